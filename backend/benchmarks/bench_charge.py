@@ -0,0 +1,142 @@
+"""
+Test de charge du dashboard
+⚙️ Débit et latences (p50, p99) de /kpi/dashboard avec 100 utilisateurs
+   simultanés, selon le pool de calcul et la coalescence des requêtes
+
+Chaque utilisateur enchaîne les requêtes /kpi/dashboard en tirant ses
+filtres parmi quelques combinaisons courantes : des requêtes identiques
+arrivent donc en même temps. Le cache des KPI est désactivé par défaut
+(--cache pour l'activer) : chaque requête qui n'est pas coalescée est
+calculée.
+
+Usage :
+    python backend/benchmarks/bench_charge.py
+    python backend/benchmarks/bench_charge.py --lignes 1000000 --utilisateurs 100 --duree 30
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from bench_workers import attendre_api, ecrire_csv  # noqa: E402
+
+# Filtres choisis par les utilisateurs (les plus courants d'abord)
+FILTRES = [
+    {},
+    {"categorie": "Technology"},
+    {"region": "West"},
+    {"segment": "Consumer"},
+    {"date_debut": "2016-01-01", "date_fin": "2016-12-31"},
+    {"categorie": "Furniture", "region": "East"},
+    {"region": "Central", "segment": "Corporate"},
+    {"date_debut": "2017-01-01", "date_fin": "2017-06-30", "categorie": "Office Supplies"},
+]
+
+# Configurations comparées : (nom, variables d'environnement du serveur)
+CONFIGURATIONS = [
+    ("thread, sans coalescence", {"API_EXECUTEUR": "thread", "API_COALESCENCE": "0"}),
+    ("thread, coalescence", {"API_EXECUTEUR": "thread", "API_COALESCENCE": "1"}),
+    ("process, coalescence", {"API_EXECUTEUR": "process", "API_COALESCENCE": "1"}),
+]
+
+
+def charge(url: str, utilisateurs: int, duree: float):
+    """Requêtes par seconde et latences p50 / p99 (ms) de `utilisateurs` simultanés"""
+    latences, erreurs, fin = [], [0], time.perf_counter() + duree
+    verrou = threading.Lock()
+    # Zipf léger : les premiers filtres sont les plus demandés
+    poids = 1 / np.arange(1, len(FILTRES) + 1)
+    poids /= poids.sum()
+
+    def utilisateur(graine: int):
+        rng = np.random.default_rng(graine)
+        locales, echecs = [], 0
+        while time.perf_counter() < fin:
+            filtres = FILTRES[rng.choice(len(FILTRES), p=poids)]
+            debut = time.perf_counter()
+            try:
+                urllib.request.urlopen(f"{url}/kpi/dashboard?{urllib.parse.urlencode(filtres)}", timeout=300).read()
+                locales.append(time.perf_counter() - debut)
+            except OSError:
+                echecs += 1
+        with verrou:
+            latences.extend(locales)
+            erreurs[0] += echecs
+
+    fils = [threading.Thread(target=utilisateur, args=(graine,)) for graine in range(utilisateurs)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    if not latences:
+        return 0.0, float('nan'), float('nan'), erreurs[0]
+    latences = np.array(latences) * 1000
+    return len(latences) / duree, float(np.percentile(latences, 50)), float(np.percentile(latences, 99)), erreurs[0]
+
+
+def mesurer(csv: str, environnement_config: dict, args):
+    """Démarre l'API avec la configuration, mesure, renvoie aussi les compteurs du pool"""
+    environnement = dict(
+        os.environ,
+        API_WORKERS="1",
+        BACKEND_PORT=str(args.port),
+        DATASET_PATH=csv,
+        DATASET_SNAPSHOT_DIR="",
+        KPI_CACHE_TAILLE="512" if args.cache else "0",
+        # Premières requêtes mesurées à froid, comme avant le préchauffage
+        KPI_PRECHAUFFAGE="0",
+        **environnement_config,
+    )
+    processus = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=DOSSIER_BACKEND, env=environnement,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        attendre_api(url, processus)
+        # Échauffement : pool créé (et processus de calcul chargés en mode process)
+        urllib.request.urlopen(url + "/kpi/dashboard", timeout=600).read()
+        resultat = charge(url, args.utilisateurs, args.duree)
+        with urllib.request.urlopen(url + "/cache/stats", timeout=60) as reponse:
+            executeur = json.load(reponse)["executeur"]
+        return resultat, executeur
+    finally:
+        processus.terminate()
+        processus.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=int, default=1_000_000)
+    parser.add_argument('--utilisateurs', type=int, default=100)
+    parser.add_argument('--duree', type=float, default=30)
+    parser.add_argument('--cache', action='store_true', help="Activer le cache des KPI")
+    parser.add_argument('--port', type=int, default=8766)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        csv = ecrire_csv(args.lignes, dossier)
+        print(f"{args.lignes:,} lignes, {os.cpu_count()} CPU, {args.utilisateurs} utilisateurs, "
+              f"{args.duree:.0f} s, cache {'activé' if args.cache else 'désactivé'}")
+        print(f"{'configuration':<26} {'req/s':>7} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+              f"{'erreurs':>8} {'calculs':>8} {'coalescées':>11}")
+        for nom, configuration in CONFIGURATIONS:
+            (debit, p50, p99, erreurs), executeur = mesurer(csv, configuration, args)
+            print(f"{nom:<26} {debit:>7.1f} {p50:>9.0f} {p99:>9.0f} "
+                  f"{erreurs:>8} {executeur['calculs']:>8} {executeur['coalescees']:>11}")
+
+
+if __name__ == "__main__":
+    main()
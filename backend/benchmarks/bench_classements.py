@@ -0,0 +1,84 @@
+"""
+Benchmark des classements
+🏆 Compare le tri complet de l'agrégat (sort_values + head / tail) à la
+   sélection partielle des rangs demandés (classements.rangs) sur des
+   agrégats de 100 000 produits et plus
+
+Les deux méthodes doivent retourner les mêmes lignes dans le même ordre
+(tri stable des deux côtés).
+
+Usage :
+    python backend/benchmarks/bench_classements.py
+    python backend/benchmarks/bench_classements.py --produits 100000 1000000 --limite 10
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from classements import CRITERES_PRODUITS, rangs  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+
+def generer_agregat(nb_produits: int, graine: int = 42) -> pd.DataFrame:
+    """Agrégat par produit (comme ContexteKPI.produits et marges), marges comprises"""
+    rng = np.random.default_rng(graine)
+    ventes = rng.gamma(1.2, 800, nb_produits)
+    profits = ventes * rng.normal(0.12, 0.25, nb_produits)
+    return pd.DataFrame({
+        'Product Name': pd.Series(np.arange(nb_produits)).map('Product {:07d}'.format),
+        'Category': np.array(['Furniture', 'Office Supplies', 'Technology'], dtype=object)[rng.integers(0, 3, nb_produits)],
+        'Sales': ventes,
+        'Quantity': rng.integers(1, 500, nb_produits),
+        'Profit': profits,
+        'marge_pct': profits / ventes * 100,
+    })
+
+
+def tri_complet(produits: pd.DataFrame, colonne: str, debut: int, fin: int, decroissant: bool) -> pd.DataFrame:
+    """Référence : tri de tout l'agrégat puis tranche"""
+    return produits.sort_values(colonne, ascending=not decroissant, kind='stable').iloc[debut:fin]
+
+
+def selection_partielle(produits: pd.DataFrame, colonne: str, debut: int, fin: int, decroissant: bool) -> pd.DataFrame:
+    """Sélection des seuls rangs demandés"""
+    return produits.take(rangs(produits[colonne].to_numpy(), debut, fin, decroissant))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--produits', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--limite', type=int, default=10)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'produits':>10} {'critère':<9} {'liste':<14} {'tri complet (ms)':>17} {'partiel (ms)':>13} {'gain':>7}")
+    for nb_produits in args.produits:
+        produits = generer_agregat(nb_produits)
+        listes = {
+            "top": (0, args.limite, True),
+            "bottom": (0, args.limite, False),
+            "page 100": (100 * args.limite, 101 * args.limite, True),
+        }
+        for critere, colonne in CRITERES_PRODUITS.items():
+            for nom, (debut, fin, decroissant) in listes.items():
+                attendu = tri_complet(produits, colonne, debut, fin, decroissant)
+                obtenu = selection_partielle(produits, colonne, debut, fin, decroissant)
+                assert attendu['Product Name'].tolist() == obtenu['Product Name'].tolist(), \
+                    f"Classement différent ({nb_produits} produits, {critere}, {nom})"
+
+                t_tri = chronometrer(lambda: tri_complet(produits, colonne, debut, fin, decroissant), args.repetitions)
+                t_partiel = chronometrer(
+                    lambda: selection_partielle(produits, colonne, debut, fin, decroissant), args.repetitions
+                )
+                print(f"{nb_produits:>10} {critere:<9} {nom:<14} {t_tri:>17.2f} {t_partiel:>13.2f} "
+                      f"{t_tri / max(t_partiel, 1e-6):>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
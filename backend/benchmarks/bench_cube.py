@@ -0,0 +1,115 @@
+"""
+Benchmark du cube journalier
+🧊 Vérifie que le cube donne les mêmes agrégats qu'un parcours des lignes
+   filtrées, puis compare les temps de réponse
+
+Usage :
+    python backend/benchmarks/bench_cube.py
+    python backend/benchmarks/bench_cube.py --tailles 10000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import IndexFiltres  # noqa: E402
+from cube import CubeJournalier  # noqa: E402
+from bench_filtres import SCENARIOS, chronometrer  # noqa: E402
+
+AGREGATIONS = {
+    'Sales': 'sum',
+    'Profit': 'sum',
+    'Quantity': 'sum',
+    'Order ID': 'nunique',
+    'Customer ID': 'nunique',
+}
+
+# Regroupements testés : None (total), dimension ou format de période
+REGROUPEMENTS = [None, 'Category', 'Region', '%Y-%m-%d', '%Y-%m', '%Y']
+
+
+def generer_dataset(nb_lignes: int, graine: int = 42) -> pd.DataFrame:
+    """Dataset au schéma Superstore avec identifiants de commandes et clients"""
+    rng = np.random.default_rng(graine)
+    nb_commandes = max(nb_lignes // 2, 1)
+    commande = rng.integers(0, nb_commandes, nb_lignes)
+    client = rng.integers(0, max(nb_lignes // 12, 1), nb_commandes)
+    jour = rng.integers(0, 4 * 365, nb_commandes)
+    return pd.DataFrame({
+        'Order ID': pd.Series(commande).map('CA-{:07d}'.format),
+        'Customer ID': pd.Series(client[commande]).map('CU-{:06d}'.format),
+        'Order Date': pd.Timestamp('2014-01-01') + pd.to_timedelta(jour[commande], unit='D'),
+        'Category': np.array(['Furniture', 'Office Supplies', 'Technology'], dtype=object)[rng.integers(0, 3, nb_lignes)],
+        'Region': np.array(['Central', 'East', 'South', 'West'], dtype=object)[rng.integers(0, 4, nb_lignes)],
+        'Segment': np.array(['Consumer', 'Corporate', 'Home Office'], dtype=object)[rng.integers(0, 3, nb_lignes)],
+        'Sales': rng.gamma(1.2, 200, nb_lignes),
+        'Profit': rng.normal(30, 100, nb_lignes),
+        'Quantity': rng.integers(1, 10, nb_lignes),
+    })
+
+
+def parcours(index: IndexFiltres, regroupement, filtres):
+    """Agrégation de référence sur les lignes filtrées"""
+    lignes = index.filtrer(**filtres)
+    if regroupement is None:
+        return {colonne: getattr(lignes[colonne], fonction)() for colonne, fonction in AGREGATIONS.items()}
+    cle = regroupement if regroupement in lignes.columns else lignes['Order Date'].dt.strftime(regroupement)
+    return lignes.groupby(cle).agg(AGREGATIONS)
+
+
+def depuis_cube(cube: CubeJournalier, regroupement, filtres):
+    """Même agrégation lue dans le cube"""
+    cellules = cube.selection(**filtres)
+    if regroupement is None:
+        return cube.agreger(cellules, AGREGATIONS)
+    if regroupement in cube.valeurs:
+        libelles = cube.libelles(cellules, regroupement)
+    else:
+        libelles = pd.DatetimeIndex(cube.jours[cellules]).strftime(regroupement)
+    return cube.agreger(cellules, AGREGATIONS, libelles)
+
+
+def verifier(attendu, obtenu, contexte: str):
+    """Les sommes doivent être égales à l'arrondi près, les comptages exactement"""
+    if isinstance(attendu, dict):
+        attendu, obtenu = pd.Series(attendu), pd.Series(obtenu)
+    else:
+        assert list(attendu.index) == list(obtenu.index), f"Groupes différents ({contexte})"
+    for colonne in AGREGATIONS:
+        a, o = np.asarray(attendu[colonne], dtype=float), np.asarray(obtenu[colonne], dtype=float)
+        assert np.allclose(a, o, rtol=1e-9, atol=1e-6), f"{colonne} différent ({contexte})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<16} {'groupe':<10} {'parcours (ms)':>14} {'cube (ms)':>10} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        index = IndexFiltres(generer_dataset(nb_lignes))
+        debut = time.perf_counter()
+        cube = CubeJournalier(index.df)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for nom, filtres in SCENARIOS.items():
+            for regroupement in REGROUPEMENTS:
+                contexte = f"{nb_lignes} lignes, {nom}, {regroupement}"
+                verifier(parcours(index, regroupement, filtres), depuis_cube(cube, regroupement, filtres), contexte)
+
+                t_parcours = chronometrer(lambda: parcours(index, regroupement, filtres), args.repetitions)
+                t_cube = chronometrer(lambda: depuis_cube(cube, regroupement, filtres), args.repetitions)
+                print(f"{nb_lignes:>10} {nom:<16} {str(regroupement):<10} {t_parcours:>14.2f} {t_cube:>10.2f} "
+                      f"{t_parcours / max(t_cube, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(construction)':<16} {len(cube)} cellules en {construction:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
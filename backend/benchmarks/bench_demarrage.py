@@ -0,0 +1,69 @@
+"""
+Benchmark du temps de démarrage de l'API
+💾 Compare le démarrage depuis le CSV (parsing complet) et depuis le snapshot
+
+Chaque mesure lance un nouveau processus Python qui importe main.py
+(chargement, index de filtrage et cube compris).
+
+Usage :
+    python backend/benchmarks/bench_demarrage.py
+    python backend/benchmarks/bench_demarrage.py --tailles 10000 1000000
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from bench_cube import generer_dataset  # noqa: E402
+
+
+def ecrire_csv(nb_lignes: int, chemin: str):
+    """CSV au format de la source (dates en MM/DD/YYYY)"""
+    df = generer_dataset(nb_lignes)
+    rng = np.random.default_rng(7)
+    df['Ship Date'] = df['Order Date'] + pd.to_timedelta(rng.integers(0, 7, nb_lignes), unit='D')
+    df['Discount'] = rng.choice([0, 0.1, 0.2, 0.5], nb_lignes)
+    for colonne in ('Order Date', 'Ship Date'):
+        df[colonne] = df[colonne].dt.strftime('%m/%d/%Y')
+    df.to_csv(chemin, index=False)
+
+
+def demarrer(env: dict) -> float:
+    """Durée (s) d'un import de main.py dans un processus neuf"""
+    debut = time.perf_counter()
+    subprocess.run([sys.executable, '-c', 'import main'], cwd=DOSSIER_BACKEND, env=env,
+                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - debut
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'CSV (s)':>9} {'snapshot (s)':>13} {'gain':>7}")
+    with tempfile.TemporaryDirectory() as dossier:
+        for nb_lignes in args.tailles:
+            csv = os.path.join(dossier, f"superstore_{nb_lignes}.csv")
+            ecrire_csv(nb_lignes, csv)
+            env = {**os.environ, "DATASET_PATH": csv,
+                   "DATASET_SNAPSHOT_DIR": os.path.join(dossier, f"snapshot_{nb_lignes}")}
+
+            # 1er démarrage : parsing du CSV + écriture du snapshot
+            t_csv = demarrer(env)
+            # Démarrages suivants : lecture du snapshot
+            t_snapshot = min(demarrer(env) for _ in range(3))
+            print(f"{nb_lignes:>10} {t_csv:>9.2f} {t_snapshot:>13.2f} {t_csv / t_snapshot:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark des comptages distincts
+🔢 Compare pandas nunique (lignes filtrées), le mode exact du cube (bitmaps
+   d'identifiants) et le mode approché (esquisses HyperLogLog)
+
+Le mode exact doit donner exactement les comptages de pandas ; pour le
+mode approché, l'erreur relative maximale est affichée. Les temps du cube
+ne mesurent que le comptage (cellules et groupes déjà calculés).
+
+Usage :
+    python backend/benchmarks/bench_distincts.py
+    python backend/benchmarks/bench_distincts.py --tailles 1000000 10000000 --colonnes 'Order ID'
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import IndexFiltres  # noqa: E402
+from cube import CubeJournalier  # noqa: E402
+from bench_filtres import SCENARIOS, chronometrer  # noqa: E402
+from bench_cube import generer_dataset  # noqa: E402
+
+# Regroupements testés : None (total), dimension ou format de période
+REGROUPEMENTS = [None, 'Region', '%Y', '%Y-%m', '%Y-%m-%d']
+
+
+def avec_pandas(index: IndexFiltres, colonne: str, regroupement, filtres) -> np.ndarray:
+    """Comptage de référence : nunique sur les lignes filtrées"""
+    lignes = index.filtrer(**filtres)
+    if regroupement is None:
+        return np.array([lignes[colonne].nunique()])
+    cle = regroupement if regroupement in lignes.columns else lignes['Order Date'].dt.strftime(regroupement)
+    return lignes.groupby(cle, observed=True)[colonne].nunique().to_numpy()
+
+
+def selection_cube(cube: CubeJournalier, regroupement, filtres):
+    """Cellules retenues et groupe de chaque cellule (hors mesure)"""
+    cellules = cube.selection(**filtres)
+    if regroupement is None:
+        return cellules, None, 1
+    if regroupement in cube.valeurs:
+        libelles = cube.libelles(cellules, regroupement)
+    else:
+        libelles = pd.DatetimeIndex(cube.jours[cellules]).strftime(regroupement)
+    groupes, cles = pd.factorize(np.asarray(libelles), sort=True)
+    return cellules, groupes, len(cles)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--colonnes', nargs='+', default=['Order ID', 'Customer ID'])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'colonne':<12} {'scenario':<16} {'groupe':<9} "
+          f"{'pandas (ms)':>12} {'exact (ms)':>11} {'approx (ms)':>12} {'erreur max':>11}")
+    for nb_lignes in args.tailles:
+        index = IndexFiltres(generer_dataset(nb_lignes))
+        cube = CubeJournalier(index.df)
+
+        for colonne in args.colonnes:
+            debut = time.perf_counter()
+            registres = cube.ids[colonne].esquisses()
+            construction = (time.perf_counter() - debut) * 1000
+
+            for nom, filtres in SCENARIOS.items():
+                for regroupement in REGROUPEMENTS:
+                    attendu = avec_pandas(index, colonne, regroupement, filtres)
+                    # Les libellés des groupes sont calculés une fois : seul le comptage est mesuré
+                    cellules, groupes, nb_groupes = selection_cube(cube, regroupement, filtres)
+                    exact = cube.compter_distincts(cellules, colonne, groupes, nb_groupes, 'exact')
+                    assert np.array_equal(attendu, exact), f"{nb_lignes} lignes, {colonne}, {nom}, {regroupement}"
+                    approche = cube.compter_distincts(cellules, colonne, groupes, nb_groupes, 'approx')
+                    erreur = np.max(np.abs(approche - attendu) / np.maximum(attendu, 1))
+
+                    t_pandas = chronometrer(lambda: avec_pandas(index, colonne, regroupement, filtres), args.repetitions)
+                    t_exact = chronometrer(
+                        lambda: cube.compter_distincts(cellules, colonne, groupes, nb_groupes, 'exact'), args.repetitions
+                    )
+                    t_approx = chronometrer(
+                        lambda: cube.compter_distincts(cellules, colonne, groupes, nb_groupes, 'approx'), args.repetitions
+                    )
+                    print(f"{nb_lignes:>10} {colonne:<12} {nom:<16} {str(regroupement):<9} "
+                          f"{t_pandas:>12.2f} {t_exact:>11.2f} {t_approx:>12.2f} {erreur:>10.1%}")
+            print(f"{nb_lignes:>10} {colonne:<12} (esquisses : {len(cube)} cellules, "
+                  f"{registres.nbytes / 2**20:.0f} Mo, {construction:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
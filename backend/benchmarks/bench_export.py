@@ -0,0 +1,128 @@
+"""
+Benchmark de l'export des commandes
+📤 Compare l'export complet par pages de 1000 lignes (/data/commandes avec
+   offset) à l'export en flux (/data/commandes/export) en NDJSON, CSV et
+   Arrow, puis le coût d'une page selon sa profondeur (offset vs curseur)
+
+Les requêtes passent par l'application (TestClient) sur un CSV synthétique.
+Le pic mémoire est mesuré avec tracemalloc (allocations Python et numpy)
+pendant l'export ; chaque export est vérifié (mêmes Row ID, même ordre).
+
+Usage :
+    python backend/benchmarks/bench_export.py
+    python backend/benchmarks/bench_export.py --lignes 1000000
+"""
+
+import argparse
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import filtrer_par_masques  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+from bench_types import generer_dataset  # noqa: E402
+
+# Filtre appliqué aux exports et aux pages
+FILTRES = {"categorie": "Technology"}
+
+
+def par_pages(client, filtres):
+    """Ancien export : pages JSON de 1000 lignes avec offset"""
+    row_ids, offset = [], 0
+    while True:
+        page = client.get("/data/commandes", params={"limite": 1000, "offset": offset, **filtres}).json()
+        row_ids.extend(ligne['Row ID'] for ligne in page['data'])
+        offset += 1000
+        if offset >= page['total']:
+            return row_ids
+
+
+def en_flux(client, format_export, filtres):
+    """Export en flux : (Row ID exportés, taille en octets)"""
+    contenu = b"".join(client.stream_bytes("/data/commandes/export", {"format_export": format_export, **filtres}))
+    if format_export == 'ndjson':
+        row_ids = [json.loads(ligne)['Row ID'] for ligne in contenu.splitlines()]
+    elif format_export == 'csv':
+        row_ids = pd.read_csv(io.BytesIO(contenu), usecols=['Row ID'])['Row ID'].tolist()
+    else:
+        import pyarrow as pa
+        row_ids = pa.ipc.open_stream(contenu).read_all().column('Row ID').to_pylist()
+    return row_ids, len(contenu)
+
+
+def mesurer(fonction):
+    """(résultat, durée en s, pic mémoire en Mo)"""
+    tracemalloc.start()
+    debut = time.perf_counter()
+    resultat = fonction()
+    duree = time.perf_counter() - debut
+    _, pic = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return resultat, duree, pic / 2**20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=int, default=200_000)
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "superstore.csv")
+        dataset = generer_dataset(args.lignes)
+        dataset['Order Date'] = dataset['Order Date'].dt.strftime('%m/%d/%Y')
+        dataset['Ship Date'] = dataset['Order Date']
+        dataset.to_csv(chemin, index=False, encoding='latin-1')
+        os.environ.update(DATASET_PATH=chemin, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="")
+        import main as api
+        from fastapi.testclient import TestClient
+
+        class Client(TestClient):
+            def stream_bytes(self, url, params):
+                with self.stream("GET", url, params=params) as reponse:
+                    yield from reponse.iter_bytes()
+
+        client = Client(api.app)
+        # Référence : filtrage par masques complets, sans index
+        attendu = filtrer_par_masques(api.etat.df, **FILTRES)['Row ID'].tolist()
+
+        print(f"{args.lignes:,} lignes, {len(attendu):,} exportées ({FILTRES})")
+        print(f"{'export':<22} {'durée (s)':>10} {'taille (Mo)':>12} {'pic mémoire (Mo)':>17}")
+        row_ids, duree, pic = mesurer(lambda: par_pages(client, FILTRES))
+        assert row_ids == attendu, "pages JSON"
+        print(f"{'pages JSON (offset)':<22} {duree:>10.2f} {'-':>12} {pic:>17.1f}")
+        for format_export in ('ndjson', 'csv', 'arrow'):
+            if format_export == 'arrow' and not api.arrow_disponible():
+                print(f"{'flux arrow':<22} (pyarrow non installé)")
+                continue
+            (row_ids, octets), duree, pic = mesurer(lambda: en_flux(client, format_export, FILTRES))
+            assert row_ids == attendu, format_export
+            print(f"{'flux ' + format_export:<22} {duree:>10.2f} {octets / 2**20:>12.1f} {pic:>17.1f}")
+
+        # Coût d'une page de 100 lignes selon sa profondeur
+        print(f"\n{'profondeur':>10} {'offset (ms)':>12} {'curseur (ms)':>13}")
+        for profondeur in (0, len(attendu) // 2, len(attendu) - 200):
+            # Curseur de la dernière ligne précédant la page
+            curseur = api.curseur_suivant(api.etat.df, api.etat.index.selection(**FILTRES), profondeur)
+            t_offset = chronometrer(lambda: client.get(
+                "/data/commandes", params={"limite": 100, "offset": profondeur, **FILTRES}), args.repetitions)
+            parametres = {"limite": 100, **FILTRES, **({"apres": curseur} if curseur else {})}
+            t_curseur = chronometrer(lambda: client.get("/data/commandes", params=parametres), args.repetitions)
+            assert np.array_equal(
+                [ligne['Row ID'] for ligne in client.get("/data/commandes", params=parametres).json()['data']],
+                attendu[profondeur:profondeur + 100],
+            ), f"page {profondeur}"
+            print(f"{profondeur:>10,} {t_offset:>12.2f} {t_curseur:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark de la fidélité clients
+🔁 Compare le calcul historique (groupby par client, puis sort_values +
+   diff sur les lignes filtrées) à la chronologie des clients triée au
+   chargement (fidelite.py), cohortes de rétention comprises
+
+Les indicateurs communs doivent être égaux. L'écart moyen entre
+commandes est vérifié contre une référence pandas au niveau commande
+(le calcul historique mesurait l'écart entre lignes, donc comptait
+0 jour entre deux articles d'une même commande).
+
+Usage :
+    python backend/benchmarks/bench_fidelite.py
+    python backend/benchmarks/bench_fidelite.py --tailles 10k 1M --horizon 24
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from fidelite import ChronologieClients, indicateurs_fidelite, retention_cohortes  # noqa: E402
+from filtres import filtrer_par_masques  # noqa: E402
+from generateur import generer_dataset, taille  # noqa: E402
+from schema import compacter_dataset  # noqa: E402
+from bench_filtres import SCENARIOS, chronometrer  # noqa: E402
+
+
+def historique(lignes: pd.DataFrame) -> dict:
+    """Calcul d'origine : agrégat par client, puis écart entre lignes consécutives"""
+    clients = lignes.groupby('Customer ID', observed=True).agg({'Sales': 'sum', 'Order ID': 'nunique'})
+    recurrents = clients['Order ID'] > 1
+    orders = lignes[['Customer ID', 'Order Date']].dropna().sort_values(['Customer ID', 'Order Date'])
+    delta = orders.groupby('Customer ID', observed=True)['Order Date'].diff().dt.days.dropna()
+    return {
+        "total_clients": len(clients),
+        "clients_recurrents": int(recurrents.sum()),
+        "avg_orders_per_client": round(clients['Order ID'].mean(), 2) if len(clients) else 0,
+        "ca_clients_recurrents": round(clients.loc[recurrents, 'Sales'].sum(), 2),
+        "avg_days_between_orders_lignes": round(delta.mean(), 2) if len(delta) else 0,
+    }
+
+
+def ecart_commandes(lignes: pd.DataFrame) -> float:
+    """Référence : écart moyen entre commandes distinctes consécutives d'un client"""
+    commandes = lignes.groupby(['Customer ID', 'Order ID'], observed=True)['Order Date'].first().reset_index()
+    commandes = commandes.sort_values(['Customer ID', 'Order Date'], kind='stable')
+    delta = commandes.groupby('Customer ID', observed=True)['Order Date'].diff().dt.days.dropna()
+    return round(delta.mean(), 2) if len(delta) else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--horizon', type=int, default=12, help="Mois des courbes de rétention")
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<16} {'historique (ms)':>16} {'chronologie (ms)':>17} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        dataset = generer_dataset(nb_lignes)
+        dataset['Order Date'] = pd.to_datetime(dataset['Order Date'], format='%m/%d/%Y')
+        dataset = compacter_dataset(dataset.sort_values('Order Date', kind='stable').reset_index(drop=True))
+
+        debut = time.perf_counter()
+        chronologie = ChronologieClients(dataset)
+        construction = (time.perf_counter() - debut) * 1000
+
+        def nouveau(filtres):
+            commandes = chronologie.commandes_clients(filtres)
+            return indicateurs_fidelite(commandes), retention_cohortes(commandes, args.horizon)
+
+        for nom, filtres in SCENARIOS.items():
+            # Vérification : mêmes indicateurs que le calcul historique, écart au niveau commande
+            lignes = filtrer_par_masques(dataset, **filtres)
+            attendu = historique(lignes)
+            obtenu, cohortes = nouveau(filtres)
+            for cle in ("total_clients", "clients_recurrents", "avg_orders_per_client"):
+                assert attendu[cle] == obtenu[cle], f"{cle} différent pour {nom}"
+            assert abs(attendu["ca_clients_recurrents"] - obtenu["ca_clients_recurrents"]) <= 0.011, \
+                f"ca_clients_recurrents différent pour {nom}"
+            assert obtenu["avg_days_between_orders"] == ecart_commandes(lignes), f"écart différent pour {nom}"
+            assert sum(cohorte["clients"] for cohorte in cohortes) == obtenu["total_clients"], \
+                f"cohortes incomplètes pour {nom}"
+
+            t_historique = chronometrer(lambda: historique(filtrer_par_masques(dataset, **filtres)), args.repetitions)
+            t_nouveau = chronometrer(lambda: nouveau(filtres), args.repetitions)
+            print(f"{nb_lignes:>10} {nom:<16} {t_historique:>16.2f} {t_nouveau:>17.2f} "
+                  f"{t_historique / max(t_nouveau, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(construction)':<16} {'':>16} {construction:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmark du moteur de filtrage
+⚡ Compare le filtrage historique (copie + masques) à l'index précalculé
+
+Les scénarios étendus couvrent les valeurs multiples, les dimensions fines
+(État, sous-catégorie, mode de livraison) et les intervalles de mesures.
+
+Usage :
+    python backend/benchmarks/bench_filtres.py
+    python backend/benchmarks/bench_filtres.py --tailles 10000 1000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import IndexFiltres, filtrer_par_masques  # noqa: E402
+
+# Combinaisons de filtres représentatives du dashboard
+SCENARIOS = {
+    "sans_filtre": {},
+    "dates": {"date_debut": "2015-01-01", "date_fin": "2016-06-30"},
+    "categorie": {"categorie": "Technology"},
+    "region_segment": {"region": "West", "segment": "Consumer"},
+    "complet": {"date_debut": "2016-01-01", "date_fin": "2016-12-31",
+                "categorie": "Furniture", "region": "East", "segment": "Corporate"},
+}
+
+# Valeurs multiples, dimensions fines et intervalles (hors cube : lignes seulement)
+SCENARIOS_ETENDUS = {
+    "multi_valeurs": {"region": ["West", "East"], "categorie": "Technology,Furniture"},
+    "etat": {"etat": "California"},
+    "fin": {"etat": ["Texas", "Ohio"], "sous_categorie": "Phones", "mode_livraison": "First Class"},
+    "ventes": {"ventes_min": 500},
+    "remise_dates": {"date_debut": "2016-01-01", "date_fin": "2016-12-31", "remise_min": 0.1, "remise_max": 0.3},
+}
+
+ETATS = ['California', 'New York', 'Texas', 'Ohio', 'Washington', 'Florida', 'Illinois', 'Pennsylvania']
+SOUS_CATEGORIES = ['Binders', 'Chairs', 'Phones', 'Paper', 'Storage', 'Tables', 'Copiers', 'Art']
+MODES_LIVRAISON = ['Standard Class', 'Second Class', 'First Class', 'Same Day']
+
+
+def generer_dataset(nb_lignes: int, graine: int = 42) -> pd.DataFrame:
+    """Génère un dataset minimal au schéma Superstore pour le filtrage"""
+    rng = np.random.default_rng(graine)
+    jours = rng.integers(0, 4 * 365, nb_lignes)
+    return pd.DataFrame({
+        'Order Date': pd.Timestamp('2014-01-01') + pd.to_timedelta(jours, unit='D'),
+        'Category': np.array(['Furniture', 'Office Supplies', 'Technology'], dtype=object)[rng.integers(0, 3, nb_lignes)],
+        'Region': np.array(['Central', 'East', 'South', 'West'], dtype=object)[rng.integers(0, 4, nb_lignes)],
+        'Segment': np.array(['Consumer', 'Corporate', 'Home Office'], dtype=object)[rng.integers(0, 3, nb_lignes)],
+        'State': np.array(ETATS, dtype=object)[rng.integers(0, len(ETATS), nb_lignes)],
+        'Sub-Category': np.array(SOUS_CATEGORIES, dtype=object)[rng.integers(0, len(SOUS_CATEGORIES), nb_lignes)],
+        'Ship Mode': np.array(MODES_LIVRAISON, dtype=object)[rng.integers(0, len(MODES_LIVRAISON), nb_lignes)],
+        'Sales': rng.gamma(1.2, 200, nb_lignes),
+        'Discount': rng.choice([0.0, 0.1, 0.2, 0.3, 0.5, 0.8], nb_lignes),
+        'Profit': rng.normal(30, 100, nb_lignes),
+        'Quantity': rng.integers(1, 10, nb_lignes),
+    })
+
+
+def chronometrer(fonction, repetitions: int) -> float:
+    """Temps médian d'exécution en millisecondes"""
+    temps = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        temps.append((time.perf_counter() - debut) * 1000)
+    return float(np.median(temps))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 1_000_000, 10_000_000])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<16} {'masques (ms)':>13} {'index (ms)':>11} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        df = generer_dataset(nb_lignes)
+
+        debut = time.perf_counter()
+        index = IndexFiltres(df)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for nom, filtres in {**SCENARIOS, **SCENARIOS_ETENDUS}.items():
+            # Vérification : mêmes lignes que le filtrage historique
+            attendu = filtrer_par_masques(index.df, **filtres)
+            obtenu = index.filtrer(**filtres)
+            assert attendu.index.equals(obtenu.index), f"Résultat différent pour {nom}"
+
+            t_masques = chronometrer(lambda: filtrer_par_masques(index.df, **filtres), args.repetitions)
+            t_index = chronometrer(lambda: index.filtrer(**filtres), args.repetitions)
+            print(f"{nb_lignes:>10} {nom:<16} {t_masques:>13.2f} {t_index:>11.2f} {t_masques / max(t_index, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(construction)':<16} {construction:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark du drill-down géographique
+🗺️ Compare le regroupement des lignes filtrées par région / État / ville
+   au cube géographique précalculé (geographie.py)
+
+Pour chaque niveau et chaque scénario de filtres (dates, région, État),
+les sommes doivent être égales à l'arrondi près et les clients et
+commandes distincts exactement.
+
+Usage :
+    python backend/benchmarks/bench_geographie.py
+    python backend/benchmarks/bench_geographie.py --tailles 10k 1M 10M
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import IndexFiltres  # noqa: E402
+from geographie import AGREGATIONS_GEO, NIVEAUX, CubeGeographique  # noqa: E402
+from generateur import generer_dataset, taille  # noqa: E402
+from schema import compacter_dataset  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+# Filtres du drill-down : tout le dataset, une année, un parent région ou État
+SCENARIOS = {
+    "sans_filtre": {},
+    "annee": {"date_debut": "2016-01-01", "date_fin": "2016-12-31"},
+    "region": {"region": "West"},
+    "etat_dates": {"etat": "California", "date_debut": "2015-07-01", "date_fin": "2016-06-30"},
+}
+
+
+def parcours(index: IndexFiltres, niveau: str, filtres) -> pd.DataFrame:
+    """Référence : regroupement des lignes filtrées par les colonnes du niveau"""
+    lignes = index.filtrer(**filtres)
+    return lignes.groupby(list(NIVEAUX[niveau]), observed=True).agg(AGREGATIONS_GEO).reset_index()
+
+
+def depuis_cube(cube: CubeGeographique, niveau: str, filtres) -> pd.DataFrame:
+    """Même agrégat lu dans le cube (sommes par ville remontées au niveau)"""
+    return cube.agreger_niveau(cube.selection(**filtres), niveau)
+
+
+def verifier(attendu: pd.DataFrame, obtenu: pd.DataFrame, contexte: str):
+    """Mêmes lieux dans le même ordre, sommes à l'arrondi près, comptages exacts"""
+    assert len(attendu) == len(obtenu), f"{contexte} : {len(attendu)} lieux attendus, {len(obtenu)} obtenus"
+    for colonne in attendu.columns:
+        a, b = attendu[colonne].to_numpy(), obtenu[colonne].to_numpy()
+        if AGREGATIONS_GEO.get(colonne) == 'sum':
+            assert np.allclose(a, b, rtol=1e-9, atol=1e-6), f"{contexte} : {colonne}"
+        else:
+            assert np.array_equal(a.astype(b.dtype), b), f"{contexte} : {colonne}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<12} {'niveau':<7} {'lignes (ms)':>12} {'cube (ms)':>10} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        dataset = generer_dataset(nb_lignes)
+        dataset['Order Date'] = pd.to_datetime(dataset['Order Date'], format='%m/%d/%Y')
+        index = IndexFiltres(compacter_dataset(dataset))
+
+        debut = time.perf_counter()
+        cube = CubeGeographique(index.df)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for nom, filtres in SCENARIOS.items():
+            for niveau in NIVEAUX:
+                verifier(parcours(index, niveau, filtres), depuis_cube(cube, niveau, filtres),
+                         f"{nb_lignes} lignes, {nom}, {niveau}")
+                t_lignes = chronometrer(lambda: parcours(index, niveau, filtres), args.repetitions)
+                t_cube = chronometrer(lambda: depuis_cube(cube, niveau, filtres), args.repetitions)
+                print(f"{nb_lignes:>10} {nom:<12} {niveau:<7} {t_lignes:>12.2f} {t_cube:>10.2f} "
+                      f"{t_lignes / max(t_cube, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(construction)':<20} {len(cube):>12} cellules en {construction:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
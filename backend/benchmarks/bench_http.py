@@ -0,0 +1,94 @@
+"""
+Benchmark du cache HTTP
+🏷️ Chargement complet vs revalidation (If-None-Match -> 304) et taille
+   des réponses selon l'encodage (identité, gzip, brotli)
+
+Mesuré dans le processus courant sur un CSV synthétique (generateur.py),
+cache des KPI désactivé : chaque 200 recalcule la réponse. Vérifie
+qu'une revalidation ne lance aucun calcul et que les réponses
+compressées redonnent le même contenu.
+
+Usage :
+    python backend/benchmarks/bench_http.py
+    python backend/benchmarks/bench_http.py --taille 1M --repetitions 10
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from generateur import ecrire_csv, taille  # noqa: E402
+
+# Réponses volumineuses ou coûteuses
+REQUETES = [
+    "/kpi/dashboard",
+    "/kpi/temporel?periode=jour",
+    "/kpi/produits/top?limite=50",
+    "/data/commandes?limite=1000",
+]
+
+
+def mediane_ms(client, url: str, en_tetes: dict, repetitions: int) -> float:
+    """Durée médiane d'une requête (ms)"""
+    mesures = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        client.get(url, headers=en_tetes)
+        mesures.append((time.perf_counter() - debut) * 1000)
+    return statistics.median(mesures)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--taille', type=taille, default=100_000, help="Nombre de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as dossier:
+        csv = os.path.join(dossier, f"superstore-{args.taille}.csv")
+        ecrire_csv(csv, args.taille)
+        os.environ.update(DATASET_PATH=csv, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="", KPI_CACHE_TAILLE="0",
+                          DATASET_SURVEILLANCE="0", DATASET_MOTEUR="memoire", KPI_MOTEUR="pandas",
+                          API_COMPRESSION="1")
+        os.chdir(DOSSIER_BACKEND)
+        import main as api
+        from cache_http import encodages_disponibles
+        from fastapi.testclient import TestClient
+
+        client = TestClient(api.app)
+        encodages = ["identity"] + encodages_disponibles()
+        print(f"{args.taille:,} lignes, encodages : {', '.join(encodages)}")
+        print(f"{'requête':<30} {'200 (ms)':>9} {'304 (ms)':>9} "
+              + " ".join(f"{encodage + ' (Ko)':>14}" for encodage in encodages))
+        for url in REQUETES:
+            reference = client.get(url, headers={"Accept-Encoding": "identity"})
+            etag = reference.headers["ETag"]
+
+            # Revalidation : 304 sans calcul
+            calculs = api.executeur.calculs
+            reponse = client.get(url, headers={"If-None-Match": etag})
+            assert reponse.status_code == 304 and not reponse.content, f"{url} : pas de 304"
+            assert api.executeur.calculs == calculs, f"{url} : calcul lancé pour un 304"
+
+            # Tailles transférées selon l'encodage, contenu identique une fois décodé
+            tailles = []
+            for encodage in encodages:
+                reponse = client.get(url, headers={"Accept-Encoding": encodage})
+                assert reponse.content == reference.content, f"{url} : contenu différent ({encodage})"
+                assert reponse.headers.get("Content-Encoding", "identity") == encodage, f"{url} : {encodage} ignoré"
+                tailles.append(reponse.num_bytes_downloaded / 1024)
+
+            complet = mediane_ms(client, url, {"Accept-Encoding": encodages[-1]}, args.repetitions)
+            revalidation = mediane_ms(client, url, {"If-None-Match": etag}, args.repetitions)
+            print(f"{url:<30} {complet:>9.1f} {revalidation:>9.2f} "
+                  + " ".join(f"{taille_ko:>14.1f}" for taille_ko in tailles))
+
+
+if __name__ == "__main__":
+    main()
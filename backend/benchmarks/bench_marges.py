@@ -0,0 +1,103 @@
+"""
+Benchmark de l'agrégat par produit et de l'analyse des marges
+💹 Compare le regroupement des lignes filtrées par produit aux cumuls
+   mensuels par produit (marges.CumulsProduits), puis mesure l'analyse
+   des marges calculée sur l'agrégat
+
+Pour chaque scénario (plage de dates, catégorie), les deux agrégats
+doivent contenir les mêmes produits, avec les mêmes sommes à l'arrondi
+près.
+
+Usage :
+    python backend/benchmarks/bench_marges.py
+    python backend/benchmarks/bench_marges.py --tailles 10k 1M 10M
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import Filtres, IndexFiltres  # noqa: E402
+from marges import COLONNES_PRODUIT, CumulsProduits, analyser_marges  # noqa: E402
+from generateur import generer_dataset, taille  # noqa: E402
+from schema import compacter_dataset  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+# Filtres de l'agrégat : tout le dataset, une année, des bornes en milieu de mois, une catégorie
+SCENARIOS = {
+    "sans_filtre": {},
+    "annee": {"date_debut": "2016-01-01", "date_fin": "2016-12-31"},
+    "mi_mois": {"date_debut": "2015-03-17", "date_fin": "2016-08-09"},
+    "categorie": {"categorie": "Technology", "date_debut": "2015-01-01"},
+}
+
+
+def parcours(index: IndexFiltres, filtres) -> pd.DataFrame:
+    """Référence : regroupement des lignes filtrées par produit"""
+    lignes = index.filtrer(**filtres)
+    colonnes = lignes[[*COLONNES_PRODUIT, 'Sales', 'Quantity', 'Profit']]
+    return colonnes.assign(remise_ventes=lignes['Sales'] * lignes['Discount']).groupby(
+        list(COLONNES_PRODUIT), observed=True
+    ).sum().reset_index()
+
+
+def depuis_cumuls(index: IndexFiltres, cumuls: CumulsProduits, filtres) -> pd.DataFrame:
+    """Même agrégat : différence de cumuls mensuels et jours des mois partiels"""
+    debut, fin = index.bornes(filtres.get("date_debut"), filtres.get("date_fin"))
+    return cumuls.agreger(debut, fin, Filtres(**filtres).dimensions.get('Category'))
+
+
+def verifier(attendu: pd.DataFrame, obtenu: pd.DataFrame, contexte: str):
+    """Mêmes produits dans le même ordre, sommes à l'arrondi près"""
+    assert len(attendu) == len(obtenu), f"{contexte} : {len(attendu)} produits attendus, {len(obtenu)} obtenus"
+    for colonne in attendu.columns:
+        a, b = attendu[colonne].to_numpy(), obtenu[colonne].to_numpy()
+        if colonne in COLONNES_PRODUIT:
+            assert np.array_equal(a.astype(str), b.astype(str)), f"{contexte} : {colonne}"
+        else:
+            assert np.allclose(a.astype(np.float64), b.astype(np.float64), rtol=1e-9, atol=1e-6), \
+                f"{contexte} : {colonne}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<12} {'produits':>9} {'lignes (ms)':>12} {'cumuls (ms)':>12} "
+          f"{'gain':>7} {'analyse (ms)':>13}")
+    for nb_lignes in args.tailles:
+        dataset = generer_dataset(nb_lignes)
+        dataset['Order Date'] = pd.to_datetime(dataset['Order Date'], format='%m/%d/%Y')
+        index = IndexFiltres(compacter_dataset(dataset))
+
+        debut = time.perf_counter()
+        cumuls = CumulsProduits(index.df)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for nom, filtres in SCENARIOS.items():
+            attendu = parcours(index, filtres)
+            obtenu = depuis_cumuls(index, cumuls, filtres)
+            verifier(attendu, obtenu, f"{nb_lignes} lignes, {nom}")
+            t_lignes = chronometrer(lambda: parcours(index, filtres), args.repetitions)
+            t_cumuls = chronometrer(lambda: depuis_cumuls(index, cumuls, filtres), args.repetitions)
+
+            marges = obtenu[obtenu['Sales'] > 0]
+            marges = marges.assign(marge_pct=marges['Profit'] / marges['Sales'] * 100)
+            t_analyse = chronometrer(lambda: analyser_marges(marges), args.repetitions)
+            print(f"{nb_lignes:>10} {nom:<12} {len(obtenu):>9} {t_lignes:>12.2f} {t_cumuls:>12.2f} "
+                  f"{t_lignes / max(t_cumuls, 1e-6):>6.1f}x {t_analyse:>13.2f}")
+        print(f"{nb_lignes:>10} {'(cumuls)':<12} {len(cumuls):>9} produits, {len(cumuls.bornes) - 1} mois, "
+              f"{cumuls.memoire() / 2**20:.1f} Mo en {construction:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Performance des moteurs de requêtes
+🔌 pandas, DuckDB et SQLite (KPI_MOTEUR) sur les mêmes données : démarrage,
+   mémoire et latence de chaque route KPI
+
+Chaque moteur est mesuré dans un processus neuf sur un CSV synthétique
+(generateur.py), cache des KPI désactivé. Toutes les routes /kpi sont
+appelées avec les variantes et les mélanges de filtres de bench_suite.py.
+L'équivalence des moteurs est vérifiée par les tests
+(tests/test_moteurs.py), sur les agrégats avant arrondi.
+
+Usage :
+    python backend/benchmarks/bench_moteurs.py --tailles 10k
+    python backend/benchmarks/bench_moteurs.py --tailles 1M 10M --moteurs pandas duckdb
+"""
+
+from typing import Any, Dict, List
+from urllib.parse import urlencode
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from bench_suite import requetes  # noqa: E402
+from generateur import ecrire_csv, taille  # noqa: E402
+
+MOTEURS = ('pandas', 'duckdb', 'sqlite')
+
+
+def mesurer(moteur: str, csv: str, repetitions: int) -> Dict[str, Any]:
+    """Durées des routes KPI, dans le processus courant (appelé par --enfant)"""
+    os.environ.update(DATASET_PATH=csv, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="", KPI_CACHE_TAILLE="0",
+                      DATASET_SURVEILLANCE="0", DATASET_MOTEUR="memoire", KPI_MOTEUR=moteur)
+    debut = time.perf_counter()
+    import main as api
+    demarrage = time.perf_counter() - debut
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    durees = {}
+    for chemin, parametres in requetes(api.app):
+        if not chemin.startswith("/kpi"):
+            continue
+        url = f"{chemin}?{urlencode(parametres)}" if parametres else chemin
+        reponse = client.get(chemin, params=parametres)
+        assert reponse.status_code == 200, f"{url} : statut {reponse.status_code}"
+        mesures = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            client.get(chemin, params=parametres)
+            mesures.append((time.perf_counter() - debut) * 1000)
+        durees[url] = statistics.median(mesures)
+    return {
+        "demarrage_s": demarrage,
+        "rss_max_mo": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "durees_ms": durees,
+    }
+
+
+def lancer(moteur: str, csv: str, repetitions: int, dossier: str) -> Dict[str, Any]:
+    """Mesure d'un moteur dans un processus neuf"""
+    sortie = os.path.join(dossier, f"mesures-{moteur}.json")
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--enfant', moteur, csv, sortie,
+                    '--repetitions', str(repetitions)], cwd=DOSSIER_BACKEND, check=True, stderr=subprocess.DEVNULL)
+    with open(sortie, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def afficher(nb_lignes: int, mesures: Dict[str, Dict[str, Any]]):
+    """Démarrage, RSS et médiane de chaque route, par moteur"""
+    moteurs: List[str] = list(mesures)
+    print(f"\n{nb_lignes:,} lignes")
+    print(f"{'moteur':<8} {'démarrage (s)':>14} {'RSS max (Mo)':>13}")
+    for moteur in moteurs:
+        print(f"{moteur:<8} {mesures[moteur]['demarrage_s']:>14.2f} {mesures[moteur]['rss_max_mo']:>13.0f}")
+    print(f"{'requête':<70} " + " ".join(f"{moteur + ' (ms)':>13}" for moteur in moteurs))
+    for url in mesures[moteurs[0]]["durees_ms"]:
+        print(f"{url[:70]:<70} " + " ".join(f"{mesures[moteur]['durees_ms'][url]:>13.1f}" for moteur in moteurs))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--moteurs', nargs='+', default=list(MOTEURS), choices=MOTEURS)
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--donnees', help="Dossier des CSV générés, réutilisés d'une exécution à l'autre "
+                                          "(temporaire par défaut)")
+    parser.add_argument('--enfant', nargs=3, metavar=('MOTEUR', 'CSV', 'JSON'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        moteur, csv, sortie = args.enfant
+        with open(sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(mesurer(moteur, csv, args.repetitions), fichier)
+        return
+
+    moteurs = args.moteurs
+    with tempfile.TemporaryDirectory() as temporaire:
+        dossier = args.donnees or temporaire
+        os.makedirs(dossier, exist_ok=True)
+        for nb_lignes in args.tailles:
+            csv = os.path.join(dossier, f"superstore-{nb_lignes}-42.csv")
+            if not os.path.exists(csv):
+                ecrire_csv(csv, nb_lignes)
+
+            mesures = {moteur: lancer(moteur, csv, args.repetitions, temporaire) for moteur in moteurs}
+            afficher(nb_lignes, mesures)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Benchmark du moteur parquet (hors mémoire)
+🗄️ Compare le dataset en mémoire aux partitions Parquet sur disque :
+   démarrage, RSS maximal du processus et latence des KPI, pour des
+   datasets de taille croissante (generateur.py)
+
+Chaque moteur est mesuré dans un processus neuf ; les partitions sont
+converties avant la mesure (conversion chronométrée à part). Les deux
+moteurs doivent renvoyer les mêmes KPI (à l'arrondi des sommes près).
+Le RSS du moteur parquet dépend de la taille d'une partition (un mois)
+et des dictionnaires clients / produits, pas du nombre total de lignes.
+
+Usage :
+    python backend/benchmarks/bench_partitions.py
+    python backend/benchmarks/bench_partitions.py --tailles 1M 5M --moteurs parquet
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from generateur import ecrire_csv, taille  # noqa: E402
+
+# Requêtes mesurées (cache des KPI désactivé)
+REQUETES = [
+    "/kpi/globaux",
+    "/kpi/globaux?categorie=Technology&region=West",
+    "/kpi/temporel?periode=mois&date_debut=2016-01-01&date_fin=2016-06-30",
+    "/kpi/produits/top?limite=10",
+    "/kpi/clients?limite=10&segment=Consumer",
+    "/kpi/dashboard",
+    "/data/commandes?limite=100&offset=50000",
+]
+
+
+def mesurer(moteur: str, csv: str, partitions: str, repetitions: int) -> dict:
+    """Mesures d'un moteur, dans le processus courant (appelé par --enfant)"""
+    os.environ.update(DATASET_PATH=csv, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="", KPI_CACHE_TAILLE="0",
+                      DATASET_MOTEUR=moteur, DATASET_PARQUET_DIR=partitions)
+    debut = time.perf_counter()
+    import main as api
+    demarrage = time.perf_counter() - debut
+    rss_demarrage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    durees, resultats = {}, {}
+    for url in REQUETES:
+        resultats[url] = client.get(url).json()
+        debut = time.perf_counter()
+        for _ in range(repetitions):
+            client.get(url)
+        durees[url] = (time.perf_counter() - debut) / repetitions * 1000
+    return {
+        "demarrage_s": demarrage,
+        "rss_demarrage_mo": rss_demarrage,
+        "rss_max_mo": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "durees_ms": durees,
+        "globaux": resultats["/kpi/globaux"],
+        "globaux_filtres": resultats["/kpi/globaux?categorie=Technology&region=West"],
+    }
+
+
+def lancer(moteur: str, csv: str, partitions: str, repetitions: int, dossier: str) -> dict:
+    """Mesure d'un moteur dans un processus neuf"""
+    sortie = os.path.join(dossier, f"mesures-{moteur}.json")
+    subprocess.run([sys.executable, os.path.abspath(__file__), '--enfant', moteur, csv, partitions, sortie,
+                    '--repetitions', str(repetitions)], cwd=DOSSIER_BACKEND, check=True, stderr=subprocess.DEVNULL)
+    with open(sortie, encoding='utf-8') as fichier:
+        return json.load(fichier)
+
+
+def verifier(attendu: dict, obtenu: dict, contexte: str):
+    """Mêmes KPI à l'arrondi près (ordre de sommation différent)"""
+    for cle, valeur in attendu.items():
+        assert abs(valeur - obtenu[cle]) <= max(1e-6 * abs(valeur), 0.011), f"{cle} différent ({contexte})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000, 10_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--moteurs', nargs='+', default=['memoire', 'parquet'], choices=['memoire', 'parquet'])
+    parser.add_argument('--repetitions', type=int, default=3)
+    parser.add_argument('--enfant', nargs=4, metavar=('MOTEUR', 'CSV', 'PARTITIONS', 'JSON'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        moteur, csv, partitions, sortie = args.enfant
+        with open(sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(mesurer(moteur, csv, partitions, args.repetitions), fichier)
+        return
+
+    with tempfile.TemporaryDirectory() as dossier:
+        for nb_lignes in args.tailles:
+            csv = os.path.join(dossier, f"superstore-{nb_lignes}.csv")
+            partitions = os.path.join(dossier, f"partitions-{nb_lignes}")
+            ecrire_csv(csv, nb_lignes)
+            if 'parquet' in args.moteurs:
+                # Premier démarrage du moteur parquet : conversion du CSV
+                debut = time.perf_counter()
+                subprocess.run([sys.executable, '-c', 'import main'], cwd=DOSSIER_BACKEND, check=True,
+                               env={**os.environ, "DATASET_PATH": csv, "DATASET_MOTEUR": "parquet",
+                                    "DATASET_PARQUET_DIR": partitions}, stderr=subprocess.DEVNULL)
+                print(f"\n{nb_lignes:,} lignes : conversion en partitions {time.perf_counter() - debut:.1f} s")
+
+            mesures = {moteur: lancer(moteur, csv, partitions, args.repetitions, dossier) for moteur in args.moteurs}
+            if len(mesures) == 2:
+                verifier(mesures['memoire']['globaux'], mesures['parquet']['globaux'], f"{nb_lignes} lignes")
+                verifier(mesures['memoire']['globaux_filtres'], mesures['parquet']['globaux_filtres'],
+                         f"{nb_lignes} lignes, filtres")
+
+            print(f"{'moteur':<9} {'démarrage (s)':>14} {'RSS démarrage (Mo)':>19} {'RSS max (Mo)':>13}")
+            for moteur, mesure in mesures.items():
+                print(f"{moteur:<9} {mesure['demarrage_s']:>14.2f} {mesure['rss_demarrage_mo']:>19.0f} "
+                      f"{mesure['rss_max_mo']:>13.0f}")
+            print(f"{'requête':<72} " + " ".join(f"{moteur + ' (ms)':>14}" for moteur in mesures))
+            for url in REQUETES:
+                print(f"{url:<72} " + " ".join(f"{mesure['durees_ms'][url]:>14.1f}" for mesure in mesures.values()))
+
+
+if __name__ == "__main__":
+    main()
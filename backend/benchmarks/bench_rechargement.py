@@ -0,0 +1,137 @@
+"""
+Benchmark du rechargement à chaud
+🔄 Compare l'ajout incrémental de nouvelles commandes (index et cube
+   prolongés) à la reconstruction complète de l'état
+
+Deux mesures :
+- structures seules : EtatDataset reconstruit vs EtatDataset.ajouter, avec
+  vérification que l'état obtenu par ajout est identique (mêmes lignes,
+  mêmes index inversés, mêmes cellules et sommes des cubes, même
+  chronologie des clients, mêmes cumuls par produit) ;
+- de bout en bout, via main.py sur un CSV local : relecture complète du
+  CSV vs lecture des seules lignes ajoutées en fin de fichier.
+
+Usage :
+    python backend/benchmarks/bench_rechargement.py
+    python backend/benchmarks/bench_rechargement.py --lignes 1000000 --ajouts 1000 10000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from rechargement import EtatDataset  # noqa: E402
+from schema import compacter_dataset, concatener_datasets  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+from bench_types import generer_dataset  # noqa: E402
+
+
+def verifier(attendu: EtatDataset, obtenu: EtatDataset, contexte: str) -> None:
+    """L'état incrémental doit être identique à l'état reconstruit"""
+    pd.testing.assert_frame_equal(attendu.df, obtenu.df)
+    for colonne, inverse in attendu.index.inverses.items():
+        autre = obtenu.index.inverses[colonne]
+        assert inverse.valeurs.keys() == autre.valeurs.keys(), f"{contexte} : valeurs de {colonne}"
+        for valeur in inverse.valeurs:
+            lignes = inverse.lignes(inverse.codes_retenus([valeur]))
+            assert np.array_equal(lignes, autre.lignes(autre.codes_retenus([valeur]))), f"{contexte} : lignes {valeur}"
+    for colonne, intervalle in attendu.index.intervalles.items():
+        autre = obtenu.index.intervalles[colonne]
+        assert np.array_equal(intervalle.triees, autre.triees), f"{contexte} : valeurs triées {colonne}"
+        assert np.array_equal(intervalle.ordre, autre.ordre), f"{contexte} : ordre {colonne}"
+    for nom in ('cube', 'geo'):
+        a, b = getattr(attendu, nom), getattr(obtenu, nom)
+        assert np.array_equal(a.jours, b.jours) and np.array_equal(a.lignes, b.lignes), f"{contexte} : cellules {nom}"
+        for colonne in a.codes:
+            assert np.array_equal(a.codes[colonne], b.codes[colonne]), f"{contexte} : codes {colonne} ({nom})"
+            assert a.valeurs[colonne].equals(b.valeurs[colonne]), f"{contexte} : valeurs {colonne} ({nom})"
+        for mesure in a.sommes:
+            assert np.array_equal(a.sommes[mesure], b.sommes[mesure]), f"{contexte} : sommes {mesure} ({nom})"
+        for colonne, ids in a.ids.items():
+            assert np.array_equal(ids.debuts, b.ids[colonne].debuts), f"{contexte} : ids {colonne} ({nom})"
+            assert np.array_equal(ids.codes, b.ids[colonne].codes), f"{contexte} : ids {colonne} ({nom})"
+    chronologie, autre = attendu.chronologie, obtenu.chronologie
+    for attribut in ('debuts', 'commandes', 'dates', 'ventes'):
+        assert np.array_equal(getattr(chronologie, attribut), getattr(autre, attribut)), \
+            f"{contexte} : chronologie {attribut}"
+    for colonne, codes in chronologie.codes.items():
+        assert np.array_equal(codes, autre.codes[colonne]), f"{contexte} : chronologie {colonne}"
+        assert chronologie.libelles[colonne] == autre.libelles[colonne], f"{contexte} : libellés {colonne}"
+    produits, autre = attendu.produits, obtenu.produits
+    pd.testing.assert_frame_equal(produits.produits, autre.produits)
+    for attribut in ('codes', 'bornes', 'lignes'):
+        assert np.array_equal(getattr(produits, attribut), getattr(autre, attribut)), f"{contexte} : produits {attribut}"
+    for mesure, cumul in produits.cumuls.items():
+        assert np.array_equal(cumul, autre.cumuls[mesure]), f"{contexte} : cumuls {mesure}"
+
+
+def structures(args):
+    """Reconstruction complète vs ajout, sur les structures en mémoire"""
+    print(f"{'ajout':>8} {'complet (ms)':>13} {'incrémental (ms)':>17} {'gain':>7}")
+    for nb_ajouts in args.ajouts:
+        # Flux de commandes : les dernières commandes (par date) arrivent après les autres
+        dataset = generer_dataset(args.lignes + nb_ajouts)
+        dataset = dataset.sort_values('Order Date', kind='stable').reset_index(drop=True)
+        ancien = compacter_dataset(dataset.iloc[:args.lignes].reset_index(drop=True))
+        ajout = compacter_dataset(dataset.iloc[args.lignes:].reset_index(drop=True))
+        etat = EtatDataset(ancien)
+
+        complet = EtatDataset(concatener_datasets(ancien, ajout), etat.version + 1)
+        verifier(complet, etat.ajouter(ajout), f"{nb_ajouts} lignes ajoutées")
+
+        t_complet = chronometrer(lambda: EtatDataset(concatener_datasets(ancien, ajout)), args.repetitions)
+        t_ajout = chronometrer(lambda: etat.ajouter(ajout), args.repetitions)
+        print(f"{nb_ajouts:>8,} {t_complet:>13.1f} {t_ajout:>17.1f} {t_complet / t_ajout:>6.1f}x")
+
+
+def bout_en_bout(args):
+    """Rechargement de main.py après ajout de lignes au CSV local"""
+    nb_ajouts = max(args.ajouts)
+    dataset = generer_dataset(args.lignes + nb_ajouts).sort_values('Order Date', kind='stable')
+    dataset['Order Date'] = dataset['Order Date'].dt.strftime('%m/%d/%Y')
+    dataset['Ship Date'] = dataset['Order Date']
+
+    with tempfile.TemporaryDirectory() as dossier:
+        chemin = os.path.join(dossier, "superstore.csv")
+        dataset.iloc[:args.lignes].to_csv(chemin, index=False, encoding='latin-1')
+        os.environ.update(DATASET_PATH=chemin, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="")
+        import main
+
+        print(f"\n{'ajout':>8} {'complet (ms)':>13} {'incrémental (ms)':>17} {'gain':>7}")
+        # Ajouts successifs en fin de fichier (tailles cumulées : --ajouts)
+        deja = 0
+        for nb in sorted(args.ajouts):
+            dataset.iloc[args.lignes + deja:args.lignes + nb].to_csv(
+                chemin, mode='a', header=False, index=False, encoding='latin-1'
+            )
+            taille, deja = nb - deja, nb
+            debut = time.perf_counter()
+            mode, _ = main.recharger_dataset()
+            t_ajout = (time.perf_counter() - debut) * 1000
+            assert mode == "incremental", mode
+            debut = time.perf_counter()
+            EtatDataset(main.load_data())
+            t_complet = (time.perf_counter() - debut) * 1000
+            print(f"{taille:>8,} {t_complet:>13.1f} {t_ajout:>17.1f} {t_complet / t_ajout:>6.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=int, default=1_000_000)
+    parser.add_argument('--ajouts', type=int, nargs='+', default=[1_000, 10_000, 100_000])
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    structures(args)
+    bout_en_bout(args)
+
+
+if __name__ == "__main__":
+    main()
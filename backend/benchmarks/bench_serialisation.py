@@ -0,0 +1,122 @@
+"""
+Benchmark de la sérialisation des réponses
+🚀 Compare l'ancien chemin (iterrows / to_dict('records') + jsonable_encoder
+   + JSONResponse) au chemin colonnaire (vers_tableau + ReponseJSON)
+
+Les tableaux mesurés reprennent la forme et la taille des réponses des
+endpoints (top produits, temporel par jour, commandes brutes...).
+
+Usage :
+    python backend/benchmarks/bench_serialisation.py
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from serialisation import ReponseJSON, orjson, vers_tableau  # noqa: E402
+
+
+def generer_tableaux(graine: int = 42):
+    """Tableaux représentatifs : (nom, DataFrame, colonnes, arrondis, iterrows)"""
+    rng = np.random.default_rng(graine)
+
+    produits = pd.DataFrame({
+        'Product Name': [f"Produit {i}" for i in range(50)],
+        'Category': rng.choice(['Furniture', 'Office Supplies', 'Technology'], 50),
+        'Sales': rng.gamma(2, 500, 50),
+        'Quantity': rng.integers(1, 500, 50),
+        'Profit': rng.normal(100, 300, 50),
+    })
+    colonnes_produits = {'Product Name': 'produit', 'Category': 'categorie', 'Sales': 'ca',
+                         'Quantity': 'quantite', 'Profit': 'profit'}
+
+    jours = pd.date_range('2014-01-01', '2017-12-31', freq='D')
+    temporel = pd.DataFrame({
+        'periode': jours.strftime('%Y-%m-%d'),
+        'ca': rng.gamma(2, 800, len(jours)),
+        'profit': rng.normal(100, 300, len(jours)),
+        'nb_commandes': rng.integers(1, 20, len(jours)),
+        'quantite': rng.integers(1, 100, len(jours)),
+    })
+
+    commandes = pd.DataFrame({
+        'Row ID': np.arange(1000),
+        'Order ID': [f"CA-2016-{i:06d}" for i in rng.integers(0, 500, 1000)],
+        'Order Date': pd.Timestamp('2016-01-01') + pd.to_timedelta(rng.integers(0, 365, 1000), unit='D'),
+        'Customer ID': [f"CU-{i:05d}" for i in rng.integers(0, 800, 1000)],
+        'Segment': rng.choice(['Consumer', 'Corporate', 'Home Office'], 1000),
+        'City': rng.choice(['Los Angeles', 'New York City', 'Houston'], 1000),
+        'Product Name': [f"Produit {i}" for i in rng.integers(0, 1800, 1000)],
+        'Sales': rng.gamma(2, 100, 1000),
+        'Quantity': rng.integers(1, 10, 1000),
+        'Discount': rng.choice([0, 0.1, 0.2], 1000),
+        'Profit': rng.normal(30, 100, 1000),
+    })
+    commandes['Order Date'] = commandes['Order Date'].dt.strftime('%Y-%m-%d')
+
+    return [
+        ("/kpi/produits/top?limite=50", produits, colonnes_produits, {'ca': 2, 'profit': 2}, True),
+        ("/kpi/temporel?periode=jour", temporel, None, None, False),
+        ("/data/commandes?limite=1000", commandes, None, None, False),
+    ]
+
+
+def ancien_chemin(frame, colonnes, arrondis, iterrows):
+    """Mise en forme ligne par ligne puis encodeur générique de FastAPI"""
+    if iterrows:
+        contenu = []
+        for _, row in frame.iterrows():
+            contenu.append({
+                nom: round(row[source], arrondis[nom]) if nom in (arrondis or {}) else
+                (int(row[source]) if isinstance(row[source], (np.integer, int)) else row[source])
+                for source, nom in colonnes.items()
+            })
+    else:
+        contenu = frame.to_dict('records')
+    return JSONResponse(jsonable_encoder(contenu)).body
+
+
+def nouveau_chemin(frame, colonnes, arrondis, format='records'):
+    """Mise en forme colonnaire et encodage direct"""
+    return ReponseJSON(vers_tableau(frame, colonnes, arrondis, format)).body
+
+
+def mesurer(fonction, repetitions: int):
+    """Percentiles p50 / p99 en millisecondes"""
+    temps = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        temps.append((time.perf_counter() - debut) * 1000)
+    return np.percentile(temps, 50), np.percentile(temps, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repetitions', type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"Encodeur : {'orjson' if orjson is not None else 'json (orjson non installé)'}")
+    print(f"{'endpoint':<30} {'chemin':<22} {'p50 (ms)':>9} {'p99 (ms)':>9} {'octets':>9}")
+    for nom, frame, colonnes, arrondis, iterrows in generer_tableaux():
+        chemins = {
+            "ancien": lambda: ancien_chemin(frame, colonnes or {c: c for c in frame.columns}, arrondis, iterrows),
+            "records": lambda: nouveau_chemin(frame, colonnes, arrondis),
+            "columnar": lambda: nouveau_chemin(frame, colonnes, arrondis, 'columnar'),
+        }
+        for chemin, fonction in chemins.items():
+            p50, p99 = mesurer(fonction, args.repetitions)
+            print(f"{nom:<30} {chemin:<22} {p50:>9.3f} {p99:>9.3f} {len(fonction()):>9}")
+
+
+if __name__ == "__main__":
+    main()
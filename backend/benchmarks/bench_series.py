@@ -0,0 +1,89 @@
+"""
+Benchmark des séries journalières
+📈 Compare l'agrégation par jour depuis les cellules du cube (fusion des
+   commandes de chaque jour) à la série journalière précalculée
+   (cube.SerieJournaliere), puis mesure le sous-échantillonnage LTTB
+
+Sur une plage de dates seule, la série doit donner exactement le même
+DataFrame que le cube (mêmes sommes, mêmes commandes distinctes).
+
+Usage :
+    python backend/benchmarks/bench_series.py
+    python backend/benchmarks/bench_series.py --tailles 10k 1M 10M --points 200 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from cube import CubeJournalier, SerieJournaliere  # noqa: E402
+from temporel import cles_periodes, lttb  # noqa: E402
+from generateur import generer_dataset, taille  # noqa: E402
+from schema import compacter_dataset  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+# Agrégations de /kpi/temporel
+AGREGATIONS = {"Sales": "sum", "Profit": "sum", "Order ID": "nunique", "Quantity": "sum"}
+
+# Plages de dates mesurées
+SCENARIOS = {
+    "tout": {},
+    "annee": {"date_debut": "2016-01-01", "date_fin": "2016-12-31"},
+    "trimestre": {"date_debut": "2015-04-01", "date_fin": "2015-06-30"},
+}
+
+
+def depuis_cube(cube: CubeJournalier, filtres) -> pd.DataFrame:
+    """Référence : regroupement des cellules retenues par jour"""
+    cellules = cube.selection(**filtres)
+    return cube.agreger(cellules, AGREGATIONS, cles_periodes(cube.jours[cellules], 'jour'), 'periode')
+
+
+def depuis_serie(cube: CubeJournalier, serie: SerieJournaliere, filtres) -> pd.DataFrame:
+    """Même agrégat lu comme une tranche de la série journalière"""
+    return serie.agreger(cube.selection(**filtres), AGREGATIONS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--points', type=int, nargs='+', default=[200, 500])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'scenario':<10} {'jours':>6} {'cube (ms)':>10} {'serie (ms)':>11} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        dataset = generer_dataset(nb_lignes)
+        dataset['Order Date'] = pd.to_datetime(dataset['Order Date'], format='%m/%d/%Y')
+        cube = CubeJournalier(compacter_dataset(dataset))
+        debut = time.perf_counter()
+        serie = SerieJournaliere(cube)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for nom, filtres in SCENARIOS.items():
+            attendu = depuis_cube(cube, filtres)
+            pd.testing.assert_frame_equal(attendu, depuis_serie(cube, serie, filtres), check_exact=True,
+                                          obj=f"{nb_lignes} lignes, {nom}")
+            t_cube = chronometrer(lambda: depuis_cube(cube, filtres), args.repetitions)
+            t_serie = chronometrer(lambda: depuis_serie(cube, serie, filtres), args.repetitions)
+            print(f"{nb_lignes:>10} {nom:<10} {len(attendu):>6} {t_cube:>10.2f} {t_serie:>11.2f} "
+                  f"{t_cube / max(t_serie, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(série)':<10} {len(serie.jours):>6} jours en {construction:.0f} ms")
+
+        complete = depuis_serie(cube, serie, {})
+        for nb_points in args.points:
+            retenus = lttb(complete.index.to_numpy(), complete['Sales'].to_numpy(), nb_points)
+            assert len(retenus) == min(nb_points, len(complete)) and (retenus[1:] > retenus[:-1]).all()
+            t_lttb = chronometrer(
+                lambda: lttb(complete.index.to_numpy(), complete['Sales'].to_numpy(), nb_points), args.repetitions)
+            print(f"{nb_lignes:>10} {'(lttb)':<10} {len(complete):>6} -> {nb_points} points en {t_lttb:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
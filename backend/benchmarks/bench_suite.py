@@ -0,0 +1,252 @@
+"""
+Suite de benchmarks de l'API
+📊 Latence de chaque endpoint, pic mémoire et temps de démarrage sur des
+   datasets synthétiques (generateur.py) de 10k à 50M lignes, enregistrés
+   dans une référence JSON comparable d'une version à l'autre
+
+Chaque taille est mesurée dans un processus neuf : le démarrage est
+l'import de main.py (lecture du CSV, index de filtrage, cube), puis toutes
+les routes GET de l'application sont appelées par le TestClient, avec des
+mélanges de filtres représentatifs pour celles qui en acceptent. Le cache
+des KPI est désactivé : chaque appel mesure le calcul.
+
+Par requête : durée du premier appel, médiane et p95 des appels suivants,
+pic mémoire Python (tracemalloc, appel séparé) et taille de la réponse.
+Par taille : durée du démarrage et RSS maximal du processus.
+
+Avec --reference, les mesures sont comparées à une référence précédente :
+une requête dont la médiane augmente de plus de --seuil % (et d'au moins
+1 ms) est une régression, et le script se termine avec le code 1.
+
+Usage :
+    python backend/benchmarks/bench_suite.py --tailles 10k 1M --sortie reference.json
+    python backend/benchmarks/bench_suite.py --tailles 10k 1M --sortie actuel.json --reference reference.json
+"""
+
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import urlencode
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from generateur import ecrire_csv, taille  # noqa: E402
+
+# Mélanges de filtres appliqués aux routes filtrables
+MELANGES_FILTRES = [
+    {},
+    {"categorie": "Technology"},
+    {"region": "West", "segment": "Consumer"},
+    {"date_debut": "2016-01-01", "date_fin": "2016-12-31"},
+    {"categorie": "Furniture", "region": "East", "date_debut": "2015-07-01", "date_fin": "2016-06-30"},
+    {"region": "West,East", "sous_categorie": "Phones,Chairs"},
+    {"etat": "California", "mode_livraison": "Standard Class", "ventes_min": 100, "remise_max": 0.2},
+]
+
+# Paramètres propres à chaque route (un seul appel sans paramètre sinon)
+VARIANTES = {
+    "/kpi/produits/top": [{"limite": 10}, {"limite": 50, "tri_par": "marge"}],
+    "/kpi/temporel": [{"periode": "mois"}, {"periode": "jour", "moyenne_mobile": 7},
+                      {"periode": "jour", "max_points": 200}],
+    "/kpi/temporel/comparaison": [{"periode": "mois"}, {"periode": "semaine", "comparaison": "annee"}],
+    "/kpi/geographique/detail": [{"niveau": "region"}, {"niveau": "etat"}, {"niveau": "ville", "parent": "California"}],
+    "/kpi/clients": [{"limite": 10}],
+    "/kpi/produits/marge": [{"limite": 10}],
+    "/data/commandes": [{"limite": 100}, {"limite": 1000, "offset": 5000}],
+    "/data/commandes/export": [{"format_export": f, "limite": 10_000} for f in ("ndjson", "csv", "arrow")],
+}
+
+# Routes non mesurées : documentation générée
+ROUTES_IGNOREES = {"/docs", "/docs/oauth2-redirect", "/redoc", "/openapi.json"}
+
+# Écart absolu (ms) en dessous duquel une hausse n'est pas une régression
+BRUIT_MS = 1.0
+
+
+def requetes(app, arrow: bool = True) -> Iterator[Tuple[str, Dict]]:
+    """(chemin, paramètres) de chaque appel : toutes les routes GET, variantes x filtres"""
+    from fastapi.routing import APIRoute
+
+    for route in app.routes:
+        if not isinstance(route, APIRoute) or "GET" not in route.methods or route.path in ROUTES_IGNOREES:
+            continue
+        filtrable = any(parametre.name == "categorie" for parametre in route.dependant.query_params)
+        for variante in VARIANTES.get(route.path, [{}]):
+            if variante.get("format_export") == "arrow" and not arrow:
+                continue
+            for filtres in (MELANGES_FILTRES if filtrable else [{}]):
+                yield route.path, {**variante, **filtres}
+
+
+def mesurer_taille(csv: str, repetitions: int) -> Dict:
+    """Mesures d'une taille, dans le processus courant (appelé par --enfant)"""
+    os.environ.update(DATASET_PATH=csv, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="", KPI_CACHE_TAILLE="0",
+                      DATASET_SURVEILLANCE="0")
+    debut = time.perf_counter()
+    import main as api
+    demarrage = time.perf_counter() - debut
+    rss_demarrage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    from fastapi.testclient import TestClient
+
+    client = TestClient(api.app)
+    resultats = {}
+    for chemin, parametres in requetes(api.app, arrow=api.arrow_disponible()):
+        url = f"{chemin}?{urlencode(parametres)}" if parametres else chemin
+        debut = time.perf_counter()
+        reponse = client.get(chemin, params=parametres)
+        premier = (time.perf_counter() - debut) * 1000
+        assert reponse.status_code == 200, f"{url} : statut {reponse.status_code}"
+
+        durees = []
+        for _ in range(repetitions):
+            debut = time.perf_counter()
+            client.get(chemin, params=parametres)
+            durees.append((time.perf_counter() - debut) * 1000)
+
+        tracemalloc.start()
+        client.get(chemin, params=parametres)
+        _, pic = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        durees.sort()
+        resultats[url] = {
+            "premier_ms": round(premier, 3),
+            "p50_ms": round(statistics.median(durees), 3),
+            "p95_ms": round(durees[min(len(durees) - 1, int(0.95 * len(durees)))], 3),
+            "pic_mo": round(pic / 2**20, 2),
+            "octets": len(reponse.content),
+        }
+
+    return {
+        "lignes": len(api.etat.df),
+        "demarrage_s": round(demarrage, 3),
+        "rss_demarrage_mo": round(rss_demarrage, 1),
+        "rss_max_mo": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "requetes": resultats,
+    }
+
+
+def meta(graine: int, repetitions: int) -> Dict:
+    """Contexte de la mesure (version du code, machine)"""
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=DOSSIER_BACKEND, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "commit": commit,
+        "python": platform.python_version(),
+        "plateforme": platform.platform(),
+        "cpu": os.cpu_count(),
+        "graine": graine,
+        "repetitions": repetitions,
+    }
+
+
+def comparer(reference: Dict, actuel: Dict, seuil: float) -> List[str]:
+    """
+    Régressions de `actuel` par rapport à `reference`
+
+    Returns:
+        Lignes décrivant chaque régression (liste vide si aucune)
+    """
+    regressions = []
+    limite = 1 + seuil / 100
+    for nb_lignes, mesures in actuel["tailles"].items():
+        precedentes = reference.get("tailles", {}).get(nb_lignes)
+        if precedentes is None:
+            continue
+        avant, apres = precedentes["demarrage_s"], mesures["demarrage_s"]
+        if apres > avant * limite and (apres - avant) * 1000 > BRUIT_MS:
+            regressions.append(f"{nb_lignes:>10} {'(démarrage)':<70} {avant * 1000:>10.1f} {apres * 1000:>10.1f}")
+        for url, mesure in mesures["requetes"].items():
+            precedente = precedentes["requetes"].get(url)
+            if precedente is None:
+                continue
+            avant, apres = precedente["p50_ms"], mesure["p50_ms"]
+            if apres > avant * limite and apres - avant > BRUIT_MS:
+                regressions.append(f"{nb_lignes:>10} {url[:70]:<70} {avant:>10.1f} {apres:>10.1f}")
+    return regressions
+
+
+def afficher(nb_lignes: int, mesures: Dict):
+    """Résumé d'une taille"""
+    print(f"\n{nb_lignes:,} lignes : démarrage {mesures['demarrage_s']:.2f} s, "
+          f"RSS {mesures['rss_demarrage_mo']:.0f} Mo au démarrage, {mesures['rss_max_mo']:.0f} Mo au maximum")
+    print(f"{'requête':<70} {'1er (ms)':>9} {'p50 (ms)':>9} {'p95 (ms)':>9} {'pic (Mo)':>9}")
+    for url, mesure in mesures["requetes"].items():
+        print(f"{url[:70]:<70} {mesure['premier_ms']:>9.1f} {mesure['p50_ms']:>9.1f} "
+              f"{mesure['p95_ms']:>9.1f} {mesure['pic_mo']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=taille, nargs='+', default=[10_000, 1_000_000],
+                        help="Nombres de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--repetitions', type=int, default=5)
+    parser.add_argument('--graine', type=int, default=42)
+    parser.add_argument('--donnees', help="Dossier des CSV générés, réutilisés d'une exécution à l'autre "
+                                          "(temporaire par défaut)")
+    parser.add_argument('--sortie', help="Référence JSON écrite")
+    parser.add_argument('--reference', help="Référence JSON précédente à comparer")
+    parser.add_argument('--seuil', type=float, default=20.0, help="Hausse de la médiane tolérée (%%)")
+    parser.add_argument('--enfant', nargs=2, metavar=('CSV', 'JSON'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.enfant:
+        csv, sortie = args.enfant
+        with open(sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(mesurer_taille(csv, args.repetitions), fichier)
+        return
+
+    resultat = {"meta": meta(args.graine, args.repetitions), "tailles": {}}
+    with tempfile.TemporaryDirectory() as temporaire:
+        dossier = args.donnees or temporaire
+        os.makedirs(dossier, exist_ok=True)
+        for nb_lignes in args.tailles:
+            csv = os.path.join(dossier, f"superstore-{nb_lignes}-{args.graine}.csv")
+            if not os.path.exists(csv):
+                debut = time.perf_counter()
+                ecrire_csv(csv, nb_lignes, args.graine)
+                print(f"{nb_lignes:,} lignes générées en {time.perf_counter() - debut:.1f} s")
+
+            # Processus neuf : démarrage et RSS propres à cette taille
+            sortie = os.path.join(temporaire, f"mesures-{nb_lignes}.json")
+            subprocess.run([sys.executable, os.path.abspath(__file__), '--enfant', csv, sortie,
+                            '--repetitions', str(args.repetitions)], cwd=DOSSIER_BACKEND, check=True,
+                           stderr=subprocess.DEVNULL)
+            with open(sortie, encoding='utf-8') as fichier:
+                mesures = json.load(fichier)
+            resultat["tailles"][str(nb_lignes)] = mesures
+            afficher(nb_lignes, mesures)
+
+    if args.sortie:
+        with open(args.sortie, 'w', encoding='utf-8') as fichier:
+            json.dump(resultat, fichier, indent=2, ensure_ascii=False)
+        print(f"\nRéférence écrite dans {args.sortie}")
+
+    if args.reference:
+        with open(args.reference, encoding='utf-8') as fichier:
+            reference = json.load(fichier)
+        regressions = comparer(reference, resultat, args.seuil)
+        print(f"\nComparaison à {args.reference} (commit {reference['meta'].get('commit')}, seuil {args.seuil:.0f} %)")
+        if regressions:
+            print(f"{'lignes':>10} {'requête':<70} {'avant (ms)':>10} {'après (ms)':>10}")
+            print("\n".join(regressions))
+            sys.exit(1)
+        print("Aucune régression")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark du moteur temporel
+📅 Compare la comparaison mois/mois historique (strftime par ligne, shift,
+   apply ligne à ligne) au moteur temporel (clés de période entières lues
+   dans le cube journalier, décalage vectorisé), pour chaque granularité
+
+Les deux calculs doivent donner les mêmes périodes et CA ; le CA de
+référence et l'évolution sont comparés là où la ligne précédente est bien
+la période précédente (l'historique décale d'une ligne, le moteur d'une
+période : ils diffèrent après une période sans vente).
+
+Usage :
+    python backend/benchmarks/bench_temporel.py
+    python backend/benchmarks/bench_temporel.py --tailles 10000 1000000 10000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from filtres import IndexFiltres  # noqa: E402
+from cube import CubeJournalier  # noqa: E402
+from temporel import GRANULARITES, cles_periodes, libelles_periodes, valeurs_decalees  # noqa: E402
+from bench_cube import generer_dataset  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+# Filtres appliqués avant la comparaison
+FILTRES = {"categorie": "Technology"}
+
+
+def cle_historique(dates: pd.Series, granularite: str) -> pd.Series:
+    """Libellé de période calculé ligne à ligne (comme avant le moteur temporel)"""
+    if granularite == 'semaine':
+        return dates.dt.strftime('%G-W%V')
+    if granularite == 'trimestre':
+        return dates.dt.year.astype(str) + '-T' + dates.dt.quarter.astype(str)
+    return dates.dt.strftime({'jour': '%Y-%m-%d', 'mois': '%Y-%m', 'annee': '%Y'}[granularite])
+
+
+def historique(index: IndexFiltres, granularite: str) -> pd.DataFrame:
+    """Comparaison historique : groupby sur des chaînes, shift puis apply"""
+    lignes = index.filtrer(**FILTRES)
+    temporal = lignes.groupby(cle_historique(lignes['Order Date'], granularite))['Sales'].sum().reset_index()
+    temporal.columns = ['periode', 'ca']
+    temporal = temporal.sort_values('periode')
+    temporal['ca_prec'] = temporal['ca'].shift(1).fillna(0)
+    temporal['evolution_pct'] = temporal.apply(
+        lambda row: round((row['ca'] - row['ca_prec']) / row['ca_prec'] * 100 if row['ca_prec'] else 0.0, 2), axis=1
+    )
+    return temporal.reset_index(drop=True)
+
+
+def moteur(cube: CubeJournalier, granularite: str) -> pd.DataFrame:
+    """Même comparaison : clés entières lues dans le cube, décalage vectorisé"""
+    cellules = cube.selection(**FILTRES)
+    ventes = cube.agreger(cellules, {'Sales': 'sum'}, cles_periodes(cube.jours[cellules], granularite))
+    cles = ventes.index.to_numpy(dtype=np.int64)
+    ca = ventes['Sales'].to_numpy(dtype=np.float64)
+    ca_prec = valeurs_decalees(cles, cles, ca, 1)
+    evolution = np.divide(ca - ca_prec, ca_prec, out=np.zeros_like(ca), where=ca_prec != 0)
+    return pd.DataFrame({
+        'cle': cles,
+        'periode': libelles_periodes(cles, granularite),
+        'ca': ca,
+        'ca_prec': ca_prec,
+        'evolution_pct': np.round(evolution * 100, 2),
+    })
+
+
+def verifier(attendu: pd.DataFrame, obtenu: pd.DataFrame, contexte: str):
+    """Mêmes périodes, mêmes montants (à l'arrondi près)"""
+    assert list(attendu['periode']) == list(obtenu['periode']), f"Périodes différentes ({contexte})"
+    assert np.allclose(attendu['ca'], obtenu['ca'], rtol=1e-9, atol=1e-6), f"ca différent ({contexte})"
+    consecutives = np.diff(obtenu['cle'].to_numpy(), prepend=obtenu['cle'].iloc[0] - 1 if len(obtenu) else 0) == 1
+    for colonne in ('ca_prec', 'evolution_pct'):
+        assert np.allclose(attendu[colonne][consecutives], obtenu[colonne][consecutives], rtol=1e-9, atol=0.011), \
+            f"{colonne} différent ({contexte})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--repetitions', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10} {'granularite':<11} {'périodes':>9} {'historique (ms)':>16} {'moteur (ms)':>12} {'gain':>7}")
+    for nb_lignes in args.tailles:
+        index = IndexFiltres(generer_dataset(nb_lignes))
+        debut = time.perf_counter()
+        cube = CubeJournalier(index.df)
+        construction = (time.perf_counter() - debut) * 1000
+
+        for granularite in GRANULARITES:
+            attendu = historique(index, granularite)
+            verifier(attendu, moteur(cube, granularite), f"{nb_lignes} lignes, {granularite}")
+
+            t_historique = chronometrer(lambda: historique(index, granularite), args.repetitions)
+            t_moteur = chronometrer(lambda: moteur(cube, granularite), args.repetitions)
+            print(f"{nb_lignes:>10} {granularite:<11} {len(attendu):>9} {t_historique:>16.2f} {t_moteur:>12.2f} "
+                  f"{t_historique / max(t_moteur, 1e-6):>6.1f}x")
+        print(f"{nb_lignes:>10} {'(cube)':<11} {len(cube)} cellules en {construction:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
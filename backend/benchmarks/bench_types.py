@@ -0,0 +1,107 @@
+"""
+Benchmark du schéma compact
+🗜️ Mesure la mémoire par ligne et le temps des regroupements avant et après
+   conversion (catégories pour les textes, entiers 32 bits)
+
+Les résultats des regroupements sont comparés entre les deux schémas :
+ils doivent être identiques.
+
+Usage :
+    python backend/benchmarks/bench_types.py
+    python backend/benchmarks/bench_types.py --tailles 1000000 5000000
+"""
+
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from schema import compacter_dataset, memoire_par_ligne  # noqa: E402
+from bench_filtres import chronometrer  # noqa: E402
+
+
+def generer_dataset(nb_lignes: int, graine: int = 42) -> pd.DataFrame:
+    """Dataset au schéma Superstore complet (colonnes de texte comprises)"""
+    rng = np.random.default_rng(graine)
+    nb_commandes = max(nb_lignes // 2, 1)
+    nb_clients = max(nb_lignes // 12, 1)
+    nb_produits = min(max(nb_lignes // 5, 1), 20000)
+    commande = rng.integers(0, nb_commandes, nb_lignes)
+    client = rng.integers(0, nb_clients, nb_commandes)[commande]
+    produit = rng.integers(0, nb_produits, nb_lignes)
+    villes = np.array([f"Ville {i}" for i in range(500)], dtype=object)
+    etats = np.array([f"State {i}" for i in range(49)], dtype=object)
+    ville = rng.integers(0, len(villes), nb_lignes)
+    return pd.DataFrame({
+        'Row ID': np.arange(1, nb_lignes + 1),
+        'Order ID': pd.Series(commande).map('CA-{:07d}'.format),
+        'Order Date': pd.Timestamp('2014-01-01') + pd.to_timedelta(rng.integers(0, 4 * 365, nb_lignes), unit='D'),
+        'Ship Mode': np.array(['First Class', 'Same Day', 'Second Class', 'Standard Class'], dtype=object)[rng.integers(0, 4, nb_lignes)],
+        'Customer ID': pd.Series(client).map('CU-{:06d}'.format),
+        'Customer Name': pd.Series(client).map('Client {:06d}'.format),
+        'Segment': np.array(['Consumer', 'Corporate', 'Home Office'], dtype=object)[rng.integers(0, 3, nb_lignes)],
+        'Country': np.full(nb_lignes, 'United States', dtype=object),
+        'City': villes[ville],
+        'State': etats[ville % len(etats)],
+        'Postal Code': rng.integers(10000, 99999, nb_lignes),
+        'Region': np.array(['Central', 'East', 'South', 'West'], dtype=object)[rng.integers(0, 4, nb_lignes)],
+        'Product ID': pd.Series(produit).map('PR-{:08d}'.format),
+        'Category': np.array(['Furniture', 'Office Supplies', 'Technology'], dtype=object)[produit % 3],
+        'Sub-Category': np.array([f"Sous-catégorie {i}" for i in range(17)], dtype=object)[produit % 17],
+        'Product Name': pd.Series(produit).map('Produit {:08d}'.format),
+        'Sales': rng.gamma(1.2, 200, nb_lignes),
+        'Quantity': rng.integers(1, 10, nb_lignes),
+        'Discount': rng.choice([0.0, 0.1, 0.2, 0.5], nb_lignes),
+        'Profit': rng.normal(30, 100, nb_lignes),
+    })
+
+
+# Regroupements mesurés : (nom, clé, agrégations)
+REGROUPEMENTS = [
+    ("produits", ['Product Name', 'Category'], {'Sales': 'sum', 'Quantity': 'sum', 'Profit': 'sum'}),
+    ("clients", 'Customer ID', {'Sales': 'sum', 'Profit': 'sum', 'Order ID': 'nunique'}),
+    ("segments", 'Segment', {'Sales': 'sum', 'Customer ID': 'nunique'}),
+]
+
+
+def regrouper(df: pd.DataFrame, cle, agregations) -> pd.DataFrame:
+    """Regroupement tel qu'écrit dans les endpoints"""
+    return df.groupby(cle, observed=True).agg(agregations)
+
+
+def verifier(attendu: pd.DataFrame, obtenu: pd.DataFrame, contexte: str) -> None:
+    """Mêmes clés, mêmes sommes au bit près et mêmes comptages"""
+    attendu = attendu.reset_index()
+    obtenu = obtenu.reset_index()
+    for colonne in attendu.columns:
+        gauche = attendu[colonne].to_numpy()
+        droite = np.asarray(obtenu[colonne].to_numpy(), dtype=gauche.dtype)
+        assert np.array_equal(gauche, droite), f"{contexte} : écart sur {colonne}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tailles', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--repetitions', type=int, default=3)
+    args = parser.parse_args()
+
+    for nb_lignes in args.tailles:
+        origine = generer_dataset(nb_lignes)
+        compact = compacter_dataset(origine)
+        avant, apres = memoire_par_ligne(origine), memoire_par_ligne(compact)
+        print(f"\n=== {nb_lignes:,} lignes ===")
+        print(f"mémoire : {avant:.0f} o/ligne -> {apres:.0f} o/ligne (x{avant / apres:.1f})")
+        print(f"{'regroupement':<12} {'origine (ms)':>13} {'compact (ms)':>13} {'gain':>7}")
+        for nom, cle, agregations in REGROUPEMENTS:
+            verifier(regrouper(origine, cle, agregations), regrouper(compact, cle, agregations), nom)
+            t_origine = chronometrer(lambda: regrouper(origine, cle, agregations), args.repetitions)
+            t_compact = chronometrer(lambda: regrouper(compact, cle, agregations), args.repetitions)
+            print(f"{nom:<12} {t_origine:>13.1f} {t_compact:>13.1f} {t_origine / t_compact:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
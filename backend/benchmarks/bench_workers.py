@@ -0,0 +1,176 @@
+"""
+Benchmark multi-workers
+🔗 Mémoire totale et débit de l'API avec 1, 4 et 8 workers uvicorn,
+   dataset chargé par chaque worker ("copie") ou partagé ("partagé")
+
+La mémoire est mesurée en PSS (Proportional Set Size, Linux) sur tout
+l'arbre de processus : une page partagée entre N workers compte pour 1/N
+dans chacun, contrairement au RSS qui la compte N fois. Le cache des KPI
+est désactivé pour mesurer le calcul.
+
+Usage :
+    python backend/benchmarks/bench_workers.py
+    python backend/benchmarks/bench_workers.py --lignes 1000000 --workers 1 4 8
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+
+import numpy as np
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, DOSSIER_BACKEND)
+
+from bench_types import generer_dataset  # noqa: E402
+
+# Requêtes tirées au hasard par les clients du test de charge
+REQUETES = [
+    "/kpi/globaux",
+    "/kpi/globaux?categorie=Technology",
+    "/kpi/categories?region=West",
+    "/kpi/temporel?periode=mois&segment=Consumer",
+    "/kpi/geographique?date_debut=2015-01-01&date_fin=2015-12-31",
+    "/kpi/produits/top?limite=10&categorie=Furniture",
+    "/kpi/clients?limite=10&region=East",
+]
+
+
+def ecrire_csv(nb_lignes: int, dossier: str) -> str:
+    """CSV synthétique au format du dataset Superstore"""
+    chemin = os.path.join(dossier, f"superstore-{nb_lignes}.csv")
+    df = generer_dataset(nb_lignes)
+    df['Order Date'] = df['Order Date'].dt.strftime('%m/%d/%Y')
+    df['Ship Date'] = df['Order Date']
+    df.to_csv(chemin, index=False, encoding='latin-1')
+    return chemin
+
+
+def processus_arbre(pid: int):
+    """PID du processus et de tous ses descendants (via /proc)"""
+    enfants = {}
+    for entree in os.listdir('/proc'):
+        if entree.isdigit():
+            try:
+                with open(f'/proc/{entree}/stat') as fichier:
+                    parent = int(fichier.read().rsplit(')', 1)[1].split()[1])
+            except OSError:
+                continue
+            enfants.setdefault(parent, []).append(int(entree))
+    resultat, pile = [], [pid]
+    while pile:
+        courant = pile.pop()
+        resultat.append(courant)
+        pile.extend(enfants.get(courant, []))
+    return resultat
+
+
+def memoire_arbre(pid: int):
+    """(RSS, PSS) totaux de l'arbre de processus, en Mo"""
+    rss = pss = 0
+    for processus in processus_arbre(pid):
+        try:
+            with open(f'/proc/{processus}/smaps_rollup') as fichier:
+                for ligne in fichier:
+                    champ, valeur = ligne.split(':', 1) if ':' in ligne else (ligne, '')
+                    if champ == 'Rss':
+                        rss += int(valeur.split()[0])
+                    elif champ == 'Pss':
+                        pss += int(valeur.split()[0])
+        except OSError:
+            continue
+    return rss / 1024, pss / 1024
+
+
+def attendre_api(url: str, processus: subprocess.Popen, delai: float = 600) -> float:
+    """Attend la première réponse de l'API, renvoie la durée de démarrage"""
+    debut = time.perf_counter()
+    while time.perf_counter() - debut < delai:
+        if processus.poll() is not None:
+            raise RuntimeError("le serveur s'est arrêté au démarrage")
+        try:
+            urllib.request.urlopen(url + "/", timeout=1).read()
+            return time.perf_counter() - debut
+        except OSError:
+            time.sleep(0.2)
+    raise TimeoutError("API non disponible")
+
+
+def charge(url: str, clients: int, duree: float):
+    """Requêtes par seconde et latence p50 (ms) avec `clients` connexions"""
+    latences, fin = [], time.perf_counter() + duree
+    verrou = threading.Lock()
+
+    def client(graine: int):
+        rng = np.random.default_rng(graine)
+        locales = []
+        while time.perf_counter() < fin:
+            debut = time.perf_counter()
+            urllib.request.urlopen(url + REQUETES[rng.integers(len(REQUETES))], timeout=60).read()
+            locales.append(time.perf_counter() - debut)
+        with verrou:
+            latences.extend(locales)
+
+    fils = [threading.Thread(target=client, args=(graine,)) for graine in range(clients)]
+    for fil in fils:
+        fil.start()
+    for fil in fils:
+        fil.join()
+    return len(latences) / duree, float(np.median(latences) * 1000)
+
+
+def mesurer(csv: str, workers: int, partage: bool, args, dossier: str):
+    """Démarre l'API, attend que tous les workers aient chargé, mesure"""
+    environnement = dict(
+        os.environ,
+        API_WORKERS=str(workers),
+        BACKEND_PORT=str(args.port),
+        DATASET_PATH=csv,
+        DATASET_SNAPSHOT_DIR="",
+        DATASET_SHM_DIR=os.path.join(dossier, "partage") if partage else "",
+        KPI_CACHE_TAILLE="0",
+    )
+    processus = subprocess.Popen(
+        [sys.executable, "main.py"], cwd=DOSSIER_BACKEND, env=environnement,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{args.port}"
+    try:
+        demarrage = attendre_api(url, processus)
+        # Chaque worker charge à l'import : on laisse les plus lents finir
+        charge(url, workers * 2, 2)
+        debit, p50 = charge(url, args.clients, args.duree)
+        rss, pss = memoire_arbre(processus.pid)
+        return demarrage, rss, pss, debit, p50
+    finally:
+        processus.terminate()
+        processus.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=int, default=1_000_000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8])
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--duree', type=float, default=10)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(dir='/dev/shm' if os.path.isdir('/dev/shm') else None) as dossier:
+        csv = ecrire_csv(args.lignes, dossier)
+        print(f"{args.lignes:,} lignes, {os.cpu_count()} CPU, {args.clients} clients, {args.duree:.0f} s")
+        print(f"{'workers':>7} {'mode':<8} {'démarrage (s)':>13} {'RSS (Mo)':>9} {'PSS (Mo)':>9} {'req/s':>7} {'p50 (ms)':>9}")
+        for workers in args.workers:
+            for partage in (False, True):
+                demarrage, rss, pss, debit, p50 = mesurer(csv, workers, partage, args, dossier)
+                mode = "partagé" if partage else "copie"
+                print(f"{workers:>7} {mode:<8} {demarrage:>13.1f} {rss:>9.0f} {pss:>9.0f} {debit:>7.1f} {p50:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Générateur de données synthétiques au schéma Superstore
+🏭 CSV déterministe de 10 000 à 50 millions de lignes, aux cardinalités
+   réalistes, écrit par blocs (mémoire indépendante de la taille)
+
+Les cardinalités suivent celles du dataset d'origine (9 994 lignes) :
+~2 lignes par commande, 793 clients et 1 862 produits, qui croissent moins
+vite que le nombre de lignes quand la taille augmente (un client commande
+plusieurs fois). Les hiérarchies sont cohérentes : Region > State > City >
+Postal Code, Category > Sub-Category > Product, et chaque client a un
+segment. Les commandes suivent une tendance annuelle et une saisonnalité
+(pic de fin d'année), les produits une popularité de type Zipf.
+
+Même graine, même taille : même fichier, octet pour octet. Chaque bloc a
+son propre générateur aléatoire, dérivé de la graine et de son numéro.
+
+Usage :
+    python backend/benchmarks/generateur.py --lignes 1M --sortie superstore-1M.csv
+    python backend/benchmarks/generateur.py --lignes 50M --sortie superstore-50M.csv --graine 7
+"""
+
+from typing import Dict, Iterator
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+# Tailles nommées (--lignes 10k, 1M, 10M, 50M)
+TAILLES = {
+    '10k': 10_000,
+    '1M': 1_000_000,
+    '10M': 10_000_000,
+    '50M': 50_000_000,
+}
+
+# Dataset d'origine : nombre de lignes, de clients et de produits
+LIGNES_ORIGINE = 9_994
+CLIENTS_ORIGINE = 793
+PRODUITS_ORIGINE = 1_862
+
+# Lignes générées à la fois
+TAILLE_BLOC = 500_000
+
+COLONNES = [
+    'Row ID', 'Order ID', 'Order Date', 'Ship Date', 'Ship Mode', 'Customer ID', 'Customer Name',
+    'Segment', 'Country', 'City', 'State', 'Postal Code', 'Region', 'Product ID', 'Category',
+    'Sub-Category', 'Product Name', 'Sales', 'Quantity', 'Discount', 'Profit',
+]
+
+# Sous-catégories : (catégorie, prix unitaire médian, marge moyenne)
+SOUS_CATEGORIES = {
+    'Bookcases': ('Furniture', 120.0, 0.02),
+    'Chairs': ('Furniture', 110.0, 0.08),
+    'Furnishings': ('Furniture', 25.0, 0.14),
+    'Tables': ('Furniture', 170.0, -0.05),
+    'Appliances': ('Office Supplies', 60.0, 0.17),
+    'Art': ('Office Supplies', 8.0, 0.24),
+    'Binders': ('Office Supplies', 15.0, 0.15),
+    'Envelopes': ('Office Supplies', 16.0, 0.42),
+    'Fasteners': ('Office Supplies', 4.0, 0.31),
+    'Labels': ('Office Supplies', 5.0, 0.44),
+    'Paper': ('Office Supplies', 15.0, 0.43),
+    'Storage': ('Office Supplies', 65.0, 0.10),
+    'Supplies': ('Office Supplies', 25.0, 0.01),
+    'Accessories': ('Technology', 55.0, 0.23),
+    'Copiers': ('Technology', 600.0, 0.37),
+    'Machines': ('Technology', 250.0, 0.02),
+    'Phones': ('Technology', 100.0, 0.13),
+}
+
+# États par région (49 états, comme le dataset d'origine)
+ETATS = {
+    'Central': ['Illinois', 'Indiana', 'Iowa', 'Kansas', 'Michigan', 'Minnesota', 'Missouri', 'Nebraska',
+                'North Dakota', 'Oklahoma', 'South Dakota', 'Texas', 'Wisconsin'],
+    'East': ['Connecticut', 'Delaware', 'District of Columbia', 'Maine', 'Maryland', 'Massachusetts',
+             'New Hampshire', 'New Jersey', 'New York', 'Ohio', 'Pennsylvania', 'Rhode Island', 'Vermont',
+             'West Virginia'],
+    'South': ['Alabama', 'Arkansas', 'Florida', 'Georgia', 'Kentucky', 'Louisiana', 'Mississippi',
+              'North Carolina', 'South Carolina', 'Tennessee', 'Virginia'],
+    'West': ['Arizona', 'California', 'Colorado', 'Idaho', 'Montana', 'Nevada', 'New Mexico', 'Oregon',
+             'Utah', 'Washington', 'Wyoming'],
+}
+# États les plus représentés (poids relatif, 1 pour les autres)
+POIDS_ETATS = {'California': 20, 'New York': 11, 'Texas': 10, 'Pennsylvania': 6, 'Washington': 5,
+               'Illinois': 5, 'Ohio': 5, 'Florida': 4}
+NB_VILLES = 531
+
+# Noms de villes (un même nom peut exister dans plusieurs états)
+NOMS_VILLES = [
+    'Springfield', 'Franklin', 'Clinton', 'Madison', 'Greenville', 'Salem', 'Fairview', 'Georgetown',
+    'Arlington', 'Jackson', 'Columbia', 'Richmond', 'Lakewood', 'Auburn', 'Bristol', 'Burlington',
+    'Dayton', 'Dover', 'Hudson', 'Kingston', 'Lebanon', 'Manchester', 'Marion', 'Milford', 'Newport',
+    'Oxford', 'Riverside', 'Quincy', 'Troy', 'Washington', 'Aurora', 'Bloomington', 'Camden', 'Chester',
+    'Danville', 'Florence', 'Glendale', 'Hamilton', 'Jamestown', 'Lancaster', 'Lexington', 'Monroe',
+    'Mount Vernon', 'Oakland', 'Plymouth', 'Portland', 'Rochester', 'Shelbyville', 'Union', 'Winchester',
+]
+
+SEGMENTS = {'Consumer': 0.52, 'Corporate': 0.30, 'Home Office': 0.18}
+
+# Modes de livraison : (part des commandes, délai minimal, délai maximal en jours)
+MODES_LIVRAISON = {
+    'Standard Class': (0.60, 4, 7),
+    'Second Class': (0.19, 2, 5),
+    'First Class': (0.15, 1, 4),
+    'Same Day': (0.06, 0, 0),
+}
+
+REMISES = np.array([0.0, 0.1, 0.15, 0.2, 0.3, 0.4, 0.45, 0.5, 0.6, 0.7, 0.8])
+POIDS_REMISES = np.array([48.0, 1.0, 0.5, 37.0, 2.0, 2.0, 0.5, 1.0, 1.5, 4.0, 3.0])
+
+PRENOMS = ['Aaron', 'Alan', 'Anna', 'Brian', 'Carol', 'Chris', 'Claire', 'Dan', 'Dave', 'Emily', 'Eric',
+           'Fred', 'Grace', 'Greg', 'Helen', 'Irene', 'Jack', 'Jane', 'Joel', 'Karen', 'Ken', 'Laura',
+           'Linda', 'Mark', 'Maria', 'Matt', 'Nick', 'Nora', 'Paul', 'Rachel', 'Rick', 'Rose', 'Sam',
+           'Sarah', 'Steve', 'Susan', 'Tom', 'Tracy', 'Victor', 'Zoe']
+NOMS = ['Adams', 'Baker', 'Brooks', 'Carter', 'Collins', 'Cook', 'Davis', 'Evans', 'Fisher', 'Foster',
+        'Garcia', 'Gray', 'Hall', 'Harris', 'Hughes', 'Jones', 'Kelly', 'King', 'Lee', 'Lewis', 'Martin',
+        'Miller', 'Moore', 'Murphy', 'Nelson', 'Parker', 'Perry', 'Price', 'Reed', 'Rivera', 'Ross',
+        'Russell', 'Scott', 'Smith', 'Stewart', 'Taylor', 'Turner', 'Walker', 'Ward', 'Young']
+
+# Période couverte : 4 années, comme le dataset d'origine
+PREMIER_JOUR = np.datetime64('2014-01-03')
+NB_JOURS = 1458
+# Poids mensuels des commandes (janvier -> décembre)
+SAISONNALITE = np.array([0.45, 0.35, 0.80, 0.70, 0.75, 0.75, 0.75, 0.75, 1.40, 0.90, 1.45, 1.50])
+
+
+def taille(valeur: str) -> int:
+    """Nombre de lignes : entier ou taille nommée (10k, 1M, 10M, 50M)"""
+    return TAILLES.get(valeur, None) or int(valeur.replace('_', ''))
+
+
+def cardinalites(nb_lignes: int) -> Dict[str, int]:
+    """
+    Nombre de clients et de produits pour `nb_lignes` lignes
+
+    Les clients croissent comme (lignes)^0.75 et les produits comme
+    (lignes)^0.5 à partir du dataset d'origine : 25 000 clients et 18 600
+    produits pour 1 million de lignes, 470 000 et 131 000 pour 50 millions.
+    """
+    echelle = max(nb_lignes, 1) / LIGNES_ORIGINE
+    return {
+        "clients": max(int(CLIENTS_ORIGINE * echelle ** 0.75), 1),
+        "produits": max(int(PRODUITS_ORIGINE * echelle ** 0.5), len(SOUS_CATEGORIES)),
+    }
+
+
+class Referentiel:
+    """
+    Tables fixes du jeu de données : villes, produits et clients
+
+    Toutes les colonnes de texte d'une ligne sont lues dans ces tables par
+    indice : seuls les numéros de ligne et de commande sont propres à
+    chaque ligne.
+    """
+
+    def __init__(self, nb_lignes: int, graine: int = 42):
+        rng = np.random.default_rng([graine, 0])
+        nombres = cardinalites(nb_lignes)
+
+        # Villes : état (pondéré), nom unique dans l'état, code postal
+        etats = [etat for region in ETATS.values() for etat in region]
+        region_etat = {etat: region for region, liste in ETATS.items() for etat in liste}
+        poids = np.array([POIDS_ETATS.get(etat, 1) for etat in etats], dtype=float)
+        etat_ville = np.concatenate([np.arange(len(etats)), rng.choice(len(etats), NB_VILLES - len(etats), p=poids / poids.sum())])
+        decalages = rng.integers(0, len(NOMS_VILLES), len(etats))
+        noms_villes, vus = [], {}
+        for etat in etat_ville:
+            rang = vus.get(etat, 0)
+            vus[etat] = rang + 1
+            nom = NOMS_VILLES[(decalages[etat] + rang) % len(NOMS_VILLES)]
+            noms_villes.append(nom if rang < len(NOMS_VILLES) else f"{nom} {rang // len(NOMS_VILLES)}")
+        self.villes = np.array(noms_villes, dtype=object)
+        self.etats_villes = np.array(etats, dtype=object)[etat_ville]
+        self.regions_villes = np.array([region_etat[etat] for etat in self.etats_villes], dtype=object)
+        self.codes_postaux = rng.integers(10000, 99999, NB_VILLES)
+        poids_villes = rng.gamma(1.0, 1.0, NB_VILLES) * np.array([POIDS_ETATS.get(e, 1) for e in self.etats_villes])
+        self.poids_villes = poids_villes / poids_villes.sum()
+
+        # Produits : sous-catégorie, prix, marge, popularité (Zipf)
+        nb_produits = nombres["produits"]
+        sous_categories = list(SOUS_CATEGORIES)
+        sous_categorie = rng.integers(0, len(sous_categories), nb_produits)
+        sous_categorie[:len(sous_categories)] = np.arange(len(sous_categories))
+        prix_median = np.array([SOUS_CATEGORIES[s][1] for s in sous_categories])
+        marge_moyenne = np.array([SOUS_CATEGORIES[s][2] for s in sous_categories])
+        self.sous_categories = np.array(sous_categories, dtype=object)[sous_categorie]
+        self.categories = np.array([SOUS_CATEGORIES[s][0] for s in sous_categories], dtype=object)[sous_categorie]
+        self.prix = np.round(prix_median[sous_categorie] * rng.lognormal(0, 0.6, nb_produits), 2)
+        self.marges = marge_moyenne[sous_categorie] + rng.normal(0, 0.08, nb_produits)
+        self.ids_produits = np.array([
+            f"{categorie[:3].upper()}-{sous[:2].upper()}-{10000000 + i}"
+            for i, (categorie, sous) in enumerate(zip(self.categories, self.sous_categories))
+        ], dtype=object)
+        self.noms_produits = np.array([
+            f"{sous} {NOMS[i % len(NOMS)]} {i:06d}" for i, sous in enumerate(self.sous_categories)
+        ], dtype=object)
+        popularite = 1 / (rng.permutation(nb_produits) + 10.0) ** 0.8
+        self.popularite = popularite / popularite.sum()
+
+        # Clients : nom, segment, ville de livraison habituelle, activité
+        nb_clients = nombres["clients"]
+        prenom = rng.integers(0, len(PRENOMS), nb_clients)
+        nom = rng.integers(0, len(NOMS), nb_clients)
+        self.noms_clients = np.array([f"{PRENOMS[p]} {NOMS[n]}" for p, n in zip(prenom, nom)], dtype=object)
+        self.ids_clients = np.array([
+            f"{PRENOMS[p][0]}{NOMS[n][0]}-{10000 + i}" for i, (p, n) in enumerate(zip(prenom, nom))
+        ], dtype=object)
+        self.segments = rng.choice(np.array(list(SEGMENTS), dtype=object), nb_clients, p=list(SEGMENTS.values()))
+        self.villes_clients = rng.choice(NB_VILLES, nb_clients, p=self.poids_villes)
+        activite = rng.gamma(1.5, 1.0, nb_clients)
+        self.activite = activite / activite.sum()
+
+        # Jours : tendance (+20 % par an) et saisonnalité mensuelle
+        jours = PREMIER_JOUR + np.arange(NB_JOURS)
+        mois = jours.astype('datetime64[M]').astype(np.int64) % 12
+        poids_jours = (1 + 0.2 * np.arange(NB_JOURS) / 365) * SAISONNALITE[mois]
+        self.poids_jours = poids_jours / poids_jours.sum()
+        # Dates au format du CSV d'origine (MM/DD/YYYY), livraisons comprises
+        self.dates = pd.DatetimeIndex(PREMIER_JOUR + np.arange(NB_JOURS + 8)).strftime('%m/%d/%Y').to_numpy(dtype=object)
+        self.annees = (jours.astype('datetime64[Y]').astype(np.int64) + 1970).astype(str).astype(object)
+
+
+def generer_bloc(referentiel: Referentiel, nb_lignes: int, premiere_ligne: int, premiere_commande: int,
+                 rng: np.random.Generator) -> pd.DataFrame:
+    """
+    `nb_lignes` lignes consécutives (numéros et commandes à la suite des blocs précédents)
+
+    Returns:
+        pd.DataFrame aux colonnes du CSV d'origine, dates en MM/DD/YYYY
+    """
+    ref = referentiel
+    # Commandes : 1 à 14 lignes (moyenne ~2), la dernière est tronquée au besoin
+    lignes_commandes = np.minimum(rng.geometric(0.5, nb_lignes // 2 + 16), 14)
+    while lignes_commandes.sum() < nb_lignes:
+        lignes_commandes = np.concatenate([lignes_commandes, np.minimum(rng.geometric(0.5, 64), 14)])
+    fins = np.cumsum(lignes_commandes)
+    nb_commandes = int(np.searchsorted(fins, nb_lignes) + 1)
+    commande = np.repeat(np.arange(nb_commandes), lignes_commandes[:nb_commandes])[:nb_lignes]
+
+    # Attributs de la commande : jour, client, ville, mode de livraison
+    jour = rng.choice(NB_JOURS, nb_commandes, p=ref.poids_jours)
+    client = rng.choice(len(ref.ids_clients), nb_commandes, p=ref.activite)
+    ville = np.where(rng.random(nb_commandes) < 0.8, ref.villes_clients[client],
+                     rng.choice(NB_VILLES, nb_commandes, p=ref.poids_villes))
+    modes = list(MODES_LIVRAISON)
+    mode = rng.choice(len(modes), nb_commandes, p=[MODES_LIVRAISON[m][0] for m in modes])
+    delai_min = np.array([MODES_LIVRAISON[m][1] for m in modes])[mode]
+    delai_max = np.array([MODES_LIVRAISON[m][2] for m in modes])[mode]
+    livraison = jour + delai_min + np.floor(rng.random(nb_commandes) * (delai_max - delai_min + 1)).astype(np.int64)
+    numeros = (premiere_commande + 100000 + np.arange(nb_commandes)).astype(str).astype(object)
+    ids_commandes = "CA-" + ref.annees[jour] + "-" + numeros
+
+    # Lignes : produit, quantité, remise, montants
+    produit = rng.choice(len(ref.ids_produits), nb_lignes, p=ref.popularite)
+    quantite = np.minimum(rng.geometric(0.3, nb_lignes), 14)
+    remise = rng.choice(REMISES, nb_lignes, p=POIDS_REMISES / POIDS_REMISES.sum())
+    ventes = np.round(ref.prix[produit] * quantite * (1 - remise) * rng.lognormal(0, 0.05, nb_lignes), 4)
+    profit = np.round(ventes * (ref.marges[produit] - 1.2 * remise + rng.normal(0, 0.05, nb_lignes)), 4)
+
+    c, v = client[commande], ville[commande]
+    return pd.DataFrame({
+        'Row ID': np.arange(premiere_ligne + 1, premiere_ligne + nb_lignes + 1),
+        'Order ID': ids_commandes[commande],
+        'Order Date': ref.dates[jour[commande]],
+        'Ship Date': ref.dates[livraison[commande]],
+        'Ship Mode': np.array(modes, dtype=object)[mode[commande]],
+        'Customer ID': ref.ids_clients[c],
+        'Customer Name': ref.noms_clients[c],
+        'Segment': ref.segments[c],
+        'Country': 'United States',
+        'City': ref.villes[v],
+        'State': ref.etats_villes[v],
+        'Postal Code': ref.codes_postaux[v],
+        'Region': ref.regions_villes[v],
+        'Product ID': ref.ids_produits[produit],
+        'Category': ref.categories[produit],
+        'Sub-Category': ref.sous_categories[produit],
+        'Product Name': ref.noms_produits[produit],
+        'Sales': ventes,
+        'Quantity': quantite,
+        'Discount': remise,
+        'Profit': profit,
+    }, columns=COLONNES)
+
+
+def generer(nb_lignes: int, graine: int = 42, taille_bloc: int = TAILLE_BLOC) -> Iterator[pd.DataFrame]:
+    """
+    Blocs successifs du jeu de données (au plus `taille_bloc` lignes chacun)
+
+    Le découpage fait partie de la définition du jeu : changer `taille_bloc`
+    change les données (pas leurs propriétés statistiques).
+    """
+    referentiel = Referentiel(nb_lignes, graine)
+    premiere_commande = 0
+    for numero, debut in enumerate(range(0, nb_lignes, taille_bloc), start=1):
+        rng = np.random.default_rng([graine, numero])
+        bloc = generer_bloc(referentiel, min(taille_bloc, nb_lignes - debut), debut, premiere_commande, rng)
+        premiere_commande += int(bloc['Order ID'].nunique())
+        yield bloc
+
+
+def generer_dataset(nb_lignes: int, graine: int = 42) -> pd.DataFrame:
+    """Jeu de données complet en mémoire (petites tailles)"""
+    return pd.concat(list(generer(nb_lignes, graine)), ignore_index=True)
+
+
+def ecrire_csv(chemin: str, nb_lignes: int, graine: int = 42, taille_bloc: int = TAILLE_BLOC) -> str:
+    """
+    Écrit le CSV (encodage latin-1, comme la source), bloc par bloc
+
+    Le fichier est écrit sous un nom temporaire puis renommé : un fichier
+    présent est toujours complet.
+    """
+    temporaire = f"{chemin}.partiel"
+    with open(temporaire, 'w', encoding='latin-1', newline='') as fichier:
+        for numero, bloc in enumerate(generer(nb_lignes, graine, taille_bloc)):
+            bloc.to_csv(fichier, index=False, header=numero == 0)
+    os.replace(temporaire, chemin)
+    return chemin
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--lignes', type=taille, default='1M', help="Nombre de lignes ou 10k, 1M, 10M, 50M")
+    parser.add_argument('--sortie', required=True, help="Chemin du CSV")
+    parser.add_argument('--graine', type=int, default=42)
+    args = parser.parse_args()
+
+    debut = time.perf_counter()
+    ecrire_csv(args.sortie, args.lignes, args.graine)
+    print(f"{args.lignes:,} lignes ({cardinalites(args.lignes)}) écrites dans {args.sortie} "
+          f"en {time.perf_counter() - debut:.1f} s ({os.path.getsize(args.sortie) / 2**20:.0f} Mo)")
+
+
+if __name__ == "__main__":
+    main()
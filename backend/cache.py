@@ -0,0 +1,106 @@
+"""
+Cache des résultats des endpoints KPI
+🗃️ Mémoïsation partagée, bornée (LRU), invalidée au rechargement du dataset
+
+Le dashboard envoie le même jeu de filtres à une dizaine d'endpoints à
+chaque changement : la clé de cache est construite à partir des filtres
+normalisés et des paramètres propres à l'endpoint (limite, tri_par...).
+La mémoïsation des endpoints (lecture, calcul, écriture) passe par
+execution.Executeur, qui y ajoute le pool de calcul et la coalescence.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+import threading
+
+from filtres import PARAMETRES_FILTRES, Filtres
+
+
+def normaliser_filtres(**filtres) -> Tuple:
+    """
+    Forme canonique d'un jeu de filtres (paramètres de PARAMETRES_FILTRES)
+
+    None, "Toutes" et "Tous" donnent la même clé, les valeurs multiples sont
+    triées et dédoublonnées ; les dates sont réécrites au format ISO et les
+    bornes en nombres (une valeur invalide est ignorée, comme au filtrage).
+    """
+    return Filtres(**filtres).cle()
+
+
+class CacheResultats:
+    """
+    Cache LRU thread-safe des résultats calculés
+
+    Attributes:
+        taille_max: Nombre maximum d'entrées conservées
+        hits / misses / evictions: Compteurs d'utilisation
+        generation: Incrémentée à chaque invalidation (rechargement des données)
+    """
+
+    def __init__(self, taille_max: int = 512):
+        self.taille_max = taille_max
+        self._entrees: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._verrou = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entrees)
+
+    def lire(self, cle: Hashable) -> Tuple[bool, Any]:
+        """Retourne (trouvé, valeur) et marque l'entrée comme récemment utilisée"""
+        with self._verrou:
+            if cle in self._entrees:
+                self._entrees.move_to_end(cle)
+                self.hits += 1
+                return True, self._entrees[cle]
+            self.misses += 1
+            return False, None
+
+    def contient(self, cle: Hashable) -> bool:
+        """Indique si la clé est en cache, sans la marquer utilisée ni compter de hit / miss"""
+        with self._verrou:
+            return cle in self._entrees
+
+    def ecrire(self, cle: Hashable, valeur: Any, generation: Optional[int] = None):
+        """
+        Enregistre une valeur en évinçant la moins récemment utilisée si besoin
+
+        Une valeur calculée avant une invalidation (generation périmée) est ignorée.
+        """
+        with self._verrou:
+            if generation is not None and generation != self.generation:
+                return
+            self._entrees[cle] = valeur
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.taille_max:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+
+    def invalider(self):
+        """Vide le cache (à appeler quand le dataset est rechargé)"""
+        with self._verrou:
+            self._entrees.clear()
+            self.generation += 1
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Compteurs d'utilisation du cache"""
+        with self._verrou:
+            total = self.hits + self.misses
+            return {
+                "entrees": len(self._entrees),
+                "taille_max": self.taille_max,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "taux_hit_pct": round(self.hits / total * 100, 2) if total else 0.0,
+                "generation": self.generation,
+            }
+
+    def cle(self, nom: str, parametres: Dict[str, Any]) -> Hashable:
+        """Clé = endpoint + filtres normalisés + autres paramètres triés"""
+        filtres = normaliser_filtres(**{p: parametres.get(p) for p in PARAMETRES_FILTRES})
+        autres = tuple(sorted((k, v) for k, v in parametres.items() if k not in PARAMETRES_FILTRES))
+        return (nom, filtres, autres)
@@ -0,0 +1,255 @@
+"""
+Cache HTTP des réponses
+🏷️ ETag, requêtes conditionnelles (304), Cache-Control et compression
+   gzip / brotli
+
+Les réponses des KPI et des données ne changent qu'au rechargement du
+dataset : leur ETag est dérivé de l'identifiant des données servies
+(empreinte de la source et version de l'état, fournies par l'application,
+identiques d'un worker et d'un redémarrage à l'autre) et des paramètres de
+la requête normalisés : filtres sous forme canonique (Filtres.cle), autres
+paramètres décodés et triés. Une requête dont l'en-tête
+If-None-Match contient cet ETag reçoit un 304 sans que l'endpoint soit
+appelé : aucun filtrage, calcul ni sérialisation.
+
+Les réponses textuelles (JSON, CSV, NDJSON) sont compressées selon
+l'en-tête Accept-Encoding (brotli si le module est installé, sinon
+gzip), au-delà d'une taille minimale ; les réponses en flux (export)
+sont compressées bloc par bloc.
+"""
+
+from typing import Callable, Iterable, List, Optional
+from urllib.parse import parse_qsl, urlencode
+import hashlib
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from cache import normaliser_filtres
+from filtres import COLONNES_INDEXEES, PARAMETRES_FILTRES
+from metriques import profilage_demande
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : compression gzip seulement
+    brotli = None
+
+# Routes dont les réponses ne dépendent que des données et des paramètres
+PREFIXES_ETAG = ("/kpi/", "/data/", "/filters/")
+
+# Paramètres sans effet sur le contenu de la réponse
+PARAMETRES_IGNORES = ("profile",)
+
+# Types de contenu compressés (préfixes)
+TYPES_COMPRESSIBLES = ("application/json", "application/x-ndjson", "text/")
+
+# Compromis vitesse / taux pour des réponses calculées à la demande
+NIVEAU_GZIP = 6
+QUALITE_BROTLI = 5
+
+
+def encodages_disponibles() -> List[str]:
+    """Encodages proposés, par ordre de préférence"""
+    return (["br"] if brotli is not None else []) + ["gzip"]
+
+
+def parametres_normalises(query_string: bytes) -> str:
+    """
+    Forme canonique des paramètres d'une requête
+
+    Les filtres donnent la clé de Filtres (None, "Toutes" et un filtre
+    absent sont équivalents, valeurs multiples triées, dates ISO). Comme
+    pour les endpoints, une dimension répétée réunit toutes ses valeurs
+    (?region=East&region=West équivaut à ?region=West,East) ; pour les
+    autres filtres, seule la dernière valeur est lue. Les autres paramètres
+    sont triés par nom (ordre des valeurs répétées conservé).
+    """
+    parametres = [
+        (nom, valeur) for nom, valeur in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+        if nom not in PARAMETRES_IGNORES
+    ]
+    filtres = {}
+    for nom, valeur in parametres:
+        if nom in COLONNES_INDEXEES:
+            filtres.setdefault(nom, []).append(valeur)
+        elif nom in PARAMETRES_FILTRES:
+            filtres[nom] = valeur
+    autres = [(nom, valeur) for nom, valeur in parametres if nom not in PARAMETRES_FILTRES]
+    return f"{normaliser_filtres(**filtres)!r}\n{urlencode(sorted(autres, key=lambda parametre: parametre[0]))}"
+
+
+def calculer_etag(validateur: str, chemin: str, query_string: bytes) -> str:
+    """
+    ETag faible : identifiant des données, route et paramètres normalisés
+
+    Faible (W/) : le même ETag désigne la réponse compressée ou non.
+    """
+    normalise = parametres_normalises(query_string)
+    empreinte = hashlib.blake2b(f"{validateur}\n{chemin}\n{normalise}".encode("utf-8"), digest_size=12)
+    return f'W/"{empreinte.hexdigest()}"'
+
+
+def etag_correspond(if_none_match: Optional[str], etag: str) -> bool:
+    """Comparaison faible de If-None-Match avec l'ETag (liste ou *)"""
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for candidat in if_none_match.split(","):
+        candidat = candidat.strip()
+        if candidat == "*" or candidat.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def choisir_encodage(accept_encoding: Optional[str], disponibles: Iterable[str]) -> Optional[str]:
+    """
+    Encodage accepté par le client (qvalue la plus haute, préférence du serveur à égalité)
+
+    Returns:
+        'br', 'gzip' ou None (réponse non compressée)
+    """
+    if not accept_encoding:
+        return None
+    qualites = {}
+    for element in accept_encoding.split(","):
+        nom, _, parametres = element.strip().partition(";")
+        qualite = 1.0
+        parametres = parametres.strip()
+        if parametres.startswith("q="):
+            try:
+                qualite = float(parametres[2:])
+            except ValueError:
+                qualite = 0.0
+        qualites[nom.strip().lower()] = qualite
+
+    meilleur, meilleure_qualite = None, 0.0
+    for encodage in disponibles:
+        qualite = qualites.get(encodage, qualites.get("*", 0.0))
+        if qualite > meilleure_qualite:
+            meilleur, meilleure_qualite = encodage, qualite
+    return meilleur
+
+
+class Compresseur:
+    """Compression incrémentale gzip ou brotli (réponses en un bloc ou en flux)"""
+
+    def __init__(self, encodage: str):
+        if encodage == "br":
+            self._compresseur = brotli.Compressor(quality=QUALITE_BROTLI)
+            self._compresser, self._terminer = self._compresseur.process, self._compresseur.finish
+        else:
+            # wbits = 16 + 15 : en-tête et somme de contrôle gzip
+            self._compresseur = zlib.compressobj(NIVEAU_GZIP, zlib.DEFLATED, 31)
+            self._compresser, self._terminer = self._compresseur.compress, self._compresseur.flush
+
+    def compresser(self, bloc: bytes) -> bytes:
+        return self._compresser(bloc)
+
+    def terminer(self) -> bytes:
+        return self._terminer()
+
+
+class MiddlewareCacheHTTP:
+    """
+    Middleware ASGI : ETag et 304, Cache-Control, compression des réponses
+
+    Args:
+        app: Application ASGI
+        validateur: Identifiant des données servies, lu à chaque requête
+            (change à chaque rechargement du dataset) ; None pendant la
+            publication d'un nouvel état : réponse sans ETag
+        max_age: Durée de fraîcheur (secondes) ; 0 : revalidation à chaque
+            utilisation (no-cache)
+        compression: Compresser les réponses textuelles
+        taille_min: Taille minimale (octets) d'une réponse compressée
+    """
+
+    def __init__(self, app, validateur: Callable[[], Optional[str]], max_age: int = 0,
+                 compression: bool = True, taille_min: int = 1024):
+        self.app = app
+        self.validateur = validateur
+        self.cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+        self.encodages = encodages_disponibles() if compression else []
+        self.taille_min = taille_min
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD"):
+            await self.app(scope, receive, send)
+            return
+
+        entetes = Headers(scope=scope)
+        etag = None
+        # Requête profilée : la réponse est un rapport, jamais un 304
+        validateur = None
+        if scope["path"].startswith(PREFIXES_ETAG) and not profilage_demande(scope):
+            validateur = self.validateur()
+        if validateur is not None:
+            etag = calculer_etag(validateur, scope["path"], scope.get("query_string", b""))
+            if etag_correspond(entetes.get("if-none-match"), etag):
+                await send({"type": "http.response.start", "status": 304,
+                            "headers": self.entetes_validation(etag)})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if etag is None and not self.encodages:
+            await self.app(scope, receive, send)
+            return
+        encodage = choisir_encodage(entetes.get("accept-encoding"), self.encodages)
+
+        debut_reponse = None
+        compresseur: Optional[Compresseur] = None
+        decide = False
+
+        async def envoyer(message):
+            nonlocal debut_reponse, compresseur, decide
+            if message["type"] == "http.response.start":
+                if etag is not None and message["status"] == 200:
+                    en_tetes = MutableHeaders(raw=message["headers"])
+                    en_tetes["ETag"] = etag
+                    en_tetes["Cache-Control"] = self.cache_control
+                # Compression décidée au premier bloc (taille connue si réponse en un bloc)
+                debut_reponse = message
+                return
+            if message["type"] != "http.response.body" or decide:
+                if compresseur is not None and message["type"] == "http.response.body":
+                    bloc = compresseur.compresser(message.get("body", b""))
+                    if not message.get("more_body", False):
+                        bloc += compresseur.terminer()
+                    message = {**message, "body": bloc}
+                await send(message)
+                return
+
+            decide = True
+            corps, suite = message.get("body", b""), message.get("more_body", False)
+            en_tetes = MutableHeaders(raw=debut_reponse["headers"])
+            compressible = (self.encodages and debut_reponse["status"] == 200
+                            and "content-encoding" not in en_tetes
+                            and en_tetes.get("content-type", "").startswith(TYPES_COMPRESSIBLES))
+            if compressible:
+                # Représentation choisie selon Accept-Encoding, compressée ou non
+                en_tetes.add_vary_header("Accept-Encoding")
+            if (not compressible or encodage is None or scope["method"] == "HEAD"
+                    or (not suite and len(corps) < self.taille_min)):
+                await send(debut_reponse)
+                await send(message)
+                return
+
+            compresseur = Compresseur(encodage)
+            en_tetes["Content-Encoding"] = encodage
+            bloc = compresseur.compresser(corps)
+            if suite:
+                del en_tetes["Content-Length"]
+            else:
+                bloc += compresseur.terminer()
+                en_tetes["Content-Length"] = str(len(bloc))
+            await send(debut_reponse)
+            await send({**message, "body": bloc})
+
+        await self.app(scope, receive, envoyer)
+
+    def entetes_validation(self, etag: str) -> List[tuple]:
+        """En-têtes d'une réponse 304 : ceux qu'aurait portés la réponse 200"""
+        en_tetes = [(b"etag", etag.encode("latin-1")), (b"cache-control", self.cache_control.encode("latin-1"))]
+        if self.encodages:
+            en_tetes.append((b"vary", b"Accept-Encoding"))
+        return en_tetes
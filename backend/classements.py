@@ -0,0 +1,57 @@
+"""
+Classements des produits et des clients
+🏆 Sélection partielle des K premiers (ou derniers) sans tri complet
+
+Les endpoints de classement ne renvoient que quelques dizaines de lignes
+parmi tous les produits ou clients agrégés : plutôt que de trier
+l'agrégat entier, on cherche la valeur du rang limite (np.partition,
+linéaire) puis on ne trie que les candidats qui la dépassent. L'ordre est
+celui d'un tri stable : à valeur égale, l'ordre de l'agrégat est conservé.
+"""
+
+import numpy as np
+
+# Critères de tri des produits (paramètre d'API -> colonne de l'agrégat)
+CRITERES_PRODUITS = {
+    'ca': 'Sales',
+    'profit': 'Profit',
+    'quantite': 'Quantity',
+    'marge': 'marge_pct',
+}
+REGEX_CRITERE_PRODUITS = '^(ca|profit|quantite|marge)$'
+
+
+def rangs(valeurs: np.ndarray, debut: int, fin: int, decroissant: bool = True) -> np.ndarray:
+    """
+    Positions des éléments de rang [debut, fin) dans l'ordre de tri
+
+    Équivaut à np.argsort(valeurs, kind='stable')[debut:fin] (ordre inversé
+    si decroissant, à valeur égale l'ordre d'origine est conservé) ; les
+    NaN sont classés en dernier.
+
+    Args:
+        valeurs: Valeurs à classer
+        debut: Premier rang retenu (0 = meilleur)
+        fin: Rang suivant le dernier retenu
+        decroissant: Plus grandes valeurs en premier
+
+    Returns:
+        np.ndarray des positions, au plus fin - debut
+    """
+    nombre = len(valeurs)
+    fin = min(fin, nombre)
+    if debut >= fin:
+        return np.zeros(0, dtype=np.intp)
+
+    # Clés croissantes : négation pour un tri décroissant, NaN à la fin
+    cles = np.asarray(valeurs, dtype=np.float64)
+    cles = -cles if decroissant else cles
+    cles = np.where(np.isnan(cles), np.inf, cles)
+
+    if fin < nombre:
+        # Valeur du rang fin - 1 : seuls les éléments inférieurs ou égaux sont triés
+        seuil = np.partition(cles, fin - 1)[fin - 1]
+        candidats = np.flatnonzero(cles <= seuil)
+    else:
+        candidats = np.arange(nombre)
+    return candidats[np.argsort(cles[candidats], kind='stable')][debut:fin]
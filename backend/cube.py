@@ -0,0 +1,290 @@
+"""
+Cube OLAP journalier du dataset Superstore
+🧊 Agrégats précalculés au grain jour × Category × Region × Segment
+
+Les mesures additives (Sales, Profit, Quantity) sont sommées par cellule.
+Pour les comptages distincts (Order ID, Customer ID), chaque cellule
+conserve la liste triée des identifiants qu'elle contient (voir
+distincts.py) : les listes des cellules retenues sont fusionnées au moment
+de la requête, exactement ou par esquisses HyperLogLog.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+import copy
+import numpy as np
+import pandas as pd
+
+from filtres import Filtres
+from distincts import IdentifiantsCellules
+
+# Dimensions du cube par défaut (les autres filtres sont appliqués aux lignes)
+DIMENSIONS = ('Category', 'Region', 'Segment')
+MESURES = ('Sales', 'Profit', 'Quantity')
+DISTINCTS = ('Order ID', 'Customer ID')
+
+
+def coder(dictionnaire: pd.Index, serie: pd.Series) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Codes des valeurs de `serie` dans `dictionnaire`, étendu avec les valeurs nouvelles
+
+    Les valeurs connues gardent leur code et les nouvelles sont ajoutées dans
+    leur ordre d'apparition : des lignes ajoutées plus tard sont codées comme
+    lors d'une construction complète. Une valeur manquante a le code -1.
+    """
+    codes_locaux, uniques = pd.factorize(serie)
+    uniques = np.asarray(uniques, dtype=object)
+    positions = np.full(len(uniques), -1, dtype=np.intp)
+    if len(dictionnaire):
+        # Table de hachage sur les quelques valeurs ajoutées, pas sur le dictionnaire
+        rangs = pd.Index(uniques).get_indexer(dictionnaire)
+        connues = rangs >= 0
+        positions[rangs[connues]] = np.flatnonzero(connues)
+    nouvelles = positions < 0
+    positions[nouvelles] = len(dictionnaire) + np.arange(np.count_nonzero(nouvelles))
+    if nouvelles.any():
+        dictionnaire = dictionnaire.append(pd.Index(uniques[nouvelles]))
+    return np.append(positions, -1)[codes_locaux], dictionnaire
+
+
+class CubeJournalier:
+    """
+    Cube des agrégats journaliers
+
+    Args:
+        df: Dataset trié par date
+        dimensions: Colonnes du grain des cellules, en plus du jour
+
+    Attributes:
+        jours: Jour de chaque cellule (trié, datetime64[ns])
+        codes: Code de chaque dimension par cellule
+        valeurs: Valeurs possibles de chaque dimension (code -> libellé)
+        dictionnaires: Identifiants connus de chaque colonne distincte (code -> identifiant)
+        sommes: Somme de chaque mesure par cellule
+        lignes: Nombre de lignes du dataset par cellule
+        ids: Identifiants distincts par cellule, pour chaque colonne distincte
+    """
+
+    def __init__(self, df: pd.DataFrame, dimensions: Sequence[str] = DIMENSIONS):
+        self.dimensions = tuple(dimensions)
+        self.valeurs: Dict[str, pd.Index] = {
+            colonne: pd.Index([], dtype=object) for colonne in self.dimensions
+        }
+        self.dictionnaires: Dict[str, pd.Index] = {
+            colonne: pd.Index([], dtype=object) for colonne in DISTINCTS
+        }
+        # Type des sommes : entiers sur 64 bits (comme pandas), sinon float64
+        self.types = {
+            mesure: np.int64 if pd.api.types.is_integer_dtype(df[mesure]) else np.float64
+            for mesure in MESURES
+        }
+        self.dates_journalieres = True
+        self._construire(df)
+
+    def _construire(self, df: pd.DataFrame):
+        """Calcule les cellules de `df` (les dictionnaires sont étendus au passage)"""
+        dates = df['Order Date']
+        jours = dates.dt.normalize()
+        # Le cube ne répond aux filtres de dates que si aucune commande n'a d'heure
+        self.dates_journalieres = self.dates_journalieres and bool((dates == jours).all())
+
+        codes_lignes = {}
+        for colonne in self.dimensions:
+            codes_lignes[colonne], self.valeurs[colonne] = coder(self.valeurs[colonne], df[colonne])
+
+        # Numéro de cellule de chaque ligne (cellules triées par jour)
+        cellules = pd.DataFrame({'jour': jours.to_numpy(), **codes_lignes})
+        cellule = cellules.groupby(list(cellules.columns), sort=True).ngroup().to_numpy()
+        nb_cellules = int(cellule.max()) + 1 if len(cellule) else 0
+        _, premieres = np.unique(cellule, return_index=True)
+
+        self.jours = jours.to_numpy(dtype='datetime64[ns]')[premieres]
+        self.codes = {colonne: codes[premieres] for colonne, codes in codes_lignes.items()}
+        self.lignes = np.bincount(cellule, minlength=nb_cellules)
+        self.sommes = {
+            mesure: np.bincount(cellule, weights=df[mesure].to_numpy(dtype='float64'), minlength=nb_cellules)
+            for mesure in MESURES
+        }
+
+        # Identifiants distincts par cellule : paires (cellule, code) uniques
+        self.ids = {}
+        for colonne in DISTINCTS:
+            codes, self.dictionnaires[colonne] = coder(self.dictionnaires[colonne], df[colonne])
+            nb_ids = max(len(self.dictionnaires[colonne]), 1)
+            self.ids[colonne] = IdentifiantsCellules.construire(cellule, codes, nb_cellules, nb_ids)
+
+    def etendre(self, df: pd.DataFrame, debut: int) -> 'CubeJournalier':
+        """
+        Nouveau cube pour `df`, dont les lignes [0, debut) sont déjà agrégées ici
+
+        `debut` est la première ligne du jour de la plus ancienne commande
+        ajoutée : les cellules de ce jour et des suivants sont recalculées
+        (même ordre de sommation qu'une construction complète), les autres
+        sont reprises telles quelles. Le cube actuel n'est pas modifié.
+
+        Args:
+            df: Dataset complet, trié par date
+            debut: Première ligne à agréger (début d'un jour)
+        """
+        cube = copy.copy(self)
+        cube.valeurs = dict(self.valeurs)
+        cube.dictionnaires = dict(self.dictionnaires)
+        cube._construire(df.iloc[debut:])
+        if not len(cube.jours):
+            return self
+
+        coupure = int(np.searchsorted(self.jours, cube.jours[0], side='left'))
+        cube.jours = np.concatenate([self.jours[:coupure], cube.jours])
+        cube.codes = {
+            colonne: np.concatenate([codes[:coupure], cube.codes[colonne]]) for colonne, codes in self.codes.items()
+        }
+        cube.lignes = np.concatenate([self.lignes[:coupure], cube.lignes])
+        cube.sommes = {
+            mesure: np.concatenate([sommes[:coupure], cube.sommes[mesure]]) for mesure, sommes in self.sommes.items()
+        }
+        cube.ids = {colonne: ids.prolonger(coupure, cube.ids[colonne]) for colonne, ids in self.ids.items()}
+        return cube
+
+    def __len__(self) -> int:
+        return len(self.jours)
+
+    def memoire(self) -> int:
+        """Octets occupés par les cellules et leurs identifiants"""
+        return int(self.jours.nbytes + self.lignes.nbytes
+                   + sum(codes.nbytes for codes in self.codes.values())
+                   + sum(sommes.nbytes for sommes in self.sommes.values())
+                   + sum(ids.debuts.nbytes + ids.codes.nbytes for ids in self.ids.values()))
+
+    def selection(self, **filtres) -> Optional[np.ndarray]:
+        """
+        Cellules correspondant aux filtres (paramètres de filtres.PARAMETRES_FILTRES)
+
+        Returns:
+            np.ndarray des cellules retenues, ou None si le cube ne peut pas
+            répondre exactement (bornes de dates avec une heure, dimension
+            hors du cube ou intervalle de mesure, par exemple)
+        """
+        filtres = Filtres(**filtres)
+        if filtres.intervalles or not set(filtres.dimensions) <= set(self.dimensions):
+            return None
+        debut, fin = 0, len(self.jours)
+        for date, cote in ((filtres.debut, 'left'), (filtres.fin, 'right')):
+            if date is None:
+                continue
+            if not self.dates_journalieres or date != date.normalize():
+                return None
+            position = int(np.searchsorted(self.jours, date.to_datetime64(), side=cote))
+            debut, fin = (position, fin) if cote == 'left' else (debut, position)
+
+        cellules = np.arange(debut, max(debut, fin))
+        for colonne, valeurs in filtres.dimensions.items():
+            codes = self.valeurs[colonne].get_indexer(list(valeurs))
+            cellules = cellules[np.isin(self.codes[colonne][cellules], codes[codes >= 0])]
+        return cellules
+
+    def libelles(self, cellules: np.ndarray, colonne: str) -> np.ndarray:
+        """Libellé de la dimension pour chaque cellule"""
+        return self.valeurs[colonne].to_numpy()[self.codes[colonne][cellules]]
+
+    def compter_distincts(self, cellules: np.ndarray, colonne: str, groupes: Optional[np.ndarray] = None,
+                          nb_groupes: int = 1, mode: str = 'exact') -> np.ndarray:
+        """Nombre d'identifiants distincts par groupe de cellules (mode 'exact' ou 'approx')"""
+        return self.ids[colonne].compter(cellules, groupes, nb_groupes, mode)
+
+    def agreger(self, cellules: np.ndarray, agregations: Dict[str, str],
+                libelles: Optional[Sequence] = None, nom: Optional[str] = None,
+                mode_distincts: str = 'exact'):
+        """
+        Équivalent de groupby(nom).agg(agregations) sur les cellules retenues
+
+        Args:
+            cellules: Cellules retenues (voir selection)
+            agregations: {colonne: 'sum' | 'nunique'}
+            libelles: Clé de groupe de chaque cellule (None = total global)
+            nom: Nom de la clé de groupe (index du résultat)
+            mode_distincts: Comptages distincts 'exact' ou 'approx' (HyperLogLog)
+
+        Returns:
+            dict (total global) ou pd.DataFrame indexé par la clé, trié
+        """
+        if libelles is None:
+            groupes, cles, nb_groupes = None, None, 1
+        else:
+            groupes, cles = pd.factorize(np.asarray(libelles), sort=True)
+            nb_groupes = len(cles)
+
+        resultat = {}
+        for colonne, fonction in agregations.items():
+            if fonction == 'nunique':
+                resultat[colonne] = self.compter_distincts(cellules, colonne, groupes, nb_groupes, mode_distincts)
+                continue
+            valeurs = self.sommes[colonne][cellules]
+            total = np.bincount(groupes, weights=valeurs, minlength=nb_groupes) if groupes is not None \
+                else np.array([valeurs.sum()])
+            resultat[colonne] = total.astype(self.types[colonne])
+
+        if groupes is None:
+            return {colonne: valeurs[0].item() for colonne, valeurs in resultat.items()}
+        return pd.DataFrame(resultat, index=pd.Index(cles, name=nom))
+
+
+class SerieJournaliere:
+    """
+    Agrégats du cube par jour, tous filtres de dimension confondus
+
+    Une commande n'ayant qu'une date, ses lignes tombent toutes le même
+    jour : les commandes distinctes d'un jour se comptent une fois pour
+    toutes, et une plage de dates n'est qu'une tranche de la série. Les
+    sommes sont celles du cube (mêmes cellules, même ordre de sommation).
+
+    Attributes:
+        jours: Jours ayant au moins une cellule (triés, datetime64[ns])
+        sommes: Somme de chaque mesure par jour
+        commandes: Commandes distinctes par jour
+    """
+
+    def __init__(self, cube: CubeJournalier):
+        self.cube = cube
+        self.jours, groupes = np.unique(cube.jours, return_inverse=True)
+        cellules = np.arange(len(cube))
+        self.sommes = {
+            mesure: np.bincount(groupes, weights=sommes, minlength=len(self.jours)).astype(cube.types[mesure])
+            for mesure, sommes in cube.sommes.items()
+        }
+        self.commandes = cube.compter_distincts(cellules, 'Order ID', groupes, len(self.jours))
+
+    def memoire(self) -> int:
+        return int(self.jours.nbytes + self.commandes.nbytes + sum(sommes.nbytes for sommes in self.sommes.values()))
+
+    def couvre(self, agregations: Dict[str, str]) -> bool:
+        """Indique si la série contient toutes les agrégations demandées"""
+        return all(
+            (fonction == 'sum' and colonne in self.sommes) or (fonction == 'nunique' and colonne == 'Order ID')
+            for colonne, fonction in agregations.items()
+        )
+
+    def agreger(self, cellules: np.ndarray, agregations: Dict[str, str]) -> pd.DataFrame:
+        """
+        Agrégats par jour des cellules d'une plage de dates (cube.selection sans filtre de dimension)
+
+        Returns:
+            pd.DataFrame indexé par la clé entière du jour (voir temporel.py), trié
+        """
+        debut, fin = 0, 0
+        if len(cellules):
+            bornes = self.cube.jours[[cellules[0], cellules[-1]]]
+            debut = int(np.searchsorted(self.jours, bornes[0], side='left'))
+            fin = int(np.searchsorted(self.jours, bornes[1], side='right'))
+        resultat = {
+            colonne: self.commandes[debut:fin] if fonction == 'nunique' else self.sommes[colonne][debut:fin]
+            for colonne, fonction in agregations.items()
+        }
+        cles = self.jours[debut:fin].astype('datetime64[D]').astype(np.int64)
+        return pd.DataFrame(resultat, index=pd.Index(cles, name='periode'))
+
+
+def colonnes_hors_cube(agregations: Dict[str, str]) -> List[str]:
+    """Colonnes non prises en charge par le cube (vide si le cube peut répondre)"""
+    return [
+        colonne for colonne, fonction in agregations.items()
+        if not ((fonction == 'sum' and colonne in MESURES) or (fonction == 'nunique' and colonne in DISTINCTS))
+    ]
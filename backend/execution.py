@@ -0,0 +1,204 @@
+"""
+Exécution des calculs KPI hors de la boucle d'événements
+⚙️ Pool de calcul configurable (threads ou processus) et coalescence des
+   requêtes identiques en cours
+
+Les endpoints KPI sont asynchrones : la boucle d'événements lit le cache,
+et seuls les calculs manquants partent dans le pool. Des requêtes
+identiques (même endpoint, mêmes paramètres normalisés) qui arrivent
+pendant un calcul attendent ce calcul au lieu d'en lancer un autre.
+
+En mode processus, les calculs s'exécutent dans des processus séparés
+(pas de verrou global de l'interpréteur) : chaque processus importe
+l'application et charge le dataset (sans copie s'il est partagé, voir
+partage.py), et le pool est relancé à chaque rechargement du dataset.
+"""
+
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+import asyncio
+import contextvars
+import functools
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+
+from cache import CacheResultats
+from metriques import noter_cache, profilage_en_cours
+
+logger = logging.getLogger(__name__)
+
+# Types de pool acceptés par API_EXECUTEUR
+TYPES_EXECUTEUR = ('thread', 'process')
+
+# Fonctions de calcul des endpoints, par nom (retrouvées par les processus du pool)
+CALCULS: Dict[str, Callable] = {}
+
+
+def calculer(nom: str, parametres: Dict[str, Any]) -> Any:
+    """Appelle la fonction de calcul enregistrée `nom` (point d'entrée du pool)"""
+    return CALCULS[nom](**parametres)
+
+
+def _initialiser_processus(module: str):
+    """Importe le module des endpoints dans un processus du pool"""
+    # Script lancé directement : déjà réexécuté par multiprocessing (__mp_main__)
+    if module != '__main__':
+        importlib.import_module(module)
+
+
+class Executeur:
+    """
+    Pool de calcul des endpoints KPI, avec cache et coalescence
+
+    Args:
+        cache: Cache des résultats (lu dans la boucle, écrit après calcul)
+        type: 'thread' ou 'process'
+        taille: Nombre de threads / processus (défaut : selon le nombre de CPU)
+        coalescence: Partager les calculs identiques en cours
+        observateur: Fonction appelée avec (endpoint, paramètres) à chaque
+            requête d'un endpoint mémoïsé, avant la lecture du cache
+
+    Attributes:
+        calculs: Nombre de calculs lancés dans le pool
+        coalescees: Nombre de requêtes ayant rejoint un calcul déjà en cours
+        actifs: Nombre de calculs en cours dans le pool
+    """
+
+    def __init__(self, cache: CacheResultats, type: str = 'thread',
+                 taille: Optional[int] = None, coalescence: bool = True,
+                 observateur: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        if type not in TYPES_EXECUTEUR:
+            raise ValueError(f"Type d'exécuteur inconnu : {type} ({', '.join(TYPES_EXECUTEUR)})")
+        self.cache = cache
+        self.type = type
+        cpu = os.cpu_count() or 1
+        self.taille = taille or (cpu if type == 'process' else min(32, cpu + 4))
+        self.coalescence = coalescence
+        self.observateur = observateur
+        self.module: Optional[str] = None
+        self._pool: Optional[Executor] = None
+        self._verrou = threading.Lock()
+        self._en_cours: Dict[Hashable, asyncio.Future] = {}
+        self.calculs = 0
+        self.coalescees = 0
+        self.actifs = 0
+
+    def pool(self) -> Executor:
+        """Pool de calcul, créé à la première utilisation"""
+        with self._verrou:
+            if self._pool is None:
+                if self.type == 'process':
+                    self._pool = ProcessPoolExecutor(
+                        self.taille, mp_context=multiprocessing.get_context('spawn'),
+                        initializer=_initialiser_processus, initargs=(self.module,),
+                    )
+                else:
+                    self._pool = ThreadPoolExecutor(self.taille, thread_name_prefix="calcul")
+            return self._pool
+
+    def redemarrer(self):
+        """
+        Relance le pool de processus (nouveau dataset)
+
+        Les calculs déjà soumis se terminent dans les anciens processus ;
+        leur résultat, calculé sur l'ancien dataset, n'est pas mis en cache.
+        Sans effet en mode thread (les threads lisent l'état courant).
+        """
+        if self.type != 'process':
+            return
+        with self._verrou:
+            ancien, self._pool = self._pool, None
+        if ancien is not None:
+            ancien.shutdown(wait=False)
+
+    async def _calculer(self, cle: Hashable, nom: str, parametres: Dict[str, Any],
+                        calcul: Callable[[], Any], generation: int) -> Any:
+        """Calcule dans le pool puis met le résultat en cache"""
+        self.calculs += 1
+        self.actifs += 1
+        boucle = asyncio.get_running_loop()
+        try:
+            if self.type == 'process':
+                valeur = await boucle.run_in_executor(self.pool(), calculer, nom, parametres)
+            else:
+                # Le calcul garde le contexte de la requête (relevé des métriques)
+                valeur = await boucle.run_in_executor(self.pool(), contextvars.copy_context().run, calcul)
+        finally:
+            self.actifs -= 1
+        self.cache.ecrire(cle, valeur, generation)
+        return valeur
+
+    async def obtenir(self, nom: str, parametres: Dict[str, Any], calcul: Callable[[], Any],
+                      generation: Optional[int] = None) -> Any:
+        """
+        Résultat de l'endpoint `nom` : cache, calcul en cours, ou nouveau calcul
+
+        L'observateur n'est pas prévenu : seuls les endpoints mémoïsés
+        relèvent leur requête (le dashboard relève la sienne une fois, pour
+        tous ses panneaux).
+
+        Args:
+            nom: Nom de l'endpoint (partie de la clé, fonction enregistrée en mode processus)
+            parametres: Paramètres complets de l'endpoint (filtres compris)
+            calcul: Fonction sans argument calculant le résultat (mode thread)
+            generation: Génération du cache lue avant de capturer le dataset
+        """
+        if profilage_en_cours():
+            # Requête profilée : calcul direct, dans le thread du profileur
+            return calcul()
+
+        cle = self.cache.cle(nom, parametres)
+        trouve, valeur = self.cache.lire(cle)
+        noter_cache(trouve)
+        if trouve:
+            return valeur
+        if generation is None:
+            generation = self.cache.generation
+
+        # Un calcul lancé avant un rechargement n'est pas rejoint (ancien dataset)
+        en_cours = (cle, generation)
+        tache = self._en_cours.get(en_cours) if self.coalescence else None
+        if tache is None:
+            # Tâche indépendante de la requête : l'annulation d'un client
+            # n'interrompt pas le calcul attendu par les autres
+            tache = asyncio.ensure_future(self._calculer(cle, nom, parametres, calcul, generation))
+            if self.coalescence:
+                self._en_cours[en_cours] = tache
+                tache.add_done_callback(
+                    lambda fini: self._en_cours.pop(en_cours) if self._en_cours.get(en_cours) is fini else None
+                )
+        else:
+            self.coalescees += 1
+        return await asyncio.shield(tache)
+
+    def memoiser(self, fonction: Callable) -> Callable:
+        """
+        Décorateur d'endpoint : endpoint asynchrone, calcul mis en cache et exécuté dans le pool
+
+        La fonction décorée reste synchrone ; elle est enregistrée sous son nom
+        pour le mode processus. La signature est conservée pour FastAPI.
+        """
+        nom = fonction.__name__
+        CALCULS[nom] = fonction
+        self.module = fonction.__module__
+
+        @functools.wraps(fonction)
+        async def wrapper(**parametres):
+            if self.observateur is not None:
+                self.observateur(nom, parametres)
+            return await self.obtenir(nom, parametres, functools.partial(fonction, **parametres))
+        return wrapper
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Type et taille du pool, calculs lancés et requêtes coalescées"""
+        return {
+            "type": self.type,
+            "taille": self.taille,
+            "coalescence": self.coalescence,
+            "en_cours": len(self._en_cours),
+            "calculs": self.calculs,
+            "coalescees": self.coalescees,
+        }
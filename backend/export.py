@@ -0,0 +1,190 @@
+"""
+Export des commandes brutes
+📤 Pagination par curseur (keyset) et export en flux NDJSON, CSV ou Arrow IPC
+
+Le dataset est trié par 'Order Date' : une page commence juste après la
+dernière ligne de la page précédente, identifiée par son curseur
+(Order Date, Row ID). Retrouver cette ligne coûte une recherche
+dichotomique sur les dates, quelle que soit la profondeur de la page
+(contrairement à un offset, qui oblige à compter les lignes précédentes).
+
+L'export en flux parcourt la sélection par blocs de lignes : la mémoire
+utilisée ne dépend que de la taille d'un bloc, pas du nombre de lignes
+exportées.
+"""
+
+from typing import Iterable, Iterator, Optional, Tuple
+import base64
+import io
+import json
+
+import numpy as np
+import pandas as pd
+
+from filtres import IndexFiltres, Selection
+from serialisation import encoder_json, vers_tableau
+
+try:
+    import pyarrow as pa
+except ImportError:  # pyarrow est optionnel : export Arrow indisponible
+    pa = None
+
+# Formats d'export et type MIME de chacun
+TYPES_EXPORT = {
+    'ndjson': "application/x-ndjson",
+    'csv': "text/csv",
+    'arrow': "application/vnd.apache.arrow.stream",
+}
+REGEX_EXPORT = '^(ndjson|csv|arrow)$'
+
+# Nombre de lignes converties à la fois
+TAILLE_BLOC = 10_000
+
+# Colonnes de dates, exportées au format YYYY-MM-DD (NDJSON, CSV)
+COLONNES_DATES = ('Order Date', 'Ship Date')
+
+
+class CurseurInvalide(ValueError):
+    """Curseur illisible, ou ligne du curseur absente du dataset"""
+
+
+def arrow_disponible() -> bool:
+    """Indique si l'export Arrow est possible (pyarrow installé)"""
+    return pa is not None
+
+
+# === CURSEURS ===
+
+def encoder_curseur(date: pd.Timestamp, row_id: int) -> str:
+    """Curseur opaque (base64 URL) désignant la ligne (Order Date, Row ID)"""
+    contenu = json.dumps([date.isoformat(), int(row_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(contenu.encode()).decode().rstrip("=")
+
+
+def decoder_curseur(curseur: str) -> Tuple[pd.Timestamp, int]:
+    """
+    (Order Date, Row ID) d'un curseur
+
+    Raises:
+        CurseurInvalide: si le curseur n'a pas été produit par encoder_curseur
+    """
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(curseur + "=" * (-len(curseur) % 4)))
+        return pd.Timestamp(date), int(row_id)
+    except (ValueError, TypeError) as e:
+        raise CurseurInvalide(f"Curseur illisible : {curseur}") from e
+
+
+def position_curseur(index: IndexFiltres, curseur: str) -> int:
+    """
+    Position dans le dataset de la ligne désignée par le curseur
+
+    Seules les lignes de la date du curseur sont parcourues.
+
+    Raises:
+        CurseurInvalide: si la ligne n'existe pas (dataset rechargé entre-temps)
+    """
+    date, row_id = decoder_curseur(curseur)
+    debut = int(np.searchsorted(index.dates, date.to_datetime64(), side='left'))
+    fin = int(np.searchsorted(index.dates, date.to_datetime64(), side='right'))
+    trouves = np.flatnonzero(index.df['Row ID'].to_numpy()[debut:fin] == row_id)
+    if not len(trouves):
+        raise CurseurInvalide(f"Ligne du curseur introuvable ({date.date()}, Row ID {row_id})")
+    return debut + int(trouves[0])
+
+
+def selection_apres(selection: Selection, position: int) -> Selection:
+    """Partie de la sélection située après la position `position`"""
+    if isinstance(selection, slice):
+        return slice(max(selection.start, position + 1), max(selection.stop, position + 1))
+    return selection[np.searchsorted(selection, position, side='right'):]
+
+
+def taille(selection: Selection) -> int:
+    """Nombre de lignes d'une sélection"""
+    if isinstance(selection, slice):
+        return selection.stop - selection.start
+    return len(selection)
+
+
+def tranche(selection: Selection, debut: int, fin: int) -> Selection:
+    """Lignes [debut, fin) de la sélection (en rang, pas en position)"""
+    if isinstance(selection, slice):
+        return slice(min(selection.start + debut, selection.stop), min(selection.start + fin, selection.stop))
+    return selection[debut:fin]
+
+
+def lignes(df: pd.DataFrame, selection: Selection) -> pd.DataFrame:
+    """Lignes du dataset correspondant à la sélection"""
+    if isinstance(selection, slice):
+        return df.iloc[selection]
+    return df.take(selection)
+
+
+def curseur_suivant(df: pd.DataFrame, selection: Selection, nombre: int) -> Optional[str]:
+    """
+    Curseur de la dernière des `nombre` premières lignes de la sélection,
+    ou None si la sélection ne contient pas plus de lignes
+    """
+    if nombre <= 0 or taille(selection) <= nombre:
+        return None
+    derniere = tranche(selection, nombre - 1, nombre)
+    position = derniere.start if isinstance(derniere, slice) else int(derniere[0])
+    return encoder_curseur(df['Order Date'].iloc[position], df['Row ID'].iloc[position])
+
+
+# === EXPORT EN FLUX ===
+
+def dates_en_texte(bloc: pd.DataFrame) -> pd.DataFrame:
+    """Dates au format YYYY-MM-DD (comme /data/commandes)"""
+    return bloc.assign(**{
+        colonne: bloc[colonne].dt.strftime('%Y-%m-%d') for colonne in COLONNES_DATES if colonne in bloc
+    })
+
+
+def exporter_blocs(blocs: Iterable[pd.DataFrame], format: str) -> Iterator[bytes]:
+    """
+    Octets de l'export d'une suite de blocs de lignes
+
+    Args:
+        blocs: Blocs de lignes, au moins un (éventuellement vide : en-tête seul)
+        format: 'ndjson', 'csv' ou 'arrow'
+    """
+    if format == 'arrow' and pa is None:
+        raise RuntimeError("Export Arrow indisponible : pyarrow n'est pas installé")
+
+    ecrivain, tampon = None, io.BytesIO()
+    for numero, bloc in enumerate(blocs):
+        if format == 'ndjson':
+            yield b"".join(encoder_json(ligne) + b"\n" for ligne in vers_tableau(dates_en_texte(bloc)))
+        elif format == 'csv':
+            yield dates_en_texte(bloc).to_csv(index=False, header=numero == 0).encode("utf-8")
+        else:
+            lot = pa.RecordBatch.from_pandas(bloc, preserve_index=False)
+            if ecrivain is None:
+                ecrivain = pa.ipc.new_stream(tampon, lot.schema)
+            ecrivain.write_batch(lot)
+            yield tampon.getvalue()
+            tampon.seek(0)
+            tampon.truncate()
+
+    if ecrivain is not None:
+        ecrivain.close()
+        yield tampon.getvalue()
+
+
+def exporter(df: pd.DataFrame, selection: Selection, format: str,
+             taille_bloc: int = TAILLE_BLOC) -> Iterator[bytes]:
+    """
+    Octets de l'export, bloc par bloc
+
+    Args:
+        df: Dataset (état capturé au début de la requête)
+        selection: Lignes à exporter
+        format: 'ndjson', 'csv' ou 'arrow'
+        taille_bloc: Nombre de lignes converties à la fois
+    """
+    return exporter_blocs((
+        lignes(df, tranche(selection, debut, debut + taille_bloc))
+        for debut in range(0, max(taille(selection), 1), taille_bloc)
+    ), format)
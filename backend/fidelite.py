@@ -0,0 +1,384 @@
+"""
+Chronologie des commandes par client
+🔁 Commandes distinctes de chaque client, triées une fois au chargement,
+   pour la fidélité et les cohortes de rétention
+
+La fidélité ne dépend que des commandes de chaque client : leur nombre,
+leurs dates et leur montant. Plutôt que de trier toutes les lignes à
+chaque requête (sort_values + diff par client), le dataset est réduit au
+chargement à ses tranches de commande : une tranche regroupe les lignes
+d'une commande ayant les mêmes valeurs pour toutes les dimensions
+filtrables (filtres.COLONNES_INDEXEES), si bien que les filtres par
+dimension restent exacts. Les tranches sont rangées par client puis par
+date (disposition CSR : un tableau par attribut, et la position de la
+première tranche de chaque client dans `debuts`). Au rechargement
+incrémental, seules les lignes ajoutées (et celles de leur premier jour)
+sont rangées, puis fusionnées client par client avec les tranches
+existantes, sans retrier l'ensemble.
+
+Une requête filtre les tranches par masques, fusionne les tranches
+retenues d'une même commande (contiguës) et obtient la liste des
+commandes de chaque client, déjà triée : les indicateurs de fidélité et
+les courbes de rétention par cohorte en sont des réductions vectorisées.
+Les filtres par intervalle de mesure (Sales, Discount) portent sur les
+lignes : la liste est alors regroupée depuis les lignes filtrées
+(commandes_lignes).
+
+Les autres moteurs (partitions Parquet, SQL) produisent la même liste de
+commandes par client (RequeteKPI.commandes_clients), réduite ici de la
+même façon.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import copy
+import numpy as np
+import pandas as pd
+
+from filtres import COLONNES_INDEXEES, Filtres
+from metriques import compter_parcours, phase
+from temporel import cles_periodes, libelles_periodes
+
+# Nanosecondes par jour (dates de commande en datetime64[ns])
+NS_JOUR = 86_400 * 10**9
+
+# Horizon maximal des courbes de rétention (mois suivant le premier achat)
+HORIZON_COHORTES_MAX = 120
+
+
+def commandes_vides() -> pd.DataFrame:
+    """Liste de commandes sans ligne (colonnes de RequeteKPI.commandes_clients)"""
+    return pd.DataFrame({
+        'client': np.zeros(0, dtype=np.int64),
+        'jour': np.zeros(0, dtype=np.int64),
+        'ventes': np.zeros(0),
+    })
+
+
+def regrouper_commandes(clients: np.ndarray, commandes: np.ndarray, dates: np.ndarray,
+                        ventes: np.ndarray) -> pd.DataFrame:
+    """
+    Commandes distinctes de lignes filtrées, non triées
+
+    Args:
+        clients: Code entier du client de chaque ligne
+        commandes: Identifiant de la commande de chaque ligne
+        dates: Date de commande de chaque ligne (datetime64)
+        ventes: Sales de chaque ligne
+
+    Returns:
+        DataFrame (client, commande, jour, ventes)
+    """
+    return pd.DataFrame({
+        'client': clients.astype(np.int64),
+        'commande': commandes,
+        'jour': dates.astype('datetime64[D]').astype(np.int64),
+        'ventes': np.nan_to_num(ventes.astype(np.float64)),
+    }).groupby(['client', 'commande'], sort=False).agg(jour=('jour', 'min'), ventes=('ventes', 'sum')).reset_index()
+
+
+def trier_commandes(commandes: pd.DataFrame) -> pd.DataFrame:
+    """Commandes rangées par client puis par date (colonnes de RequeteKPI.commandes_clients)"""
+    return commandes.sort_values(['client', 'jour'], kind='stable', ignore_index=True)[['client', 'jour', 'ventes']]
+
+
+def commandes_lignes(lignes: pd.DataFrame) -> pd.DataFrame:
+    """Commandes distinctes par client calculées depuis des lignes filtrées (sans chronologie)"""
+    if not len(lignes):
+        return commandes_vides()
+    with phase('agregation'):
+        clients, _ = pd.factorize(lignes['Customer ID'])
+        return trier_commandes(regrouper_commandes(
+            clients, lignes['Order ID'].to_numpy(), lignes['Order Date'].to_numpy(), lignes['Sales'].to_numpy()
+        ))
+
+
+def coder(valeurs: pd.Series, connues: pd.Index) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Codes entiers de `valeurs` dans `connues` ; les valeurs nouvelles sont
+    codées à la suite, par ordre d'apparition (comme pd.factorize sur
+    l'ensemble des lignes), les valeurs manquantes -1
+
+    Returns:
+        (codes, valeurs connues complétées)
+    """
+    locaux, distinctes = pd.factorize(valeurs)
+    if not len(distinctes):
+        return np.full(len(locaux), -1), connues
+    distinctes = np.asarray(distinctes, dtype=object)
+    positions = connues.get_indexer(distinctes) if len(connues) else np.full(len(distinctes), -1)
+    inconnues = positions < 0
+    positions[inconnues] = len(connues) + np.arange(np.count_nonzero(inconnues))
+    if inconnues.any():
+        connues = connues.append(pd.Index(distinctes[inconnues], dtype=object))
+    return np.where(locaux >= 0, positions[np.maximum(locaux, 0)], -1), connues
+
+
+def type_codes(nombre: int):
+    """Type entier des codes de `nombre` valeurs d'une dimension"""
+    return np.int16 if nombre < 2**15 else np.int32
+
+
+class ChronologieClients:
+    """
+    Tranches de commande rangées par client puis par date
+
+    Attributes:
+        debuts: Position de la première tranche de chaque client, plus le
+            nombre total de tranches (CSR, len = clients + 1)
+        commandes: Code de la commande de chaque tranche
+        dates: Date de commande (datetime64[ns] en entier)
+        ventes: Somme des Sales des lignes de la tranche
+        codes: Code de chaque dimension filtrable, par tranche
+        libelles: Pour chaque dimension, valeur -> code
+        valeurs: Valeurs de chaque code (clients, commandes, dimensions),
+            pour coder les lignes ajoutées (etendre)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        colonnes = ['Customer ID', 'Order ID', *(colonne for colonne in COLONNES_INDEXEES.values()
+                                                 if colonne in df.columns)]
+        self.valeurs = {colonne: pd.Index([], dtype=object) for colonne in colonnes}
+        self.debuts = np.zeros(1, dtype=np.int64)
+        self.commandes = np.zeros(0, dtype=np.int32)
+        self.dates = np.zeros(0, dtype=np.int64)
+        self.ventes = np.zeros(0)
+        self.codes = {colonne: np.zeros(0, dtype=np.int16) for colonne in colonnes[2:]}
+        self.libelles = {colonne: {} for colonne in colonnes[2:]}
+        self._ajouter(df)
+
+    def etendre(self, df: pd.DataFrame, debut: int) -> 'ChronologieClients':
+        """
+        Nouvelle chronologie pour `df`, dont les lignes [0, debut) sont déjà rangées ici
+
+        `debut` est la première ligne du jour de la plus ancienne commande
+        ajoutée (lignes triées par date) : les tranches de ce jour et des
+        suivants sont recalculées, les autres reprises telles quelles. Les
+        deux parties sont fusionnées client par client sans nouveau tri (les
+        tranches reprises sont antérieures). La chronologie actuelle n'est
+        pas modifiée.
+
+        Args:
+            df: Dataset complet, trié par date
+            debut: Première ligne à ranger (début d'un jour)
+        """
+        chronologie = copy.copy(self)
+        chronologie.valeurs = dict(self.valeurs)
+        chronologie.libelles = dict(self.libelles)
+        dates = df['Order Date'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+        # Tranches reprises : antérieures au jour de la première ligne recalculée
+        reprises = self.dates < dates[debut] if debut < len(df) else np.ones(len(self), dtype=bool)
+        chronologie._ajouter(df.iloc[debut:], reprises)
+        return chronologie
+
+    def _ajouter(self, df: pd.DataFrame, reprises: Optional[np.ndarray] = None):
+        """Range les lignes de `df` et les fusionne avec les tranches `reprises` (toutes par défaut)"""
+        # Codes des clients, commandes et dimensions (code -1 des valeurs manquantes)
+        codes = {}
+        for colonne, connues in self.valeurs.items():
+            codes[colonne], self.valeurs[colonne] = coder(df[colonne], connues)
+        clients, commandes = codes.pop('Customer ID'), codes.pop('Order ID')
+        for colonne in codes:
+            nombre = len(self.valeurs[colonne])
+            codes[colonne] = codes[colonne].astype(type_codes(nombre))
+            if nombre > len(self.libelles[colonne]):
+                self.libelles[colonne] = {valeur: numero for numero, valeur in enumerate(self.valeurs[colonne])}
+        dates = df['Order Date'].to_numpy().astype('datetime64[ns]').astype(np.int64)
+
+        # Tri unique des lignes ajoutées : client, date, commande, dimensions
+        ordre = np.lexsort((*codes.values(), commandes, dates, clients))
+        clients, commandes = clients[ordre], commandes[ordre]
+        nouvelles = np.ones(len(ordre), dtype=bool)
+        nouvelles[1:] = commandes[1:] != commandes[:-1]
+        for code in codes.values():
+            trie = code[ordre]
+            nouvelles[1:] |= trie[1:] != trie[:-1]
+        tranches = np.flatnonzero(nouvelles)
+        ventes = np.nan_to_num(df['Sales'].to_numpy(dtype=np.float64))[ordre]
+        ajoutees = {
+            "commandes": commandes[tranches],
+            "dates": dates[ordre[tranches]],
+            "ventes": np.add.reduceat(ventes, tranches) if len(tranches) else np.zeros(0),
+            **{colonne: code[ordre[tranches]] for colonne, code in codes.items()},
+        }
+
+        # Fusion par client : tranches reprises (antérieures), puis tranches ajoutées
+        nb_clients = len(self.valeurs['Customer ID'])
+        anciens = np.repeat(np.arange(len(self.debuts) - 1), np.diff(self.debuts))
+        if reprises is not None:
+            anciens = anciens[reprises]
+        nouveaux = clients[tranches]
+        comptes_anciens = np.bincount(anciens, minlength=nb_clients)
+        comptes_nouveaux = np.bincount(nouveaux, minlength=nb_clients)
+        self.debuts = np.concatenate([[0], np.cumsum(comptes_anciens + comptes_nouveaux)])
+        rangs = np.concatenate([[0], np.cumsum(comptes_anciens)])[:-1]
+        places_anciennes = self.debuts[anciens] + np.arange(len(anciens)) - rangs[anciens]
+        rangs = np.concatenate([[0], np.cumsum(comptes_nouveaux)])[:-1]
+        places_nouvelles = self.debuts[nouveaux] + comptes_anciens[nouveaux] + np.arange(len(nouveaux)) - rangs[nouveaux]
+
+        def fusionner(ancien: np.ndarray, ajoute: np.ndarray, dtype) -> np.ndarray:
+            fusion = np.empty(self.debuts[-1], dtype=dtype)
+            fusion[places_anciennes] = ancien if reprises is None else ancien[reprises]
+            fusion[places_nouvelles] = ajoute
+            return fusion
+
+        self.commandes = fusionner(self.commandes, ajoutees["commandes"],
+                                   np.int32 if len(self.valeurs['Order ID']) < 2**31 else np.int64)
+        self.dates = fusionner(self.dates, ajoutees["dates"], np.int64)
+        self.ventes = fusionner(self.ventes, ajoutees["ventes"], np.float64)
+        self.codes = {
+            colonne: fusionner(code, ajoutees[colonne], type_codes(len(self.valeurs[colonne])))
+            for colonne, code in self.codes.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.commandes)
+
+    def memoire(self) -> int:
+        """Octets occupés par les tableaux de la chronologie"""
+        return int(self.debuts.nbytes + self.commandes.nbytes + self.dates.nbytes + self.ventes.nbytes
+                   + sum(code.nbytes for code in self.codes.values())
+                   + sum(valeurs.memory_usage() for valeurs in self.valeurs.values()))
+
+    def selection(self, **filtres) -> Optional[np.ndarray]:
+        """
+        Positions des tranches retenues par les filtres (dans l'ordre de la chronologie)
+
+        Returns:
+            None si un filtre porte sur les lignes (intervalle de mesure) ou
+            sur une dimension absente du dataset
+        """
+        filtres = Filtres(**filtres)
+        if filtres.intervalles or not set(filtres.dimensions) <= set(self.codes):
+            return None
+        masque = None
+        if filtres.debut is not None:
+            masque = self.dates >= filtres.debut.value
+        if filtres.fin is not None:
+            condition = self.dates <= filtres.fin.value
+            masque = condition if masque is None else masque & condition
+        for colonne, valeurs in filtres.dimensions.items():
+            codes = [self.libelles[colonne][valeur] for valeur in valeurs if valeur in self.libelles[colonne]]
+            if not codes:
+                return np.zeros(0, dtype=np.int64)
+            condition = np.isin(self.codes[colonne], codes)
+            masque = condition if masque is None else masque & condition
+        return np.arange(len(self)) if masque is None else np.flatnonzero(masque)
+
+    def commandes_clients(self, filtres: Dict[str, Any]) -> Optional[pd.DataFrame]:
+        """
+        Commandes distinctes des lignes filtrées, triées par client puis par date
+
+        Returns:
+            DataFrame (client, jour, ventes) : code du client, jour de la
+            commande (depuis 1970), Sales des lignes filtrées de la commande ;
+            None si la chronologie ne peut pas appliquer les filtres (voir selection)
+        """
+        with phase('filtre'):
+            positions = self.selection(**filtres)
+        if positions is None:
+            return None
+        compter_parcours(lignes=len(positions))
+        if not len(positions):
+            return commandes_vides()
+        with phase('agregation'):
+            # Les tranches d'une commande sont contiguës : une commande commence à chaque changement
+            commandes = self.commandes[positions]
+            nouvelles = np.ones(len(positions), dtype=bool)
+            nouvelles[1:] = commandes[1:] != commandes[:-1]
+            debuts = np.flatnonzero(nouvelles)
+            premieres = positions[debuts]
+            return pd.DataFrame({
+                'client': np.searchsorted(self.debuts, premieres, side='right') - 1,
+                'jour': self.dates[premieres] // NS_JOUR,
+                'ventes': np.add.reduceat(self.ventes[positions], debuts),
+            })
+
+
+# === RÉDUCTIONS ===
+
+def bornes_clients(clients: np.ndarray) -> np.ndarray:
+    """Position de la première commande de chaque client, plus le nombre de commandes (liste triée par client)"""
+    premiers = np.ones(len(clients), dtype=bool)
+    premiers[1:] = clients[1:] != clients[:-1]
+    return np.append(np.flatnonzero(premiers), len(clients))
+
+
+def indicateurs_fidelite(commandes: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Récurrence, poids des clients récurrents et écart moyen entre commandes
+
+    Args:
+        commandes: Commandes par client (RequeteKPI.commandes_clients)
+    """
+    if not len(commandes):
+        return {
+            "total_clients": 0, "clients_recurrents": 0, "clients_nouveaux": 0, "repeat_rate_pct": 0.0,
+            "avg_orders_per_client": 0, "ca_clients_recurrents": 0.0, "share_ca_recurrent_pct": 0.0,
+            "avg_days_between_orders": 0,
+        }
+    bornes = bornes_clients(commandes['client'].to_numpy())
+    debuts, fins = bornes[:-1], bornes[1:] - 1
+    nb_commandes = np.diff(bornes)
+    ventes = np.add.reduceat(commandes['ventes'].to_numpy(dtype=np.float64), debuts)
+    jours = commandes['jour'].to_numpy()
+
+    total_clients = len(debuts)
+    recurrents = nb_commandes > 1
+    clients_recurrents = int(np.count_nonzero(recurrents))
+    ca_clients_recurrents = float(ventes[recurrents].sum())
+    ca_total = float(ventes.sum())
+    # Écarts entre commandes consécutives d'un client : leur somme vaut dernière - première date
+    ecarts = int((nb_commandes - 1).sum())
+    return {
+        "total_clients": total_clients,
+        "clients_recurrents": clients_recurrents,
+        "clients_nouveaux": total_clients - clients_recurrents,
+        "repeat_rate_pct": round(clients_recurrents / total_clients * 100, 2),
+        "avg_orders_per_client": round(float(nb_commandes.mean()), 2),
+        "ca_clients_recurrents": round(ca_clients_recurrents, 2),
+        "share_ca_recurrent_pct": round(ca_clients_recurrents / ca_total * 100, 2) if ca_total else 0.0,
+        "avg_days_between_orders": round(float((jours[fins] - jours[debuts]).sum()) / ecarts, 2) if ecarts else 0,
+    }
+
+
+def retention_cohortes(commandes: pd.DataFrame, horizon: int = 12) -> List[Dict[str, Any]]:
+    """
+    Courbes de rétention par cohorte (mois du premier achat x mois écoulés)
+
+    La cohorte d'un client est le mois de sa première commande (parmi les
+    lignes filtrées). Pour chaque cohorte, retention_pct[k] est la part
+    de ses clients ayant commandé k mois après ce premier mois (100 pour
+    k = 0), jusqu'à `horizon` mois ou au dernier mois observé.
+
+    Returns:
+        [{"cohorte": "YYYY-MM", "clients": n, "retention_pct": [...]}] chronologiquement
+    """
+    if not len(commandes):
+        return []
+    clients = commandes['client'].to_numpy()
+    bornes = bornes_clients(clients)
+    mois = cles_periodes(commandes['jour'].to_numpy().astype('datetime64[D]'), 'mois')
+    nb_commandes = np.diff(bornes)
+    premiers_mois = mois[bornes[:-1]]
+    ecarts = mois - np.repeat(premiers_mois, nb_commandes)
+
+    # Mois actifs distincts de chaque client (écarts croissants dans la liste triée par date)
+    actifs = np.ones(len(mois), dtype=bool)
+    actifs[1:] = (clients[1:] != clients[:-1]) | (ecarts[1:] != ecarts[:-1])
+    actifs &= ecarts <= horizon
+
+    cohortes, rang_client = np.unique(premiers_mois, return_inverse=True)
+    rangs = np.repeat(rang_client, nb_commandes)[actifs]
+    comptes = np.bincount(rangs * (horizon + 1) + ecarts[actifs],
+                          minlength=len(cohortes) * (horizon + 1)).reshape(len(cohortes), horizon + 1)
+    tailles = comptes[:, 0]
+    pourcentages = np.round(comptes / tailles[:, None] * 100, 2)
+    # Mois observables de chaque cohorte : jusqu'au dernier mois des commandes retenues
+    longueurs = np.minimum(int(mois.max()) - cohortes, horizon) + 1
+
+    return [
+        {"cohorte": libelle, "clients": int(taille), "retention_pct": pourcentages[rang, :longueur].tolist()}
+        for rang, (libelle, taille, longueur) in enumerate(
+            zip(libelles_periodes(cohortes, 'mois'), tailles, longueurs.tolist())
+        )
+    ]
@@ -0,0 +1,481 @@
+"""
+Moteur de filtrage du dataset Superstore
+⚡ Index construit une seule fois au chargement des données
+
+Le dataframe est trié par date de commande : un filtre de dates devient
+une simple tranche obtenue par recherche dichotomique (searchsorted).
+Chaque dimension filtrable a un index inversé (valeur -> positions des
+lignes, triées) et chaque mesure filtrable par intervalle un ordre de tri
+des lignes : un filtre donne directement la liste des lignes candidates.
+La sélection part de la liste la plus courte (tranche de dates comprise)
+et ne vérifie les autres filtres que sur ces lignes : ajouter des
+dimensions n'ajoute aucun parcours complet du dataset.
+
+Les dimensions acceptent plusieurs valeurs (paramètre répété ou valeurs
+séparées par des virgules) : une ligne est retenue si elle porte l'une
+d'elles.
+"""
+
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import math
+import numpy as np
+import pandas as pd
+
+# Dimensions filtrables (paramètre d'API -> colonne du dataset)
+COLONNES_INDEXEES = {
+    'categorie': 'Category',
+    'region': 'Region',
+    'segment': 'Segment',
+    'etat': 'State',
+    'ville': 'City',
+    'sous_categorie': 'Sub-Category',
+    'mode_livraison': 'Ship Mode',
+}
+
+# Mesures filtrables par intervalle (préfixe des paramètres <préfixe>_min / <préfixe>_max -> colonne)
+COLONNES_INTERVALLES = {
+    'ventes': 'Sales',
+    'remise': 'Discount',
+}
+
+# Paramètres de filtrage communs à tous les endpoints (bornes incluses)
+PARAMETRES_INTERVALLES = {
+    f"{prefixe}_{borne}": (colonne, borne)
+    for prefixe, colonne in COLONNES_INTERVALLES.items() for borne in ('min', 'max')
+}
+PARAMETRES_FILTRES = ('date_debut', 'date_fin', *COLONNES_INDEXEES, *PARAMETRES_INTERVALLES)
+
+# Valeurs envoyées par le dashboard pour signifier "pas de filtre"
+VALEURS_TOUTES = ('Toutes', 'Tous')
+
+# Une sélection est soit une tranche contiguë, soit un tableau de positions
+Selection = Union[slice, np.ndarray]
+
+# Valeur d'un filtre de dimension : une valeur, ou plusieurs
+ValeursFiltre = Union[None, str, Sequence[str]]
+
+
+def convertir_date(valeur: Optional[str]) -> Optional[pd.Timestamp]:
+    """
+    Convertit une date saisie par l'utilisateur
+
+    Returns:
+        pd.Timestamp ou None si la valeur est absente ou invalide
+    """
+    if not valeur:
+        return None
+    date = pd.to_datetime(valeur, errors='coerce')
+    return date if pd.notna(date) else None
+
+
+def convertir_nombre(valeur: Any) -> Optional[float]:
+    """Borne d'intervalle saisie par l'utilisateur (None si absente ou invalide)"""
+    if valeur is None or valeur == '':
+        return None
+    try:
+        nombre = float(valeur)
+    except (TypeError, ValueError):
+        return None
+    return nombre if not math.isnan(nombre) else None
+
+
+def est_sans_filtre(valeur: Optional[str]) -> bool:
+    """Indique si une valeur de dimension ne filtre rien (None, "Toutes", "Tous")"""
+    return not valeur or valeur in VALEURS_TOUTES
+
+
+def valeurs_dimension(valeur: ValeursFiltre) -> Optional[Tuple[str, ...]]:
+    """
+    Valeurs retenues d'une dimension, triées et sans doublon
+
+    Returns:
+        None si la dimension ne filtre rien (absente, vide, "Toutes" ou "Tous"
+        parmi les valeurs)
+    """
+    if valeur is None:
+        return None
+    brutes = [valeur] if isinstance(valeur, str) else valeur
+    valeurs = [morceau.strip() for brute in brutes if brute for morceau in brute.split(',') if morceau.strip()]
+    if not valeurs or any(est_sans_filtre(v) for v in valeurs):
+        return None
+    return tuple(sorted(set(valeurs)))
+
+
+class Filtres:
+    """
+    Filtres d'une requête, sous forme canonique (mêmes paramètres que l'API)
+
+    Attributes:
+        debut / fin: Bornes de dates incluses (None si absentes ou invalides)
+        dimensions: {colonne: valeurs retenues} des seules dimensions filtrées
+        intervalles: {colonne: (minimum, maximum)} des seules mesures
+            filtrées (borne None si ouverte)
+    """
+
+    def __init__(self, date_debut: Optional[str] = None, date_fin: Optional[str] = None, **autres):
+        inconnus = set(autres) - set(COLONNES_INDEXEES) - set(PARAMETRES_INTERVALLES)
+        if inconnus:
+            raise TypeError(f"Filtres inconnus : {', '.join(sorted(inconnus))}")
+        self.debut = convertir_date(date_debut)
+        self.fin = convertir_date(date_fin)
+        self.dimensions: Dict[str, Tuple[str, ...]] = {}
+        for parametre, colonne in COLONNES_INDEXEES.items():
+            valeurs = valeurs_dimension(autres.get(parametre))
+            if valeurs is not None:
+                self.dimensions[colonne] = valeurs
+        self.intervalles: Dict[str, Tuple[Optional[float], Optional[float]]] = {}
+        for parametre, (colonne, borne) in PARAMETRES_INTERVALLES.items():
+            nombre = convertir_nombre(autres.get(parametre))
+            if nombre is not None:
+                minimum, maximum = self.intervalles.get(colonne, (None, None))
+                self.intervalles[colonne] = (nombre, maximum) if borne == 'min' else (minimum, nombre)
+
+    @property
+    def dates_seules(self) -> bool:
+        """Aucun filtre hors des dates"""
+        return not self.dimensions and not self.intervalles
+
+    def parametres(self) -> Dict[str, Any]:
+        """
+        Paramètres d'API des seuls filtres actifs (forme inverse du constructeur)
+
+        Filtres(**filtres.parametres()) a la même clé que filtres.
+        """
+        parametres: Dict[str, Any] = {}
+        for nom, date in (('date_debut', self.debut), ('date_fin', self.fin)):
+            if date is not None:
+                parametres[nom] = date.strftime('%Y-%m-%d') if date == date.normalize() else date.isoformat()
+        for parametre, colonne in COLONNES_INDEXEES.items():
+            if colonne in self.dimensions:
+                parametres[parametre] = list(self.dimensions[colonne])
+        for parametre, (colonne, borne) in PARAMETRES_INTERVALLES.items():
+            minimum, maximum = self.intervalles.get(colonne, (None, None))
+            valeur = minimum if borne == 'min' else maximum
+            if valeur is not None:
+                parametres[parametre] = valeur
+        return parametres
+
+    def cle(self) -> Tuple:
+        """Forme hashable (clé de cache) : deux jeux de filtres équivalents ont la même clé"""
+        return (
+            self.debut.isoformat() if self.debut is not None else None,
+            self.fin.isoformat() if self.fin is not None else None,
+            tuple(sorted(self.dimensions.items())),
+            tuple(sorted(self.intervalles.items())),
+        )
+
+    def masque(self, df: pd.DataFrame) -> np.ndarray:
+        """Masque booléen des lignes de `df` qui respectent les filtres (hors index)"""
+        masque = np.ones(len(df), dtype=bool)
+        if self.debut is not None:
+            masque &= (df['Order Date'] >= self.debut).to_numpy()
+        if self.fin is not None:
+            masque &= (df['Order Date'] <= self.fin).to_numpy()
+        for colonne, valeurs in self.dimensions.items():
+            masque &= df[colonne].isin(valeurs).to_numpy()
+        for colonne, (minimum, maximum) in self.intervalles.items():
+            masque &= dans_intervalle(df[colonne].to_numpy(), minimum, maximum)
+        return masque
+
+
+def dans_intervalle(valeurs: np.ndarray, minimum: Optional[float], maximum: Optional[float]) -> np.ndarray:
+    """Masque des valeurs comprises entre les bornes (incluses ; NaN exclus)"""
+    masque = ~np.isnan(valeurs) if valeurs.dtype.kind == 'f' else np.ones(len(valeurs), dtype=bool)
+    if minimum is not None:
+        masque &= valeurs >= minimum
+    if maximum is not None:
+        masque &= valeurs <= maximum
+    return masque
+
+
+def filtrer_par_masques(df: pd.DataFrame, **filtres) -> pd.DataFrame:
+    """
+    Filtrage historique par masques (copie puis masque de chaque filtre)
+
+    Conservé pour les dataframes non indexés et comme référence
+    dans les benchmarks.
+    """
+    return df.copy()[Filtres(**filtres).masque(df)]
+
+
+def type_positions(nombre: int) -> type:
+    """Entiers assez grands pour `nombre` positions (32 bits si possible)"""
+    return np.int32 if nombre < 2**31 else np.int64
+
+
+class IndexInverse:
+    """
+    Index inversé d'une dimension : positions des lignes de chaque valeur
+
+    Attributes:
+        valeurs: Valeur -> code
+        codes: Code de chaque ligne (-1 si la valeur manque)
+        debuts: Début des positions de chaque code (CSR, len = valeurs + 1)
+        positions: Positions des lignes, rangées par code puis croissantes
+    """
+
+    def __init__(self, serie: pd.Series):
+        codes, valeurs = pd.factorize(serie)
+        self.valeurs = {valeur: code for code, valeur in enumerate(valeurs)}
+        self._ranger(codes.astype(np.int16 if len(valeurs) < 2**15 else np.int32))
+
+    def _ranger(self, codes: np.ndarray):
+        """Positions des lignes rangées par code (tri stable : croissantes pour un même code)"""
+        self.codes = codes
+        comptes = np.bincount(codes[codes >= 0], minlength=len(self.valeurs))
+        self.debuts = np.concatenate([[0], np.cumsum(comptes)]).astype(np.int64)
+        ordre = np.argsort(codes, kind='stable')
+        # Valeurs manquantes (code -1) en tête du tri : écartées
+        self.positions = ordre[len(codes) - int(self.debuts[-1]):].astype(type_positions(len(codes)))
+
+    def etendre(self, serie: pd.Series) -> 'IndexInverse':
+        """
+        Nouvel index : lignes actuelles suivies de `serie` (codes des valeurs connues conservés)
+
+        Seules les nouvelles lignes sont rangées ; leurs positions, toutes
+        plus grandes que les positions actuelles, sont placées à la suite de
+        celles de leur code (fusion sans nouveau tri).
+        """
+        codes_locaux, uniques = pd.factorize(serie)
+        valeurs = dict(self.valeurs)
+        correspondance = np.array([valeurs.setdefault(valeur, len(valeurs)) for valeur in uniques] + [-1])
+        index = IndexInverse.__new__(IndexInverse)
+        index.valeurs = valeurs
+        nouveaux = correspondance[codes_locaux].astype(np.int16 if len(valeurs) < 2**15 else np.int32)
+        index.codes = np.concatenate([self.codes.astype(nouveaux.dtype), nouveaux])
+
+        ancien = len(self.codes)
+        comptes = np.bincount(nouveaux[nouveaux >= 0], minlength=len(valeurs))
+        debuts_ajout = np.concatenate([[0], np.cumsum(comptes)])
+        # Valeurs manquantes (code -1) en tête du tri : écartées
+        ordre = np.argsort(nouveaux, kind='stable')
+        ajout = ordre[len(nouveaux) - int(debuts_ajout[-1]):] + ancien
+
+        comptes_actuels = np.zeros(len(valeurs), dtype=np.int64)
+        comptes_actuels[:len(self.valeurs)] = np.diff(self.debuts)
+        index.debuts = np.concatenate([[0], np.cumsum(comptes_actuels + comptes)]).astype(np.int64)
+        morceaux = []
+        for code in range(len(valeurs)):
+            if code < len(self.valeurs):
+                morceaux.append(self.positions[self.debuts[code]:self.debuts[code + 1]])
+            morceaux.append(ajout[debuts_ajout[code]:debuts_ajout[code + 1]])
+        index.positions = np.concatenate(morceaux or [ajout], dtype=type_positions(len(index.codes)))
+        return index
+
+    def codes_retenus(self, valeurs: Iterable[str]) -> np.ndarray:
+        """Codes des valeurs demandées (les valeurs inconnues sont ignorées)"""
+        return np.array(sorted({self.valeurs[v] for v in valeurs if v in self.valeurs}), dtype=np.int64)
+
+    def compter(self, codes: np.ndarray) -> int:
+        """Nombre de lignes portant l'un des codes"""
+        return int((self.debuts[codes + 1] - self.debuts[codes]).sum())
+
+    def lignes(self, codes: np.ndarray) -> np.ndarray:
+        """Positions croissantes des lignes portant l'un des codes"""
+        if len(codes) == 1:
+            return self.positions[self.debuts[codes[0]]:self.debuts[codes[0] + 1]]
+        return np.sort(np.concatenate([self.positions[self.debuts[c]:self.debuts[c + 1]] for c in codes]))
+
+    def garder(self, positions: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Positions dont la ligne porte l'un des codes"""
+        table = np.zeros(len(self.valeurs) + 1, dtype=bool)
+        table[codes] = True
+        # Code -1 (valeur manquante) : dernière case, jamais retenue
+        return positions[table[self.codes[positions]]]
+
+    def memoire(self) -> int:
+        return self.codes.nbytes + self.debuts.nbytes + self.positions.nbytes
+
+
+class IndexIntervalle:
+    """
+    Ordre de tri d'une mesure : lignes comprises entre deux bornes par recherche dichotomique
+
+    Attributes:
+        valeurs: Valeur de chaque ligne (vue sur la colonne du dataset)
+        ordre: Positions des lignes triées par valeur (NaN écartés)
+        triees: Valeurs triées
+    """
+
+    def __init__(self, valeurs: np.ndarray):
+        self.valeurs = valeurs
+        ordre = np.argsort(valeurs, kind='stable')
+        if valeurs.dtype.kind == 'f':
+            # NaN rangés en fin de tri : écartés
+            ordre = ordre[:len(ordre) - int(np.isnan(valeurs).sum())]
+        self.ordre = ordre.astype(type_positions(len(valeurs)))
+        self.triees = valeurs[self.ordre]
+
+    def etendre(self, valeurs: np.ndarray) -> 'IndexIntervalle':
+        """Nouvel index : `valeurs` prolonge la colonne actuelle (les nouvelles lignes sont insérées dans l'ordre)"""
+        ancien = len(self.valeurs)
+        ajout = IndexIntervalle(valeurs[ancien:])
+        # side='right' : à valeur égale, les lignes actuelles (positions plus petites) restent devant
+        rangs = np.searchsorted(self.triees, ajout.triees, side='right')
+        index = IndexIntervalle.__new__(IndexIntervalle)
+        index.valeurs = valeurs
+        index.ordre = np.insert(self.ordre.astype(type_positions(len(valeurs))), rangs, ajout.ordre + ancien)
+        index.triees = np.insert(self.triees, rangs, ajout.triees)
+        return index
+
+    def bornes(self, minimum: Optional[float], maximum: Optional[float]) -> Tuple[int, int]:
+        """Plage [debut, fin) de `ordre` comprise entre les bornes"""
+        debut = int(np.searchsorted(self.triees, minimum, side='left')) if minimum is not None else 0
+        fin = int(np.searchsorted(self.triees, maximum, side='right')) if maximum is not None else len(self.triees)
+        return debut, max(debut, fin)
+
+    def lignes(self, minimum: Optional[float], maximum: Optional[float]) -> np.ndarray:
+        """Positions croissantes des lignes comprises entre les bornes"""
+        debut, fin = self.bornes(minimum, maximum)
+        return np.sort(self.ordre[debut:fin])
+
+    def garder(self, positions: np.ndarray, minimum: Optional[float], maximum: Optional[float]) -> np.ndarray:
+        """Positions dont la valeur est comprise entre les bornes"""
+        return positions[dans_intervalle(self.valeurs[positions], minimum, maximum)]
+
+    def memoire(self) -> int:
+        return self.ordre.nbytes + self.triees.nbytes
+
+
+class IndexFiltres:
+    """
+    Index de filtrage précalculé sur le dataset
+
+    Attributes:
+        df: Dataset trié par 'Order Date' (index remis à zéro)
+        dates: Dates de commande triées (datetime64[ns])
+        inverses: Index inversé de chaque dimension filtrable présente
+        intervalles: Ordre de tri de chaque mesure filtrable présente
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        # Tri stable : l'ordre d'origine est conservé à date égale
+        if not df['Order Date'].is_monotonic_increasing:
+            df = df.sort_values('Order Date', kind='stable')
+        # Index déjà 0..n-1 (snapshot, mémoire partagée) : pas de copie
+        if not df.index.equals(pd.RangeIndex(len(df))):
+            df = df.reset_index(drop=True)
+        self.df = df
+        self.dates = self.df['Order Date'].to_numpy(dtype='datetime64[ns]')
+        self.inverses: Dict[str, IndexInverse] = {
+            colonne: IndexInverse(self.df[colonne]) for colonne in COLONNES_INDEXEES.values() if colonne in df.columns
+        }
+        self.intervalles: Dict[str, IndexIntervalle] = {
+            colonne: IndexIntervalle(self.df[colonne].to_numpy())
+            for colonne in COLONNES_INTERVALLES.values() if colonne in df.columns
+        }
+
+    def etendre(self, df: pd.DataFrame) -> 'IndexFiltres':
+        """
+        Nouvel index pour `df` : le dataset actuel suivi de commandes plus récentes
+
+        Les nouvelles lignes sont codées avec les dictionnaires actuels puis
+        rangées (tri des codes, sans nouvelle factorisation du dataset) et
+        insérées dans l'ordre des mesures ;
+        l'index actuel n'est pas modifié, les requêtes en cours l'utilisent encore.
+
+        Raises:
+            ValueError: si une nouvelle commande est antérieure à la dernière connue
+        """
+        ancien = len(self.df)
+        nouvelles = df.iloc[ancien:]
+        dates = df['Order Date'].to_numpy(dtype='datetime64[ns]')
+        if ancien and len(nouvelles) and dates[ancien] < self.dates[-1]:
+            raise ValueError("Les nouvelles commandes doivent suivre la dernière commande indexée")
+
+        index = IndexFiltres.__new__(IndexFiltres)
+        index.df = df
+        index.dates = dates
+        index.inverses = {colonne: inverse.etendre(nouvelles[colonne]) for colonne, inverse in self.inverses.items()}
+        index.intervalles = {
+            colonne: intervalle.etendre(df[colonne].to_numpy()) for colonne, intervalle in self.intervalles.items()
+        }
+        return index
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def memoire(self) -> int:
+        """Octets occupés par les dates et les index"""
+        return int(self.dates.nbytes + sum(inverse.memoire() for inverse in self.inverses.values())
+                   + sum(intervalle.memoire() for intervalle in self.intervalles.values()))
+
+    def bornes(self, date_debut: Optional[str], date_fin: Optional[str]) -> Tuple[int, int]:
+        """
+        Convertit une plage de dates en positions [debut, fin) dans le dataset trié
+        """
+        debut, fin = 0, len(self.dates)
+        date_debut_dt = convertir_date(date_debut)
+        if date_debut_dt is not None:
+            debut = int(np.searchsorted(self.dates, date_debut_dt.to_datetime64(), side='left'))
+        date_fin_dt = convertir_date(date_fin)
+        if date_fin_dt is not None:
+            fin = int(np.searchsorted(self.dates, date_fin_dt.to_datetime64(), side='right'))
+        return debut, max(debut, fin)
+
+    def selection(self, date_debut: Optional[str] = None, date_fin: Optional[str] = None, **autres) -> Selection:
+        """
+        Calcule les lignes correspondant aux filtres, sans toucher au dataframe
+
+        Les filtres sont classés par nombre de lignes candidates (connu
+        par l'index) : le plus sélectif fournit les positions, les autres
+        ne sont vérifiés que sur elles.
+
+        Returns:
+            Selection: tranche si seules les dates filtrent, positions sinon
+        """
+        filtres = Filtres(date_debut, date_fin, **autres)
+        debut, fin = self.bornes(date_debut, date_fin)
+        if filtres.dates_seules:
+            return slice(debut, fin)
+
+        # Filtres candidats : (lignes candidates, type, colonne, critère)
+        candidats: List[Tuple[int, str, str, Any]] = []
+        for colonne, valeurs in filtres.dimensions.items():
+            inverse = self.inverses.get(colonne)
+            codes = inverse.codes_retenus(valeurs) if inverse is not None else np.zeros(0, dtype=np.int64)
+            if not len(codes):
+                # Aucune valeur connue : aucune ligne ne correspond
+                return slice(debut, debut)
+            candidats.append((inverse.compter(codes), 'dimension', colonne, codes))
+        for colonne, (minimum, maximum) in filtres.intervalles.items():
+            intervalle = self.intervalles.get(colonne)
+            if intervalle is None:
+                return slice(debut, debut)
+            premiere, derniere = intervalle.bornes(minimum, maximum)
+            candidats.append((derniere - premiere, 'intervalle', colonne, (minimum, maximum)))
+        candidats.sort(key=lambda candidat: candidat[0])
+
+        # Point de départ : la plus courte des listes, ou la tranche de dates
+        nombre, type_filtre, colonne, critere = candidats[0]
+        if nombre < fin - debut:
+            if type_filtre == 'dimension':
+                positions = self.inverses[colonne].lignes(critere)
+            else:
+                positions = self.intervalles[colonne].lignes(*critere)
+            positions = positions[np.searchsorted(positions, debut):np.searchsorted(positions, fin)]
+            restants = candidats[1:]
+        else:
+            positions = np.arange(debut, fin)
+            restants = candidats
+
+        for _, type_filtre, colonne, critere in restants:
+            if type_filtre == 'dimension':
+                positions = self.inverses[colonne].garder(positions, critere)
+            else:
+                positions = self.intervalles[colonne].garder(positions, *critere)
+        return positions.astype(np.int64, copy=False)
+
+    def filtrer(self, *args, **kwargs) -> pd.DataFrame:
+        """
+        Retourne les lignes filtrées (mêmes paramètres que selection)
+
+        Le dataframe retourné peut partager sa mémoire avec le dataset :
+        il ne doit pas être modifié en place.
+        """
+        selection = self.selection(*args, **kwargs)
+        if isinstance(selection, slice):
+            if selection.start == 0 and selection.stop == len(self.df):
+                return self.df
+            return self.df.iloc[selection]
+        return self.df.take(selection)
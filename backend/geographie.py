@@ -0,0 +1,98 @@
+"""
+Hiérarchie géographique du dataset Superstore
+🗺️ Agrégats précalculés au grain jour × Region × State × City
+
+Le cube géographique est un CubeJournalier dont le grain est la ville
+(avec son État et sa région : deux villes homonymes d'États différents
+restent distinctes). Une requête de drill-down agrège d'abord les
+cellules retenues par ville, puis remonte les sommes ville -> État ->
+région sans relire les lignes. Les clients et commandes distincts sont
+comptés exactement en fusionnant les identifiants des cellules de chaque
+lieu (un comptage distinct ne s'additionne pas).
+"""
+
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+
+from cube import CubeJournalier
+
+# Niveaux du drill-down (paramètre d'API -> colonnes identifiant un lieu)
+NIVEAUX: Dict[str, Tuple[str, ...]] = {
+    'region': ('Region',),
+    'etat': ('Region', 'State'),
+    'ville': ('Region', 'State', 'City'),
+}
+REGEX_NIVEAU = f"^({'|'.join(NIVEAUX)})$"
+
+# Filtre appliqué par le paramètre `parent` de chaque niveau (la région elle-même au niveau racine)
+PARENTS: Dict[str, str] = {
+    'region': 'region',
+    'etat': 'region',
+    'ville': 'etat',
+}
+
+COLONNES_GEO = NIVEAUX['ville']
+
+# Mesures de chaque lieu : sommes et comptages distincts exacts
+AGREGATIONS_GEO = {
+    'Sales': 'sum',
+    'Profit': 'sum',
+    'Customer ID': 'nunique',
+    'Order ID': 'nunique',
+}
+
+
+class CubeGeographique(CubeJournalier):
+    """
+    Cube journalier au grain de la ville (Region × State × City)
+
+    Répond aux filtres de dates, de région, d'État et de ville (voir
+    CubeJournalier.selection) ; les autres filtres passent par les lignes.
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        super().__init__(df, COLONNES_GEO)
+
+    def agreger_niveau(self, cellules: np.ndarray, niveau: str) -> pd.DataFrame:
+        """
+        Équivalent de groupby(NIVEAUX[niveau]).agg(AGREGATIONS_GEO) sur les cellules retenues
+
+        Les sommes sont calculées par ville puis cumulées vers le niveau
+        demandé (ville -> État -> région).
+
+        Returns:
+            pd.DataFrame : colonnes du niveau puis mesures, trié par lieu
+        """
+        colonnes = NIVEAUX[niveau]
+        tailles = [len(self.valeurs[colonne]) for colonne in COLONNES_GEO]
+
+        # Clé entière de la ville de chaque cellule (codes des trois colonnes)
+        cles = np.zeros(len(cellules), dtype=np.int64)
+        for colonne, taille in zip(COLONNES_GEO, tailles):
+            cles = cles * taille + self.codes[colonne][cellules]
+        villes, groupes = np.unique(cles, return_inverse=True)
+        sommes = {
+            mesure: np.bincount(groupes, weights=self.sommes[mesure][cellules], minlength=len(villes))
+            for mesure in ('Sales', 'Profit')
+        }
+
+        # Remontée : la clé d'un lieu parent est celle de la ville sans ses dernières colonnes
+        lieux = villes
+        for taille in reversed(tailles[len(colonnes):]):
+            lieux, parents = np.unique(lieux // taille, return_inverse=True)
+            sommes = {mesure: np.bincount(parents, weights=valeurs, minlength=len(lieux))
+                      for mesure, valeurs in sommes.items()}
+            groupes = parents[groupes]
+
+        resultat = {}
+        for colonne, taille in reversed(list(zip(colonnes, tailles))):
+            resultat[colonne] = self.valeurs[colonne].to_numpy()[lieux % taille]
+            lieux = lieux // taille
+        resultat = {colonne: resultat[colonne] for colonne in colonnes}
+        for colonne, fonction in AGREGATIONS_GEO.items():
+            if fonction == 'sum':
+                resultat[colonne] = sommes[colonne].astype(self.types[colonne])
+            else:
+                resultat[colonne] = self.compter_distincts(cellules, colonne, groupes, len(sommes['Sales']))
+        return pd.DataFrame(resultat).sort_values(list(colonnes), ignore_index=True)
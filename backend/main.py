@@ -5,12 +5,48 @@ API FastAPI pour l'analyse du dataset Superstore
 """
 
 from fastapi import FastAPI, Query, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict, Any
 from datetime import datetime
+import hashlib
+import inspect
+import json
+from functools import cached_property, partial, wraps
+import numpy as np
 import pandas as pd
 from pydantic import BaseModel
 import logging
+import os
+import time
+
+from filtres import COLONNES_INDEXEES, PARAMETRES_INTERVALLES
+from cache import PARAMETRES_FILTRES, CacheResultats
+from distincts import MODES_DISTINCTS, REGEX_MODE_DISTINCTS
+from serialisation import REGEX_FORMAT, ReponseJSON, serialiser, vers_tableau
+from snapshot import ecrire_snapshot, lire_snapshot
+from schema import compacter_dataset
+from partage import DOSSIER_PAR_DEFAUT, charger_partage
+from rechargement import EtatDataset, Rechargeur, lire_ajouts, position_fichier
+from execution import Executeur
+from metriques import Metriques, MiddlewareMetriques
+from cache_http import MiddlewareCacheHTTP
+from classements import CRITERES_PRODUITS, REGEX_CRITERE_PRODUITS, rangs
+from temporel import (
+    DECALAGE_ANNEE, MAX_POINTS_MIN, MOYENNE_MOBILE_MAX, REGEX_COMPARAISON, REGEX_GRANULARITE,
+    debut_reference, libelles_periodes, lttb, moyennes_mobiles, valeurs_decalees,
+)
+from fidelite import HORIZON_COHORTES_MAX, indicateurs_fidelite, retention_cohortes
+from geographie import PARENTS, REGEX_NIVEAU
+from marges import analyser_marges
+from export import (
+    REGEX_EXPORT, TYPES_EXPORT, CurseurInvalide, arrow_disponible, curseur_suivant, exporter, exporter_blocs,
+    lignes, position_curseur, selection_apres, taille, tranche,
+)
+from partitions import EtatPartitionne, charger_partitions, curseur_ligne
+from requetes import MOTEURS_REQUETES, RequeteKPI
+from sql import EtatSQL
+from prechauffage import DIMENSIONS_PRECHAUFFEES, JournalFiltres, Prechauffeur, combinaisons_prechauffage
 
 # Configuration du logger pour faciliter le débogage
 logging.basicConfig(level=logging.INFO)
@@ -22,7 +58,40 @@ app = FastAPI(
     description="API d'analyse Business Intelligence pour le dataset Superstore",
     version="1.0.0",
     docs_url="/docs",  # Documentation Swagger accessible via /docs
-    redoc_url="/redoc"  # Documentation ReDoc accessible via /redoc
+    redoc_url="/redoc",  # Documentation ReDoc accessible via /redoc
+    default_response_class=ReponseJSON  # Encodage JSON direct (orjson si installé)
+)
+
+# Cache HTTP : durée de fraîcheur des réponses (Cache-Control max-age, secondes), 0 pour revalider à chaque fois
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", "0"))
+# Compression gzip / brotli des réponses (0 pour désactiver)
+API_COMPRESSION = os.getenv("API_COMPRESSION", "1") != "0"
+# Taille minimale (octets) d'une réponse compressée
+API_COMPRESSION_MIN = int(os.getenv("API_COMPRESSION_MIN", "1024"))
+
+def validateur_http() -> Optional[str]:
+    """
+    Identifiant des données servies, base des ETag (voir cache_http.py)
+
+    Empreinte du contenu de la source et version de l'état : deux workers
+    (ou deux démarrages) servant les mêmes données donnent les mêmes ETag.
+    Entre la publication d'un état et l'invalidation du cache, des
+    résultats de l'ancien état peuvent encore être servis : pas d'ETag
+    (None) tant que la génération du cache n'est pas celle de l'état publié.
+    """
+    identifiant, generation = publication
+    if generation != cache_kpi.generation:
+        return None
+    return identifiant
+
+# ETag et 304, Cache-Control et compression ; ajouté avant CORS, il
+# s'exécute à l'intérieur (les réponses 304 portent aussi les en-têtes CORS)
+app.add_middleware(
+    MiddlewareCacheHTTP,
+    validateur=validateur_http,
+    max_age=API_CACHE_MAX_AGE,
+    compression=API_COMPRESSION,
+    taille_min=API_COMPRESSION_MIN,
 )
 
 # Configuration CORS pour permettre les appels depuis Streamlit
@@ -32,57 +101,330 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Distincts-Mode", "X-Curseur-Suivant", "Server-Timing", "ETag"],
 )
 
 # === CHARGEMENT DES DONNÉES ===
 
 # URL du dataset Superstore sur GitHub
-DATASET_URL = "https://raw.githubusercontent.com/leonism/sample-superstore/master/data/superstore.csv"
+DATASET_URL = os.getenv(
+    "DATASET_URL",
+    "https://raw.githubusercontent.com/leonism/sample-superstore/master/data/superstore.csv"
+)
+# Fichier CSV local, prioritaire sur l'URL (démarrage hors ligne, tests)
+DATASET_PATH = os.getenv("DATASET_PATH")
+# Dossier du snapshot colonnaire (vide pour désactiver)
+DATASET_SNAPSHOT_DIR = os.getenv(
+    "DATASET_SNAPSHOT_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshot")
+)
+# Nombre de workers uvicorn lancés par `python main.py`
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# Mémoire partagée entre workers : dossier des colonnes publiées (vide pour désactiver)
+DATASET_SHM_DIR = os.getenv("DATASET_SHM_DIR", "")
+# Fichier des demandes de rechargement suivi par tous les workers (vide : ce processus seulement)
+DATASET_SIGNAL = os.getenv(
+    "DATASET_SIGNAL",
+    os.path.join(DATASET_SHM_DIR, "rechargement.signal") if DATASET_SHM_DIR else ""
+)
+# Intervalle de surveillance du CSV local en secondes (0 pour désactiver)
+DATASET_SURVEILLANCE = float(os.getenv("DATASET_SURVEILLANCE", "0"))
+# Pool de calcul des KPI : "thread" ou "process" (groupby lourds, sans verrou global)
+API_EXECUTEUR = os.getenv("API_EXECUTEUR", "thread")
+# Taille du pool de calcul (0 pour la valeur par défaut selon le nombre de CPU)
+API_EXECUTEUR_TAILLE = int(os.getenv("API_EXECUTEUR_TAILLE", "0"))
+# Coalescence des requêtes identiques en cours (0 pour désactiver)
+API_COALESCENCE = os.getenv("API_COALESCENCE", "1") != "0"
+# Mode par défaut des comptages distincts : exact, ou approx (HyperLogLog)
+DISTINCTS_MODE = os.getenv("DISTINCTS_MODE", "exact")
+if DISTINCTS_MODE not in MODES_DISTINCTS:
+    DISTINCTS_MODE = "exact"
+# Profilage d'une requête avec ?profile=1 ou X-Profile: 1 (1 pour autoriser)
+API_PROFILAGE = os.getenv("API_PROFILAGE", "0") == "1"
+# Moteur de données : "memoire" (dataset en RAM) ou "parquet" (partitions sur disque, hors mémoire)
+DATASET_MOTEUR = os.getenv("DATASET_MOTEUR", "memoire")
+if DATASET_MOTEUR not in ("memoire", "parquet"):
+    DATASET_MOTEUR = "memoire"
+# Dossier des partitions Parquet (moteur parquet)
+DATASET_PARQUET_DIR = os.getenv(
+    "DATASET_PARQUET_DIR",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "partitions")
+)
+# Moteur de requêtes des KPI sur le dataset en mémoire : "pandas", "duckdb" ou "sqlite" (SQL embarqué)
+KPI_MOTEUR = os.getenv("KPI_MOTEUR", "pandas")
+if KPI_MOTEUR not in MOTEURS_REQUETES:
+    KPI_MOTEUR = "pandas"
+# Préchauffage du cache en arrière-plan au démarrage et après chaque rechargement (0 pour désactiver)
+KPI_PRECHAUFFAGE = os.getenv("KPI_PRECHAUFFAGE", "1") != "0"
+# Nombre maximum de combinaisons de filtres préchauffées
+KPI_PRECHAUFFAGE_MAX = int(os.getenv("KPI_PRECHAUFFAGE_MAX", "50"))
+# Journal des filtres demandés, relu au démarrage (vide pour le garder en mémoire seulement)
+KPI_PRECHAUFFAGE_JOURNAL = os.getenv(
+    "KPI_PRECHAUFFAGE_JOURNAL",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "filtres_frequents.json")
+)
+
+def nettoyer_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Nettoie des lignes brutes du CSV (chargement complet ou lignes ajoutées)
+
+    Returns:
+        pd.DataFrame: Lignes valides au schéma compact, dans l'ordre du fichier
+    """
+    # Nettoyage des noms de colonnes (suppression espaces)
+    df.columns = df.columns.str.strip()
+    
+    # Conversion des dates au format datetime
+    df['Order Date'] = pd.to_datetime(df['Order Date'], errors='coerce')
+    df['Ship Date'] = pd.to_datetime(df['Ship Date'], errors='coerce')
+
+    # Normalisation des colonnes numeriques (valeurs non conformes -> NaN)
+    for col in ['Sales', 'Profit', 'Quantity', 'Discount']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+
+    # Normalisation des bornes attendues
+    if 'Discount' in df.columns:
+        df['Discount'] = df['Discount'].clip(lower=0, upper=1)
+    if 'Quantity' in df.columns:
+        df['Quantity'] = df['Quantity'].clip(lower=0)
+
+    # Suppression des lignes avec valeurs manquantes critiques
+    df = df.dropna(subset=['Order ID', 'Customer ID', 'Sales', 'Order Date', 'Quantity'])
+
+    # Schéma compact : catégories pour les textes, entiers 32 bits
+    return compacter_dataset(df)
 
 def load_data() -> pd.DataFrame:
     """
-    Charge le dataset Superstore depuis GitHub
+    Charge le dataset Superstore (fichier local ou GitHub)
     Nettoie et prépare les données pour l'analyse
     
+    Avec une source locale, le dataset nettoyé est conservé dans un
+    snapshot colonnaire : les démarrages suivants l'ouvrent en mémoire
+    mappée sans reparser le CSV, tant que le fichier source n'a pas changé.
+    
     Returns:
-        pd.DataFrame: Dataset nettoyé et prêt à l'emploi
+        pd.DataFrame: Dataset nettoyé, trié par date, prêt à l'emploi
     """
+    source = DATASET_PATH or DATASET_URL
+    avec_snapshot = bool(DATASET_PATH and DATASET_SNAPSHOT_DIR)
     try:
-        logger.info(f"Chargement du dataset depuis {DATASET_URL}")
-        
-        # Lecture du CSV
-        df = pd.read_csv(DATASET_URL, encoding='latin-1')
-        
-        # Nettoyage des noms de colonnes (suppression espaces)
-        df.columns = df.columns.str.strip()
+        if avec_snapshot:
+            df = lire_snapshot(DATASET_SNAPSHOT_DIR, DATASET_PATH)
+            if df is not None:
+                logger.info(f"✅ Dataset chargé depuis le snapshot : {len(df)} commandes")
+                return df
+
+        logger.info(f"Chargement du dataset depuis {source}")
         
-        # Conversion des dates au format datetime
-        df['Order Date'] = pd.to_datetime(df['Order Date'], errors='coerce')
-        df['Ship Date'] = pd.to_datetime(df['Ship Date'], errors='coerce')
-
-        # Normalisation des colonnes numeriques (valeurs non conformes -> NaN)
-        for col in ['Sales', 'Profit', 'Quantity', 'Discount']:
-            if col in df.columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-
-        # Normalisation des bornes attendues
-        if 'Discount' in df.columns:
-            df['Discount'] = df['Discount'].clip(lower=0, upper=1)
-        if 'Quantity' in df.columns:
-            df['Quantity'] = df['Quantity'].clip(lower=0)
-
-        # Suppression des lignes avec valeurs manquantes critiques
-        df = df.dropna(subset=['Order ID', 'Customer ID', 'Sales', 'Order Date', 'Quantity'])
+        # Lecture et nettoyage du CSV
+        df = nettoyer_dataset(pd.read_csv(source, encoding='latin-1'))
+
+        # Tri chronologique (ordre attendu par l'index de filtrage)
+        df = df.sort_values('Order Date', kind='stable').reset_index(drop=True)
         
         logger.info(f"✅ Dataset chargé : {len(df)} commandes")
+
+        if avec_snapshot:
+            try:
+                ecrire_snapshot(df, DATASET_SNAPSHOT_DIR, DATASET_PATH)
+            except OSError as e:
+                logger.warning(f"⚠️ Snapshot non écrit : {e}")
         return df
         
     except Exception as e:
         logger.error(f"❌ Erreur lors du chargement des données : {e}")
         raise HTTPException(status_code=500, detail=f"Erreur de chargement : {str(e)}")
 
-# Chargement des données au démarrage de l'application
-df = load_data()
+# Cache partagé des résultats KPI (taille configurable)
+cache_kpi = CacheResultats(taille_max=int(os.getenv("KPI_CACHE_TAILLE", "512")))
+
+# Identifiant des données publiées (empreinte de la source et version) et
+# génération du cache à partir de laquelle il est valable (voir validateur_http)
+publication = ("", -1)
+
+# Combinaisons de filtres demandées aux endpoints KPI (priorités du préchauffage)
+journal_filtres = JournalFiltres(KPI_PRECHAUFFAGE_JOURNAL or None)
+
+def noter_filtres(endpoint: str, parametres: Dict[str, Any]):
+    """Relève les filtres d'une requête KPI dans le journal"""
+    journal_filtres.noter({cle: parametres.get(cle) for cle in PARAMETRES_FILTRES})
+
+# Pool de calcul des endpoints KPI, avec coalescence des requêtes identiques
+executeur = Executeur(cache_kpi, API_EXECUTEUR, API_EXECUTEUR_TAILLE or None, API_COALESCENCE,
+                      observateur=noter_filtres)
+
+# Préchauffage du cache, cédant la place aux calculs des requêtes
+# (combinaisons et calculs définis avec les panneaux du dashboard, plus bas)
+prechauffeur = Prechauffeur(
+    combinaisons=lambda: combinaisons_a_prechauffer(),
+    prechauffer=lambda filtres: prechauffer_filtres(filtres),
+    occupe=lambda: executeur.actifs > 0,
+)
+
+def jauges_api():
+    """Jauges lues à chaque exposition de /metrics : dataset, mémoire, cache, pool"""
+    donnees = etat
+    cache = cache_kpi.statistiques()
+    pool = executeur.statistiques()
+    jauges = [
+        ("superstore_dataset_lignes", "Lignes du dataset chargé", {}, donnees.nb_lignes),
+        ("superstore_dataset_version", "Version du dataset (incrémentée à chaque rechargement)", {}, donnees.version),
+    ]
+    jauges += [
+        ("superstore_memoire_octets", "Mémoire occupée par structure", {"structure": structure}, octets)
+        for structure, octets in donnees.memoire().items()
+    ]
+    jauges += [
+        ("superstore_cache_entrees", "Résultats conservés dans le cache des KPI", {}, cache["entrees"]),
+        ("superstore_cache_evictions", "Résultats évincés du cache depuis le démarrage", {}, cache["evictions"]),
+        ("superstore_pool_calculs", "Calculs lancés dans le pool depuis le démarrage", {}, pool["calculs"]),
+        ("superstore_pool_en_cours", "Calculs en cours dans le pool", {}, pool["en_cours"]),
+        ("superstore_pool_coalescees", "Requêtes ayant rejoint un calcul en cours", {}, pool["coalescees"]),
+    ]
+    return jauges
+
+# Métriques de performance (/metrics) et profilage à la demande
+metriques = Metriques(jauges_api)
+app.add_middleware(MiddlewareMetriques, metriques=metriques, profilage=API_PROFILAGE)
+
+# Lanceur multi-workers de `python main.py` : il ne sert aucune requête et
+# ne charge rien ("__mp_main__" : copie du script réimportée par chaque worker)
+LANCEUR_WORKERS = __name__ in ("__main__", "__mp_main__") and API_WORKERS > 1
+
+def creer_etat(df: pd.DataFrame, version: int = 1) -> EtatDataset:
+    """État du dataset en mémoire, dont les KPI sont calculés par le moteur KPI_MOTEUR"""
+    if KPI_MOTEUR == "pandas":
+        return EtatDataset(df, version)
+    return EtatSQL(df, version, moteur=KPI_MOTEUR)
+
+def empreinte_source(donnees: EtatDataset, position: Optional[Dict[str, Any]]) -> str:
+    """
+    Empreinte du contenu chargé, la même dans tous les processus chargeant la même source
+
+    CSV local : octets lus (taille et empreinte des derniers octets, voir
+    position_fichier) ; partitions parquet : empreinte de la source et
+    partitions du manifeste ; source distante : hachage des lignes.
+    """
+    if isinstance(donnees, EtatPartitionne):
+        manifeste = donnees.dataset.manifeste
+        contenu = json.dumps([manifeste["source"].get("sha256", manifeste["source"].get("chemin")),
+                              manifeste["lignes"], manifeste["partitions"]], sort_keys=True, default=str)
+    elif position is not None:
+        contenu = f"{position['taille']}:{position['controle']}"
+    else:
+        contenu = pd.util.hash_pandas_object(donnees.df, index=False).to_numpy().tobytes()
+    if isinstance(contenu, str):
+        contenu = contenu.encode("utf-8")
+    return hashlib.blake2b(contenu, digest_size=16).hexdigest()
+
+def publier_etat(nouvel_etat: EtatDataset, position: Optional[Dict[str, Any]] = None):
+    """
+    Remplace l'état courant du dataset (une seule affectation, atomique)
+
+    L'état est publié avant l'invalidation du cache : un résultat calculé
+    sur l'ancien état porte une génération périmée et n'est pas conservé.
+
+    Args:
+        nouvel_etat: État à servir
+        position: Position de lecture du CSV local correspondant à l'état
+            (None pour une autre source), base de son empreinte
+    """
+    global etat, publication
+    etat = nouvel_etat
+    # Nouveau dataset : les résultats précédents ne sont plus valables
+    cache_kpi.invalider()
+    # Identifiant des ETag, valable à partir de cette génération du cache
+    publication = (f"{empreinte_source(nouvel_etat, position)}:{nouvel_etat.version}", cache_kpi.generation)
+    # Mode processus : les processus de calcul rechargent le nouveau dataset
+    executeur.redemarrer()
+    # Cache vide : nouveau préchauffage (sans effet avant le démarrage de l'application)
+    prechauffeur.lancer()
+
+def recharger_dataset():
+    """
+    Recharge le dataset : lignes ajoutées au CSV local si possible, sinon tout
+
+    Returns:
+        (mode, nombre de lignes ajoutées), mode valant 'incremental',
+        'complet' ou 'inchange'
+    """
+    global position_source
+    actuel = etat
+    if isinstance(actuel, EtatPartitionne):
+        # Moteur parquet : nouvelle conversion si la source a changé
+        dataset = charger_partitions(DATASET_PARQUET_DIR, DATASET_PATH or DATASET_URL, nettoyer_dataset)
+        if dataset.manifeste == actuel.dataset.manifeste:
+            return "inchange", 0
+        publier_etat(EtatPartitionne(dataset, actuel.version + 1))
+        logger.info(f"🔄 Partitions rechargées : {etat.nb_lignes} commandes (version {etat.version})")
+        return "complet", etat.nb_lignes - actuel.nb_lignes
+
+    if DATASET_PATH and position_source is not None:
+        lecture = lire_ajouts(DATASET_PATH, position_source)
+        if lecture is not None:
+            lignes, position = lecture
+            if lignes.empty:
+                position_source = position
+                return "inchange", 0
+            lignes = nettoyer_dataset(lignes)
+            publier_etat(actuel.ajouter(lignes), position)
+            position_source = position
+            logger.info(f"🔄 {len(lignes)} commandes ajoutées (version {etat.version})")
+            return "incremental", len(lignes)
+
+    # Fichier réécrit ou source distante : rechargement complet
+    nouvel_etat = creer_etat(load_data(), actuel.version + 1)
+    position_source = position_fichier(DATASET_PATH) if DATASET_PATH else None
+    publier_etat(nouvel_etat, position_source)
+    logger.info(f"🔄 Dataset rechargé : {etat.nb_lignes} commandes (version {etat.version})")
+    return "complet", etat.nb_lignes - actuel.nb_lignes
+
+rechargeur = Rechargeur(recharger_dataset)
+
+if not LANCEUR_WORKERS and DATASET_MOTEUR == "parquet":
+    # Moteur parquet : partitions sur disque (converties depuis le CSV au
+    # premier démarrage), seuls les dictionnaires clients / produits en mémoire
+    position_source = None
+    publier_etat(EtatPartitionne(charger_partitions(DATASET_PARQUET_DIR, DATASET_PATH or DATASET_URL, nettoyer_dataset)))
+elif not LANCEUR_WORKERS:
+    # Chargement des données au démarrage de l'application
+    # En mode partagé, un seul worker charge, les autres s'attachent sans copie
+    if DATASET_SHM_DIR:
+        dataset = charger_partage(DATASET_SHM_DIR, DATASET_PATH or DATASET_URL, load_data)
+    else:
+        dataset = load_data()
+    # Position de lecture du CSV local, pour les rechargements incrémentaux
+    position_source = position_fichier(DATASET_PATH) if DATASET_PATH else None
+    # État courant : dataset trié par date, index de filtrage et cube
+    # journalier des mesures additives (jour x catégorie x région x segment),
+    # base SQL embarquée si KPI_MOTEUR l'indique
+    publier_etat(creer_etat(dataset), position_source)
+    del dataset
+
+@app.on_event("startup")
+def demarrer_surveillance():
+    """
+    Surveillance du CSV local et des demandes de rechargement des autres
+    workers (processus servant l'API uniquement, pas le pool de calcul)
+    """
+    if DATASET_PATH and DATASET_SURVEILLANCE > 0:
+        rechargeur.surveiller(DATASET_PATH, DATASET_SURVEILLANCE)
+    if DATASET_SIGNAL:
+        rechargeur.suivre(DATASET_SIGNAL)
+
+@app.on_event("startup")
+def demarrer_prechauffage():
+    """Préchauffage en arrière-plan : l'API répond déjà pendant qu'il progresse (voir /sante)"""
+    if KPI_PRECHAUFFAGE and cache_kpi.taille_max > 0:
+        prechauffeur.demarrer()
+
+@app.on_event("shutdown")
+def sauvegarder_journal():
+    """Conserve les filtres demandés pour le préchauffage du prochain démarrage"""
+    if KPI_PRECHAUFFAGE:
+        journal_filtres.sauvegarder()
 
 # === MODÈLES PYDANTIC (pour la validation des réponses) ===
 
@@ -96,119 +438,514 @@ class KPIGlobaux(BaseModel):
     profit_total: float
     marge_moyenne: float
 
-class ProduitTop(BaseModel):
-    """Modèle pour les produits top performers"""
-    produit: str
-    categorie: str
-    ca: float
-    quantite: int
-    profit: float
-
-class CategoriePerf(BaseModel):
-    """Modèle pour la performance par catégorie"""
-    categorie: str
-    ca: float
-    profit: float
-    nb_commandes: int
-    marge_pct: float
-
-class ProduitMarge(BaseModel):
-    """Modèle pour la marge par produit"""
-    produit: str
-    categorie: str
-    ca: float
-    profit: float
-    marge_pct: float
-
-class EvolutionComparaison(BaseModel):
-    """Modèle pour les comparaisons temporelles"""
-    periode: str
-    ca: float
-    ca_prec: float
-    evolution_pct: float
-
-class FideliteClients(BaseModel):
-    """Modèle pour les indicateurs de fidelite"""
-    total_clients: int
-    clients_recurrents: int
-    clients_nouveaux: int
-    repeat_rate_pct: float
-    avg_orders_per_client: float
-    ca_clients_recurrents: float
-    share_ca_recurrent_pct: float
-    avg_days_between_orders: float
-
 # === FONCTIONS UTILITAIRES ===
 
-def filtrer_dataframe(
-    df: pd.DataFrame,
-    date_debut: Optional[str] = None,
-    date_fin: Optional[str] = None,
-    categorie: Optional[str] = None,
-    region: Optional[str] = None,
-    segment: Optional[str] = None
-) -> pd.DataFrame:
+# Description des paramètres de filtrage dans la documentation OpenAPI
+MULTIPLES = " (plusieurs valeurs : paramètre répété ou séparées par des virgules)"
+DESCRIPTIONS_FILTRES = {
+    "date_debut": "Date début (YYYY-MM-DD)",
+    "date_fin": "Date fin (YYYY-MM-DD)",
+    "categorie": "Catégorie produit" + MULTIPLES,
+    "region": "Région" + MULTIPLES,
+    "segment": "Segment client" + MULTIPLES,
+    "etat": "État" + MULTIPLES,
+    "ville": "Ville" + MULTIPLES,
+    "sous_categorie": "Sous-catégorie produit" + MULTIPLES,
+    "mode_livraison": "Mode de livraison" + MULTIPLES,
+    "ventes_min": "Montant minimum de la ligne (Sales, inclus)",
+    "ventes_max": "Montant maximum de la ligne (Sales, inclus)",
+    "remise_min": "Remise minimum (Discount, 0 à 1, incluse)",
+    "remise_max": "Remise maximum (Discount, 0 à 1, incluse)",
+}
+
+def parametres_filtres(fonction):
     """
-    Applique les filtres sur le dataframe
-    
-    Args:
-        df: DataFrame source
-        date_debut: Date de début (YYYY-MM-DD)
-        date_fin: Date de fin (YYYY-MM-DD)
-        categorie: Catégorie de produit
-        region: Région géographique
-        segment: Segment client
-        
-    Returns:
-        pd.DataFrame: DataFrame filtré
+    Décorateur d'endpoint : déclare les paramètres de filtrage communs
+
+    L'endpoint reçoit les filtres dans **filtres ; sa signature (lue par
+    FastAPI et conservée par les autres décorateurs) les expose comme
+    paramètres de requête. Les dimensions acceptent plusieurs valeurs.
     """
-    df_filtered = df.copy()
-    
-    # Filtre par date
-    if date_debut:
-        date_debut_dt = pd.to_datetime(date_debut, errors='coerce')
-        if pd.notna(date_debut_dt):
-            df_filtered = df_filtered[df_filtered['Order Date'] >= date_debut_dt]
-    if date_fin:
-        date_fin_dt = pd.to_datetime(date_fin, errors='coerce')
-        if pd.notna(date_fin_dt):
-            df_filtered = df_filtered[df_filtered['Order Date'] <= date_fin_dt]
-    
-    # Filtre par catégorie
-    if categorie and categorie != "Toutes":
-        df_filtered = df_filtered[df_filtered['Category'] == categorie]
-    
-    # Filtre par région
-    if region and region != "Toutes":
-        df_filtered = df_filtered[df_filtered['Region'] == region]
-    
-    # Filtre par segment
-    if segment and segment != "Tous":
-        df_filtered = df_filtered[df_filtered['Segment'] == segment]
-    
-    return df_filtered
+    signature = inspect.signature(fonction)
+    parametres = [p for p in signature.parameters.values() if p.kind != inspect.Parameter.VAR_KEYWORD]
+    for nom in PARAMETRES_FILTRES:
+        if nom in COLONNES_INDEXEES:
+            annotation = Optional[List[str]]
+        elif nom in PARAMETRES_INTERVALLES:
+            annotation = Optional[float]
+        else:
+            annotation = Optional[str]
+        parametres.append(inspect.Parameter(
+            nom, inspect.Parameter.KEYWORD_ONLY,
+            default=Query(None, description=DESCRIPTIONS_FILTRES[nom]), annotation=annotation,
+        ))
+    fonction.__signature__ = signature.replace(parameters=parametres)
+    return fonction
+
+# === CALCUL DES KPI ===
+
+class ContexteKPI:
+    """
+    Filtres d'une requête et agrégats intermédiaires partagés
+
+    Chaque agrégat est calculé à la première demande puis réutilisé :
+    le dashboard complet ne filtre qu'une fois et ne regroupe qu'une fois
+    par produit et par client. L'état du dataset est capturé à la
+    création : un rechargement pendant la requête ne la perturbe pas.
+    """
+
+    def __init__(self, mode_distincts: str = 'exact', **filtres):
+        # Filtres reçus sous forme brute : normalisés par le moteur de requête
+        self.filtres = {parametre: filtres.get(parametre) for parametre in PARAMETRES_FILTRES}
+        self.mode_distincts = mode_distincts
+        self.etat = etat
+
+    @cached_property
+    def requete(self) -> RequeteKPI:
+        """Requête du moteur de l'état capturé (pandas, parquet ou SQL, voir requetes.py)"""
+        return self.etat.requete(self.filtres, self.mode_distincts)
+
+    @property
+    def mode_distincts_effectif(self) -> str:
+        """Mode des comptages distincts appliqué : seul le cube sait approcher"""
+        return self.requete.mode_distincts_effectif
+
+    @cached_property
+    def produits(self) -> pd.DataFrame:
+        """Agrégat par produit, partagé par le top produits et la marge"""
+        return self.requete.agreger_produits()
+
+    @cached_property
+    def marges(self) -> pd.DataFrame:
+        """
+        Produits ayant des ventes, avec leur marge (%), partagé par la marge,
+        le top par marge et l'analyse des marges (Sales > 0 : marge finie)
+        """
+        produits = self.produits[self.produits['Sales'] > 0]
+        return produits.assign(marge_pct=produits['Profit'] / produits['Sales'] * 100)
+
+    @cached_property
+    def clients(self) -> pd.DataFrame:
+        """Agrégat par client (analyse clients)"""
+        return self.requete.agreger_clients()
+
+    @cached_property
+    def commandes_clients(self) -> pd.DataFrame:
+        """Commandes distinctes de chaque client, triées par date (fidélité et cohortes)"""
+        return self.requete.commandes_clients()
+
+    def avec_filtres(self, **filtres) -> 'ContexteKPI':
+        """Contexte sur le même état du dataset, avec certains filtres remplacés"""
+        contexte = ContexteKPI(**{**self.filtres, **filtres}, mode_distincts=self.mode_distincts)
+        contexte.etat = self.etat
+        return contexte
+
+    def agreger_geo(self, niveau: str) -> pd.DataFrame:
+        """Mesures par lieu du niveau 'region', 'etat' ou 'ville' (cube géographique si possible)"""
+        return self.requete.agreger_geo(niveau)
+
+    def agreger(self, agregations: Dict[str, str], par: Optional[str] = None,
+                granularite: Optional[str] = None):
+        """
+        Agrège les lignes filtrées : équivalent de groupby(par).agg(agregations)
+
+        Avec le moteur pandas, le cube journalier répond quand les
+        agrégations et les filtres le permettent (comptages distincts
+        exacts ou approchés selon mode_distincts) ; sinon les lignes
+        filtrées sont parcourues et les comptages sont exacts. Les moteurs
+        parquet et SQL comptent toujours exactement.
+
+        Args:
+            agregations: {colonne: 'sum' | 'nunique'}
+            par: Colonne de regroupement, 'periode' (avec granularite) ou None
+            granularite: Granularité de la période ('jour', 'semaine', 'mois'...)
+
+        Returns:
+            dict des totaux si par est None, sinon DataFrame indexé par la clé
+            (clé entière de période pour 'periode', voir temporel.py)
+        """
+        return self.requete.agreger(agregations, par, granularite)
+
+def calculer_kpi_globaux(contexte: ContexteKPI) -> KPIGlobaux:
+    """KPI globaux (voir /kpi/globaux)"""
+    # Agrégation (cube journalier si possible)
+    totaux = contexte.agreger({
+        'Sales': 'sum',
+        'Order ID': 'nunique',
+        'Customer ID': 'nunique',
+        'Quantity': 'sum',
+        'Profit': 'sum'
+    })
+
+    # Calcul des KPI
+    ca_total = totaux['Sales']
+    nb_commandes = int(totaux['Order ID'])
+    nb_clients = int(totaux['Customer ID'])
+    panier_moyen = ca_total / nb_commandes if nb_commandes > 0 else 0
+    quantite_vendue = int(totaux['Quantity'])
+    profit_total = totaux['Profit']
+    marge_moyenne = (profit_total / ca_total * 100) if ca_total > 0 else 0
+
+    return KPIGlobaux(
+        ca_total=round(ca_total, 2),
+        nb_commandes=nb_commandes,
+        nb_clients=nb_clients,
+        panier_moyen=round(panier_moyen, 2),
+        quantite_vendue=quantite_vendue,
+        profit_total=round(profit_total, 2),
+        marge_moyenne=round(marge_moyenne, 2)
+    )
+
+def calculer_top_produits(contexte: ContexteKPI, limite: int = 10, tri_par: str = "ca", offset: int = 0,
+                          format: str = 'records'):
+    """Top produits (voir /kpi/produits/top)"""
+    colonnes = {
+        'Product Name': 'produit',
+        'Category': 'categorie',
+        'Sales': 'ca',
+        'Quantity': 'quantite',
+        'Profit': 'profit'
+    }
+    arrondis = {'ca': 2, 'profit': 2}
+    if tri_par == "marge":
+        produits = contexte.marges
+        colonnes['marge_pct'] = 'marge_pct'
+        arrondis['marge_pct'] = 2
+    else:
+        produits = contexte.produits
+
+    # Sélection partielle des rangs [offset, offset + limite) selon le critère
+    positions = rangs(produits[CRITERES_PRODUITS[tri_par]].to_numpy(), offset, offset + limite)
+    top = produits.take(positions).astype({'Quantity': 'int64'})
+
+    # Formatage de la réponse
+    return vers_tableau(top, colonnes, arrondis=arrondis, format=format)
+
+def calculer_performance_categories(contexte: ContexteKPI, format: str = 'records'):
+    """Performance par catégorie (voir /kpi/categories)"""
+    # Agrégation par catégorie (cube journalier si possible)
+    categories = contexte.agreger({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Order ID': 'nunique'
+    }, par='Category').reset_index()
+
+    # Calcul de la marge
+    categories['marge_pct'] = (categories['Profit'] / categories['Sales'] * 100).round(2)
+
+    # Renommage des colonnes
+    categories.columns = ['categorie', 'ca', 'profit', 'nb_commandes', 'marge_pct']
+
+    # Tri par CA décroissant
+    categories = categories.sort_values('ca', ascending=False)
+
+    return vers_tableau(categories, format=format)
+
+def calculer_evolution_temporelle(contexte: ContexteKPI, periode: str = 'mois', moyenne_mobile: int = 0,
+                                  format: str = 'records', max_points: Optional[int] = None):
+    """Évolution temporelle (voir /kpi/temporel)"""
+    # Agrégation par clé de période (cube journalier si possible), triée
+    temporal = contexte.agreger({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Order ID': 'nunique',
+        'Quantity': 'sum'
+    }, par='periode', granularite=periode)
+    cles = temporal.index.to_numpy(dtype=np.int64)
+
+    temporal = temporal.reset_index()
+    temporal.columns = ['periode', 'ca', 'profit', 'nb_commandes', 'quantite']
+    temporal['periode'] = libelles_periodes(cles, periode)
+
+    # Moyennes mobiles sur les N dernières périodes
+    if moyenne_mobile:
+        for colonne in ('ca', 'profit'):
+            temporal[f'{colonne}_moyenne_mobile'] = moyennes_mobiles(
+                cles, temporal[colonne].to_numpy(dtype=np.float64), moyenne_mobile
+            )
+
+    if max_points is None:
+        return vers_tableau(temporal, format=format)
+
+    # Sous-échantillonnage LTTB sur le CA (moyennes mobiles calculées sur la série complète)
+    retenus = lttb(cles, temporal['ca'].to_numpy(dtype=np.float64), max_points)
+    return {
+        "periode": periode,
+        "echantillonnage": "lttb" if len(retenus) < len(temporal) else "aucun",
+        "points_source": len(temporal),
+        "points": len(retenus),
+        "data": vers_tableau(temporal.iloc[retenus].reset_index(drop=True), format=format),
+    }
+
+def calculer_performance_geographique(contexte: ContexteKPI, format: str = 'records'):
+    """Performance par région (voir /kpi/geographique)"""
+    geo = contexte.agreger({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Customer ID': 'nunique',
+        'Order ID': 'nunique'
+    }, par='Region').reset_index()
+
+    geo.columns = ['region', 'ca', 'profit', 'nb_clients', 'nb_commandes']
+    geo = geo.sort_values('ca', ascending=False)
+
+    return vers_tableau(geo, format=format)
+
+def calculer_detail_geographique(contexte: ContexteKPI, niveau: str = 'etat', parent: Optional[str] = None,
+                                 format: str = 'records'):
+    """Drill-down géographique (voir /kpi/geographique/detail)"""
+    if parent:
+        contexte = contexte.avec_filtres(**{PARENTS[niveau]: parent})
+    lieux = contexte.agreger_geo(niveau)
+
+    lieux = lieux.rename(columns={
+        'Region': 'region', 'State': 'etat', 'City': 'ville',
+        'Sales': 'ca', 'Profit': 'profit', 'Customer ID': 'nb_clients', 'Order ID': 'nb_commandes',
+    })
+    lieux['marge_pct'] = (lieux['profit'] / lieux['ca'] * 100).replace([float('inf'), -float('inf')], 0).round(2)
+    lieux = lieux.sort_values('ca', ascending=False, kind='stable')
+
+    return vers_tableau(lieux, format=format)
+
+def calculer_analyse_clients(contexte: ContexteKPI, limite: int = 10, format: str = 'records') -> Dict[str, Any]:
+    """Analyse clients (voir /kpi/clients)"""
+    clients = contexte.clients
+
+    # Top clients : sélection partielle puis copie renommée des seules lignes retenues
+    top_clients = clients.take(rangs(clients['Sales'].to_numpy(), 0, limite)).rename(columns={
+        'Customer ID': 'customer_id',
+        'Sales': 'ca_total',
+        'Profit': 'profit_total',
+        'Order ID': 'nb_commandes',
+        'Customer Name': 'nom'
+    })
+    top_clients['valeur_commande_moy'] = (top_clients['ca_total'] / top_clients['nb_commandes']).round(2)
+
+    # Statistiques de récurrence
+    nb_commandes = clients['Order ID'].to_numpy()
+    recurrence = {
+        "clients_1_achat": int(np.count_nonzero(nb_commandes == 1)),
+        "clients_recurrents": int(np.count_nonzero(nb_commandes > 1)),
+        "nb_commandes_moyen": round(clients['Order ID'].mean(), 2),
+        "total_clients": len(clients)
+    }
+
+    # Analyse par segment (cube journalier si possible)
+    segments = contexte.agreger({
+        'Sales': 'sum',
+        'Profit': 'sum',
+        'Customer ID': 'nunique'
+    }, par='Segment').reset_index()
+    segments.columns = ['segment', 'ca', 'profit', 'nb_clients']
+
+    return {
+        "top_clients": vers_tableau(top_clients, format=format),
+        "recurrence": recurrence,
+        "segments": vers_tableau(segments, format=format)
+    }
+
+def calculer_marge_produits(contexte: ContexteKPI, limite: int = 10, offset: int = 0,
+                            format: str = 'records') -> Dict[str, Any]:
+    """Marge par produit (voir /kpi/produits/marge)"""
+    produits = contexte.marges
+    marges = produits['marge_pct'].to_numpy()
+
+    def formatter(df_slice: pd.DataFrame):
+        return vers_tableau(df_slice, {
+            'Product Name': 'produit',
+            'Category': 'categorie',
+            'Sales': 'ca',
+            'Profit': 'profit',
+            'marge_pct': 'marge_pct'
+        }, arrondis={'ca': 2, 'profit': 2, 'marge_pct': 2}, format=format)
+
+    # Meilleures et pires marges : sélections partielles, rangs [offset, offset + limite)
+    top = formatter(produits.take(rangs(marges, offset, offset + limite)))
+    bottom = formatter(produits.take(rangs(marges, offset, offset + limite, decroissant=False)))
+
+    return {
+        "top": top,
+        "bottom": bottom
+    }
+
+def calculer_analyse_marges(contexte: ContexteKPI, format: str = 'records') -> Dict[str, Any]:
+    """Distribution des marges par produit (voir /kpi/produits/marge/analyse)"""
+    analyse = analyser_marges(contexte.marges)
+    analyse["histogramme"] = vers_tableau(analyse["histogramme"], arrondis={'ca': 2, 'profit': 2}, format=format)
+    analyse["remises"] = vers_tableau(analyse["remises"], arrondis={'ca': 2, 'profit': 2, 'marge_pct': 2},
+                                      format=format)
+    return analyse
+
+def calculer_comparaison_temporelle(contexte: ContexteKPI, periode: str = 'mois', comparaison: str = 'precedent',
+                                    format: str = 'records') -> Dict[str, Any]:
+    """Comparaison à la période précédente ou à l'année précédente (voir /kpi/temporel/comparaison)"""
+    ventes = contexte.agreger({'Sales': 'sum'}, par='periode', granularite=periode)
+    cles = ventes.index.to_numpy(dtype=np.int64)
+    ca = ventes['Sales'].to_numpy(dtype=np.float64)
+
+    if comparaison == 'annee':
+        # L'année précédente peut précéder la plage de dates : série de référence élargie
+        reference = ventes
+        debut = debut_reference(contexte.filtres['date_debut'], periode)
+        if debut is not None:
+            reference = contexte.avec_filtres(date_debut=debut).agreger(
+                {'Sales': 'sum'}, par='periode', granularite=periode
+            )
+        ca_prec = valeurs_decalees(cles, reference.index.to_numpy(dtype=np.int64),
+                                   reference['Sales'].to_numpy(dtype=np.float64), DECALAGE_ANNEE[periode])
+    else:
+        ca_prec = valeurs_decalees(cles, cles, ca, 1)
+
+    evolution = np.divide(ca - ca_prec, ca_prec, out=np.zeros_like(ca), where=ca_prec != 0)
+    temporal = pd.DataFrame({
+        'periode': libelles_periodes(cles, periode),
+        'ca': ca,
+        'ca_prec': ca_prec,
+        'evolution_pct': np.round(evolution * 100, 2),
+    })
+
+    series = vers_tableau(temporal, format=format)
+    latest = vers_tableau(temporal.tail(1))[0] if len(temporal) else {"periode": None, "ca": 0, "ca_prec": 0, "evolution_pct": 0}
+
+    return {
+        "series": series,
+        "latest": latest
+    }
+
+def calculer_fidelite_clients(contexte: ContexteKPI, horizon_cohortes: int = 12) -> Dict[str, Any]:
+    """Fidélité clients et rétention par cohorte (voir /kpi/clients/fidelite)"""
+    # Commandes de chaque client déjà triées par date : réductions vectorisées
+    commandes = contexte.commandes_clients
+
+    return {
+        **indicateurs_fidelite(commandes),
+        "cohortes": retention_cohortes(commandes, horizon_cohortes),
+    }
+
+# Panneaux dont les comptages distincts suivent le paramètre mode_distincts
+PANNEAUX_DISTINCTS = ("globaux", "categories", "temporel", "geographique", "clients")
+
+# Panneaux du dashboard :
+# nom -> (endpoint individuel, calcul, {paramètre du calcul: paramètre du dashboard})
+PANNEAUX_DASHBOARD = {
+    "globaux": ("get_kpi_globaux", calculer_kpi_globaux, {}),
+    "produits_top": ("get_top_produits", calculer_top_produits,
+                     {"limite": "limite_produits", "tri_par": "tri_par", "offset": "offset_produits", "format": "format"}),
+    "produits_marge": ("get_marge_produits", calculer_marge_produits,
+                       {"limite": "limite_produits", "offset": "offset_produits", "format": "format"}),
+    "marges_analyse": ("get_analyse_marges", calculer_analyse_marges, {"format": "format"}),
+    "categories": ("get_performance_categories", calculer_performance_categories, {"format": "format"}),
+    "temporel": ("get_evolution_temporelle", calculer_evolution_temporelle,
+                 {"periode": "periode", "moyenne_mobile": "moyenne_mobile", "format": "format",
+                  "max_points": "max_points"}),
+    "temporel_comparaison": ("get_comparaison_temporelle", calculer_comparaison_temporelle,
+                             {"periode": "periode_comparaison", "comparaison": "comparaison", "format": "format"}),
+    "geographique": ("get_performance_geographique", calculer_performance_geographique, {"format": "format"}),
+    "clients": ("get_analyse_clients", calculer_analyse_clients, {"limite": "limite_clients", "format": "format"}),
+    "clients_fidelite": ("get_fidelite_clients", calculer_fidelite_clients, {"horizon_cohortes": "horizon_cohortes"}),
+}
+
+# Paramètres par défaut du dashboard (ceux des endpoints individuels)
+DEFAUTS_DASHBOARD = {
+    "limite_produits": 10,
+    "tri_par": "ca",
+    "offset_produits": 0,
+    "periode": "mois",
+    "moyenne_mobile": 0,
+    "max_points": None,
+    "periode_comparaison": "mois",
+    "comparaison": "precedent",
+    "limite_clients": 10,
+    "horizon_cohortes": 12,
+    "format": "records",
+}
+
+def panneau_dashboard(nom: str, parametres_dashboard: Dict[str, Any], filtres: Dict[str, Any],
+                      mode_distincts: str):
+    """
+    Endpoint individuel, calcul, paramètres du calcul et paramètres de la
+    clé de cache d'un panneau (même clé que l'endpoint individuel)
+    """
+    endpoint, calcul, correspondances = PANNEAUX_DASHBOARD[nom]
+    parametres = {cle: parametres_dashboard[source] for cle, source in correspondances.items()}
+    cle = {**parametres, **filtres}
+    if nom in PANNEAUX_DISTINCTS:
+        cle["mode_distincts"] = mode_distincts
+    return endpoint, calcul, parametres, cle
+
+# === PRÉCHAUFFAGE DU CACHE ===
 
-def safe_divide(numerateur: float, denominateur: float) -> float:
-    """Division sure pour eviter les inf et NaN"""
-    if denominateur and denominateur != 0:
-        return numerateur / denominateur
-    return 0.0
+def combinaisons_a_prechauffer() -> List[Dict[str, Any]]:
+    """
+    Filtres préchauffés pour l'état courant : aucun filtre, les plus
+    demandés (journal), chaque catégorie / région / segment, les années et
+    les derniers jours du dataset
+    """
+    donnees = etat
+    # Le journal est aussi conservé ici, au cas où le processus serait arrêté sans shutdown
+    journal_filtres.sauvegarder()
+    debut, fin = donnees.plage_dates()
+    valeurs = {parametre: donnees.valeurs(COLONNES_INDEXEES[parametre]) for parametre in DIMENSIONS_PRECHAUFFEES}
+    # Tous les panneaux de chaque combinaison doivent tenir dans le cache
+    limite = min(KPI_PRECHAUFFAGE_MAX, cache_kpi.taille_max // len(PANNEAUX_DASHBOARD))
+    return combinaisons_prechauffage(valeurs, debut, fin, journal_filtres.frequentes(limite), limite)
+
+def prechauffer_filtres(filtres: Dict[str, Any]) -> int:
+    """
+    Calcule les panneaux du dashboard (paramètres par défaut) absents du cache
+
+    Returns:
+        Nombre de panneaux calculés
+    """
+    filtres = {parametre: filtres.get(parametre) for parametre in PARAMETRES_FILTRES}
+    generation = cache_kpi.generation
+    contexte = ContexteKPI(**filtres, mode_distincts=DISTINCTS_MODE)
+    calculs = 0
+    for nom in PANNEAUX_DASHBOARD:
+        endpoint, calcul, parametres, cle = panneau_dashboard(nom, DEFAUTS_DASHBOARD, filtres, DISTINCTS_MODE)
+        cle = cache_kpi.cle(endpoint, cle)
+        if cache_kpi.contient(cle):
+            continue
+        # Résultat ignoré par le cache si le dataset a été rechargé entre-temps
+        cache_kpi.ecrire(cle, calcul(contexte, **parametres), generation)
+        calculs += 1
+    return calculs
 
 # === ENDPOINTS API ===
 
+# En-tête indiquant le mode des comptages distincts réellement appliqué
+ENTETE_MODE_DISTINCTS = "X-Distincts-Mode"
+
+def annoncer_mode_distincts(fonction):
+    """
+    Décorateur d'endpoint : ajoute l'en-tête X-Distincts-Mode à la réponse
+
+    Le mode est déduit des paramètres à chaque requête (hors cache) :
+    'approx' n'est appliqué que si le cube répond aux filtres.
+    """
+    @wraps(fonction)
+    async def wrapper(**parametres):
+        resultat = await fonction(**parametres)
+        filtres = {cle: parametres.get(cle) for cle in PARAMETRES_FILTRES}
+        mode = ContexteKPI(**filtres, mode_distincts=parametres["mode_distincts"]).mode_distincts_effectif
+        return ReponseJSON(resultat, headers={ENTETE_MODE_DISTINCTS: mode})
+    return wrapper
+
 @app.get("/", tags=["Info"])
 def root():
     """
     Endpoint racine - Informations sur l'API
     """
+    donnees = etat
+    debut, fin = donnees.plage_dates()
     return {
         "message": "🛒 API Superstore BI",
         "version": "1.0.0",
         "dataset": "Sample Superstore",
-        "nb_lignes": len(df),
+        "nb_lignes": donnees.nb_lignes,
         "periode": {
-            "debut": df['Order Date'].min().strftime('%Y-%m-%d'),
-            "fin": df['Order Date'].max().strftime('%Y-%m-%d')
+            "debut": debut.strftime('%Y-%m-%d'),
+            "fin": fin.strftime('%Y-%m-%d')
         },
         "endpoints": {
             "documentation": "/docs",
@@ -217,17 +954,23 @@ def root():
             "categories": "/kpi/categories",
             "evolution_temporelle": "/kpi/temporel",
             "performance_geo": "/kpi/geographique",
-            "analyse_clients": "/kpi/clients"
+            "detail_geo": "/kpi/geographique/detail",
+            "analyse_clients": "/kpi/clients",
+            "analyse_marges": "/kpi/produits/marge/analyse",
+            "dashboard": "/kpi/dashboard",
+            "sante": "/sante"
         }
     }
 
 @app.get("/kpi/globaux", response_model=KPIGlobaux, tags=["KPI"])
+@serialiser
+@annoncer_mode_distincts
+@executeur.memoiser
+@parametres_filtres
 def get_kpi_globaux(
-    date_debut: Optional[str] = Query(None, description="Date début (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Catégorie produit"),
-    region: Optional[str] = Query(None, description="Région"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
     📊 KPI GLOBAUX
@@ -241,37 +984,18 @@ def get_kpi_globaux(
     - Profit total
     - Marge moyenne (%)
     """
-    # Application des filtres
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-    
-    # Calcul des KPI
-    ca_total = df_filtered['Sales'].sum()
-    nb_commandes = df_filtered['Order ID'].nunique()
-    nb_clients = df_filtered['Customer ID'].nunique()
-    panier_moyen = ca_total / nb_commandes if nb_commandes > 0 else 0
-    quantite_vendue = int(df_filtered['Quantity'].sum())
-    profit_total = df_filtered['Profit'].sum()
-    marge_moyenne = (profit_total / ca_total * 100) if ca_total > 0 else 0
-    
-    return KPIGlobaux(
-        ca_total=round(ca_total, 2),
-        nb_commandes=nb_commandes,
-        nb_clients=nb_clients,
-        panier_moyen=round(panier_moyen, 2),
-        quantite_vendue=quantite_vendue,
-        profit_total=round(profit_total, 2),
-        marge_moyenne=round(marge_moyenne, 2)
-    )
+    return calculer_kpi_globaux(ContexteKPI(mode_distincts, **filtres))
 
 @app.get("/kpi/produits/top", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
 def get_top_produits(
     limite: int = Query(10, ge=1, le=50, description="Nombre de produits à retourner"),
-    tri_par: str = Query("ca", regex="^(ca|profit|quantite)$", description="Critère de tri"),
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    tri_par: str = Query("ca", regex=REGEX_CRITERE_PRODUITS, description="Critère de tri"),
+    offset: int = Query(0, ge=0, description="Rang du premier produit (pagination)"),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    **filtres
 ):
     """
     🏆 TOP PRODUITS
@@ -280,48 +1004,23 @@ def get_top_produits(
     - ca : Chiffre d'affaires
     - profit : Profit
     - quantite : Quantité vendue
-    """
-    # Application des filtres
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
+    - marge : Marge (%), produits ayant des ventes (ajoute marge_pct)
 
-    # Agrégation par produit
-    produits = df_filtered.groupby(['Product Name', 'Category']).agg({
-        'Sales': 'sum',
-        'Quantity': 'sum',
-        'Profit': 'sum'
-    }).reset_index()
-    
-    # Tri selon le critère
-    if tri_par == "ca":
-        produits = produits.sort_values('Sales', ascending=False)
-    elif tri_par == "profit":
-        produits = produits.sort_values('Profit', ascending=False)
-    else:  # quantite
-        produits = produits.sort_values('Quantity', ascending=False)
-    
-    # Sélection du top
-    top = produits.head(limite)
-    
-    # Formatage de la réponse
-    result = []
-    for _, row in top.iterrows():
-        result.append({
-            "produit": row['Product Name'],
-            "categorie": row['Category'],
-            "ca": round(row['Sales'], 2),
-            "quantite": int(row['Quantity']),
-            "profit": round(row['Profit'], 2)
-        })
-    
-    return result
+    Page suivante : offset=offset+limite (seuls les rangs demandés sont triés)
+    """
+    return calculer_top_produits(ContexteKPI(**filtres), limite, tri_par,
+                                 offset, format)
 
 @app.get("/kpi/categories", tags=["KPI"])
+@serialiser
+@annoncer_mode_distincts
+@executeur.memoiser
+@parametres_filtres
 def get_performance_categories(
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
     📦 PERFORMANCE PAR CATÉGORIE
@@ -332,74 +1031,52 @@ def get_performance_categories(
     - Nombre de commandes
     - Marge (%)
     """
-    # Application des filtres
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-
-    # Agrégation par catégorie
-    categories = df_filtered.groupby('Category').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique'
-    }).reset_index()
-    
-    # Calcul de la marge
-    categories['marge_pct'] = (categories['Profit'] / categories['Sales'] * 100).round(2)
-    
-    # Renommage des colonnes
-    categories.columns = ['categorie', 'ca', 'profit', 'nb_commandes', 'marge_pct']
-    
-    # Tri par CA décroissant
-    categories = categories.sort_values('ca', ascending=False)
-    
-    return categories.to_dict('records')
+    return calculer_performance_categories(ContexteKPI(mode_distincts, **filtres), format=format)
 
 @app.get("/kpi/temporel", tags=["KPI"])
+@serialiser
+@annoncer_mode_distincts
+@executeur.memoiser
+@parametres_filtres
 def get_evolution_temporelle(
-    periode: str = Query('mois', regex='^(jour|mois|annee)$', description="Granularité temporelle"),
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    periode: str = Query('mois', regex=REGEX_GRANULARITE, description="Granularité temporelle"),
+    moyenne_mobile: int = Query(0, ge=0, le=MOYENNE_MOBILE_MAX,
+                                description="Moyenne mobile du CA et du profit sur N périodes (0 = aucune)"),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    max_points: Optional[int] = Query(None, ge=MAX_POINTS_MIN,
+                                      description="Nombre maximum de points (sous-échantillonnage LTTB)"),
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
     📈 ÉVOLUTION TEMPORELLE
     
     Analyse l'évolution du CA, profit et commandes dans le temps
-    Granularités disponibles : jour, mois, annee
+    Granularités disponibles : jour, semaine, mois, trimestre, annee
+
+    Avec `moyenne_mobile=N`, ajoute ca_moyenne_mobile et profit_moyenne_mobile :
+    moyenne des N dernières périodes (null tant que la fenêtre est incomplète).
+
+    Avec `max_points=N`, une série plus longue est réduite à N points par
+    LTTB (Largest-Triangle-Three-Buckets, appliqué au CA : pics et creux
+    conservés) et la réponse devient {periode, echantillonnage ('lttb' ou
+    'aucun'), points_source, points, data}. Par jour sur une simple plage de
+    dates, la série vient des agrégats journaliers précalculés.
     """
-    df_temp = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-    
-    # Création de la colonne période selon la granularité
-    if periode == 'jour':
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y-%m-%d')
-    elif periode == 'mois':
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y-%m')
-    else:  # annee
-        df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y')
-    
-    # Agrégation
-    temporal = df_temp.groupby('periode').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique',
-        'Quantity': 'sum'
-    }).reset_index()
-    
-    temporal.columns = ['periode', 'ca', 'profit', 'nb_commandes', 'quantite']
-    
-    # Tri chronologique
-    temporal = temporal.sort_values('periode')
-    
-    return temporal.to_dict('records')
+    return calculer_evolution_temporelle(ContexteKPI(mode_distincts, **filtres),
+                                         periode, moyenne_mobile, format, max_points)
 
 @app.get("/kpi/geographique", tags=["KPI"])
+@serialiser
+@annoncer_mode_distincts
+@executeur.memoiser
+@parametres_filtres
 def get_performance_geographique(
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
     🌍 PERFORMANCE GÉOGRAPHIQUE
@@ -410,28 +1087,47 @@ def get_performance_geographique(
     - Nombre de clients
     - Nombre de commandes
     """
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
+    return calculer_performance_geographique(ContexteKPI(mode_distincts, **filtres), format=format)
 
-    geo = df_filtered.groupby('Region').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Customer ID': 'nunique',
-        'Order ID': 'nunique'
-    }).reset_index()
-    
-    geo.columns = ['region', 'ca', 'profit', 'nb_clients', 'nb_commandes']
-    geo = geo.sort_values('ca', ascending=False)
-    
-    return geo.to_dict('records')
+@app.get("/kpi/geographique/detail", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
+def get_detail_geographique(
+    niveau: str = Query('etat', regex=REGEX_NIVEAU, description="Niveau : region, etat ou ville"),
+    parent: Optional[str] = Query(None, description="Lieu parent : région (niveau etat) ou État (niveau ville)"),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    **filtres
+):
+    """
+    🗺️ DRILL-DOWN GÉOGRAPHIQUE
+
+    Performance par lieu, du niveau demandé :
+    - region : une ligne par région
+    - etat : une ligne par État (avec sa région)
+    - ville : une ligne par ville (avec son État et sa région)
+
+    `parent` restreint le résultat aux lieux d'une région (niveau etat) ou
+    d'un État (niveau ville) ; il remplace le filtre region / etat de la
+    requête. Au niveau region, il sélectionne la région elle-même.
+
+    Les agrégats viennent du cube géographique précalculé (sommes par ville
+    remontées vers l'État et la région, clients et commandes distincts
+    exacts) ; un filtre hors dates et géographie passe par les lignes.
+    """
+    return calculer_detail_geographique(ContexteKPI(**filtres), niveau, parent, format)
 
 @app.get("/kpi/clients", tags=["KPI"])
+@serialiser
+@annoncer_mode_distincts
+@executeur.memoiser
+@parametres_filtres
 def get_analyse_clients(
     limite: int = Query(10, ge=1, le=100, description="Nombre de top clients"),
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
     👥 ANALYSE CLIENTS
@@ -441,172 +1137,280 @@ def get_analyse_clients(
     - Statistiques de récurrence
     - Analyse par segment
     """
-    # Application des filtres
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-
-    # Top clients
-    clients = df_filtered.groupby('Customer ID').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Order ID': 'nunique',
-        'Customer Name': 'first'
-    }).reset_index()
-    
-    clients.columns = ['customer_id', 'ca_total', 'profit_total', 'nb_commandes', 'nom']
-    clients['valeur_commande_moy'] = (clients['ca_total'] / clients['nb_commandes']).round(2)
-    
-    top_clients = clients.sort_values('ca_total', ascending=False).head(limite)
-    
-    # Statistiques de récurrence
-    recurrence = {
-        "clients_1_achat": len(clients[clients['nb_commandes'] == 1]),
-        "clients_recurrents": len(clients[clients['nb_commandes'] > 1]),
-        "nb_commandes_moyen": round(clients['nb_commandes'].mean(), 2),
-        "total_clients": len(clients)
-    }
-    
-    # Analyse par segment
-    segments = df_filtered.groupby('Segment').agg({
-        'Sales': 'sum',
-        'Profit': 'sum',
-        'Customer ID': 'nunique'
-    }).reset_index()
-    segments.columns = ['segment', 'ca', 'profit', 'nb_clients']
-    
-    return {
-        "top_clients": top_clients.to_dict('records'),
-        "recurrence": recurrence,
-        "segments": segments.to_dict('records')
-    }
+    return calculer_analyse_clients(ContexteKPI(mode_distincts, **filtres), limite, format)
 
 @app.get("/kpi/produits/marge", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
 def get_marge_produits(
     limite: int = Query(10, ge=1, le=50, description="Nombre de produits par liste"),
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+    offset: int = Query(0, ge=0, description="Rang du premier produit de chaque liste (pagination)"),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    **filtres
 ):
     """
     💹 MARGE PAR PRODUIT
 
     Retourne les produits les plus et moins rentables selon la marge (%)
     """
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
+    return calculer_marge_produits(ContexteKPI(**filtres), limite, offset, format)
 
-    produits = df_filtered.groupby(['Product Name', 'Category']).agg({
-        'Sales': 'sum',
-        'Profit': 'sum'
-    }).reset_index()
+@app.get("/kpi/produits/marge/analyse", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
+def get_analyse_marges(
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    **filtres
+):
+    """
+    📐 ANALYSE DES MARGES
 
-    produits = produits[produits['Sales'] > 0]
-    produits['marge_pct'] = (produits['Profit'] / produits['Sales'] * 100).replace([float('inf'), -float('inf')], 0)
+    Distribution des marges (%) des produits ayant des ventes, calculée sur
+    le même agrégat par produit que la marge et le top produits :
+    - percentiles (p5 à p95) et marge globale
+    - histogramme par classe de marge (classes extrêmes ouvertes)
+    - tranches de remise moyenne (pondérée par les ventes) : CA, profit,
+      marge et produits à perte de chaque tranche
+    - produits à perte : nombre, CA et pertes
+    """
+    return calculer_analyse_marges(ContexteKPI(**filtres), format)
 
-    produits = produits.sort_values('marge_pct', ascending=False)
+@app.get("/kpi/temporel/comparaison", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
+def get_comparaison_temporelle(
+    periode: str = Query('mois', regex=REGEX_GRANULARITE, description="Granularité temporelle"),
+    comparaison: str = Query('precedent', regex=REGEX_COMPARAISON,
+                             description="Référence : période précédente ou même période de l'année précédente"),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des tableaux : records ou columnar"),
+    **filtres
+):
+    """
+    📅 COMPARAISON TEMPORELLE
 
-    def formatter(df_slice: pd.DataFrame) -> List[Dict[str, Any]]:
-        result = []
-        for _, row in df_slice.iterrows():
-            result.append({
-                "produit": row['Product Name'],
-                "categorie": row['Category'],
-                "ca": round(row['Sales'], 2),
-                "profit": round(row['Profit'], 2),
-                "marge_pct": round(row['marge_pct'], 2)
-            })
-        return result
+    Retourne l'evolution du CA vs periode precedente (mois par defaut)
+    - comparaison=precedent : période précédente (0 si elle n'a pas de ventes)
+    - comparaison=annee : même période de l'année précédente, y compris
+      avant date_debut (52 semaines, 364 jours pour les granularités fines)
+    """
+    return calculer_comparaison_temporelle(ContexteKPI(**filtres),
+                                           periode, comparaison, format)
 
-    top = formatter(produits.head(limite))
-    bottom = formatter(produits.tail(limite).sort_values('marge_pct', ascending=True))
+@app.get("/kpi/clients/fidelite", tags=["KPI"])
+@serialiser
+@executeur.memoiser
+@parametres_filtres
+def get_fidelite_clients(
+    horizon_cohortes: int = Query(12, ge=0, le=HORIZON_COHORTES_MAX,
+                                  description="Mois suivis après le premier achat (rétention par cohorte)"),
+    **filtres
+):
+    """
+    🔁 FIDELITE CLIENTS
 
-    return {
-        "top": top,
-        "bottom": bottom
-    }
+    Indicateurs de recurrence et poids des clients recurrents, calculés sur
+    les commandes distinctes de chaque client (chronologie triée au chargement) :
+    - avg_days_between_orders : écart moyen entre deux commandes consécutives
+    - cohortes : pour chaque mois de premier achat, part des clients ayant
+      commandé 0, 1, ..., horizon_cohortes mois plus tard
+    """
+    return calculer_fidelite_clients(ContexteKPI(**filtres), horizon_cohortes)
 
-@app.get("/kpi/temporel/comparaison", tags=["KPI"])
-def get_comparaison_temporelle(
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
+@app.get("/kpi/dashboard", tags=["KPI"])
+@serialiser
+@parametres_filtres
+async def get_dashboard(
+    panneaux: List[str] = Query(
+        list(PANNEAUX_DASHBOARD),
+        description="Panneaux à calculer (répétables ou séparés par des virgules)"
+    ),
+    limite_produits: int = Query(DEFAUTS_DASHBOARD["limite_produits"], ge=1, le=50, description="Nombre de produits (top et marge)"),
+    tri_par: str = Query(DEFAUTS_DASHBOARD["tri_par"], regex=REGEX_CRITERE_PRODUITS,
+                         description="Critère de tri du top produits"),
+    offset_produits: int = Query(DEFAUTS_DASHBOARD["offset_produits"], ge=0, description="Rang du premier produit (top et marge)"),
+    periode: str = Query(DEFAUTS_DASHBOARD["periode"], regex=REGEX_GRANULARITE, description="Granularité temporelle"),
+    moyenne_mobile: int = Query(DEFAUTS_DASHBOARD["moyenne_mobile"], ge=0, le=MOYENNE_MOBILE_MAX,
+                                description="Moyenne mobile sur N périodes (temporel)"),
+    max_points: Optional[int] = Query(DEFAUTS_DASHBOARD["max_points"], ge=MAX_POINTS_MIN,
+                                      description="Points maximum de la série (temporel, LTTB)"),
+    periode_comparaison: str = Query(DEFAUTS_DASHBOARD["periode_comparaison"], regex=REGEX_GRANULARITE,
+                                     description="Granularité de la comparaison"),
+    comparaison: str = Query(DEFAUTS_DASHBOARD["comparaison"], regex=REGEX_COMPARAISON,
+                             description="Référence de la comparaison"),
+    limite_clients: int = Query(DEFAUTS_DASHBOARD["limite_clients"], ge=1, le=100, description="Nombre de top clients"),
+    horizon_cohortes: int = Query(DEFAUTS_DASHBOARD["horizon_cohortes"], ge=0, le=HORIZON_COHORTES_MAX,
+                                  description="Mois suivis par cohorte (fidélité)"),
+    format: str = Query(DEFAUTS_DASHBOARD["format"], regex=REGEX_FORMAT,
+                        description="Format des tableaux : records ou columnar"),
+    mode_distincts: str = Query(DISTINCTS_MODE, regex=REGEX_MODE_DISTINCTS,
+                                description="Comptages distincts : exact ou approx (HyperLogLog)"),
+    **filtres
 ):
     """
-    📅 COMPARAISON MOIS/MOIS
+    🧩 DASHBOARD COMPLET
+
+    Calcule plusieurs panneaux en une seule requête :
+    - les lignes ne sont filtrées qu'une fois
+    - l'agrégat produits sert au top et à la marge
+    - la fidélité lit la chronologie des clients, triée au chargement
+    - chaque panneau réutilise le cache de son endpoint individuel (et ses
+      calculs en cours)
 
-    Retourne l'evolution du CA vs mois precedent
+    La durée de calcul de chaque panneau est renvoyée dans l'en-tête Server-Timing,
+    le mode des comptages distincts dans l'en-tête X-Distincts-Mode.
     """
-    df_temp = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
-    df_temp = df_temp.copy()
-    df_temp['periode'] = df_temp['Order Date'].dt.strftime('%Y-%m')
+    demandes = [nom.strip() for valeur in panneaux for nom in valeur.split(',') if nom.strip()]
+    inconnus = [nom for nom in demandes if nom not in PANNEAUX_DASHBOARD]
+    if inconnus:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Panneaux inconnus : {', '.join(inconnus)} (disponibles : {', '.join(PANNEAUX_DASHBOARD)})"
+        )
 
-    temporal = df_temp.groupby('periode').agg({
-        'Sales': 'sum'
-    }).reset_index()
+    filtres = {parametre: filtres.get(parametre) for parametre in PARAMETRES_FILTRES}
+    # Une requête, un relevé : les panneaux passent par executeur.obtenir,
+    # qui ne prévient pas l'observateur (réservé aux endpoints mémoïsés)
+    noter_filtres("get_dashboard", filtres)
+    parametres_dashboard = {
+        "limite_produits": limite_produits,
+        "tri_par": tri_par,
+        "offset_produits": offset_produits,
+        "periode": periode,
+        "moyenne_mobile": moyenne_mobile,
+        "max_points": max_points,
+        "periode_comparaison": periode_comparaison,
+        "comparaison": comparaison,
+        "limite_clients": limite_clients,
+        "horizon_cohortes": horizon_cohortes,
+        "format": format,
+    }
+    # Génération lue avant de capturer l'état : un rechargement concurrent
+    # rend les résultats de ce contexte non réutilisables
+    generation = cache_kpi.generation
+    contexte = ContexteKPI(**filtres, mode_distincts=mode_distincts)
 
-    temporal.columns = ['periode', 'ca']
-    temporal = temporal.sort_values('periode')
-    temporal['ca_prec'] = temporal['ca'].shift(1).fillna(0)
-    temporal['evolution_pct'] = temporal.apply(lambda row: round(safe_divide(row['ca'] - row['ca_prec'], row['ca_prec']) * 100, 2), axis=1)
+    resultat = {}
+    durees = []
+    for nom in dict.fromkeys(demandes):
+        # Même clé de cache que l'endpoint individuel
+        endpoint, calcul, parametres, cle = panneau_dashboard(nom, parametres_dashboard, filtres, mode_distincts)
 
-    series = temporal.to_dict('records')
-    latest = series[-1] if series else {"periode": None, "ca": 0, "ca_prec": 0, "evolution_pct": 0}
+        debut = time.perf_counter()
+        resultat[nom] = await executeur.obtenir(endpoint, cle, partial(calcul, contexte, **parametres), generation)
+        durees.append(f"{nom};dur={(time.perf_counter() - debut) * 1000:.2f}")
 
-    return {
-        "series": series,
-        "latest": latest
-    }
+    return ReponseJSON(resultat, headers={
+        "Server-Timing": ", ".join(durees),
+        ENTETE_MODE_DISTINCTS: contexte.mode_distincts_effectif,
+    })
 
-@app.get("/kpi/clients/fidelite", tags=["KPI"])
-def get_fidelite_clients(
-    date_debut: Optional[str] = Query(None, description="Date debut (YYYY-MM-DD)"),
-    date_fin: Optional[str] = Query(None, description="Date fin (YYYY-MM-DD)"),
-    categorie: Optional[str] = Query(None, description="Categorie produit"),
-    region: Optional[str] = Query(None, description="Region"),
-    segment: Optional[str] = Query(None, description="Segment client")
-):
+@app.get("/cache/stats", tags=["Info"])
+def get_statistiques_cache():
     """
-    🔁 FIDELITE CLIENTS
+    🗃️ STATISTIQUES DU CACHE
 
-    Indicateurs de recurrence et poids des clients recurrents
+    Compteurs hits/misses/evictions du cache des KPI, calculs lancés dans
+    le pool et requêtes coalescées
     """
-    df_filtered = filtrer_dataframe(df, date_debut, date_fin, categorie, region, segment)
+    return {**cache_kpi.statistiques(), "executeur": executeur.statistiques()}
 
-    clients = df_filtered.groupby('Customer ID').agg({
-        'Order ID': 'nunique',
-        'Sales': 'sum',
-        'Order Date': 'max'
-    }).reset_index()
+@app.get("/sante", tags=["Info"])
+def get_sante():
+    """
+    💚 SANTÉ ET DISPONIBILITÉ
 
-    total_clients = len(clients)
-    clients_recurrents = len(clients[clients['Order ID'] > 1])
-    clients_nouveaux = total_clients - clients_recurrents
-    repeat_rate_pct = round(safe_divide(clients_recurrents, total_clients) * 100, 2)
-    avg_orders_per_client = round(clients['Order ID'].mean(), 2) if total_clients > 0 else 0
+    L'API est prête dès que le dataset est chargé : le préchauffage du
+    cache (combinaisons de filtres courantes) progresse en arrière-plan,
+    relancé après chaque rechargement, sans bloquer les requêtes.
+    """
+    donnees = etat
+    prechauffage = prechauffeur.statistiques()
+    return {
+        "statut": "ok",
+        "pret": True,
+        "cache_chaud": prechauffage.get("etat") == "termine",
+        "dataset": {"version": donnees.version, "nb_lignes": donnees.nb_lignes},
+        "prechauffage": {**prechauffage, "filtres_journalises": len(journal_filtres)},
+    }
 
-    ca_clients_recurrents = clients.loc[clients['Order ID'] > 1, 'Sales'].sum()
-    ca_total = clients['Sales'].sum()
-    share_ca_recurrent_pct = round(safe_divide(ca_clients_recurrents, ca_total) * 100, 2)
+@app.get("/metrics", tags=["Info"], response_class=PlainTextResponse)
+def get_metriques():
+    """
+    📏 MÉTRIQUES PROMETHEUS
 
-    # Intervalle moyen entre commandes par client
-    orders = df_filtered[['Customer ID', 'Order Date']].dropna()
-    orders = orders.sort_values(['Customer ID', 'Order Date'])
-    orders['delta'] = orders.groupby('Customer ID')['Order Date'].diff().dt.days
-    avg_days_between_orders = round(orders['delta'].dropna().mean(), 2) if not orders['delta'].dropna().empty else 0
+    Par route : nombre de requêtes par statut, histogrammes des durées
+    (requête complète et phases filtre / agregation / serialisation),
+    lignes et cellules du cube parcourues, lectures du cache.
+    Jauges : taille et mémoire du dataset, de l'index et du cube, cache, pool.
+    """
+    return PlainTextResponse(metriques.exposer(), media_type="text/plain; version=0.0.4")
 
+def statistiques_rechargement() -> Dict[str, Any]:
+    """Version, fraîcheur et durées des rechargements du dataset"""
+    donnees = etat
+    maintenant = time.time()
+    # Retard : depuis quand le CSV local contient des modifications non chargées
+    retard = None
+    if DATASET_PATH and position_source is not None:
+        try:
+            mtime_ns = os.stat(DATASET_PATH).st_mtime_ns
+            retard = 0.0 if mtime_ns == position_source["mtime_ns"] else round(maintenant - mtime_ns / 1e9, 3)
+        except OSError:
+            pass
     return {
-        "total_clients": int(total_clients),
-        "clients_recurrents": int(clients_recurrents),
-        "clients_nouveaux": int(clients_nouveaux),
-        "repeat_rate_pct": repeat_rate_pct,
-        "avg_orders_per_client": avg_orders_per_client,
-        "ca_clients_recurrents": round(ca_clients_recurrents, 2),
-        "share_ca_recurrent_pct": share_ca_recurrent_pct,
-        "avg_days_between_orders": avg_days_between_orders
+        "version": donnees.version,
+        "nb_lignes": donnees.nb_lignes,
+        "en_cours": rechargeur.en_cours,
+        "charge_le": datetime.fromtimestamp(donnees.charge_le).isoformat(timespec='seconds'),
+        "age_secondes": round(maintenant - donnees.charge_le, 3),
+        "retard_source_secondes": retard,
+        "rechargements": dict(rechargeur.compteurs),
+        "duree_totale_ms": round(rechargeur.duree_totale * 1000, 2),
+        "dernier": rechargeur.dernier,
     }
 
+@app.post("/admin/recharger", tags=["Administration"], status_code=202)
+def post_recharger(
+    attendre: bool = Query(False, description="Attendre la fin du rechargement avant de répondre")
+):
+    """
+    🔄 RECHARGEMENT DU DATASET
+
+    Charge les commandes ajoutées au CSV local (ajout incrémental à l'index
+    et au cube), ou tout le dataset si le fichier a été réécrit. Le nouvel
+    état remplace l'ancien d'un seul coup : les requêtes en cours ne voient
+    jamais un dataset à moitié mis à jour.
+
+    Avec plusieurs workers (DATASET_SIGNAL), la demande est publiée aux
+    autres workers, qui rechargent dans la seconde ; `attendre` ne porte
+    que sur le worker ayant reçu la requête.
+    """
+    diffuse = False
+    if DATASET_SIGNAL:
+        try:
+            rechargeur.signaler(DATASET_SIGNAL)
+            diffuse = True
+        except OSError as e:
+            logger.warning(f"⚠️ Demande de rechargement non publiée ({DATASET_SIGNAL}) : {e}")
+    if attendre:
+        rechargeur.executer()
+        lance = True
+    else:
+        lance = rechargeur.lancer()
+    return {"lance": lance, "diffuse": diffuse, **statistiques_rechargement()}
+
+@app.get("/admin/rechargement", tags=["Administration"])
+def get_rechargement():
+    """
+    ⏱️ ÉTAT DU RECHARGEMENT
+
+    Version du dataset, fraîcheur, retard sur le CSV local et durée des rechargements
+    """
+    return statistiques_rechargement()
+
 @app.get("/filters/valeurs", tags=["Filtres"])
 def get_valeurs_filtres():
     """
@@ -614,46 +1418,148 @@ def get_valeurs_filtres():
     
     Retourne toutes les valeurs uniques disponibles pour les filtres
     """
+    donnees = etat
+    debut, fin = donnees.plage_dates()
     return {
-        "categories": sorted(df['Category'].unique().tolist()),
-        "regions": sorted(df['Region'].unique().tolist()),
-        "segments": sorted(df['Segment'].unique().tolist()),
-        "etats": sorted(df['State'].unique().tolist()),
+        "categories": donnees.valeurs('Category'),
+        "regions": donnees.valeurs('Region'),
+        "segments": donnees.valeurs('Segment'),
+        "etats": donnees.valeurs('State'),
+        "villes": donnees.valeurs('City'),
+        "sous_categories": donnees.valeurs('Sub-Category'),
+        "modes_livraison": donnees.valeurs('Ship Mode'),
         "plage_dates": {
-            "min": df['Order Date'].min().strftime('%Y-%m-%d'),
-            "max": df['Order Date'].max().strftime('%Y-%m-%d')
+            "min": debut.strftime('%Y-%m-%d'),
+            "max": fin.strftime('%Y-%m-%d')
         }
     }
 
+def appliquer_curseur(donnees: EtatDataset, selection, apres: Optional[str]):
+    """Partie de la sélection située après la ligne du curseur `apres` (s'il est fourni)"""
+    if not apres:
+        return selection
+    try:
+        return selection_apres(selection, position_curseur(donnees.index, apres))
+    except CurseurInvalide as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def suite_curseur(donnees: EtatPartitionne, filtres: Dict[str, Optional[str]], apres: Optional[str]):
+    """Moteur parquet : lignes suivant le curseur `apres` dans sa partition (None sans curseur)"""
+    if not apres:
+        return None
+    try:
+        return donnees.dataset.suite_curseur(filtres, apres)
+    except CurseurInvalide as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.get("/data/commandes", tags=["Données brutes"])
+@serialiser
+@parametres_filtres
 def get_commandes(
     limite: int = Query(100, ge=1, le=1000),
-    offset: int = Query(0, ge=0)
+    offset: int = Query(0, ge=0),
+    format: str = Query('records', regex=REGEX_FORMAT, description="Format des données : records ou columnar"),
+    apres: Optional[str] = Query(None, description="Curseur : commandes situées après cette ligne (curseur_suivant)"),
+    **filtres
 ):
     """
     📋 DONNÉES BRUTES
     
-    Retourne les commandes brutes avec pagination
+    Retourne les commandes brutes avec pagination, triées par date
+
+    Pour parcourir de nombreuses pages, passer le `curseur_suivant` de la
+    page précédente dans `apres` (pagination par curseur) : chaque page
+    coûte alors autant que la première, contrairement à `offset`.
     """
-    total = len(df)
-    commandes = df.iloc[offset:offset+limite]
+    donnees = etat
+    filtres = {parametre: filtres.get(parametre) for parametre in PARAMETRES_FILTRES}
+    if isinstance(donnees, EtatPartitionne):
+        # Moteur parquet : les partitions entièrement sautées par l'offset sont comptées sans être lues
+        total = donnees.dataset.compter_lignes(filtres)
+        lues = donnees.dataset.premieres(filtres, suite_curseur(donnees, filtres, apres), offset, limite + 1)
+        suivant = curseur_ligne(lues, limite - 1) if len(lues) > limite else None
+        commandes = lues.iloc[:limite]
+    else:
+        selection = donnees.index.selection(**filtres)
+        total = taille(selection)
+        selection = appliquer_curseur(donnees, selection, apres)
+        selection = tranche(selection, offset, taille(selection))
+        suivant = curseur_suivant(donnees.df, selection, limite)
+        commandes = lignes(donnees.df, tranche(selection, 0, limite))
     
-    # Conversion des dates en string pour JSON
-    commandes_dict = commandes.copy()
-    commandes_dict['Order Date'] = commandes_dict['Order Date'].dt.strftime('%Y-%m-%d')
-    commandes_dict['Ship Date'] = commandes_dict['Ship Date'].dt.strftime('%Y-%m-%d')
+    # Conversion des dates en string pour JSON (colonne par colonne)
+    commandes = commandes.assign(**{
+        'Order Date': commandes['Order Date'].dt.strftime('%Y-%m-%d'),
+        'Ship Date': commandes['Ship Date'].dt.strftime('%Y-%m-%d')
+    })
     
     return {
         "total": total,
         "limite": limite,
         "offset": offset,
-        "data": commandes_dict.to_dict('records')
+        "curseur_suivant": suivant,
+        "data": vers_tableau(commandes, format=format)
     }
 
+@app.get("/data/commandes/export", tags=["Données brutes"])
+@parametres_filtres
+def get_export_commandes(
+    format_export: str = Query('ndjson', regex=REGEX_EXPORT, description="Format : ndjson, csv ou arrow (Arrow IPC)"),
+    limite: Optional[int] = Query(None, ge=1, description="Nombre maximum de commandes (toutes si absent)"),
+    apres: Optional[str] = Query(None, description="Curseur : commandes situées après cette ligne"),
+    **filtres
+):
+    """
+    📤 EXPORT DES COMMANDES
+
+    Exporte les commandes filtrées en flux (NDJSON, CSV ou Arrow IPC), par
+    blocs de lignes : la mémoire utilisée ne dépend pas de la taille de
+    l'export. Avec `limite`, le curseur de la page suivante est renvoyé dans
+    l'en-tête X-Curseur-Suivant (à passer dans `apres`).
+    """
+    if format_export == 'arrow' and not arrow_disponible():
+        raise HTTPException(status_code=501, detail="Export Arrow indisponible : pyarrow n'est pas installé")
+    # État capturé : un rechargement pendant l'export ne le perturbe pas
+    donnees = etat
+    filtres = {parametre: filtres.get(parametre) for parametre in PARAMETRES_FILTRES}
+
+    en_tetes = {}
+    if isinstance(donnees, EtatPartitionne):
+        # Moteur parquet : partitions lues et exportées l'une après l'autre
+        suite = suite_curseur(donnees, filtres, apres)
+        if limite is not None:
+            suivantes = donnees.dataset.premieres(filtres, suite, limite - 1, 2)
+            if len(suivantes) == 2:
+                en_tetes["X-Curseur-Suivant"] = curseur_ligne(suivantes, 0)
+        contenu = exporter_blocs(donnees.dataset.blocs(filtres, suite, limite), format_export)
+    else:
+        selection = appliquer_curseur(donnees, donnees.index.selection(**filtres), apres)
+        if limite is not None:
+            suivant = curseur_suivant(donnees.df, selection, limite)
+            if suivant is not None:
+                en_tetes["X-Curseur-Suivant"] = suivant
+            selection = tranche(selection, 0, limite)
+        contenu = exporter(donnees.df, selection, format_export)
+    if format_export == 'csv':
+        en_tetes["Content-Disposition"] = 'attachment; filename="commandes.csv"'
+
+    return StreamingResponse(
+        contenu,
+        media_type=TYPES_EXPORT[format_export],
+        headers=en_tetes,
+    )
+
 # === DÉMARRAGE DU SERVEUR ===
 
 if __name__ == "__main__":
     import uvicorn
-    print("🚀 Démarrage de l'API Superstore BI sur http://localhost:8000")
-    print("📚 Documentation disponible sur http://localhost:8000/docs")
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    port = int(os.getenv("BACKEND_PORT", "8000"))
+    print(f"🚀 Démarrage de l'API Superstore BI sur http://localhost:{port}")
+    print(f"📚 Documentation disponible sur http://localhost:{port}/docs")
+    if API_WORKERS > 1:
+        # Les workers héritent de l'environnement : dataset chargé une seule fois
+        os.environ.setdefault("DATASET_SHM_DIR", DOSSIER_PAR_DEFAUT)
+        print(f"🔗 {API_WORKERS} workers, dataset partagé dans {os.environ['DATASET_SHM_DIR']}")
+        uvicorn.run("main:app", host="0.0.0.0", port=port, workers=API_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
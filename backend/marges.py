@@ -0,0 +1,308 @@
+"""
+Agrégats par produit et analyse des marges
+💹 Sommes par produit cumulées mois par mois au chargement, distributions
+   des marges calculées sur l'agrégat produits de la requête
+
+L'agrégat par produit (top produits, marges) regroupait toutes les lignes
+filtrées à chaque requête. Sur une plage de dates (éventuellement avec un
+filtre de catégorie, attribut du produit), il se déduit maintenant de
+sommes cumulées précalculées : les mois entièrement couverts par la
+plage sont la différence de deux cumuls (une ligne par produit), et seuls
+les jours des mois partiellement couverts, aux deux extrémités, sont relus
+dans le dataset trié par date (deux tranches contiguës). Au rechargement
+incrémental, seuls les mois à partir de la première ligne ajoutée sont
+recumulés.
+
+L'analyse des marges (percentiles, histogramme, tranches de remise,
+produits à perte) n'est qu'une suite de réductions vectorisées du même
+agrégat : elle n'ajoute aucun parcours des lignes.
+"""
+
+from typing import Any, Dict, Optional, Sequence
+import copy
+import numpy as np
+import pandas as pd
+
+from temporel import cles_periodes
+
+# Clé d'un produit (comme le regroupement des lignes)
+COLONNES_PRODUIT = ('Product Name', 'Category')
+
+# Mesures de l'agrégat par produit ; remise_ventes = somme de Sales x Discount
+# (remise moyenne pondérée par les ventes = remise_ventes / Sales)
+MESURES_PRODUITS = ('Sales', 'Quantity', 'Profit', 'remise_ventes')
+
+# Percentiles de la distribution des marges par produit (%)
+PERCENTILES_MARGE = (5, 10, 25, 50, 75, 90, 95)
+
+# Bornes des classes de marge (%) de l'histogramme, ouvertes aux deux extrémités
+CLASSES_MARGE = (-50, -25, -10, 0, 10, 20, 30, 40, 50)
+
+# Bornes des tranches de remise moyenne (0 à 1), la dernière est ouverte
+TRANCHES_REMISE = (0.0, 0.1, 0.2, 0.3, 0.5)
+
+# Décimales conservées avant le classement (écarts d'arrondi entre moteurs)
+DECIMALES_CLASSES = 6
+
+
+def valeurs_mesure(df: pd.DataFrame, mesure: str, debut: int = 0, fin: Optional[int] = None) -> np.ndarray:
+    """Valeurs d'une mesure de l'agrégat produits pour les lignes [debut, fin) (NaN comptés 0)"""
+    if mesure == 'remise_ventes':
+        return (np.nan_to_num(df['Sales'].to_numpy(dtype=np.float64)[debut:fin])
+                * np.nan_to_num(df['Discount'].to_numpy(dtype=np.float64)[debut:fin]))
+    return np.nan_to_num(df[mesure].to_numpy(dtype=np.float64)[debut:fin])
+
+
+def regrouper_produits(df: pd.DataFrame):
+    """
+    Produit de chaque ligne (regroupement trié sur COLONNES_PRODUIT)
+
+    Returns:
+        (codes int32, -1 pour une ligne sans nom ou catégorie ; produits,
+        DataFrame des clés dans l'ordre des codes)
+    """
+    groupes = df.groupby(list(COLONNES_PRODUIT), observed=True, sort=True)
+    codes = groupes.ngroup().fillna(-1).to_numpy().astype(np.int32)
+    return codes, groupes.size().index.to_frame(index=False)
+
+
+def recoder(codes: np.ndarray, places: np.ndarray) -> np.ndarray:
+    """Codes renumérotés (ancien code -> places[code]), -1 conservé"""
+    if not len(places):
+        return np.full(len(codes), -1, dtype=np.int32)
+    return np.where(codes >= 0, places[np.maximum(codes, 0)], -1).astype(np.int32)
+
+
+class CumulsProduits:
+    """
+    Sommes de chaque produit cumulées mois par mois
+
+    Attributes:
+        produits: Produits (Product Name, Category), dans l'ordre du regroupement des lignes
+        codes: Produit de chaque ligne du dataset (trié par date), -1 sans produit
+        mois: Clé (temporel.cles_periodes) de chaque mois présent
+        bornes: Position de la première ligne de chaque mois présent, plus le nombre de lignes
+        cumuls: Pour chaque mesure, tableau (mois + 1) x produits : sommes des mois précédents
+        lignes: Nombre de lignes des mois précédents, même disposition (produits présents)
+    """
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self.codes, self.produits = regrouper_produits(df)
+        self.mois = np.zeros(0, dtype=np.int64)
+        self.bornes = np.zeros(1, dtype=np.int64)
+        self.cumuls = {mesure: np.zeros((1, len(self.produits))) for mesure in MESURES_PRODUITS}
+        self.lignes = np.zeros((1, len(self.produits)), dtype=np.int32)
+        self._cumuler(0)
+
+    def etendre(self, df: pd.DataFrame, debut: int) -> 'CumulsProduits':
+        """
+        Nouveaux cumuls pour `df`, dont les lignes [0, debut) sont déjà cumulées ici
+
+        Les sommes du mois de la ligne `debut` et des suivants sont
+        recalculées depuis les lignes (même ordre de sommation qu'une
+        construction complète) puis cumulées à la suite des mois précédents,
+        repris tels quels. Les produits nouveaux prennent leur place dans
+        l'ordre du regroupement (colonnes des cumuls réordonnées). Les cumuls
+        actuels ne sont pas modifiés.
+
+        Args:
+            df: Dataset complet, trié par date
+            debut: Première ligne ajoutée ou modifiée (début d'un jour)
+        """
+        if debut >= len(df):
+            return self
+        cumuls = copy.copy(self)
+        cumuls.df = df
+        cle = cles_periodes(df['Order Date'].to_numpy()[debut:debut + 1], 'mois')[0]
+        mois = int(np.searchsorted(self.mois, cle, side='left'))
+        premiere = int(self.bornes[mois])
+
+        # Produits des lignes recalculées, placés parmi les produits connus
+        locaux, presents = regrouper_produits(df.iloc[premiere:])
+        connus = pd.MultiIndex.from_frame(self.produits.astype(object))
+        presents = pd.MultiIndex.from_frame(presents.astype(object))
+        tous = connus.union(presents) if not presents.isin(connus).all() else connus
+        codes = self.codes[:premiere]
+        precedents = {mesure: cumul[:mois + 1] for mesure, cumul in self.cumuls.items()}
+        precedents_lignes = self.lignes[:mois + 1]
+        if len(tous) > len(connus):
+            places = tous.get_indexer(connus)
+            codes = recoder(codes, places)
+
+            def replacer(cumul: np.ndarray) -> np.ndarray:
+                remplace = np.zeros((len(cumul), len(tous)), dtype=cumul.dtype)
+                remplace[:, places] = cumul
+                return remplace
+
+            precedents = {mesure: replacer(cumul) for mesure, cumul in precedents.items()}
+            precedents_lignes = replacer(precedents_lignes)
+            cumuls.produits = tous.to_frame(index=False)
+            for colonne in COLONNES_PRODUIT:
+                if isinstance(df[colonne].dtype, pd.CategoricalDtype):
+                    cumuls.produits[colonne] = cumuls.produits[colonne].astype(df[colonne].dtype)
+        cumuls.codes = np.concatenate([codes, recoder(locaux, tous.get_indexer(presents))])
+
+        cumuls.mois, cumuls.bornes = self.mois[:mois], self.bornes[:mois + 1]
+        cumuls.cumuls, cumuls.lignes = precedents, precedents_lignes
+        cumuls._cumuler(mois)
+        return cumuls
+
+    def _cumuler(self, mois: int):
+        """
+        Sommes des mois à partir du rang `mois` (première ligne bornes[mois]),
+        cumulées à la suite de cumuls[mois]
+        """
+        debut = int(self.bornes[mois])
+        # Dataset trié par date : chaque mois est une tranche contiguë
+        cles = cles_periodes(self.df['Order Date'].to_numpy()[debut:], 'mois')
+        nouveaux, debuts = np.unique(cles, return_index=True)
+        self.mois = np.concatenate([self.mois[:mois], nouveaux])
+        self.bornes = np.concatenate([self.bornes[:mois], debuts + debut, [len(self.df)]])
+        rangs_mois = np.repeat(np.arange(len(debuts)), np.diff(np.append(debuts, len(cles))))
+
+        # Lignes sans produit (nom ou catégorie manquants) : hors agrégat, comme au regroupement
+        nombre = len(self.produits)
+        codes = self.codes[debut:]
+        connues = codes >= 0
+        cellules = (rangs_mois * nombre + codes)[connues]
+        taille = len(debuts) * nombre
+
+        def cumuler(precedents: np.ndarray, sommes: np.ndarray) -> np.ndarray:
+            sommes = sommes.reshape(len(debuts), nombre).astype(precedents.dtype)
+            suite = np.cumsum(np.concatenate([precedents[mois:mois + 1], sommes]), axis=0, dtype=precedents.dtype)
+            return np.concatenate([precedents[:mois], suite])
+
+        self.cumuls = {
+            mesure: cumuler(self.cumuls[mesure], np.bincount(cellules, valeurs_mesure(self.df, mesure, debut)[connues],
+                                                             taille))
+            for mesure in MESURES_PRODUITS
+        }
+        self.lignes = cumuler(self.lignes, np.bincount(cellules, minlength=taille))
+
+    def __len__(self) -> int:
+        return len(self.produits)
+
+    def memoire(self) -> int:
+        """Octets occupés par les codes et les cumuls (hors dataset)"""
+        return int(self.codes.nbytes + self.mois.nbytes + self.bornes.nbytes + self.lignes.nbytes
+                   + sum(cumul.nbytes for cumul in self.cumuls.values()))
+
+    def agreger(self, debut: int, fin: int, categories: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """
+        Agrégat par produit des lignes [debut, fin) du dataset trié par date
+
+        Args:
+            debut / fin: Positions des lignes (IndexFiltres.bornes)
+            categories: Catégories retenues (None : toutes)
+
+        Returns:
+            pd.DataFrame (Product Name, Category, Sales, Quantity, Profit,
+            remise_ventes) des produits ayant au moins une ligne, dans
+            l'ordre du regroupement des lignes
+        """
+        # Mois entièrement couverts [premier, dernier) et lignes des mois partiels
+        premier = int(np.searchsorted(self.bornes, debut, side='left'))
+        dernier = int(np.searchsorted(self.bornes, fin, side='right')) - 1
+        if premier < dernier:
+            bords = [(debut, int(self.bornes[premier])), (int(self.bornes[dernier]), fin)]
+            sommes = {mesure: cumul[dernier] - cumul[premier] for mesure, cumul in self.cumuls.items()}
+            lignes = self.lignes[dernier] - self.lignes[premier]
+        else:
+            bords = [(debut, fin)]
+            sommes = {mesure: np.zeros(len(self.produits)) for mesure in self.cumuls}
+            lignes = np.zeros(len(self.produits), dtype=np.int32)
+
+        for a, b in bords:
+            if a >= b:
+                continue
+            codes = self.codes[a:b]
+            connues = codes >= 0
+            codes = codes[connues]
+            for mesure in self.cumuls:
+                sommes[mesure] = sommes[mesure] + np.bincount(codes, valeurs_mesure(self.df, mesure, a, b)[connues],
+                                                              len(self.produits))
+            lignes = lignes + np.bincount(codes, minlength=len(self.produits))
+
+        retenus = lignes > 0
+        if categories is not None:
+            retenus &= self.produits['Category'].isin(categories).to_numpy()
+        resultat = self.produits[retenus].reset_index(drop=True)
+        for mesure, valeurs in sommes.items():
+            resultat[mesure] = valeurs[retenus]
+        resultat['Quantity'] = np.rint(resultat['Quantity']).astype(np.int64)
+        return resultat
+
+
+def analyser_marges(marges: pd.DataFrame) -> Dict[str, Any]:
+    """
+    Distribution des marges par produit, tranches de remise et produits à perte
+
+    Args:
+        marges: Produits ayant des ventes, avec Sales, Profit, remise_ventes
+            et marge_pct (ContexteKPI.marges)
+
+    Returns:
+        dict : nb_produits, marge_globale_pct, percentiles ({"p50": ...}),
+        histogramme et remises (DataFrames, une ligne par classe / tranche)
+        et pertes (produits à perte)
+    """
+    ventes = marges['Sales'].to_numpy(dtype=np.float64)
+    profits = marges['Profit'].to_numpy(dtype=np.float64)
+    taux = marges['marge_pct'].to_numpy(dtype=np.float64)
+    remises = marges['remise_ventes'].to_numpy(dtype=np.float64) / ventes if len(ventes) else ventes
+    # Classes sur des valeurs arrondies : une remise de 10 % ou une marge de 20 % tombent
+    # dans la même classe quel que soit l'ordre des sommes (moteurs)
+    classes_taux, classes_remises = np.round(taux, DECIMALES_CLASSES), np.round(remises, DECIMALES_CLASSES)
+    a_perte = profits < 0
+    ca_total, profit_total = float(ventes.sum()), float(profits.sum())
+
+    if len(taux):
+        valeurs = np.percentile(taux, PERCENTILES_MARGE)
+        percentiles = {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES_MARGE, valeurs)}
+    else:
+        percentiles = {f"p{p}": None for p in PERCENTILES_MARGE}
+
+    def regrouper(classes: np.ndarray, nb_classes: int) -> Dict[str, np.ndarray]:
+        """Produits, CA, profit et produits à perte de chaque classe (bincount)"""
+        return {
+            "produits": np.bincount(classes, minlength=nb_classes),
+            "ca": np.bincount(classes, ventes, nb_classes),
+            "profit": np.bincount(classes, profits, nb_classes),
+            "produits_a_perte": np.bincount(classes, a_perte, nb_classes).astype(np.int64),
+        }
+
+    # Classe i : [bornes[i - 1], bornes[i]), la première et la dernière sont ouvertes
+    bornes = np.asarray(CLASSES_MARGE, dtype=np.float64)
+    histogramme = pd.DataFrame({
+        "marge_min": [None, *CLASSES_MARGE],
+        "marge_max": [*CLASSES_MARGE, None],
+        **regrouper(np.searchsorted(bornes, classes_taux, side='right'), len(bornes) + 1),
+    })
+
+    bornes = np.asarray(TRANCHES_REMISE, dtype=np.float64)
+    tranches = np.maximum(np.searchsorted(bornes, classes_remises, side='right') - 1, 0)
+    par_remise = pd.DataFrame({
+        "remise_min": list(TRANCHES_REMISE),
+        "remise_max": [*TRANCHES_REMISE[1:], None],
+        **regrouper(tranches, len(bornes)),
+    })
+    with np.errstate(divide='ignore', invalid='ignore'):
+        par_remise["marge_pct"] = np.where(par_remise["ca"] > 0, par_remise["profit"] / par_remise["ca"] * 100, 0.0)
+
+    nb_pertes = int(np.count_nonzero(a_perte))
+    ca_pertes = float(ventes[a_perte].sum())
+    return {
+        "nb_produits": len(marges),
+        "marge_globale_pct": round(profit_total / ca_total * 100, 2) if ca_total else 0.0,
+        "percentiles": percentiles,
+        "histogramme": histogramme,
+        "remises": par_remise,
+        "pertes": {
+            "produits": nb_pertes,
+            "part_produits_pct": round(nb_pertes / len(marges) * 100, 2) if len(marges) else 0.0,
+            "ca": round(ca_pertes, 2),
+            "profit": round(float(profits[a_perte].sum()), 2),
+            "part_ca_pct": round(ca_pertes / ca_total * 100, 2) if ca_total else 0.0,
+        },
+    }
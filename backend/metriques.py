@@ -0,0 +1,301 @@
+"""
+Métriques de performance de l'API
+📏 Durées par endpoint et par phase, lignes parcourues, cache, profilage
+
+Un middleware ASGI ouvre pour chaque requête HTTP un relevé (Mesures)
+rangé dans une variable de contexte : le code de calcul y ajoute la durée
+de ses phases (filtre, agrégation, sérialisation), le nombre de lignes et
+de cellules du cube parcourues et l'issue de ses lectures du cache, sans
+connaître la requête. À la fin de la requête, le relevé alimente les
+histogrammes et compteurs exposés au format texte de Prometheus.
+
+Avec `?profile=1` (ou l'en-tête X-Profile: 1) et si le profilage est
+autorisé, la requête est exécutée sous cProfile et la réponse est
+remplacée par le rapport (texte). Les calculs KPI sont alors faits sans
+cache, dans le thread de la boucle (le seul que cProfile observe) ; les
+endpoints synchrones (données brutes) s'exécutent hors de ce thread et
+n'apparaissent que partiellement.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import bisect
+import cProfile
+import contextvars
+import io
+import pstats
+import threading
+import time
+from urllib.parse import parse_qs
+
+# Bornes des histogrammes de durée (secondes)
+BORNES_DUREES = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Libellé des requêtes ne correspondant à aucune route (cardinalité bornée)
+ROUTE_INCONNUE = "inconnue"
+
+# Nombre de fonctions listées dans un rapport de profilage
+LIGNES_PROFIL = 40
+
+# En-tête demandant le profilage (nom en minuscules, comme dans le scope ASGI)
+ENTETE_PROFIL = b"x-profile"
+
+
+class Mesures:
+    """
+    Relevé d'une requête, rempli par le code de calcul
+
+    Attributes:
+        phases: Durée cumulée de chaque phase (secondes)
+        lignes: Lignes du dataset parcourues
+        cellules: Cellules du cube parcourues
+        cache: Lectures du cache {'hit': n, 'miss': n}
+        profilage: Requête exécutée sous le profileur (calculs hors cache et hors pool)
+    """
+
+    def __init__(self, profilage: bool = False):
+        self.phases: Dict[str, float] = {}
+        self.lignes = 0
+        self.cellules = 0
+        self.cache = {'hit': 0, 'miss': 0}
+        self.profilage = profilage
+
+
+# Relevé de la requête en cours (None hors requête HTTP)
+MESURES: contextvars.ContextVar[Optional[Mesures]] = contextvars.ContextVar("mesures", default=None)
+
+
+@contextmanager
+def phase(nom: str):
+    """Ajoute la durée du bloc à la phase `nom` de la requête en cours"""
+    mesures = MESURES.get()
+    if mesures is None:
+        yield
+        return
+    debut = time.perf_counter()
+    try:
+        yield
+    finally:
+        mesures.phases[nom] = mesures.phases.get(nom, 0.0) + time.perf_counter() - debut
+
+
+def compter_parcours(lignes: int = 0, cellules: int = 0):
+    """Ajoute des lignes / cellules parcourues au relevé de la requête en cours"""
+    mesures = MESURES.get()
+    if mesures is not None:
+        mesures.lignes += lignes
+        mesures.cellules += cellules
+
+
+def noter_cache(trouve: bool):
+    """Note une lecture du cache (hit ou miss) dans le relevé de la requête en cours"""
+    mesures = MESURES.get()
+    if mesures is not None:
+        mesures.cache['hit' if trouve else 'miss'] += 1
+
+
+def profilage_en_cours() -> bool:
+    """Indique si la requête en cours est profilée"""
+    mesures = MESURES.get()
+    return mesures is not None and mesures.profilage
+
+
+# === AGRÉGATION ET EXPOSITION ===
+
+class Histogramme:
+    """Histogramme cumulatif de durées (format Prometheus)"""
+
+    def __init__(self, bornes: Tuple[float, ...] = BORNES_DUREES):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur: float):
+        self.comptes[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def lignes(self, nom: str, etiquettes: str) -> Iterable[str]:
+        """Lignes _bucket (cumulées), _sum et _count"""
+        cumul = 0
+        for borne, compte in zip((*map(repr, self.bornes), "+Inf"), self.comptes):
+            cumul += compte
+            yield f'{nom}_bucket{{{etiquettes},le="{borne}"}} {cumul}'
+        yield f'{nom}_sum{{{etiquettes}}} {self.somme}'
+        yield f'{nom}_count{{{etiquettes}}} {self.nombre}'
+
+
+def echapper(valeur: str) -> str:
+    """Valeur d'étiquette Prometheus (antislash, guillemets, retours à la ligne)"""
+    return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def etiquettes(**valeurs: str) -> str:
+    """Étiquettes Prometheus : cle="valeur",..."""
+    return ",".join(f'{cle}="{echapper(valeur)}"' for cle, valeur in valeurs.items())
+
+
+class Metriques:
+    """
+    Métriques cumulées depuis le démarrage du processus
+
+    Args:
+        jauges: Fonction appelée à chaque exposition, renvoyant des jauges
+            [(nom, aide, {étiquettes}, valeur)] (dataset, cache, pool...)
+    """
+
+    def __init__(self, jauges: Optional[Callable[[], List[Tuple[str, str, Dict[str, str], float]]]] = None):
+        self.jauges = jauges
+        self._verrou = threading.Lock()
+        self.requetes: Dict[Tuple[str, str, int], int] = {}
+        self.durees: Dict[Tuple[str, str], Histogramme] = {}
+        self.phases: Dict[Tuple[str, str], Histogramme] = {}
+        self.lignes: Dict[str, int] = {}
+        self.cellules: Dict[str, int] = {}
+        self.cache: Dict[Tuple[str, str], int] = {}
+
+    def observer(self, methode: str, route: str, statut: int, duree: float, mesures: Mesures):
+        """Enregistre une requête terminée et son relevé"""
+        with self._verrou:
+            cle = (route, methode, statut)
+            self.requetes[cle] = self.requetes.get(cle, 0) + 1
+            self.durees.setdefault((route, methode), Histogramme()).observer(duree)
+            for nom, valeur in mesures.phases.items():
+                self.phases.setdefault((route, nom), Histogramme()).observer(valeur)
+            if mesures.lignes:
+                self.lignes[route] = self.lignes.get(route, 0) + mesures.lignes
+            if mesures.cellules:
+                self.cellules[route] = self.cellules.get(route, 0) + mesures.cellules
+            for resultat, nombre in mesures.cache.items():
+                if nombre:
+                    self.cache[(route, resultat)] = self.cache.get((route, resultat), 0) + nombre
+
+    def exposer(self) -> str:
+        """Toutes les métriques au format texte de Prometheus (version 0.0.4)"""
+        sortie: List[str] = []
+
+        def entete(nom: str, type: str, aide: str):
+            sortie.append(f"# HELP {nom} {aide}")
+            sortie.append(f"# TYPE {nom} {type}")
+
+        with self._verrou:
+            entete("superstore_requetes_total", "counter", "Requêtes HTTP terminées")
+            for (route, methode, statut), nombre in sorted(self.requetes.items()):
+                valeurs = etiquettes(route=route, methode=methode, statut=str(statut))
+                sortie.append(f"superstore_requetes_total{{{valeurs}}} {nombre}")
+
+            entete("superstore_requete_duree_secondes", "histogram", "Durée des requêtes HTTP (réponse complète)")
+            for (route, methode), histogramme in sorted(self.durees.items()):
+                sortie.extend(histogramme.lignes("superstore_requete_duree_secondes",
+                                                 etiquettes(route=route, methode=methode)))
+
+            entete("superstore_phase_duree_secondes", "histogram",
+                   "Durée par requête de chaque phase (filtre, agregation, serialisation)")
+            for (route, nom), histogramme in sorted(self.phases.items()):
+                sortie.extend(histogramme.lignes("superstore_phase_duree_secondes", etiquettes(route=route, phase=nom)))
+
+            entete("superstore_lignes_parcourues_total", "counter", "Lignes du dataset parcourues")
+            for route, nombre in sorted(self.lignes.items()):
+                sortie.append(f"superstore_lignes_parcourues_total{{{etiquettes(route=route)}}} {nombre}")
+
+            entete("superstore_cellules_parcourues_total", "counter", "Cellules du cube journalier parcourues")
+            for route, nombre in sorted(self.cellules.items()):
+                sortie.append(f"superstore_cellules_parcourues_total{{{etiquettes(route=route)}}} {nombre}")
+
+            entete("superstore_cache_lectures_total", "counter", "Lectures du cache des KPI (hit / miss)")
+            for (route, resultat), nombre in sorted(self.cache.items()):
+                sortie.append(f"superstore_cache_lectures_total{{{etiquettes(route=route, resultat=resultat)}}} {nombre}")
+
+        if self.jauges is not None:
+            vues = set()
+            for nom, aide, valeurs, valeur in self.jauges():
+                if nom not in vues:
+                    entete(nom, "gauge", aide)
+                    vues.add(nom)
+                suffixe = f"{{{etiquettes(**valeurs)}}}" if valeurs else ""
+                sortie.append(f"{nom}{suffixe} {valeur}")
+
+        return "\n".join(sortie) + "\n"
+
+
+# === MIDDLEWARE ===
+
+def profilage_demande(scope) -> bool:
+    """?profile=1 ou en-tête X-Profile: 1"""
+    for nom, valeur in scope.get("headers", ()):
+        if nom == ENTETE_PROFIL and valeur.strip() in (b"1", b"true"):
+            return True
+    parametres = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return parametres.get("profile", [""])[-1] in ("1", "true")
+
+
+def rapport_profil(profileur: cProfile.Profile, duree: float, statut: int) -> bytes:
+    """Rapport texte : fonctions triées par temps cumulé, puis par temps propre"""
+    tampon = io.StringIO()
+    tampon.write(f"Durée : {duree * 1000:.2f} ms (statut {statut})\n\n")
+    statistiques = pstats.Stats(profileur, stream=tampon)
+    statistiques.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(LIGNES_PROFIL)
+    statistiques.sort_stats(pstats.SortKey.TIME).print_stats(LIGNES_PROFIL // 2)
+    return tampon.getvalue().encode("utf-8")
+
+
+class MiddlewareMetriques:
+    """
+    Middleware ASGI : relevé par requête, durée jusqu'au dernier octet
+    envoyé (réponses en flux comprises) et profilage à la demande
+
+    Args:
+        app: Application ASGI
+        metriques: Métriques alimentées à la fin de chaque requête
+        profilage: Autoriser ?profile=1 (sinon le paramètre est ignoré)
+    """
+
+    def __init__(self, app, metriques: Metriques, profilage: bool = False):
+        self.app = app
+        self.metriques = metriques
+        self.profilage = profilage
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        profileur = cProfile.Profile() if self.profilage and profilage_demande(scope) else None
+        mesures = Mesures(profilage=profileur is not None)
+        jeton = MESURES.set(mesures)
+        statut = 500
+
+        async def envoyer(message):
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+            # Profilage : la réponse est remplacée par le rapport
+            if profileur is None:
+                await send(message)
+
+        debut = time.perf_counter()
+        try:
+            if profileur is not None:
+                profileur.enable()
+            try:
+                await self.app(scope, receive, envoyer)
+            finally:
+                if profileur is not None:
+                    profileur.disable()
+        finally:
+            duree = time.perf_counter() - debut
+            MESURES.reset(jeton)
+            route = scope.get("route")
+            chemin = getattr(route, "path", ROUTE_INCONNUE)
+            self.metriques.observer(scope["method"], chemin, statut, duree, mesures)
+
+        if profileur is not None:
+            rapport = rapport_profil(profileur, duree, statut)
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"text/plain; charset=utf-8"),
+                            (b"content-length", str(len(rapport)).encode())],
+            })
+            await send({"type": "http.response.body", "body": rapport})
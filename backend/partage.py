@@ -0,0 +1,103 @@
+"""
+Dataset partagé entre les workers uvicorn
+🔗 Un seul processus charge le dataset, les autres s'y attachent sans copie
+
+Le premier worker qui démarre prend un verrou, charge le dataset (snapshot
+ou CSV) et publie ses colonnes dans un dossier en mémoire partagée
+(`/dev/shm` : tmpfs POSIX). Les workers suivants attendent le verrou puis
+ouvrent ces colonnes en mémoire mappée : des tableaux numpy en lecture
+seule, dont les pages sont communes à tous les processus.
+
+Une publication n'est valable que pour la session qui l'a écrite (même
+processus superviseur uvicorn, même source) : un redémarrage du serveur
+recharge donc toujours le dataset.
+"""
+
+from contextlib import contextmanager
+from typing import Callable, Optional
+import logging
+import os
+
+import pandas as pd
+
+from snapshot import ecrire_colonnes, lire_manifeste, ouvrir_colonnes
+
+try:
+    import fcntl
+except ImportError:  # fcntl absent (Windows) : pas de verrou, chaque worker peut publier
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Dossier par défaut : tmpfs si disponible (pages en RAM, jamais sur disque)
+DOSSIER_PAR_DEFAUT = "/dev/shm/superstore-bi" if os.path.isdir("/dev/shm") else os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "snapshot-partage"
+)
+
+
+def jeton_session(source: str) -> str:
+    """
+    Identifiant de la session de workers
+
+    Les workers d'un même serveur ont le même processus parent (le
+    superviseur uvicorn) : une publication d'un serveur précédent est ignorée.
+    """
+    return f"{os.getppid()}:{source}"
+
+
+@contextmanager
+def verrou(dossier: str):
+    """Verrou exclusif entre processus (fichier voisin du dossier partagé)"""
+    parent = os.path.dirname(os.path.abspath(dossier))
+    os.makedirs(parent, exist_ok=True)
+    if fcntl is None:
+        yield
+        return
+    with open(os.path.abspath(dossier) + ".lock", 'w') as fichier:
+        fcntl.flock(fichier, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(fichier, fcntl.LOCK_UN)
+
+
+def publier_dataset(df: pd.DataFrame, dossier: str, jeton: str) -> None:
+    """Écrit les colonnes du dataset dans la mémoire partagée"""
+    ecrire_colonnes(df, dossier, {"jeton": jeton})
+    logger.info(f"🔗 Dataset publié en mémoire partagée dans {dossier} ({len(df)} lignes)")
+
+
+def attacher_dataset(dossier: str, jeton: str) -> Optional[pd.DataFrame]:
+    """
+    Ouvre le dataset publié par la session courante
+
+    Returns:
+        pd.DataFrame (colonnes en lecture seule) ou None si absent / d'une autre session
+    """
+    manifeste = lire_manifeste(dossier)
+    if manifeste is None or manifeste.get("jeton") != jeton:
+        return None
+    return ouvrir_colonnes(dossier, manifeste)
+
+
+def charger_partage(dossier: str, source: str, chargement: Callable[[], pd.DataFrame]) -> pd.DataFrame:
+    """
+    Dataset partagé : publié par le premier worker, attaché par les suivants
+
+    Args:
+        dossier: Dossier de la mémoire partagée
+        source: Source du dataset (chemin ou URL), fait partie du jeton
+        chargement: Chargement complet, appelé par un seul worker
+
+    Returns:
+        pd.DataFrame: Colonnes en mémoire mappée, en lecture seule
+    """
+    jeton = jeton_session(source)
+    with verrou(dossier):
+        df = attacher_dataset(dossier, jeton)
+        if df is None:
+            publier_dataset(chargement(), dossier, jeton)
+            df = attacher_dataset(dossier, jeton)
+        else:
+            logger.info(f"🔗 Dataset attaché depuis la mémoire partagée : {len(df)} lignes")
+    return df
@@ -0,0 +1,627 @@
+"""
+Dataset partitionné sur disque
+🗄️ Parquet par année et par mois, parcouru une partition à la fois
+
+Pour un historique plus grand que la mémoire : le CSV est converti une
+fois, par blocs, en fichiers Parquet rangés par mois de commande
+(annee=2016/mois=03/bloc-00000.parquet), puis chaque requête lit les
+partitions l'une après l'autre. Seules les partitions de la plage de dates
+demandée sont ouvertes (élagage) ; les filtres Category / Region / Segment
+et les bornes de dates sont transmis au lecteur Parquet (statistiques des
+groupes de lignes, puis filtrage pendant la lecture) et seules les
+colonnes utiles sont décodées. Chaque partition donne des agrégats
+partiels, fusionnés à la fin.
+
+Les clients et les produits reçoivent à la conversion un code entier
+global (dictionnaires conservés à part, voir cube.coder) : les agrégats
+par client ou par produit sont des tableaux de la taille du dictionnaire,
+cumulés partition après partition. La mémoire dépend de la taille d'une
+partition (un mois) et du nombre de clients et de produits, pas du nombre
+total de lignes.
+
+Une commande n'a qu'une date : toutes ses lignes sont dans la même
+partition, et les commandes distinctes se comptent partition par partition.
+"""
+
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from cube import coder
+from export import TAILLE_BLOC as TAILLE_BLOC_EXPORT, CurseurInvalide, decoder_curseur, encoder_curseur
+from fidelite import commandes_vides, regrouper_commandes, trier_commandes
+from filtres import COLONNES_INDEXEES, Filtres, convertir_date, filtrer_par_masques
+from metriques import compter_parcours, phase
+from requetes import RequeteDeleguee
+from snapshot import decrire_source, empreinte_fichier
+from temporel import cles_periodes
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow est optionnel : moteur parquet indisponible
+    pa = ds = pq = None
+
+logger = logging.getLogger(__name__)
+
+MANIFESTE = "manifeste.json"
+VERSION_FORMAT = 2
+
+# Lignes du CSV lues et converties à la fois
+TAILLE_BLOC = 500_000
+
+# Dictionnaires des clients et des produits (code -> libellés)
+FICHIER_CLIENTS = "clients.parquet"
+FICHIER_PRODUITS = "produits.parquet"
+
+# Colonnes ajoutées aux partitions : codes globaux
+CODE_CLIENT = 'code_client'
+CODE_PRODUIT = 'code_produit'
+
+# Séparateur de la clé produit (Product Name, Category) lors du codage
+SEPARATEUR = "\x1f"
+
+# Colonnes dont les valeurs distinctes sont conservées dans le manifeste (/filters/valeurs)
+COLONNES_VALEURS = tuple(COLONNES_INDEXEES.values())
+
+
+def parquet_disponible() -> bool:
+    """Indique si le moteur parquet est utilisable (pyarrow installé)"""
+    return pq is not None
+
+
+def verifier_parquet():
+    if pq is None:
+        raise RuntimeError("Moteur parquet indisponible : pyarrow n'est pas installé")
+
+
+# === CONVERSION ===
+
+def ecrire_partitions(source: str, dossier: str, nettoyer: Callable[[pd.DataFrame], pd.DataFrame],
+                      taille_bloc: int = TAILLE_BLOC, encoding: str = 'latin-1') -> Dict[str, Any]:
+    """
+    Convertit le CSV en partitions Parquet (remplacement atomique du dossier)
+
+    Le CSV est lu par blocs de `taille_bloc` lignes : chaque bloc est
+    nettoyé, codé (clients, produits) puis réparti entre les mois qu'il
+    contient. Une partition contient un fichier par bloc, dans l'ordre du
+    CSV.
+
+    Args:
+        source: Chemin ou URL du CSV
+        dossier: Dossier des partitions
+        nettoyer: Nettoyage d'un bloc de lignes brutes (schéma compact)
+
+    Returns:
+        Manifeste écrit
+    """
+    verifier_parquet()
+    parent = os.path.dirname(os.path.abspath(dossier))
+    os.makedirs(parent, exist_ok=True)
+    temporaire = tempfile.mkdtemp(prefix=".partitions-", dir=parent)
+
+    clients, noms_clients = pd.Index([], dtype=object), []
+    produits = pd.Index([], dtype=object)
+    partitions: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    valeurs = {colonne: set() for colonne in COLONNES_VALEURS}
+    schema, nb_lignes, date_min, date_max = None, 0, None, None
+
+    try:
+        for numero, brut in enumerate(pd.read_csv(source, encoding=encoding, chunksize=taille_bloc)):
+            bloc = nettoyer(brut)
+            if bloc.empty:
+                continue
+
+            # Codes globaux : les valeurs nouvelles sont ajoutées aux dictionnaires
+            connus = len(clients)
+            codes_clients, clients = coder(clients, bloc['Customer ID'])
+            noms = pd.Series(bloc['Customer Name'].to_numpy(dtype=object)).groupby(codes_clients).first()
+            noms_clients.extend(noms[noms.index >= connus].tolist())
+            cles_produits = bloc['Product Name'].astype(str) + SEPARATEUR + bloc['Category'].astype(str)
+            codes_produits, produits = coder(produits, cles_produits)
+
+            categories = [colonne for colonne in bloc.columns if isinstance(bloc[colonne].dtype, pd.CategoricalDtype)]
+            bloc = bloc.astype({colonne: object for colonne in categories}).assign(**{
+                CODE_CLIENT: codes_clients.astype(np.int32),
+                CODE_PRODUIT: codes_produits.astype(np.int32),
+            })
+            for colonne in COLONNES_VALEURS:
+                if colonne in bloc:
+                    valeurs[colonne].update(bloc[colonne].dropna().unique().tolist())
+
+            # Répartition par mois de commande, ordre du CSV conservé
+            dates = bloc['Order Date']
+            date_min = dates.min() if date_min is None else min(date_min, dates.min())
+            date_max = dates.max() if date_max is None else max(date_max, dates.max())
+            mois = (dates.dt.year * 12 + dates.dt.month - 1).to_numpy()
+            for cle in np.unique(mois):
+                annee, numero_mois = divmod(int(cle), 12)
+                lignes = bloc[mois == cle]
+                table = pa.Table.from_pandas(lignes, schema=schema, preserve_index=False)
+                schema = table.schema if schema is None else schema
+                partition = partitions.setdefault((annee, numero_mois + 1), {
+                    "annee": annee, "mois": numero_mois + 1, "lignes": 0, "fichiers": [],
+                })
+                relatif = os.path.join(f"annee={annee}", f"mois={numero_mois + 1:02d}", f"bloc-{numero:05d}.parquet")
+                os.makedirs(os.path.dirname(os.path.join(temporaire, relatif)), exist_ok=True)
+                pq.write_table(table, os.path.join(temporaire, relatif))
+                partition["lignes"] += len(lignes)
+                partition["fichiers"].append(relatif)
+            nb_lignes += len(bloc)
+
+        # Dictionnaires : code -> identifiant (et nom du premier enregistrement)
+        pq.write_table(pa.table({
+            'Customer ID': clients.to_numpy(dtype=object).astype(str),
+            'Customer Name': np.asarray(noms_clients, dtype=object),
+        }), os.path.join(temporaire, FICHIER_CLIENTS))
+        cles = produits.to_numpy(dtype=object).astype(str)
+        separees = np.char.partition(cles, SEPARATEUR) if len(cles) else np.empty((0, 3), dtype=str)
+        pq.write_table(pa.table({
+            'Product Name': separees[:, 0].astype(object),
+            'Category': separees[:, 2].astype(object),
+        }), os.path.join(temporaire, FICHIER_PRODUITS))
+
+        manifeste = {
+            "version": VERSION_FORMAT,
+            "source": decrire_source(source) if os.path.exists(source) else {"chemin": source},
+            "lignes": nb_lignes,
+            "dates": {
+                "min": date_min.isoformat() if date_min is not None else None,
+                "max": date_max.isoformat() if date_max is not None else None,
+            },
+            "valeurs": {colonne: sorted(valeurs[colonne]) for colonne in COLONNES_VALEURS},
+            "clients": len(clients),
+            "produits": len(produits),
+            "partitions": [partitions[cle] for cle in sorted(partitions)],
+        }
+        with open(os.path.join(temporaire, MANIFESTE), 'w', encoding='utf-8') as fichier:
+            json.dump(manifeste, fichier, ensure_ascii=False)
+    except BaseException:
+        shutil.rmtree(temporaire, ignore_errors=True)
+        raise
+
+    # Remplacement atomique : un lecteur ne voit jamais des partitions à moitié écrites
+    ancien = None
+    if os.path.exists(dossier):
+        ancien = tempfile.mkdtemp(prefix=".ancien-", dir=parent)
+        os.replace(dossier, os.path.join(ancien, "partitions"))
+    os.replace(temporaire, dossier)
+    if ancien:
+        shutil.rmtree(ancien, ignore_errors=True)
+    logger.info(f"🗄️ {nb_lignes} lignes converties en {len(partitions)} partitions dans {dossier}")
+    return manifeste
+
+
+def partitions_valides(dossier: str, source: str) -> Optional[Dict[str, Any]]:
+    """
+    Manifeste des partitions s'il correspond toujours à la source
+
+    Même règle que le snapshot : même taille et même date de modification,
+    ou à défaut même empreinte SHA-256. Une source distante (URL) n'est
+    convertie qu'une fois.
+    """
+    chemin_manifeste = os.path.join(dossier, MANIFESTE)
+    try:
+        with open(chemin_manifeste, encoding='utf-8') as fichier:
+            manifeste = json.load(fichier)
+    except (OSError, ValueError):
+        return None
+    if manifeste.get("version") != VERSION_FORMAT:
+        return None
+
+    connu = manifeste["source"]
+    if not os.path.exists(source):
+        return manifeste if connu["chemin"] == source else None
+    actuel = decrire_source(source, avec_empreinte=False)
+    if actuel["chemin"] != connu["chemin"] or actuel["taille"] != connu.get("taille"):
+        return None
+    if actuel["mtime_ns"] == connu["mtime_ns"] or empreinte_fichier(source) == connu["sha256"]:
+        return manifeste
+    return None
+
+
+def charger_partitions(dossier: str, source: str,
+                       nettoyer: Callable[[pd.DataFrame], pd.DataFrame]) -> 'DatasetPartitionne':
+    """Ouvre les partitions de `dossier`, après conversion de la source si elles sont absentes ou périmées"""
+    verifier_parquet()
+    manifeste = partitions_valides(dossier, source)
+    if manifeste is None:
+        logger.info(f"🗄️ Conversion de {source} en partitions Parquet")
+        manifeste = ecrire_partitions(source, dossier, nettoyer)
+    return DatasetPartitionne(dossier, manifeste)
+
+
+# === LECTURE ===
+
+def expression_filtres(**filtres):
+    """Filtres transmis au lecteur Parquet (None si aucun)"""
+    filtres = Filtres(**filtres)
+    conditions = []
+    if filtres.debut is not None:
+        conditions.append(ds.field('Order Date') >= pa.scalar(filtres.debut.to_datetime64(), pa.timestamp('ns')))
+    if filtres.fin is not None:
+        conditions.append(ds.field('Order Date') <= pa.scalar(filtres.fin.to_datetime64(), pa.timestamp('ns')))
+    for colonne, valeurs in filtres.dimensions.items():
+        conditions.append(ds.field(colonne).isin(list(valeurs)))
+    for colonne, (minimum, maximum) in filtres.intervalles.items():
+        if minimum is not None:
+            conditions.append(ds.field(colonne) >= minimum)
+        if maximum is not None:
+            conditions.append(ds.field(colonne) <= maximum)
+    if not conditions:
+        return None
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return expression
+
+
+class DatasetPartitionne:
+    """
+    Partitions Parquet d'un dataset, lues à la demande
+
+    Attributes:
+        dossier: Dossier des partitions
+        manifeste: Description (source, partitions, valeurs des filtres)
+        partitions: (année, mois, fichiers) triés chronologiquement
+        clients: Dictionnaire des clients (Customer ID, Customer Name ; position = code)
+        produits: Dictionnaire des produits (Product Name, Category ; position = code)
+    """
+
+    def __init__(self, dossier: str, manifeste: Dict[str, Any]):
+        verifier_parquet()
+        self.dossier = dossier
+        self.manifeste = manifeste
+        self.partitions = [
+            (partition["annee"], partition["mois"], [os.path.join(dossier, f) for f in partition["fichiers"]])
+            for partition in manifeste["partitions"]
+        ]
+        self.clients = pq.read_table(os.path.join(dossier, FICHIER_CLIENTS)).to_pandas()
+        self.produits = pq.read_table(os.path.join(dossier, FICHIER_PRODUITS)).to_pandas()
+        # Ordre des agrégats en mémoire (groupby) : identifiants triés
+        self.ordre_clients = np.argsort(self.clients['Customer ID'].to_numpy(dtype=str), kind='stable')
+        self.ordre_produits = self.produits.sort_values(['Product Name', 'Category'], kind='stable').index.to_numpy()
+        self._datasets: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return self.manifeste["lignes"]
+
+    def memoire(self) -> int:
+        """Octets occupés en mémoire (dictionnaires des clients et des produits)"""
+        return int(self.clients.memory_usage(deep=True).sum() + self.produits.memory_usage(deep=True).sum()
+                   + self.ordre_clients.nbytes + self.ordre_produits.nbytes)
+
+    def retenues(self, date_debut: Optional[str] = None, date_fin: Optional[str] = None) -> List[int]:
+        """Numéros des partitions recoupant la plage de dates (élagage)"""
+        debut, fin = convertir_date(date_debut), convertir_date(date_fin)
+        premier = debut.year * 12 + debut.month - 1 if debut is not None else None
+        dernier = fin.year * 12 + fin.month - 1 if fin is not None else None
+        return [
+            numero for numero, (annee, mois, _) in enumerate(self.partitions)
+            if (premier is None or annee * 12 + mois - 1 >= premier)
+            and (dernier is None or annee * 12 + mois - 1 <= dernier)
+        ]
+
+    def _dataset(self, numero: int):
+        """Fichiers d'une partition (ouverts une fois)"""
+        dataset = self._datasets.get(numero)
+        if dataset is None:
+            dataset = ds.dataset(self.partitions[numero][2], format='parquet')
+            self._datasets[numero] = dataset
+        return dataset
+
+    def lire(self, numero: int, colonnes: Optional[List[str]] = None, **filtres) -> pd.DataFrame:
+        """Lignes filtrées d'une partition, dans l'ordre du CSV"""
+        with phase('filtre'):
+            table = self._dataset(numero).to_table(columns=colonnes, filter=expression_filtres(**filtres))
+            lignes = table.to_pandas()
+        compter_parcours(lignes=len(lignes))
+        return lignes
+
+    def compter(self, numero: int, **filtres) -> int:
+        """Nombre de lignes filtrées d'une partition"""
+        with phase('filtre'):
+            return self._dataset(numero).count_rows(filter=expression_filtres(**filtres))
+
+    def parcourir(self, colonnes: List[str], **filtres) -> Iterator[pd.DataFrame]:
+        """Lignes filtrées, partition par partition (chronologiquement)"""
+        for numero in self.retenues(filtres.get("date_debut"), filtres.get("date_fin")):
+            lignes = self.lire(numero, colonnes, **filtres)
+            if len(lignes):
+                yield lignes
+
+    # === AGRÉGATS ===
+
+    def agreger(self, filtres: Dict[str, Optional[str]], agregations: Dict[str, str],
+                par: Union[None, str, Tuple[str, ...]] = None, granularite: Optional[str] = None):
+        """
+        Équivalent de groupby(par).agg(agregations) sur les lignes filtrées
+        (même contrat que ContexteKPI.agreger, comptages distincts exacts)
+
+        Les sommes et les commandes distinctes de chaque partition sont
+        additionnées ; les autres comptages distincts (clients) fusionnent
+        les paires (groupe, valeur) vues dans chaque partition.
+        """
+        distincts = [colonne for colonne, fonction in agregations.items()
+                     if fonction == 'nunique' and colonne != 'Order ID']
+        lues = {CODE_CLIENT if colonne == 'Customer ID' else colonne for colonne in agregations}
+        if par == 'periode':
+            lues.add('Order Date')
+        elif isinstance(par, tuple):
+            lues.update(par)
+        elif par is not None:
+            lues.add(par)
+
+        total: Optional[pd.DataFrame] = None
+        paires: Dict[str, Optional[pd.DataFrame]] = {colonne: None for colonne in distincts}
+        entiers = {colonne for colonne, fonction in agregations.items() if fonction == 'nunique'}
+        for lignes in self.parcourir(sorted(lues), **filtres):
+            with phase('agregation'):
+                if par is None:
+                    groupes = np.zeros(len(lignes), dtype=np.int64)
+                elif par == 'periode':
+                    groupes = cles_periodes(lignes['Order Date'].to_numpy(), granularite)
+                elif isinstance(par, tuple):
+                    # Clé de groupe : tuple des valeurs de chaque colonne
+                    groupes = pd.MultiIndex.from_arrays([lignes[colonne].to_numpy() for colonne in par]).to_numpy()
+                else:
+                    groupes = lignes[par].to_numpy()
+
+                additives = {colonne: fonction for colonne, fonction in agregations.items() if colonne not in distincts}
+                entiers.update(colonne for colonne, fonction in additives.items()
+                               if fonction == 'sum' and pd.api.types.is_integer_dtype(lignes[colonne]))
+                partiel = lignes.groupby(groupes, sort=False).agg(additives) if additives else None
+                if partiel is not None:
+                    total = partiel if total is None else total.add(partiel, fill_value=0)
+
+                for colonne in distincts:
+                    valeurs = lignes[CODE_CLIENT if colonne == 'Customer ID' else colonne].to_numpy()
+                    vues = pd.DataFrame({'groupe': groupes, 'valeur': valeurs}).drop_duplicates()
+                    if paires[colonne] is not None:
+                        vues = pd.concat([paires[colonne], vues], ignore_index=True).drop_duplicates()
+                    paires[colonne] = vues
+
+        # Fusion : sommes, commandes distinctes et nombre de paires par groupe
+        resultat = total if total is not None else pd.DataFrame(columns=[c for c in agregations if c not in distincts])
+        for colonne in distincts:
+            comptes = paires[colonne].groupby('groupe').size() if paires[colonne] is not None else pd.Series(dtype=np.int64)
+            resultat = resultat.join(comptes.rename(colonne), how='outer') if len(resultat.columns) else comptes.to_frame(colonne)
+        resultat = resultat.reindex(columns=list(agregations)).fillna(0)
+        resultat = resultat.astype({colonne: np.int64 for colonne in entiers if colonne in resultat})
+
+        if par is None:
+            if not len(resultat):
+                return {colonne: 0 if colonne in entiers else 0.0 for colonne in agregations}
+            return {colonne: resultat[colonne].iloc[0] for colonne in agregations}
+        resultat = resultat.sort_index()
+        if isinstance(par, tuple):
+            resultat.index = pd.MultiIndex.from_tuples(resultat.index, names=par)
+        else:
+            resultat.index.name = par
+        return resultat
+
+    def agreger_produits(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """Agrégat par produit (comme ContexteKPI.produits), produits ayant au moins une ligne"""
+        nombre = len(self.produits)
+        ventes, quantites, profits = np.zeros(nombre), np.zeros(nombre), np.zeros(nombre)
+        remises = np.zeros(nombre)
+        presents = np.zeros(nombre, dtype=bool)
+        for lignes in self.parcourir([CODE_PRODUIT, 'Sales', 'Quantity', 'Discount', 'Profit'], **filtres):
+            with phase('agregation'):
+                codes = lignes[CODE_PRODUIT].to_numpy()
+                montants = np.nan_to_num(lignes['Sales'].to_numpy(np.float64))
+                ventes += np.bincount(codes, montants, nombre)
+                quantites += np.bincount(codes, lignes['Quantity'].to_numpy(np.float64), nombre)
+                profits += np.bincount(codes, np.nan_to_num(lignes['Profit'].to_numpy(np.float64)), nombre)
+                remises += np.bincount(codes, montants * np.nan_to_num(lignes['Discount'].to_numpy(np.float64)), nombre)
+                presents[codes] = True
+
+        ordre = self.ordre_produits[presents[self.ordre_produits]]
+        return pd.DataFrame({
+            'Product Name': self.produits['Product Name'].to_numpy()[ordre],
+            'Category': self.produits['Category'].to_numpy()[ordre],
+            'Sales': ventes[ordre],
+            'Quantity': quantites[ordre].astype(np.int64),
+            'Profit': profits[ordre],
+            'remise_ventes': remises[ordre],
+        })
+
+    def agreger_clients(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """Agrégat par client (comme ContexteKPI.clients), nom tiré du dictionnaire"""
+        nombre = len(self.clients)
+        ventes, profits = np.zeros(nombre), np.zeros(nombre)
+        commandes = np.zeros(nombre, dtype=np.int64)
+        presents = np.zeros(nombre, dtype=bool)
+        for lignes in self.parcourir([CODE_CLIENT, 'Order ID', 'Sales', 'Profit'], **filtres):
+            with phase('agregation'):
+                codes = lignes[CODE_CLIENT].to_numpy()
+                ventes += np.bincount(codes, np.nan_to_num(lignes['Sales'].to_numpy(np.float64)), nombre)
+                profits += np.bincount(codes, np.nan_to_num(lignes['Profit'].to_numpy(np.float64)), nombre)
+                presents[codes] = True
+                # Commandes distinctes par client : paires (client, commande) de la partition
+                codes_commandes, uniques = pd.factorize(lignes['Order ID'])
+                paires = np.unique(codes.astype(np.int64) * (len(uniques) + 1) + codes_commandes)
+                commandes += np.bincount(paires // (len(uniques) + 1), minlength=nombre)
+
+        ordre = self.ordre_clients[presents[self.ordre_clients]]
+        return pd.DataFrame({
+            'Customer ID': self.clients['Customer ID'].to_numpy()[ordre],
+            'Sales': ventes[ordre],
+            'Profit': profits[ordre],
+            'Order ID': commandes[ordre],
+            'Customer Name': self.clients['Customer Name'].to_numpy()[ordre],
+        })
+
+    def commandes_clients(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """
+        Commandes distinctes par client (comme RequeteKPI.commandes_clients)
+
+        Une commande n'est que dans une partition : les commandes de chaque
+        partition sont simplement mises bout à bout puis triées.
+        """
+        morceaux = []
+        for lignes in self.parcourir([CODE_CLIENT, 'Order ID', 'Order Date', 'Sales'], **filtres):
+            with phase('agregation'):
+                morceaux.append(regrouper_commandes(
+                    lignes[CODE_CLIENT].to_numpy(), lignes['Order ID'].to_numpy(),
+                    lignes['Order Date'].to_numpy(), lignes['Sales'].to_numpy(),
+                ))
+        if not morceaux:
+            return commandes_vides()
+        with phase('agregation'):
+            return trier_commandes(pd.concat(morceaux, ignore_index=True))
+
+    # === LIGNES BRUTES ===
+
+    def colonnes(self) -> List[str]:
+        """Colonnes du dataset (sans les codes ajoutés)"""
+        if not self.partitions:
+            return []
+        return [nom for nom in self._dataset(0).schema.names if nom not in (CODE_CLIENT, CODE_PRODUIT)]
+
+    def vide(self) -> pd.DataFrame:
+        """Aucune ligne, colonnes et types du dataset"""
+        if not self.partitions:
+            return pd.DataFrame()
+        return self._dataset(0).schema.empty_table().to_pandas()[self.colonnes()]
+
+    def suite_curseur(self, filtres: Dict[str, Optional[str]], apres: str) -> Tuple[int, pd.DataFrame]:
+        """
+        Partition de la ligne du curseur et ses lignes filtrées situées après lui
+
+        La partition est lue entière et triée pour retrouver la ligne (la
+        position du curseur ne dépend pas des filtres), puis filtrée.
+
+        Raises:
+            CurseurInvalide: si la ligne n'existe pas (dataset rechargé entre-temps)
+        """
+        date, row_id = decoder_curseur(apres)
+        mois = date.year * 12 + date.month - 1
+        for numero, (annee, numero_mois, _) in enumerate(self.partitions):
+            if annee * 12 + numero_mois - 1 != mois:
+                continue
+            lignes = self.lire(numero, self.colonnes()).sort_values('Order Date', kind='stable')
+            trouves = np.flatnonzero((lignes['Order Date'] == date).to_numpy() & (lignes['Row ID'] == row_id).to_numpy())
+            if len(trouves):
+                return numero, filtrer_par_masques(lignes.iloc[trouves[0] + 1:], **filtres).reset_index(drop=True)
+        raise CurseurInvalide(f"Ligne du curseur introuvable ({date.date()}, Row ID {row_id})")
+
+    def lignes_triees(self, filtres: Dict[str, Optional[str]], suite: Optional[Tuple[int, pd.DataFrame]] = None,
+                      sauter: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Lignes filtrées triées par 'Order Date' (ordre du dataset en mémoire),
+        partition par partition
+
+        Args:
+            filtres: Filtres de la requête
+            suite: Résultat de suite_curseur : seules les lignes suivant le curseur sont produites
+            sauter: Nombre de premières lignes omises ; une partition
+                entièrement sautée est seulement comptée, pas lue
+        """
+        colonnes = self.colonnes()
+        numeros = self.retenues(filtres.get("date_debut"), filtres.get("date_fin"))
+        blocs: List[Any] = []
+        if suite is not None:
+            numero_curseur, lignes = suite
+            numeros = [numero for numero in numeros if numero > numero_curseur]
+            blocs.append(lignes)
+        blocs.extend(numeros)
+
+        for bloc in blocs:
+            if isinstance(bloc, pd.DataFrame):
+                lignes = bloc
+            else:
+                if sauter:
+                    nombre = self.compter(bloc, **filtres)
+                    if nombre <= sauter:
+                        sauter -= nombre
+                        continue
+                lignes = self.lire(bloc, colonnes, **filtres).sort_values('Order Date', kind='stable')
+            retires = min(sauter, len(lignes))
+            sauter -= retires
+            if len(lignes) > retires:
+                yield lignes.iloc[retires:].reset_index(drop=True)
+
+    def compter_lignes(self, filtres: Dict[str, Optional[str]]) -> int:
+        """Nombre de lignes filtrées (sans lire les lignes)"""
+        return sum(self.compter(numero, **filtres)
+                   for numero in self.retenues(filtres.get("date_debut"), filtres.get("date_fin")))
+
+    def premieres(self, filtres: Dict[str, Optional[str]], suite: Optional[Tuple[int, pd.DataFrame]],
+                  sauter: int, nombre: int) -> pd.DataFrame:
+        """Au plus `nombre` lignes triées, après le curseur (suite) et les `sauter` premières"""
+        morceaux, reste = [], nombre
+        for lignes in self.lignes_triees(filtres, suite, sauter):
+            morceaux.append(lignes.iloc[:reste])
+            reste -= len(morceaux[-1])
+            if reste <= 0:
+                break
+        if not morceaux:
+            return self.vide()
+        return pd.concat(morceaux, ignore_index=True)
+
+    def blocs(self, filtres: Dict[str, Optional[str]], suite: Optional[Tuple[int, pd.DataFrame]] = None,
+              limite: Optional[int] = None, taille_bloc: int = TAILLE_BLOC_EXPORT) -> Iterator[pd.DataFrame]:
+        """Lignes triées par blocs d'au plus `taille_bloc` lignes (export) ; au moins un bloc, vide si besoin"""
+        reste, vide = limite, True
+        for lignes in self.lignes_triees(filtres, suite):
+            if reste is not None:
+                lignes = lignes.iloc[:reste]
+                reste -= len(lignes)
+            for debut in range(0, len(lignes), taille_bloc):
+                vide = False
+                yield lignes.iloc[debut:debut + taille_bloc]
+            if reste is not None and reste <= 0:
+                break
+        if vide:
+            yield self.vide()
+
+
+def curseur_ligne(lignes: pd.DataFrame, position: int) -> str:
+    """Curseur de la ligne `position` d'un bloc de lignes triées"""
+    return encoder_curseur(lignes['Order Date'].iloc[position], lignes['Row ID'].iloc[position])
+
+
+class EtatPartitionne:
+    """
+    État du dataset partitionné : même rôle qu'EtatDataset, sans lignes en mémoire
+
+    Attributes:
+        dataset: Partitions Parquet
+        version: Numéro de l'état (incrémenté à chaque rechargement)
+        charge_le: Horodatage (time.time()) de l'ouverture
+    """
+
+    def __init__(self, dataset: DatasetPartitionne, version: int = 1):
+        self.dataset = dataset
+        self.version = version
+        self.charge_le = time.time()
+
+    @property
+    def nb_lignes(self) -> int:
+        return len(self.dataset)
+
+    def plage_dates(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Première et dernière date de commande"""
+        dates = self.dataset.manifeste["dates"]
+        return (pd.Timestamp(dates["min"]) if dates["min"] else None,
+                pd.Timestamp(dates["max"]) if dates["max"] else None)
+
+    def valeurs(self, colonne: str) -> List[str]:
+        """Valeurs distinctes triées d'une colonne filtrable"""
+        return list(self.dataset.manifeste["valeurs"].get(colonne, []))
+
+    def requete(self, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact') -> RequeteDeleguee:
+        """Requête KPI lue partition par partition (comptages distincts exacts)"""
+        return RequeteDeleguee(self.dataset, filtres, mode_distincts)
+
+    def memoire(self) -> Dict[str, int]:
+        return {"dictionnaires": self.dataset.memoire()}
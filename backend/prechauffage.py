@@ -0,0 +1,336 @@
+"""
+Préchauffage du cache des KPI
+🔥 Calcule en arrière-plan les combinaisons de filtres courantes, au
+   démarrage et après chaque rechargement du dataset
+
+Sans préchauffage, le premier utilisateur après un déploiement (ou un
+rechargement, qui vide le cache) paie le calcul à froid de chaque panneau.
+Le préchauffeur parcourt, dans un fil de basse priorité, les combinaisons
+les plus probables : aucun filtre, chaque valeur des dimensions principales
+seule, des plages de dates usuelles et les combinaisons les plus demandées,
+relevées dans un journal des requêtes conservé d'un démarrage à l'autre.
+
+Il ne retarde pas la disponibilité de l'API (le fil démarre une fois
+l'application prête) et laisse passer les requêtes : il attend qu'aucun
+calcul de requête ne soit en cours avant chaque combinaison.
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+import pandas as pd
+
+from filtres import Filtres
+from partage import verrou
+
+logger = logging.getLogger(__name__)
+
+# Dimensions préchauffées valeur par valeur (paramètres d'API)
+DIMENSIONS_PRECHAUFFEES = ('categorie', 'region', 'segment')
+
+# Plages de dates usuelles : derniers jours du dataset (en plus de chaque année civile)
+DERNIERS_JOURS = (30, 90, 365)
+
+# Combinaisons distinctes conservées par le journal des requêtes
+JOURNAL_TAILLE_MAX = 1000
+
+
+def plages_dates(debut: Optional[pd.Timestamp], fin: Optional[pd.Timestamp]) -> List[Dict[str, str]]:
+    """
+    Filtres de dates usuels : chaque année civile du dataset, puis les
+    DERNIERS_JOURS jours jusqu'à la dernière commande
+    """
+    if debut is None or fin is None:
+        return []
+    plages = [
+        {"date_debut": f"{annee}-01-01", "date_fin": f"{annee}-12-31"}
+        for annee in range(debut.year, fin.year + 1)
+    ]
+    for jours in DERNIERS_JOURS:
+        plages.append({
+            "date_debut": (fin - pd.Timedelta(days=jours - 1)).strftime('%Y-%m-%d'),
+            "date_fin": fin.strftime('%Y-%m-%d'),
+        })
+    return plages
+
+
+def combinaisons_prechauffage(valeurs: Dict[str, List[str]], debut: Optional[pd.Timestamp],
+                              fin: Optional[pd.Timestamp], frequentes: List[Dict[str, Any]],
+                              limite: int) -> List[Dict[str, Any]]:
+    """
+    Combinaisons de filtres à préchauffer, sans doublon, par ordre de priorité
+
+    Aucun filtre, puis les combinaisons les plus demandées, chaque valeur
+    des dimensions DIMENSIONS_PRECHAUFFEES seule et les plages de dates
+    usuelles.
+
+    Args:
+        valeurs: Valeurs de chaque dimension préchauffée (paramètre -> valeurs)
+        debut / fin: Dates de la première et de la dernière commande
+        frequentes: Filtres relevés par le journal, du plus au moins demandé
+        limite: Nombre maximum de combinaisons
+
+    Returns:
+        Liste de paramètres de filtrage (filtres actifs seulement)
+    """
+    candidates = [{}, *frequentes]
+    candidates += [{parametre: [valeur]} for parametre in DIMENSIONS_PRECHAUFFEES
+                   for valeur in valeurs.get(parametre, [])]
+    candidates += plages_dates(debut, fin)
+
+    combinaisons: Dict[Hashable, Dict[str, Any]] = {}
+    for filtres in candidates:
+        canonique = Filtres(**filtres)
+        combinaisons.setdefault(canonique.cle(), canonique.parametres())
+    return list(combinaisons.values())[:max(limite, 0)]
+
+
+class JournalFiltres:
+    """
+    Combinaisons de filtres des requêtes KPI reçues, avec leur nombre
+
+    Les filtres sont comptés sous forme canonique (deux écritures
+    équivalentes comptent pour la même combinaison). Le journal est relu
+    au démarrage et mis à jour par sauvegarder() si un chemin est fourni.
+    Les workers uvicorn partagent le fichier : chacun y ajoute les requêtes
+    qu'il a comptées depuis sa dernière sauvegarde, sous verrou, puis
+    reprend les compteurs de tous les workers.
+
+    Args:
+        chemin: Fichier JSON du journal (None pour un journal en mémoire)
+        taille_max: Combinaisons conservées ; au-delà, les moins demandées
+            sont oubliées
+    """
+
+    def __init__(self, chemin: Optional[str] = None, taille_max: int = JOURNAL_TAILLE_MAX):
+        self.chemin = chemin
+        self.taille_max = taille_max
+        self._verrou = threading.Lock()
+        self._compteurs: Counter = Counter()
+        self._parametres: Dict[Hashable, Dict[str, Any]] = {}
+        # Requêtes comptées par ce processus depuis la dernière sauvegarde
+        self._nouvelles: Counter = Counter()
+        if chemin:
+            self._compteurs, self._parametres = self._lire()
+            self._limiter()
+
+    def __len__(self) -> int:
+        return len(self._compteurs)
+
+    def _lire(self) -> Tuple[Counter, Dict[Hashable, Dict[str, Any]]]:
+        """Compteurs et paramètres du fichier (vides s'il est absent ou illisible)"""
+        compteurs: Counter = Counter()
+        parametres: Dict[Hashable, Dict[str, Any]] = {}
+        try:
+            with open(self.chemin, encoding='utf-8') as fichier:
+                entrees = json.load(fichier)
+        except FileNotFoundError:
+            return compteurs, parametres
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Journal des filtres illisible ({self.chemin}) : {e}")
+            return compteurs, parametres
+        for entree in entrees:
+            try:
+                nombre = int(entree["requetes"])
+                canonique = Filtres(**{cle: valeur for cle, valeur in entree["filtres"].items() if valeur is not None})
+            except (AttributeError, KeyError, TypeError, ValueError):
+                continue
+            cle = canonique.cle()
+            if cle not in parametres:
+                parametres[cle] = canonique.parametres()
+            compteurs[cle] += nombre
+        return compteurs, parametres
+
+    def _limiter(self):
+        """Oubli de la moitié la moins demandée au-delà de taille_max (amorti sur les ajouts suivants)"""
+        if len(self._compteurs) <= self.taille_max:
+            return
+        for oubliee, _ in self._compteurs.most_common()[self.taille_max // 2:]:
+            del self._compteurs[oubliee]
+            del self._parametres[oubliee]
+            self._nouvelles.pop(oubliee, None)
+
+    def noter(self, filtres: Dict[str, Any], nombre: int = 1):
+        """Compte une requête (ou `nombre`) pour ces filtres (paramètres de PARAMETRES_FILTRES)"""
+        canonique = Filtres(**{parametre: valeur for parametre, valeur in filtres.items() if valeur is not None})
+        cle = canonique.cle()
+        with self._verrou:
+            if cle not in self._parametres:
+                self._parametres[cle] = canonique.parametres()
+            self._compteurs[cle] += nombre
+            self._nouvelles[cle] += nombre
+            self._limiter()
+
+    def frequentes(self, nombre: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Filtres les plus demandés, du plus au moins demandé"""
+        with self._verrou:
+            return [self._parametres[cle] for cle, _ in self._compteurs.most_common(nombre)]
+
+    def sauvegarder(self):
+        """
+        Ajoute au fichier les requêtes comptées depuis la dernière sauvegarde
+        (relecture et remplacement atomique sous verrou entre processus),
+        puis reprend ses compteurs, ceux de tous les workers ; sans effet sans chemin
+        """
+        if not self.chemin:
+            return
+        with verrou(self.chemin):
+            with self._verrou:
+                nouvelles, self._nouvelles = self._nouvelles, Counter()
+                parametres_nouvelles = {cle: self._parametres[cle] for cle in nouvelles}
+            compteurs, parametres = self._lire()
+            compteurs.update(nouvelles)
+            parametres = {**parametres_nouvelles, **parametres}
+            entrees = [{"filtres": parametres[cle], "requetes": nombre}
+                       for cle, nombre in compteurs.most_common(self.taille_max)]
+            temporaire = f"{self.chemin}.{os.getpid()}.tmp"
+            try:
+                with open(temporaire, 'w', encoding='utf-8') as fichier:
+                    json.dump(entrees, fichier, ensure_ascii=False)
+                os.replace(temporaire, self.chemin)
+            except OSError as e:
+                logger.warning(f"⚠️ Journal des filtres non sauvegardé ({self.chemin}) : {e}")
+                with self._verrou:
+                    self._nouvelles.update(nouvelles)
+                return
+
+        with self._verrou:
+            # Requêtes comptées pendant l'écriture : gardées pour la prochaine sauvegarde
+            for cle in self._nouvelles:
+                if cle not in parametres:
+                    parametres[cle] = self._parametres[cle]
+            self._compteurs = compteurs + self._nouvelles
+            self._parametres = parametres
+            self._limiter()
+
+
+def baisser_priorite():
+    """Priorité minimale pour le fil appelant (Linux : priorité propre à chaque fil)"""
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+    except (AttributeError, OSError):
+        pass
+
+
+class Prechauffeur:
+    """
+    Préchauffe le cache dans un fil d'arrière-plan, à la demande
+
+    Un seul fil, relancé par lancer() : une demande arrivant pendant un
+    préchauffage (nouveau dataset) l'interrompt et le reprend depuis le
+    début avec les nouvelles combinaisons.
+
+    Args:
+        combinaisons: Fonction renvoyant les filtres à préchauffer
+        prechauffer: Fonction calculant les KPI d'une combinaison ; elle
+            renvoie le nombre de résultats calculés (0 s'ils étaient en cache)
+        occupe: Fonction indiquant qu'une requête est en cours de calcul
+            (le préchauffage attend qu'elle se termine)
+        pause: Attente entre deux vérifications de occupe(), en secondes
+
+    Attributes:
+        actif: Préchauffage autorisé (après le démarrage de l'application)
+        cycles: Préchauffages menés à leur terme
+    """
+
+    def __init__(self, combinaisons: Callable[[], List[Dict[str, Any]]],
+                 prechauffer: Callable[[Dict[str, Any]], int],
+                 occupe: Callable[[], bool] = lambda: False, pause: float = 0.05):
+        self._combinaisons = combinaisons
+        self._prechauffer = prechauffer
+        self._occupe = occupe
+        self.pause = pause
+        self._demande = threading.Event()
+        self._verrou = threading.Lock()
+        self._fil: Optional[threading.Thread] = None
+        self.actif = False
+        self.cycles = 0
+        self.progression: Dict[str, Any] = {"etat": "inactif"}
+
+    @property
+    def en_cours(self) -> bool:
+        return self.progression["etat"] in ("en_attente", "en_cours")
+
+    def demarrer(self):
+        """Autorise le préchauffage et lance le premier (application prête)"""
+        self.actif = True
+        self.lancer()
+
+    def lancer(self) -> bool:
+        """
+        Demande un préchauffage (reprise depuis le début s'il est en cours)
+
+        Returns:
+            False si le préchauffage n'est pas encore autorisé
+        """
+        if not self.actif:
+            return False
+        with self._verrou:
+            self.progression = {**self.progression, "etat": "en_attente"}
+            self._demande.set()
+            if self._fil is None or not self._fil.is_alive():
+                self._fil = threading.Thread(target=self._boucle, name="prechauffage", daemon=True)
+                self._fil.start()
+        return True
+
+    def _boucle(self):
+        baisser_priorite()
+        while True:
+            self._demande.wait()
+            self._demande.clear()
+            self.executer()
+
+    def executer(self):
+        """Préchauffe toutes les combinaisons (dans le fil appelant), sauf nouvelle demande entre-temps"""
+        debut = time.perf_counter()
+        progression = {
+            "etat": "en_cours",
+            "debut": datetime.now().isoformat(timespec='seconds'),
+            "combinaisons": 0,
+            "terminees": 0,
+            "calculs": 0,
+            "erreurs": 0,
+        }
+        self.progression = progression
+        try:
+            combinaisons = self._combinaisons()
+        except Exception as e:
+            logger.error(f"❌ Combinaisons à préchauffer indisponibles : {e}")
+            self.progression = {**progression, "etat": "erreur", "erreur": str(e)}
+            return
+        progression["combinaisons"] = len(combinaisons)
+
+        for filtres in combinaisons:
+            # Les requêtes des utilisateurs passent avant
+            while self._occupe() and not self._demande.is_set():
+                time.sleep(self.pause)
+            if self._demande.is_set():
+                # Nouveau dataset : le préchauffage reprend depuis le début
+                return
+            try:
+                progression["calculs"] += self._prechauffer(filtres)
+            except Exception as e:
+                progression["erreurs"] += 1
+                logger.warning(f"⚠️ Préchauffage de {filtres} impossible : {e}")
+            progression["terminees"] += 1
+
+        duree = time.perf_counter() - debut
+        self.cycles += 1
+        self.progression = {**progression, "etat": "termine", "duree_ms": round(duree * 1000, 2)}
+        logger.info(f"🔥 Cache préchauffé : {progression['combinaisons']} combinaisons de filtres, "
+                    f"{progression['calculs']} calculs en {duree:.1f} s")
+
+    def statistiques(self) -> Dict[str, Any]:
+        """Avancement du dernier préchauffage (progression de 0 à 1)"""
+        progression = dict(self.progression)
+        if progression.get("combinaisons"):
+            progression["progression"] = round(progression["terminees"] / progression["combinaisons"], 3)
+        else:
+            progression["progression"] = 1.0 if progression["etat"] == "termine" else 0.0
+        return {"actif": self.actif, "cycles": self.cycles, **progression}
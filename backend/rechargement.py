@@ -0,0 +1,311 @@
+"""
+Rechargement à chaud du dataset
+🔄 Ajout incrémental des nouvelles commandes et remplacement atomique
+
+Le dataset et ses structures dérivées (index de filtrage, cubes journalier
+et géographique) forment un EtatDataset qui n'est jamais modifié après sa construction. Un
+rechargement construit un nouvel état en arrière-plan puis le publie d'une
+seule affectation : une requête en cours garde l'état qu'elle a capturé.
+
+Quand le CSV local ne fait que grandir (flux de commandes ajoutées en fin
+de fichier), seuls les octets nouveaux sont lus et les nouvelles lignes
+sont ajoutées à l'index et aux cubes sans les reconstruire.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+import hashlib
+import io
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from filtres import IndexFiltres
+from cube import CubeJournalier, SerieJournaliere
+from geographie import CubeGeographique
+from fidelite import ChronologieClients
+from marges import CumulsProduits
+from schema import concatener_datasets
+from requetes import RequetePandas
+
+logger = logging.getLogger(__name__)
+
+# Octets relus avant la position connue pour vérifier que le début du fichier n'a pas changé
+TAILLE_CONTROLE = 1 << 16
+
+# Intervalle (secondes) de lecture du fichier des demandes de rechargement (plusieurs workers)
+INTERVALLE_SIGNAL = 1.0
+
+
+class EtatDataset:
+    """
+    Dataset et structures dérivées, en lecture seule
+
+    Attributes:
+        df: Dataset trié par 'Order Date'
+        index: Index de filtrage
+        cube: Cube journalier des mesures additives
+        geo: Cube géographique (jour × région × État × ville, drill-down)
+        serie: Agrégats du cube par jour (évolution journalière)
+        chronologie: Commandes de chaque client triées par date (fidélité)
+        produits: Sommes par produit cumulées mois par mois (top produits, marges)
+        version: Numéro de l'état (incrémenté à chaque rechargement)
+        charge_le: Horodatage (time.time()) de la construction
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 1,
+                 index: Optional[IndexFiltres] = None, cube: Optional[CubeJournalier] = None,
+                 geo: Optional[CubeGeographique] = None, chronologie: Optional[ChronologieClients] = None,
+                 produits: Optional[CumulsProduits] = None):
+        self.index = index if index is not None else IndexFiltres(df)
+        self.df = self.index.df
+        self.cube = cube if cube is not None else CubeJournalier(self.df)
+        self.geo = geo if geo is not None else CubeGeographique(self.df)
+        self.serie = SerieJournaliere(self.cube)
+        self.chronologie = chronologie if chronologie is not None else ChronologieClients(self.df)
+        self.produits = produits if produits is not None else CumulsProduits(self.df)
+        self.version = version
+        self.charge_le = time.time()
+        self._memoire: Optional[Dict[str, int]] = None
+
+    @property
+    def nb_lignes(self) -> int:
+        return len(self.df)
+
+    def plage_dates(self) -> Tuple[Optional[pd.Timestamp], Optional[pd.Timestamp]]:
+        """Première et dernière date de commande"""
+        dates = self.index.dates
+        if not len(dates):
+            return None, None
+        return pd.Timestamp(dates[0]), pd.Timestamp(dates[-1])
+
+    def valeurs(self, colonne: str) -> List[str]:
+        """Valeurs distinctes triées d'une colonne"""
+        return sorted(self.df[colonne].unique().tolist())
+
+    def requete(self, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact') -> RequetePandas:
+        """Requête KPI sur ce dataset (moteur pandas : index de filtrage et cube)"""
+        return RequetePandas(self, filtres, mode_distincts)
+
+    def memoire(self) -> Dict[str, int]:
+        """Octets occupés par le dataset, l'index, les cubes et la chronologie (calculé une fois)"""
+        if self._memoire is None:
+            self._memoire = {
+                "dataset": int(self.df.memory_usage(index=True, deep=True).sum()),
+                "index": self.index.memoire(),
+                "cube": self.cube.memoire(),
+                "geo": self.geo.memoire(),
+                "serie": self.serie.memoire(),
+                "chronologie": self.chronologie.memoire(),
+                "produits": self.produits.memoire(),
+            }
+        return self._memoire
+
+    def ajouter(self, lignes: pd.DataFrame) -> 'EtatDataset':
+        """
+        Nouvel état contenant en plus `lignes` (nettoyées, schéma compact)
+
+        Si toutes les nouvelles commandes sont postérieures ou égales à la
+        dernière connue, l'index, les cubes, la chronologie des clients et
+        les cumuls par produit sont prolongés ; sinon tout est reconstruit
+        (même résultat, plus lent).
+        """
+        if lignes.empty:
+            return self
+        if not lignes['Order Date'].is_monotonic_increasing:
+            lignes = lignes.sort_values('Order Date', kind='stable')
+        df = concatener_datasets(self.df, lignes)
+
+        dates = self.index.dates
+        premiere = lignes['Order Date'].iloc[0]
+        if len(dates) and premiere.to_datetime64() < dates[-1]:
+            logger.info("🔄 Commandes antérieures au dataset : reconstruction complète")
+            return EtatDataset(df, self.version + 1)
+
+        index = self.index.etendre(df)
+        # Les cellules du jour de la première nouvelle commande sont recalculées
+        debut = int(np.searchsorted(dates, premiere.normalize().to_datetime64(), side='left'))
+        cube = self.cube.etendre(index.df, debut)
+        geo = self.geo.etendre(index.df, debut)
+        chronologie = self.chronologie.etendre(index.df, debut)
+        produits = self.produits.etendre(index.df, debut)
+        return EtatDataset(index.df, self.version + 1, index, cube, geo, chronologie, produits)
+
+
+# === LECTURE INCRÉMENTALE DU CSV ===
+
+def position_fichier(chemin: str) -> Dict[str, Any]:
+    """
+    Position de lecture du CSV : taille lue, date de modification et
+    empreinte des derniers octets lus
+    """
+    infos = os.stat(chemin)
+    with open(chemin, 'rb') as fichier:
+        fichier.seek(max(infos.st_size - TAILLE_CONTROLE, 0))
+        fin = fichier.read(TAILLE_CONTROLE)
+    return {
+        "taille": infos.st_size,
+        "mtime_ns": infos.st_mtime_ns,
+        "controle": hashlib.sha256(fin).hexdigest(),
+    }
+
+
+def lire_ajouts(chemin: str, position: Dict[str, Any], encoding: str = 'latin-1'):
+    """
+    Lignes ajoutées en fin de fichier depuis `position`
+
+    Returns:
+        (DataFrame brut, nouvelle position), avec un DataFrame vide si rien
+        n'a été ajouté, ou None si le fichier a été réécrit (rechargement
+        complet nécessaire)
+    """
+    infos = os.stat(chemin)
+    debut = position["taille"]
+    if infos.st_size < debut:
+        return None
+    with open(chemin, 'rb') as fichier:
+        entete = fichier.readline()
+        fichier.seek(max(debut - TAILLE_CONTROLE, 0))
+        precedent = fichier.read(debut - max(debut - TAILLE_CONTROLE, 0))
+        ajout = fichier.read(infos.st_size - debut)
+    if hashlib.sha256(precedent).hexdigest() != position["controle"]:
+        return None
+
+    # Seules les lignes complètes sont lues ; la suite le sera au prochain passage
+    ajout = ajout[:ajout.rfind(b'\n') + 1]
+    nouvelle_position = {
+        "taille": debut + len(ajout),
+        "mtime_ns": infos.st_mtime_ns,
+        "controle": hashlib.sha256((precedent + ajout)[-TAILLE_CONTROLE:]).hexdigest(),
+    }
+    if not ajout.strip():
+        return pd.DataFrame(), nouvelle_position
+    return pd.read_csv(io.BytesIO(entete + ajout), encoding=encoding), nouvelle_position
+
+
+# === RECHARGEMENT EN ARRIÈRE-PLAN ===
+
+class Rechargeur:
+    """
+    Exécute les rechargements en arrière-plan (un seul à la fois) et
+    conserve leurs métriques
+
+    Args:
+        recharger: Fonction effectuant le rechargement ; elle renvoie le mode
+            ('incremental', 'complet' ou 'inchange') et le nombre de lignes ajoutées
+    """
+
+    def __init__(self, recharger: Callable[[], tuple]):
+        self._recharger = recharger
+        # Un rechargement à la fois ; le lancement n'attend pas la fin du rechargement
+        self._verrou = threading.Lock()
+        self._verrou_lancement = threading.Lock()
+        self._fil: Optional[threading.Thread] = None
+        self.compteurs = {"incremental": 0, "complet": 0, "inchange": 0, "erreur": 0}
+        self.dernier: Optional[Dict[str, Any]] = None
+        self.duree_totale = 0.0
+        # Dernière demande de rechargement prise en compte (fichier partagé, voir signaler)
+        self.jeton: Optional[str] = None
+
+    @property
+    def en_cours(self) -> bool:
+        return self._fil is not None and self._fil.is_alive()
+
+    def executer(self) -> Dict[str, Any]:
+        """Recharge immédiatement (dans le fil appelant) et renvoie le compte rendu"""
+        with self._verrou:
+            debut = time.perf_counter()
+            compte_rendu = {"debut": datetime.now().isoformat(timespec='seconds')}
+            try:
+                mode, lignes = self._recharger()
+                compte_rendu.update(mode=mode, lignes_ajoutees=lignes)
+            except Exception as e:
+                logger.error(f"❌ Rechargement du dataset impossible : {e}")
+                compte_rendu.update(mode="erreur", erreur=str(e))
+            duree = time.perf_counter() - debut
+            compte_rendu["duree_ms"] = round(duree * 1000, 2)
+            self.compteurs[compte_rendu["mode"]] += 1
+            self.duree_totale += duree
+            self.dernier = compte_rendu
+            return compte_rendu
+
+    def lancer(self) -> bool:
+        """
+        Lance un rechargement en arrière-plan
+
+        Returns:
+            False si un rechargement est déjà en cours
+        """
+        with self._verrou_lancement:
+            if self.en_cours:
+                return False
+            self._fil = threading.Thread(target=self.executer, name="rechargement", daemon=True)
+            self._fil.start()
+            return True
+
+    def surveiller(self, chemin: str, intervalle: float):
+        """Relance un rechargement dès que le fichier `chemin` change (scrutation)"""
+        def signature():
+            try:
+                infos = os.stat(chemin)
+            except OSError:
+                return None
+            return infos.st_size, infos.st_mtime_ns
+
+        def boucle():
+            connue = signature()
+            while True:
+                time.sleep(intervalle)
+                actuelle = signature()
+                # Rechargement déjà en cours : le changement sera repris au passage suivant
+                if actuelle is not None and actuelle != connue and self.lancer():
+                    connue = actuelle
+
+        threading.Thread(target=boucle, name="surveillance-dataset", daemon=True).start()
+        logger.info(f"👀 Surveillance de {chemin} toutes les {intervalle} s")
+
+    def signaler(self, chemin: str) -> str:
+        """
+        Publie une demande de rechargement dans le fichier `chemin`, suivi
+        par tous les workers (voir suivre) ; le processus appelant la
+        considère comme prise en compte et recharge lui-même
+
+        Returns:
+            Jeton de la demande (processus et horodatage)
+        """
+        jeton = f"{os.getpid()}-{time.time_ns()}"
+        self.jeton = jeton
+        os.makedirs(os.path.dirname(os.path.abspath(chemin)), exist_ok=True)
+        temporaire = f"{chemin}.{os.getpid()}.tmp"
+        with open(temporaire, 'w', encoding='utf-8') as fichier:
+            fichier.write(jeton)
+        # Remplacement atomique : un worker ne lit jamais un jeton à moitié écrit
+        os.replace(temporaire, chemin)
+        return jeton
+
+    def suivre(self, chemin: str, intervalle: float = INTERVALLE_SIGNAL):
+        """Relance un rechargement à chaque demande publiée dans `chemin` par un autre worker"""
+        def lire() -> Optional[str]:
+            try:
+                with open(chemin, encoding='utf-8') as fichier:
+                    return fichier.read().strip() or None
+            except OSError:
+                return None
+
+        # Demandes antérieures au démarrage : déjà couvertes par le chargement initial
+        self.jeton = lire()
+
+        def boucle():
+            while True:
+                time.sleep(intervalle)
+                jeton = lire()
+                # Rechargement déjà en cours : la demande sera reprise au passage suivant
+                if jeton is not None and jeton != self.jeton and self.lancer():
+                    self.jeton = jeton
+
+        threading.Thread(target=boucle, name="demandes-rechargement", daemon=True).start()
+        logger.info(f"📣 Demandes de rechargement suivies dans {chemin}")
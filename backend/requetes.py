@@ -0,0 +1,251 @@
+"""
+Moteurs de requêtes des KPI
+🔌 Interface commune aux moteurs d'agrégation, choisie au démarrage
+
+Les calculs des endpoints (main.py) ne parlent qu'à une requête : les
+lignes filtrées d'un état du dataset, vues à travers leurs agrégats
+(regroupement générique, par produit, par client, commandes de chaque
+client, par lieu géographique).
+Chaque état fournit sa requête :
+
+- RequetePandas : dataset en mémoire, index de filtrage et cube journalier
+  (implémentation d'origine) ;
+- RequeteDeleguee : moteur qui reçoit les filtres à chaque appel, comme
+  les partitions Parquet (partitions.py) ou le moteur SQL embarqué
+  (sql.py).
+
+Tous les moteurs renvoient les mêmes résultats, aux arrondis des sommes
+près (ordre de sommation différent).
+"""
+
+from abc import ABC, abstractmethod
+from functools import cached_property
+from typing import Dict, Optional, Tuple, Union
+import pandas as pd
+
+from cube import colonnes_hors_cube
+from fidelite import commandes_lignes
+from filtres import Filtres
+from geographie import AGREGATIONS_GEO, NIVEAUX
+from marges import COLONNES_PRODUIT
+from metriques import compter_parcours, phase
+from temporel import cles_periodes
+
+# Moteurs de requêtes acceptés par KPI_MOTEUR (dataset en mémoire)
+MOTEURS_REQUETES = ('pandas', 'duckdb', 'sqlite')
+
+
+class RequeteKPI(ABC):
+    """
+    Lignes filtrées d'un état du dataset, vues à travers leurs agrégats
+
+    Args:
+        filtres: Paramètres de filtrage (filtres.PARAMETRES_FILTRES)
+        mode_distincts: 'exact' ou 'approx' (appliqué si le moteur le permet)
+    """
+
+    def __init__(self, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact'):
+        self.filtres = filtres
+        self.mode_distincts = mode_distincts
+
+    @property
+    def mode_distincts_effectif(self) -> str:
+        """Mode des comptages distincts appliqué (exact par défaut)"""
+        return 'exact'
+
+    @abstractmethod
+    def agreger(self, agregations: Dict[str, str], par: Union[None, str, Tuple[str, ...]] = None,
+                granularite: Optional[str] = None):
+        """
+        Équivalent de groupby(par).agg(agregations) sur les lignes filtrées
+
+        Args:
+            agregations: {colonne: 'sum' | 'nunique'}
+            par: Colonne de regroupement, tuple de colonnes, 'periode' (avec
+                granularite) ou None
+            granularite: Granularité de la période ('jour', 'semaine', 'mois'...)
+
+        Returns:
+            dict des totaux si par est None, sinon DataFrame indexé par la clé
+            et trié (clé entière de période pour 'periode', voir temporel.py ;
+            MultiIndex pour un tuple de colonnes)
+        """
+
+    def agreger_geo(self, niveau: str) -> pd.DataFrame:
+        """
+        Sales, Profit, Customer ID et Order ID (distincts) par lieu du niveau
+        ('region', 'etat' ou 'ville', voir geographie.py) : colonnes du lieu
+        puis mesures, trié par lieu
+        """
+        return self.agreger(AGREGATIONS_GEO, par=NIVEAUX[niveau]).reset_index()
+
+    @abstractmethod
+    def agreger_produits(self) -> pd.DataFrame:
+        """
+        Product Name, Category, Sales, Quantity, Profit et remise_ventes
+        (somme de Sales x Discount, voir marges.py) par produit, triés par produit
+        """
+
+    @abstractmethod
+    def agreger_clients(self) -> pd.DataFrame:
+        """Customer ID, Sales, Profit, Order ID (distinctes), Customer Name par client, triés par client"""
+
+    @abstractmethod
+    def commandes_clients(self) -> pd.DataFrame:
+        """
+        Commandes distinctes de chaque client, triées par client puis par date
+
+        Returns:
+            DataFrame (client, jour, ventes) : code entier du client, jour de
+            la commande (depuis 1970) et Sales des lignes filtrées de la
+            commande (voir fidelite.py)
+        """
+
+
+class RequetePandas(RequeteKPI):
+    """
+    Requête sur le dataset en mémoire (EtatDataset)
+
+    Les lignes filtrées sont calculées à la première demande puis
+    partagées par les agrégats ; le cube journalier répond quand les
+    agrégations et les filtres le permettent.
+    """
+
+    def __init__(self, etat, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact'):
+        super().__init__(filtres, mode_distincts)
+        self.etat = etat
+
+    @cached_property
+    def mode_distincts_effectif(self) -> str:
+        """Seul le cube sait approcher les comptages distincts"""
+        if self.mode_distincts == 'approx' and self.etat.cube.selection(**self.filtres) is not None:
+            return 'approx'
+        return 'exact'
+
+    @cached_property
+    def lignes(self) -> pd.DataFrame:
+        """Lignes filtrées (lecture seule)"""
+        with phase('filtre'):
+            lignes = self.etat.index.filtrer(**self.filtres)
+        compter_parcours(lignes=len(lignes))
+        return lignes
+
+    def agreger(self, agregations: Dict[str, str], par: Union[None, str, Tuple[str, ...]] = None,
+                granularite: Optional[str] = None):
+        """
+        Cube journalier si possible (comptages distincts exacts ou approchés
+        selon mode_distincts), sinon parcours des lignes filtrées. Par jour
+        et sur une plage de dates seule, la série journalière du cube
+        répond sans fusionner les identifiants.
+        """
+        cube = self.etat.cube
+        cellules = None
+        if not colonnes_hors_cube(agregations) and par in (None, 'periode', *cube.valeurs):
+            with phase('filtre'):
+                cellules = cube.selection(**self.filtres)
+
+        if cellules is not None:
+            serie = self.etat.serie
+            if par == 'periode' and granularite == 'jour' and self.mode_distincts == 'exact' \
+                    and serie.couvre(agregations) and Filtres(**self.filtres).dates_seules:
+                # Série journalière précalculée : tranche de jours, sans fusion des identifiants
+                with phase('agregation'):
+                    return serie.agreger(cellules, agregations)
+            compter_parcours(cellules=len(cellules))
+            with phase('agregation'):
+                if par is None:
+                    return cube.agreger(cellules, agregations, mode_distincts=self.mode_distincts)
+                if par == 'periode':
+                    libelles = cles_periodes(cube.jours[cellules], granularite)
+                else:
+                    libelles = cube.libelles(cellules, par)
+                return cube.agreger(cellules, agregations, libelles, par, self.mode_distincts)
+
+        # Repli : parcours des lignes filtrées
+        lignes = self.lignes
+        with phase('agregation'):
+            if par is None:
+                return {colonne: getattr(lignes[colonne], fonction)() for colonne, fonction in agregations.items()}
+            if par == 'periode':
+                par = pd.Series(cles_periodes(lignes['Order Date'].to_numpy(), granularite),
+                                index=lignes.index, name='periode')
+            elif isinstance(par, tuple):
+                par = list(par)
+            return lignes.groupby(par, observed=True).agg(agregations)
+
+    def agreger_produits(self) -> pd.DataFrame:
+        """
+        Cumuls mensuels par produit sur une plage de dates (avec ou sans
+        filtre de catégorie), sinon regroupement des lignes filtrées
+        """
+        filtres = Filtres(**self.filtres)
+        if not filtres.intervalles and set(filtres.dimensions) <= {'Category'}:
+            with phase('filtre'):
+                debut, fin = self.etat.index.bornes(self.filtres.get('date_debut'), self.filtres.get('date_fin'))
+            with phase('agregation'):
+                return self.etat.produits.agreger(debut, fin, filtres.dimensions.get('Category'))
+
+        lignes = self.lignes
+        with phase('agregation'):
+            colonnes = lignes[[*COLONNES_PRODUIT, 'Sales', 'Quantity', 'Profit']]
+            return colonnes.assign(remise_ventes=lignes['Sales'] * lignes['Discount']).groupby(
+                list(COLONNES_PRODUIT), observed=True
+            ).agg({
+                'Sales': 'sum',
+                'Quantity': 'sum',
+                'Profit': 'sum',
+                'remise_ventes': 'sum',
+            }).reset_index()
+
+    def agreger_clients(self) -> pd.DataFrame:
+        lignes = self.lignes
+        with phase('agregation'):
+            return lignes.groupby('Customer ID', observed=True).agg({
+                'Sales': 'sum',
+                'Profit': 'sum',
+                'Order ID': 'nunique',
+                'Customer Name': 'first'
+            }).reset_index()
+
+    def agreger_geo(self, niveau: str) -> pd.DataFrame:
+        """Cube géographique si les filtres le permettent, sinon parcours des lignes filtrées"""
+        geo = self.etat.geo
+        with phase('filtre'):
+            cellules = geo.selection(**self.filtres)
+        if cellules is None:
+            return super().agreger_geo(niveau)
+        compter_parcours(cellules=len(cellules))
+        with phase('agregation'):
+            return geo.agreger_niveau(cellules, niveau)
+
+    def commandes_clients(self) -> pd.DataFrame:
+        """
+        Lues dans la chronologie des clients, triée au chargement (sans
+        parcourir les lignes), sinon regroupées depuis les lignes filtrées
+        """
+        commandes = self.etat.chronologie.commandes_clients(self.filtres)
+        return commandes if commandes is not None else commandes_lignes(self.lignes)
+
+
+class RequeteDeleguee(RequeteKPI):
+    """
+    Requête sur un moteur qui reçoit les filtres à chaque appel
+    (DatasetPartitionne, MoteurSQL) ; comptages distincts toujours exacts
+    """
+
+    def __init__(self, moteur, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact'):
+        super().__init__(filtres, mode_distincts)
+        self.moteur = moteur
+
+    def agreger(self, agregations: Dict[str, str], par: Union[None, str, Tuple[str, ...]] = None,
+                granularite: Optional[str] = None):
+        return self.moteur.agreger(self.filtres, agregations, par, granularite)
+
+    def agreger_produits(self) -> pd.DataFrame:
+        return self.moteur.agreger_produits(self.filtres)
+
+    def agreger_clients(self) -> pd.DataFrame:
+        return self.moteur.agreger_clients(self.filtres)
+
+    def commandes_clients(self) -> pd.DataFrame:
+        return self.moteur.commandes_clients(self.filtres)
@@ -0,0 +1,109 @@
+"""
+Schéma compact du dataset en mémoire
+🗜️ Catégories pour les textes répétés, entiers 32 bits pour les petits entiers
+
+Les colonnes de texte (dimensions et identifiants) sont stockées en
+catégories pandas : un code entier par ligne et une table de libellés
+triés pour le décodage. Les regroupements et les égalités travaillent
+alors sur des entiers. Les mesures monétaires (Sales, Profit, Discount)
+restent en float64 pour que les sommes et les réponses JSON soient
+identiques au dataset d'origine.
+"""
+
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+# Dimensions de faible cardinalité
+DIMENSIONS = (
+    'Category', 'Sub-Category', 'Region', 'Segment', 'Ship Mode',
+    'Country', 'State', 'City',
+)
+
+# Identifiants et libellés : codes entiers + table de décodage
+IDENTIFIANTS = (
+    'Order ID', 'Customer ID', 'Customer Name', 'Product ID', 'Product Name',
+)
+
+# Entiers dont les valeurs tiennent sur 32 bits
+ENTIERS_32 = ('Row ID', 'Quantity', 'Postal Code')
+
+
+def compacter_dataset(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convertit le dataset nettoyé vers le schéma compact
+
+    Une colonne absente est ignorée. Seules les colonnes déjà entières
+    sont réduites à 32 bits (une colonne flottante s'afficherait autrement
+    en JSON), et seulement si leurs valeurs y tiennent.
+    """
+    types: Dict[str, str] = {}
+    for colonne in DIMENSIONS + IDENTIFIANTS:
+        if colonne in df.columns and df[colonne].dtype == object:
+            types[colonne] = 'category'
+
+    for colonne in ENTIERS_32:
+        if colonne not in df.columns or not pd.api.types.is_integer_dtype(df[colonne]):
+            continue
+        serie = df[colonne]
+        if len(serie) == 0 or (serie.min() >= -2**31 and serie.max() < 2**31):
+            types[colonne] = 'int32'
+
+    return df.astype(types)
+
+
+def memoire_par_ligne(df: pd.DataFrame) -> float:
+    """Octets occupés par ligne (chaînes comprises)"""
+    return df.memory_usage(deep=True, index=False).sum() / max(len(df), 1)
+
+
+def concatener_categories(avant: pd.Categorical, apres) -> pd.Categorical:
+    """
+    Concatène deux catégorielles en gardant des catégories triées
+
+    Les libellés nouveaux sont insérés à leur rang (searchsorted) : les codes
+    existants sont seulement décalés, sans retrier toutes les catégories.
+    """
+    apres = pd.Categorical(apres)
+    categories = avant.categories
+    # Table de hachage sur les catégories ajoutées (peu nombreuses), pas sur les existantes
+    positions = np.full(len(apres.categories), -1, dtype=np.intp)
+    rangs = apres.categories.get_indexer(categories)
+    connues = rangs >= 0
+    positions[rangs[connues]] = np.flatnonzero(connues)
+    manquantes = positions < 0
+    if not manquantes.any():
+        codes = np.concatenate([avant.codes, np.append(positions, -1)[apres.codes]])
+        return pd.Categorical.from_codes(codes, dtype=avant.dtype)
+
+    nouvelles = np.sort(apres.categories[manquantes].to_numpy())
+    rangs = categories.searchsorted(nouvelles)
+    # Nouveau code de chaque ancienne catégorie : décalée d'une place par libellé inséré avant elle
+    decalees = np.arange(len(categories)) + np.searchsorted(rangs, np.arange(len(categories)), side='right')
+    rang_nouvelles = np.searchsorted(nouvelles, apres.categories[manquantes].to_numpy())
+    positions[manquantes] = rangs[rang_nouvelles] + rang_nouvelles
+    positions[~manquantes] = decalees[positions[~manquantes]]
+
+    codes = np.concatenate([
+        np.append(decalees, -1)[avant.codes],
+        np.append(positions, -1)[apres.codes],
+    ])
+    categories = np.insert(categories.to_numpy(), rangs, nouvelles)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+
+def concatener_datasets(ancien: pd.DataFrame, nouveau: pd.DataFrame) -> pd.DataFrame:
+    """
+    Ajoute les lignes de `nouveau` à la fin de `ancien`, en conservant le schéma
+
+    Les catégories sont fusionnées et restent triées (comme après
+    compacter_dataset sur l'ensemble des lignes). `ancien` n'est pas modifié.
+    """
+    colonnes = {}
+    for colonne in ancien.columns:
+        avant, apres = ancien[colonne], nouveau[colonne]
+        if isinstance(avant.dtype, pd.CategoricalDtype):
+            colonnes[colonne] = concatener_categories(avant.array, apres)
+        else:
+            colonnes[colonne] = np.concatenate([avant.to_numpy(), apres.to_numpy()])
+    return pd.DataFrame(colonnes, copy=False)
@@ -0,0 +1,142 @@
+"""
+Sérialisation des réponses de l'API
+🚀 Encodage direct en JSON (orjson si disponible) et mise en forme vectorisée
+
+Les endpoints retournent des structures Python simples (listes, dicts,
+tableaux en colonnes). Elles sont encodées directement en octets, sans
+passer par l'encodeur générique de FastAPI (jsonable_encoder).
+Les valeurs NaN / infinies deviennent null au lieu de provoquer une erreur.
+"""
+
+from typing import Any, Callable, Dict, List, Optional, Union
+import functools
+import inspect
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from fastapi import Response
+from pydantic import BaseModel
+
+from metriques import phase
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : repli sur le module json standard
+    orjson = None
+
+# Formats de tableau acceptés par le paramètre `format`
+FORMATS_TABLEAU = ('records', 'columnar')
+REGEX_FORMAT = '^(records|columnar)$'
+
+Tableau = Union[List[Dict[str, Any]], Dict[str, List[Any]]]
+
+
+def _par_defaut(valeur: Any) -> Any:
+    """Types non natifs : modèles pydantic, scalaires et tableaux numpy"""
+    if isinstance(valeur, BaseModel):
+        return valeur.model_dump()
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    if isinstance(valeur, np.ndarray):
+        return valeur.tolist()
+    if isinstance(valeur, pd.Timestamp):
+        return valeur.isoformat()
+    raise TypeError(f"Type non sérialisable : {type(valeur).__name__}")
+
+
+def _nettoyer(valeur: Any) -> Any:
+    """Remplace NaN / inf par None (repli sans orjson uniquement)"""
+    if isinstance(valeur, float):
+        return valeur if math.isfinite(valeur) else None
+    if isinstance(valeur, dict):
+        return {cle: _nettoyer(v) for cle, v in valeur.items()}
+    if isinstance(valeur, (list, tuple)):
+        return [_nettoyer(v) for v in valeur]
+    if isinstance(valeur, (BaseModel, np.generic, np.ndarray)):
+        return _nettoyer(_par_defaut(valeur))
+    return valeur
+
+
+def encoder_json(contenu: Any) -> bytes:
+    """Encode une structure en JSON compact (UTF-8)"""
+    if orjson is not None:
+        return orjson.dumps(contenu, default=_par_defaut,
+                            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_nettoyer(contenu), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":"), default=_par_defaut).encode("utf-8")
+
+
+class ReponseJSON(Response):
+    """Réponse JSON encodée directement en octets"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        with phase('serialisation'):
+            return encoder_json(content)
+
+
+def serialiser(fonction: Callable) -> Callable:
+    """
+    Décorateur d'endpoint : le résultat est renvoyé tel quel dans une ReponseJSON
+
+    FastAPI ne repasse alors pas le résultat dans jsonable_encoder
+    (ni dans la validation du response_model, qui reste documenté).
+    Les endpoints asynchrones restent asynchrones.
+    """
+    if inspect.iscoroutinefunction(fonction):
+        @functools.wraps(fonction)
+        async def wrapper_asynchrone(*args, **kwargs):
+            return en_reponse(await fonction(*args, **kwargs))
+        return wrapper_asynchrone
+
+    @functools.wraps(fonction)
+    def wrapper(*args, **kwargs):
+        return en_reponse(fonction(*args, **kwargs))
+    return wrapper
+
+
+def en_reponse(resultat: Any) -> Response:
+    """Résultat d'endpoint dans une ReponseJSON (inchangé si c'est déjà une réponse)"""
+    if isinstance(resultat, Response):
+        return resultat
+    return ReponseJSON(resultat)
+
+
+def vers_tableau(
+    frame: pd.DataFrame,
+    colonnes: Optional[Dict[str, str]] = None,
+    arrondis: Optional[Dict[str, int]] = None,
+    format: str = 'records'
+) -> Tableau:
+    """
+    Met en forme un DataFrame pour la réponse, colonne par colonne
+
+    Args:
+        frame: Données à exporter
+        colonnes: {colonne source: nom dans la réponse} (toutes si None)
+        arrondis: {nom dans la réponse: nombre de décimales}
+        format: 'records' (liste de dicts) ou 'columnar' ({colonne: [valeurs]})
+
+    Returns:
+        Tableau: liste d'enregistrements ou dictionnaire de colonnes
+    """
+    if colonnes is None:
+        colonnes = {colonne: colonne for colonne in frame.columns}
+    arrondis = arrondis or {}
+
+    donnees = {}
+    for source, nom in colonnes.items():
+        valeurs = frame[source].tolist()
+        if nom in arrondis:
+            # round() Python (arrondi du float exact), comme les réponses historiques :
+            # Series.round passe par une mise à l'échelle ×10^n et diffère parfois d'un centime
+            decimales = arrondis[nom]
+            valeurs = [round(valeur, decimales) for valeur in valeurs]
+        donnees[nom] = valeurs
+
+    if format == 'columnar':
+        return donnees
+    noms = list(donnees)
+    return [dict(zip(noms, valeurs)) for valeurs in zip(*donnees.values())]
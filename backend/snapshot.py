@@ -0,0 +1,200 @@
+"""
+Snapshot colonnaire local du dataset nettoyé
+💾 Évite de relire et de reparser le CSV à chaque démarrage
+
+Le dataset nettoyé est écrit une colonne par fichier .npy (dates en
+datetime64, textes en codes entiers + libellés, types d'origine conservés) avec un
+manifeste JSON. Les démarrages suivants ouvrent ces fichiers en mémoire
+mappée, sans aucun parsing.
+
+Le snapshot est valide tant que le CSV source n'a pas changé :
+même taille et même date de modification, ou à défaut même empreinte SHA-256.
+"""
+
+from typing import Any, Dict, Optional
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MANIFESTE = "manifeste.json"
+VERSION_FORMAT = 2
+
+
+def empreinte_fichier(chemin: str) -> str:
+    """SHA-256 du fichier source (lu par blocs)"""
+    sha = hashlib.sha256()
+    with open(chemin, 'rb') as fichier:
+        for bloc in iter(lambda: fichier.read(1 << 20), b''):
+            sha.update(bloc)
+    return sha.hexdigest()
+
+
+def decrire_source(chemin: str, avec_empreinte: bool = True) -> Dict[str, Any]:
+    """Taille, date de modification et empreinte du fichier source"""
+    infos = os.stat(chemin)
+    description = {
+        "chemin": os.path.abspath(chemin),
+        "taille": infos.st_size,
+        "mtime_ns": infos.st_mtime_ns,
+    }
+    if avec_empreinte:
+        description["sha256"] = empreinte_fichier(chemin)
+    return description
+
+
+def ecrire_colonnes(df: pd.DataFrame, dossier: str, entete: Dict[str, Any]) -> None:
+    """
+    Écrit les colonnes du dataset dans `dossier` (remplacement atomique du dossier)
+
+    Args:
+        df: Dataset nettoyé
+        dossier: Dossier de destination
+        entete: Champs ajoutés au manifeste (description de la source...)
+    """
+    parent = os.path.dirname(os.path.abspath(dossier))
+    os.makedirs(parent, exist_ok=True)
+    temporaire = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+
+    colonnes = []
+    for numero, colonne in enumerate(df.columns):
+        serie = df[colonne]
+        fichier = f"{numero:03d}.npy"
+        description = {"nom": colonne, "fichier": fichier}
+        if isinstance(serie.dtype, pd.CategoricalDtype) or serie.dtype == object:
+            # Texte libre ("object") ou catégorie : stocké en codes + libellés
+            categories = serie.astype('category')
+            description["type"] = "category" if serie.dtype != object else "object"
+            description["categories"] = categories.cat.categories.tolist()
+            valeurs = categories.cat.codes.to_numpy()
+        else:
+            description["type"] = str(serie.dtype)
+            valeurs = serie.to_numpy()
+        np.save(os.path.join(temporaire, fichier), valeurs, allow_pickle=False)
+        colonnes.append(description)
+
+    manifeste = {
+        "version": VERSION_FORMAT,
+        "lignes": len(df),
+        **entete,
+        "colonnes": colonnes,
+    }
+    with open(os.path.join(temporaire, MANIFESTE), 'w', encoding='utf-8') as fichier:
+        json.dump(manifeste, fichier, ensure_ascii=False)
+
+    # Remplacement atomique : un lecteur ne voit jamais un snapshot à moitié écrit
+    ancien = None
+    if os.path.exists(dossier):
+        ancien = tempfile.mkdtemp(prefix=".ancien-", dir=parent)
+        os.replace(dossier, os.path.join(ancien, "snapshot"))
+    os.replace(temporaire, dossier)
+    if ancien:
+        shutil.rmtree(ancien, ignore_errors=True)
+
+
+def lire_manifeste(dossier: str) -> Optional[Dict[str, Any]]:
+    """Manifeste de `dossier` s'il existe et est au format courant"""
+    chemin_manifeste = os.path.join(dossier, MANIFESTE)
+    if not os.path.exists(chemin_manifeste):
+        return None
+    try:
+        with open(chemin_manifeste, encoding='utf-8') as fichier:
+            manifeste = json.load(fichier)
+    except (OSError, ValueError):
+        return None
+    if manifeste.get("version") != VERSION_FORMAT:
+        return None
+    return manifeste
+
+
+def ouvrir_colonnes(dossier: str, manifeste: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Ouvre les colonnes de `dossier` en mémoire mappée, sans copie
+
+    Les colonnes numériques et les codes des catégories restent des vues
+    en lecture seule sur les fichiers : plusieurs processus qui ouvrent le
+    même dossier partagent les mêmes pages mémoire.
+    """
+    colonnes = {}
+    for description in manifeste["colonnes"]:
+        valeurs = np.load(os.path.join(dossier, description["fichier"]), mmap_mode='r', allow_pickle=False)
+        if description["type"] == "category":
+            # Les codes sont utilisés tels quels (aucun parsing)
+            colonnes[description["nom"]] = pd.Categorical.from_codes(
+                valeurs, categories=description["categories"]
+            )
+        elif description["type"] == "object":
+            libelles = np.asarray(description["categories"] + [np.nan], dtype=object)
+            colonnes[description["nom"]] = libelles[valeurs]
+        else:
+            colonnes[description["nom"]] = valeurs
+    # copy=False : pas de consolidation des colonnes en blocs (qui les copierait)
+    return pd.DataFrame(colonnes, copy=False)
+
+
+def ecrire_snapshot(df: pd.DataFrame, dossier: str, source: str) -> None:
+    """
+    Écrit le dataset dans `dossier` (remplacement atomique du dossier)
+
+    Args:
+        df: Dataset nettoyé
+        dossier: Dossier du snapshot
+        source: Chemin du CSV dont le dataset est issu
+    """
+    ecrire_colonnes(df, dossier, {"source": decrire_source(source)})
+    logger.info(f"💾 Snapshot écrit dans {dossier} ({len(df)} lignes)")
+
+
+def snapshot_valide(dossier: str, source: str) -> Optional[Dict[str, Any]]:
+    """
+    Manifeste du snapshot s'il correspond toujours au fichier source
+
+    Taille et date de modification identiques suffisent ; sinon l'empreinte
+    SHA-256 est recalculée (fichier simplement « touché »).
+    """
+    manifeste = lire_manifeste(dossier)
+    if manifeste is None:
+        return None
+
+    connu = manifeste["source"]
+    actuel = decrire_source(source, avec_empreinte=False)
+    if actuel["chemin"] != connu["chemin"]:
+        return None
+    if actuel["taille"] == connu["taille"] and actuel["mtime_ns"] == connu["mtime_ns"]:
+        return manifeste
+    if actuel["taille"] == connu["taille"] and empreinte_fichier(source) == connu["sha256"]:
+        # Contenu inchangé : on mémorise la nouvelle date pour éviter de recalculer l'empreinte
+        manifeste["source"]["mtime_ns"] = actuel["mtime_ns"]
+        try:
+            chemin_manifeste = os.path.join(dossier, MANIFESTE)
+            temporaire = chemin_manifeste + ".tmp"
+            with open(temporaire, 'w', encoding='utf-8') as fichier:
+                json.dump(manifeste, fichier, ensure_ascii=False)
+            os.replace(temporaire, chemin_manifeste)
+        except OSError:
+            pass
+        return manifeste
+    return None
+
+
+def lire_snapshot(dossier: str, source: str) -> Optional[pd.DataFrame]:
+    """
+    Ouvre le snapshot en mémoire mappée s'il est valide
+
+    Returns:
+        pd.DataFrame ou None si le snapshot est absent ou périmé
+    """
+    manifeste = snapshot_valide(dossier, source)
+    if manifeste is None:
+        return None
+
+    df = ouvrir_colonnes(dossier, manifeste)
+    logger.info(f"💾 Snapshot chargé depuis {dossier} ({len(df)} lignes)")
+    return df
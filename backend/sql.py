@@ -0,0 +1,296 @@
+"""
+Moteur SQL embarqué des KPI
+🦆 Agrégats calculés en SQL par DuckDB (ou SQLite) sur le dataset nettoyé
+
+Avec KPI_MOTEUR=duckdb ou sqlite, le dataset nettoyé est copié une fois,
+au chargement, dans une base embarquée en mémoire (table `commandes`), et
+chaque agrégat des KPI devient une requête : filtres en WHERE,
+regroupements en GROUP BY. DuckDB parcourt et agrège les colonnes en
+parallèle sur tous les cœurs ; SQLite (bibliothèque standard, sans
+dépendance) exécute une requête à la fois.
+
+La table ne reprend que les colonnes des KPI, plus la position de la
+ligne (pour la valeur 'first' du nom de client), la date en nanosecondes
+(bornes de dates identiques au filtrage pandas) et une clé entière par
+granularité de période, calculée par temporel.cles_periodes : les mêmes
+clés que le moteur pandas, sans arithmétique de dates propre au dialecte.
+
+Les lignes brutes (/data/commandes et son export) restent lues dans le
+dataset en mémoire.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+import logging
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from filtres import Filtres
+from metriques import phase
+from rechargement import EtatDataset
+from requetes import RequeteDeleguee
+from temporel import GRANULARITES, cles_periodes
+
+try:
+    import duckdb
+except ImportError:  # duckdb est optionnel : moteur sqlite uniquement
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+# Moteurs SQL embarqués
+MOTEURS_SQL = ('duckdb', 'sqlite')
+
+TABLE = 'commandes'
+
+# Colonnes du dataset copiées dans la table
+COLONNES = (
+    'Order ID', 'Customer ID', 'Customer Name', 'Product Name',
+    'Category', 'Sub-Category', 'Region', 'Segment', 'State', 'City', 'Ship Mode',
+    'Sales', 'Quantity', 'Discount', 'Profit',
+)
+
+# Colonnes ajoutées : position de la ligne, date en nanosecondes, clés de période
+LIGNE = 'ligne'
+DATE = 'date_ns'
+PERIODES = {granularite: f'periode_{granularite}' for granularite in GRANULARITES}
+
+# Fonctions d'agrégation pandas -> SQL
+FONCTIONS = {
+    'sum': 'SUM({})',
+    'nunique': 'COUNT(DISTINCT {})',
+}
+
+
+def sql_disponible(moteur: str) -> bool:
+    """Indique si un moteur SQL est utilisable (duckdb installé pour 'duckdb')"""
+    return moteur == 'sqlite' or duckdb is not None
+
+
+def verifier_sql(moteur: str):
+    if not sql_disponible(moteur):
+        raise RuntimeError("Moteur duckdb indisponible : duckdb n'est pas installé")
+
+
+def nom(colonne: str) -> str:
+    """Identifiant SQL entre guillemets (colonnes à espaces)"""
+    return '"' + colonne.replace('"', '""') + '"'
+
+
+def table_commandes(df: pd.DataFrame) -> pd.DataFrame:
+    """Colonnes de la table `commandes` (catégories conservées, clés de période int64)"""
+    dates = df['Order Date'].to_numpy()
+    colonnes = {colonne: df[colonne].array for colonne in COLONNES}
+    colonnes[LIGNE] = np.arange(len(df), dtype=np.int64)
+    colonnes[DATE] = dates.astype('datetime64[ns]').astype(np.int64)
+    for granularite, colonne in PERIODES.items():
+        colonnes[colonne] = cles_periodes(dates, granularite)
+    return pd.DataFrame(colonnes)
+
+
+def clause_filtres(**filtres) -> Tuple[str, List[Any]]:
+    """Clause WHERE (vide si aucun filtre) et ses paramètres"""
+    filtres = Filtres(**filtres)
+    conditions, parametres = [], []
+    if filtres.debut is not None:
+        conditions.append(f"{DATE} >= ?")
+        parametres.append(filtres.debut.value)
+    if filtres.fin is not None:
+        conditions.append(f"{DATE} <= ?")
+        parametres.append(filtres.fin.value)
+    for colonne, valeurs in filtres.dimensions.items():
+        conditions.append(f"{nom(colonne)} IN ({', '.join('?' * len(valeurs))})")
+        parametres.extend(valeurs)
+    for colonne, (minimum, maximum) in filtres.intervalles.items():
+        if minimum is not None:
+            conditions.append(f"{nom(colonne)} >= ?")
+            parametres.append(minimum)
+        if maximum is not None:
+            conditions.append(f"{nom(colonne)} <= ?")
+            parametres.append(maximum)
+    return (" WHERE " + " AND ".join(conditions) if conditions else ""), parametres
+
+
+class MoteurSQL:
+    """
+    Base embarquée en mémoire contenant la table `commandes`
+
+    Args:
+        df: Dataset nettoyé (schéma compact)
+        moteur: 'duckdb' ou 'sqlite'
+
+    Attributes:
+        entiers: Colonnes entières (sommes converties en int64)
+    """
+
+    def __init__(self, df: pd.DataFrame, moteur: str = 'duckdb'):
+        verifier_sql(moteur)
+        self.moteur = moteur
+        self.entiers = {colonne for colonne in COLONNES if pd.api.types.is_integer_dtype(df[colonne])}
+        table = table_commandes(df)
+        if moteur == 'duckdb':
+            # Une connexion par thread (curseurs de la même base)
+            self.connexion = duckdb.connect(':memory:')
+            self.connexion.register('source', table)
+            self.connexion.execute(f"CREATE TABLE {TABLE} AS SELECT * FROM source")
+            self.connexion.unregister('source')
+            self._locale = threading.local()
+        else:
+            # SQLite : une connexion partagée, une requête à la fois
+            self.connexion = sqlite3.connect(':memory:', check_same_thread=False)
+            categories = [colonne for colonne in COLONNES if isinstance(table[colonne].dtype, pd.CategoricalDtype)]
+            table.astype({colonne: object for colonne in categories}).to_sql(
+                TABLE, self.connexion, index=False, chunksize=100_000
+            )
+            self.connexion.execute(f"CREATE INDEX {TABLE}_date ON {TABLE} ({DATE})")
+            self._verrou = threading.Lock()
+        self._memoire = self._mesurer_memoire()
+
+    def memoire(self) -> int:
+        """Octets occupés par la base (mesurés au chargement)"""
+        return self._memoire
+
+    def _mesurer_memoire(self) -> int:
+        if self.moteur == 'duckdb':
+            return int(self.connexion.execute("SELECT SUM(memory_usage_bytes) FROM duckdb_memory()").fetchone()[0] or 0)
+        pages = self.connexion.execute("PRAGMA page_count").fetchone()[0]
+        return int(pages * self.connexion.execute("PRAGMA page_size").fetchone()[0])
+
+    def lire(self, requete: str, parametres: List[Any]) -> pd.DataFrame:
+        """Résultat d'une requête SELECT"""
+        with phase('agregation'):
+            if self.moteur == 'duckdb':
+                curseur = getattr(self._locale, 'curseur', None)
+                if curseur is None:
+                    curseur = self._locale.curseur = self.connexion.cursor()
+                return curseur.execute(requete, parametres).df()
+            with self._verrou:
+                curseur = self.connexion.execute(requete, parametres)
+                lignes = curseur.fetchall()
+            return pd.DataFrame.from_records(lignes, columns=[description[0] for description in curseur.description])
+
+    def somme(self, colonne: str) -> str:
+        """Somme d'une colonne (0 si aucune valeur, entière pour les colonnes entières)"""
+        expression = f"COALESCE(SUM({nom(colonne)}), 0)"
+        return f"CAST({expression} AS BIGINT)" if colonne in self.entiers else expression
+
+    def premier(self, colonne: str, ordre: str) -> str:
+        """Première valeur non nulle de `colonne` dans l'ordre de `ordre` (équivalent de 'first')"""
+        position = f"CASE WHEN {nom(colonne)} IS NOT NULL THEN {ordre} END"
+        if self.moteur == 'duckdb':
+            return f"arg_min({nom(colonne)}, {position})"
+        # SQLite : colonne nue, prise sur la ligne du MIN (seul MIN / MAX de la requête)
+        return f"MIN({position}) AS _position, {nom(colonne)}"
+
+    # === AGRÉGATS (même contrat que DatasetPartitionne) ===
+
+    def agreger(self, filtres: Dict[str, Optional[str]], agregations: Dict[str, str],
+                par: Union[None, str, Tuple[str, ...]] = None, granularite: Optional[str] = None):
+        """
+        Équivalent de groupby(par).agg(agregations) sur les lignes filtrées
+        (même contrat que RequeteKPI.agreger, comptages distincts exacts)
+        """
+        expressions = [
+            self.somme(colonne) if fonction == 'sum' else FONCTIONS[fonction].format(nom(colonne))
+            for colonne, fonction in agregations.items()
+        ]
+        selection = ", ".join(f"{expression} AS c{numero}" for numero, expression in enumerate(expressions))
+        where, parametres = clause_filtres(**filtres)
+
+        if par is None:
+            resultat = self.lire(f"SELECT {selection} FROM {TABLE}{where}", parametres)
+            return {colonne: resultat[f"c{numero}"].iloc[0] for numero, colonne in enumerate(agregations)}
+
+        if isinstance(par, tuple):
+            groupes = [nom(colonne) for colonne in par]
+        else:
+            groupes = [PERIODES[granularite] if par == 'periode' else nom(par)]
+        cles = [f"g{numero}" for numero in range(len(groupes))]
+        liste = ", ".join(groupes)
+        resultat = self.lire(
+            f"SELECT {', '.join(f'{groupe} AS {cle}' for groupe, cle in zip(groupes, cles))}, {selection} "
+            f"FROM {TABLE}{where} GROUP BY {liste} ORDER BY {liste}",
+            parametres
+        )
+        resultat = resultat.set_index(cles)
+        resultat.columns = list(agregations)
+        if isinstance(par, tuple):
+            resultat.index.names = list(par)
+        else:
+            resultat.index.name = par
+        entiers = {colonne for colonne, fonction in agregations.items()
+                   if fonction == 'nunique' or colonne in self.entiers}
+        return resultat.astype({colonne: np.int64 for colonne in entiers})
+
+    def agreger_produits(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """Agrégat par produit (comme RequeteKPI.agreger_produits)"""
+        where, parametres = clause_filtres(**filtres)
+        produit, categorie = nom('Product Name'), nom('Category')
+        resultat = self.lire(
+            f"SELECT {produit} AS \"Product Name\", {categorie} AS \"Category\", "
+            f"{self.somme('Sales')} AS \"Sales\", {self.somme('Quantity')} AS \"Quantity\", "
+            f"{self.somme('Profit')} AS \"Profit\", "
+            f"COALESCE(SUM({nom('Sales')} * {nom('Discount')}), 0) AS \"remise_ventes\" "
+            f"FROM {TABLE}{where} GROUP BY {produit}, {categorie} ORDER BY {produit}, {categorie}",
+            parametres
+        )
+        return resultat.astype({'Quantity': np.int64})
+
+    def agreger_clients(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """Agrégat par client (comme RequeteKPI.agreger_clients)"""
+        where, parametres = clause_filtres(**filtres)
+        client = nom('Customer ID')
+        resultat = self.lire(
+            f"SELECT {client} AS \"Customer ID\", {self.somme('Sales')} AS \"Sales\", "
+            f"{self.somme('Profit')} AS \"Profit\", COUNT(DISTINCT {nom('Order ID')}) AS \"Order ID\", "
+            f"{self.premier('Customer Name', LIGNE)} AS \"Customer Name\" "
+            f"FROM {TABLE}{where} GROUP BY {client} ORDER BY {client}",
+            parametres
+        )
+        return resultat[['Customer ID', 'Sales', 'Profit', 'Order ID', 'Customer Name']].astype({'Order ID': np.int64})
+
+    def commandes_clients(self, filtres: Dict[str, Optional[str]]) -> pd.DataFrame:
+        """Commandes distinctes par client (comme RequeteKPI.commandes_clients)"""
+        where, parametres = clause_filtres(**filtres)
+        client = nom('Customer ID')
+        resultat = self.lire(
+            f"SELECT {client} AS client, MIN({PERIODES['jour']}) AS jour, {self.somme('Sales')} AS ventes "
+            f"FROM {TABLE}{where} GROUP BY {client}, {nom('Order ID')} ORDER BY {client}, jour",
+            parametres
+        )
+        return pd.DataFrame({
+            'client': pd.factorize(resultat['client'])[0].astype(np.int64),
+            'jour': resultat['jour'].to_numpy(dtype=np.int64),
+            'ventes': resultat['ventes'].to_numpy(dtype=np.float64),
+        })
+
+
+class EtatSQL(EtatDataset):
+    """
+    État du dataset en mémoire dont les KPI sont calculés par le moteur SQL
+
+    Le dataset, l'index de filtrage et les cubes restent ceux d'EtatDataset
+    (lignes brutes, rechargement incrémental) ; la base SQL est reconstruite
+    à chaque nouvel état.
+    """
+
+    def __init__(self, df: pd.DataFrame, version: int = 1, index=None, cube=None, geo=None, chronologie=None,
+                 produits=None, moteur: str = 'duckdb'):
+        super().__init__(df, version, index, cube, geo, chronologie, produits)
+        self.sql = MoteurSQL(self.df, moteur)
+
+    def requete(self, filtres: Dict[str, Optional[str]], mode_distincts: str = 'exact') -> RequeteDeleguee:
+        """Requête KPI exécutée par le moteur SQL (comptages distincts exacts)"""
+        return RequeteDeleguee(self.sql, filtres, mode_distincts)
+
+    def memoire(self) -> Dict[str, int]:
+        return {**super().memoire(), "sql": self.sql.memoire()}
+
+    def ajouter(self, lignes: pd.DataFrame) -> 'EtatSQL':
+        etat = super().ajouter(lignes)
+        if etat is self:
+            return self
+        return EtatSQL(etat.df, etat.version, etat.index, etat.cube, etat.geo, etat.chronologie, etat.produits,
+                       self.sql.moteur)
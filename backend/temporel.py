@@ -0,0 +1,196 @@
+"""
+Moteur temporel des KPI
+📅 Clés de période entières, décalages, moyennes mobiles vectorisés et
+   sous-échantillonnage des séries longues
+
+Chaque jour est converti en une clé entière de période (jour, semaine,
+mois, trimestre ou année depuis 1970) : les regroupements se font sur des
+entiers, et les libellés ('2016-03', '2016-W05', '2016-T1'...) ne sont
+produits qu'une fois par période. Les clés étant consécutives, la période
+précédente (ou celle de l'année précédente) est celle de clé k - décalage,
+retrouvée par simple indexation d'une série dense, sans parcours ligne à
+ligne.
+"""
+
+from typing import Optional
+import numpy as np
+import pandas as pd
+
+from filtres import convertir_date
+
+# Granularités acceptées par les endpoints temporels
+GRANULARITES = ('jour', 'semaine', 'mois', 'trimestre', 'annee')
+REGEX_GRANULARITE = '^(jour|semaine|mois|trimestre|annee)$'
+
+# Périodes de référence des comparaisons
+COMPARAISONS = ('precedent', 'annee')
+REGEX_COMPARAISON = '^(precedent|annee)$'
+
+# Décalage (en périodes) vers la même période de l'année précédente :
+# 364 jours / 52 semaines conservent le jour de la semaine
+DECALAGE_ANNEE = {
+    'jour': 364,
+    'semaine': 52,
+    'mois': 12,
+    'trimestre': 4,
+    'annee': 1,
+}
+
+# Fenêtre maximale des moyennes mobiles (en périodes)
+MOYENNE_MOBILE_MAX = 366
+
+# Points minimum d'une série sous-échantillonnée (premier, dernier et au moins un intermédiaire)
+MAX_POINTS_MIN = 3
+
+
+def cles_periodes(jours: np.ndarray, granularite: str) -> np.ndarray:
+    """
+    Clé entière de la période de chaque date
+
+    Args:
+        jours: Dates (datetime64, l'heure éventuelle est ignorée)
+        granularite: 'jour', 'semaine', 'mois', 'trimestre' ou 'annee'
+
+    Returns:
+        np.ndarray (int64) : jours, semaines (du lundi), mois, trimestres
+        ou années écoulés depuis 1970
+    """
+    jours = np.asarray(jours)
+    if granularite == 'jour':
+        return jours.astype('datetime64[D]').astype(np.int64)
+    if granularite == 'semaine':
+        # Le 1er janvier 1970 est un jeudi : +3 aligne les semaines sur le lundi
+        return (jours.astype('datetime64[D]').astype(np.int64) + 3) // 7
+    if granularite == 'annee':
+        return jours.astype('datetime64[Y]').astype(np.int64)
+    mois = jours.astype('datetime64[M]').astype(np.int64)
+    return mois // 3 if granularite == 'trimestre' else mois
+
+
+def libelles_periodes(cles: np.ndarray, granularite: str) -> np.ndarray:
+    """
+    Libellés des périodes : 'YYYY-MM-DD', 'YYYY-Www' (semaine ISO),
+    'YYYY-MM', 'YYYY-Tn' ou 'YYYY'
+
+    L'ordre alphabétique des libellés est l'ordre chronologique.
+    """
+    cles = np.asarray(cles, dtype=np.int64)
+    if granularite == 'jour':
+        return np.datetime_as_string(cles.astype('datetime64[D]'), unit='D').astype(object)
+    if granularite == 'semaine':
+        lundis = (cles * 7 - 3).astype('datetime64[D]')
+        return pd.DatetimeIndex(lundis).strftime('%G-W%V').to_numpy(dtype=object)
+    if granularite == 'mois':
+        return np.datetime_as_string(cles.astype('datetime64[M]'), unit='M').astype(object)
+    if granularite == 'trimestre':
+        return np.array([f"{1970 + cle // 4}-T{cle % 4 + 1}" for cle in cles.tolist()], dtype=object)
+    return np.datetime_as_string(cles.astype('datetime64[Y]'), unit='Y').astype(object)
+
+
+def serie_dense(cles: np.ndarray, valeurs: np.ndarray, debut: int, fin: int) -> np.ndarray:
+    """Valeurs des périodes [debut, fin) : 0 pour les périodes absentes de `cles`"""
+    dense = np.zeros(max(fin - debut, 0), dtype=np.float64)
+    dans = (cles >= debut) & (cles < fin)
+    dense[cles[dans] - debut] = valeurs[dans]
+    return dense
+
+
+def valeurs_decalees(cles: np.ndarray, cles_reference: np.ndarray, valeurs_reference: np.ndarray,
+                     decalage: int) -> np.ndarray:
+    """
+    Valeur de référence de la période k - decalage, pour chaque clé k
+
+    Args:
+        cles: Clés des périodes (triées, uniques)
+        cles_reference: Clés des périodes de référence (triées, uniques)
+        valeurs_reference: Valeur de chaque période de référence
+        decalage: 1 pour la période précédente, DECALAGE_ANNEE pour l'année précédente
+
+    Returns:
+        np.ndarray (float64) : 0 si la période de référence n'a pas de valeur
+    """
+    if not len(cles):
+        return np.zeros(0, dtype=np.float64)
+    cibles = cles - decalage
+    debut, fin = int(cibles[0]), int(cibles[-1]) + 1
+    return serie_dense(cles_reference, valeurs_reference, debut, fin)[cibles - debut]
+
+
+def moyennes_mobiles(cles: np.ndarray, valeurs: np.ndarray, fenetre: int) -> np.ndarray:
+    """
+    Moyenne des `fenetre` dernières périodes (période courante comprise)
+
+    Les périodes absentes comptent pour 0 ; la moyenne n'est définie (NaN
+    sinon) qu'une fois la fenêtre entièrement dans la série.
+    """
+    if not len(cles):
+        return np.zeros(0, dtype=np.float64)
+    debut = int(cles[0])
+    cumul = np.concatenate([[0.0], np.cumsum(serie_dense(cles, valeurs, debut, int(cles[-1]) + 1))])
+    positions = cles - debut + 1
+    moyennes = (cumul[positions] - cumul[np.maximum(positions - fenetre, 0)]) / fenetre
+    return np.where(positions >= fenetre, moyennes, np.nan)
+
+
+def debut_reference(date_debut: Optional[str], granularite: str) -> Optional[str]:
+    """
+    Début de la plage de dates couvrant aussi l'année précédente
+
+    Recule `date_debut` d'un an (d'un décalage DECALAGE_ANNEE pour les jours
+    et les semaines) : la première période de référence est tronquée comme
+    la première période de la plage.
+    """
+    date = convertir_date(date_debut)
+    if date is None:
+        return None
+    if granularite in ('jour', 'semaine'):
+        recul = pd.Timedelta(days=DECALAGE_ANNEE['jour'])
+    else:
+        recul = pd.DateOffset(years=1)
+    return (date - recul).isoformat()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, nb_points: int) -> np.ndarray:
+    """
+    Positions des points conservés par Largest-Triangle-Three-Buckets
+
+    Le premier et le dernier point sont gardés ; les autres sont répartis
+    en nb_points - 2 paquets consécutifs, et chaque paquet garde le point
+    formant le plus grand triangle avec le point retenu juste avant et la
+    moyenne du paquet suivant : pics et creux restent visibles, contrairement
+    à une moyenne par paquet.
+
+    Args:
+        x: Abscisses croissantes (clés de période)
+        y: Valeurs de la série
+        nb_points: Nombre de points voulus (série inchangée si elle est plus courte)
+
+    Returns:
+        np.ndarray des positions retenues, croissantes
+    """
+    n = len(y)
+    if nb_points >= n or nb_points < MAX_POINTS_MIN:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+
+    # Paquets des points intermédiaires [bornes[i], bornes[i + 1]), puis le dernier point seul
+    bornes = np.append(np.linspace(1, n - 1, nb_points - 1).astype(np.int64), n)
+    cumul_x = np.concatenate([[0.0], np.cumsum(x)])
+    cumul_y = np.concatenate([[0.0], np.cumsum(y)])
+    tailles = bornes[2:] - bornes[1:-1]
+    moyennes_x = (cumul_x[bornes[2:]] - cumul_x[bornes[1:-1]]) / tailles
+    moyennes_y = (cumul_y[bornes[2:]] - cumul_y[bornes[1:-1]]) / tailles
+
+    retenus = np.empty(nb_points, dtype=np.int64)
+    retenus[0], retenus[-1] = 0, n - 1
+    precedent = 0
+    for paquet in range(nb_points - 2):
+        debut, fin = bornes[paquet], bornes[paquet + 1]
+        xa, ya = x[precedent], y[precedent]
+        # Double de l'aire du triangle (point précédent, candidat, moyenne suivante)
+        aires = np.abs((xa - moyennes_x[paquet]) * (y[debut:fin] - ya)
+                       - (xa - x[debut:fin]) * (moyennes_y[paquet] - ya))
+        precedent = debut + int(np.argmax(aires))
+        retenus[paquet + 1] = precedent
+    return retenus
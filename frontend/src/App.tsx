@@ -74,34 +74,30 @@ function App() {
     
     const loadData = async () => {
       try {
-        const [
-          kpiData,
-          compData,
-          fidData,
-          margeData,
-          produitsData,
-          catData,
-          tempData,
-          geoData
-        ] = await Promise.all([
-          apiService.getKPIGlobaux(filtres),
-          apiService.getComparaisonTemporelle(filtres),
-          apiService.getFideliteClients(filtres),
-          apiService.getMargeProduits(10, filtres),
-          apiService.getTopProduits(10, critereProduit, filtres),
-          apiService.getPerformanceCategories(filtres),
-          apiService.getEvolutionTemporelle(granularite, filtres),
-          apiService.getPerformanceGeo(filtres)
-        ]);
+        // Un seul appel pour tous les panneaux
+        const dashboard = await apiService.getDashboard(
+          [
+            'globaux',
+            'temporel_comparaison',
+            'clients_fidelite',
+            'produits_marge',
+            'produits_top',
+            'categories',
+            'temporel',
+            'geographique'
+          ],
+          { limite_produits: 10, tri_par: critereProduit, periode: granularite },
+          filtres
+        );
         
-        setKpiGlobaux(kpiData);
-        setComparaison(compData);
-        setFidelite(fidData);
-        setMarge(margeData);
-        setProduits(produitsData);
-        setCategories(catData);
-        setTemporal(tempData);
-        setGeo(geoData);
+        setKpiGlobaux(dashboard.globaux!);
+        setComparaison(dashboard.temporel_comparaison!);
+        setFidelite(dashboard.clients_fidelite!);
+        setMarge(dashboard.produits_marge!);
+        setProduits(dashboard.produits_top!);
+        setCategories(dashboard.categories!);
+        setTemporal(dashboard.temporel!);
+        setGeo(dashboard.geographique!);
       } catch (err) {
         setError(`Erreur lors du chargement des données: ${err}`);
       }
@@ -198,7 +194,7 @@ function App() {
               )}
               
               {activeTab === 'geo' && (
-                <GeographiqueTab geo={geo} />
+                <GeographiqueTab geo={geo} filtres={filtres} />
               )}
            </div>
         </div>
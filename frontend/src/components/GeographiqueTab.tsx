@@ -1,33 +1,104 @@
-import React from 'react';
+import React, { useState, useEffect } from 'react';
 import Plot from 'react-plotly.js';
-import type { PerformanceGeo } from '../types';
+import { apiService } from '../services/api';
+import type { Filtres, PerformanceGeo, LieuGeo, NiveauGeo } from '../types';
 
 interface GeographiqueTabProps {
   geo: PerformanceGeo[];
+  filtres: Filtres;
 }
 
-export const GeographiqueTab: React.FC<GeographiqueTabProps> = ({ geo }) => {
+// Drill-down : région sélectionnée, puis État de cette région
+interface CheminGeo {
+  region?: string;
+  etat?: string;
+}
+
+const titres: Record<NiveauGeo, string> = {
+  region: 'PERFORMANCE RÉGIONALE (CA)',
+  etat: 'PERFORMANCE PAR ÉTAT (CA)',
+  ville: 'PERFORMANCE PAR VILLE (CA)'
+};
+
+export const GeographiqueTab: React.FC<GeographiqueTabProps> = ({ geo, filtres }) => {
+  const [chemin, setChemin] = useState<CheminGeo>({});
+  const [lieux, setLieux] = useState<LieuGeo[]>([]);
+  const [erreur, setErreur] = useState<string | null>(null);
+
+  const niveau: NiveauGeo = chemin.etat ? 'ville' : chemin.region ? 'etat' : 'region';
+  const parent = chemin.etat ?? chemin.region;
+
+  // Les régions viennent du dashboard ; États et villes sont chargés à la demande
+  useEffect(() => {
+    if (niveau === 'region') return;
+    let actif = true;
+    setLieux([]);
+    setErreur(null);
+    apiService.getDetailGeo(niveau, parent, filtres)
+      .then(data => { if (actif) setLieux(data); })
+      .catch(err => { if (actif) setErreur(`Erreur lors du chargement du détail: ${err}`); });
+    return () => { actif = false; };
+  }, [niveau, parent, filtres]);
+
+  const affiches: PerformanceGeo[] = niveau === 'region' ? geo : lieux;
+  const noms = niveau === 'region'
+    ? geo.map(g => g.region)
+    : lieux.map(l => (niveau === 'ville' ? l.ville : l.etat) ?? '');
+
+  const descendre = (lieu: string) => {
+    if (niveau === 'region') setChemin({ region: lieu });
+    else if (niveau === 'etat') setChemin({ region: chemin.region, etat: lieu });
+  };
+
+  const styleBouton = { fontSize: '0.8rem', padding: '6px 12px' };
+
   return (
     <div>
+      <div style={{ marginBottom: '20px', display: 'flex', gap: '8px' }}>
+        <button
+          onClick={() => setChemin({})}
+          className={`tab ${niveau === 'region' ? 'active' : ''}`}
+          style={styleBouton}
+        >
+          Régions
+        </button>
+        {chemin.region && (
+          <button
+            onClick={() => setChemin({ region: chemin.region })}
+            className={`tab ${niveau === 'etat' ? 'active' : ''}`}
+            style={styleBouton}
+          >
+            {chemin.region}
+          </button>
+        )}
+        {chemin.etat && (
+          <button className="tab active" style={styleBouton}>
+            {chemin.etat}
+          </button>
+        )}
+      </div>
+
+      {erreur && <div className="error">{erreur}</div>}
+
       <div className="grid-2">
         <div className="chart-wrapper">
           <Plot
             data={[
               {
                 type: 'bar',
-                x: geo.map(g => g.region),
-                y: geo.map(g => g.ca),
+                x: noms,
+                y: affiches.map(g => g.ca),
                 marker: {
-                  color: geo.map(g => g.ca),
+                  color: affiches.map(g => g.ca),
                   colorscale: [[0, '#0b1426'], [1, '#1199fa']] // Dark to Blue
                 },
-                text: geo.map(g => `${(g.ca/1000).toFixed(0)}k`),
+                text: affiches.map(g => `${(g.ca/1000).toFixed(0)}k`),
                 textposition: 'outside',
                 textfont: { color: '#b2b4b8' }
               }
             ]}
             layout={{
-              title: { text: 'PERFORMANCE RÉGIONALE (CA)', font: { color: '#ffffff', family: 'Inter, sans-serif' } },
+              title: { text: titres[niveau], font: { color: '#ffffff', family: 'Inter, sans-serif' } },
               paper_bgcolor: 'rgba(0,0,0,0)',
               plot_bgcolor: 'rgba(0,0,0,0)',
               xaxis: { color: '#b2b4b8', gridcolor: '#262b33', tickfont: { family: 'Inter, sans-serif' } },
@@ -36,16 +107,17 @@ export const GeographiqueTab: React.FC<GeographiqueTabProps> = ({ geo }) => {
             }}
             config={{ responsive: true, displayModeBar: false }}
             style={{ width: '100%' }}
+            onClick={event => descendre(String(event.points[0].x))} // Région -> États -> villes
           />
         </div>
-        
+
         <div className="chart-wrapper">
           <Plot
             data={[
               {
                 type: 'pie',
-                labels: geo.map(g => g.region),
-                values: geo.map(g => g.nb_clients),
+                labels: noms,
+                values: affiches.map(g => g.nb_clients),
                 textinfo: 'percent',
                 textposition: 'inside',
                 hole: 0.6, // Donut styled like crypto portfolio
@@ -5,12 +5,16 @@ import type {
   CategoriePerf,
   EvolutionTemporelle,
   PerformanceGeo,
+  LieuGeo,
+  NiveauGeo,
   AnalyseClients,
   Filtres,
   ValeursFiltres,
   FideliteClients,
   MargeProduits,
-  ComparaisonData
+  ComparaisonData,
+  DashboardData,
+  PanneauDashboard
 } from '../types';
 
 const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
@@ -78,6 +82,14 @@ export const apiService = {
     return data;
   },
 
+  // Drill-down géographique (États d'une région, villes d'un État)
+  async getDetailGeo(niveau: NiveauGeo, parent?: string, filtres?: Filtres): Promise<LieuGeo[]> {
+    const { data } = await api.get<LieuGeo[]>('/kpi/geographique/detail', {
+      params: { niveau, parent, ...filtres }
+    });
+    return data;
+  },
+
   // Analyse clients
   async getAnalyseClients(limite: number = 10, filtres?: Filtres): Promise<AnalyseClients> {
     const { data } = await api.get<AnalyseClients>('/kpi/clients', {
@@ -94,6 +106,23 @@ export const apiService = {
     return data;
   },
 
+  // Dashboard complet en une requête (filtrage unique côté API)
+  async getDashboard(
+    panneaux: PanneauDashboard[],
+    options: {
+      limite_produits?: number;
+      tri_par?: 'ca' | 'profit' | 'quantite';
+      periode?: 'jour' | 'mois' | 'annee';
+      limite_clients?: number;
+    } = {},
+    filtres?: Filtres
+  ): Promise<DashboardData> {
+    const { data } = await api.get<DashboardData>('/kpi/dashboard', {
+      params: { panneaux: panneaux.join(','), ...options, ...filtres }
+    });
+    return data;
+  },
+
   // Valeurs des filtres
   async getValeursFiltres(): Promise<ValeursFiltres> {
     const { data } = await api.get<ValeursFiltres>('/filters/valeurs');
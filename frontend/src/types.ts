@@ -57,6 +57,14 @@ export interface PerformanceGeo {
   nb_commandes: number;
 }
 
+export type NiveauGeo = 'region' | 'etat' | 'ville';
+
+export interface LieuGeo extends PerformanceGeo {
+  etat?: string;
+  ville?: string;
+  marge_pct: number;
+}
+
 export interface TopClient {
   customer_id: string;
   nom: string;
@@ -107,6 +115,20 @@ export interface ComparaisonData {
   latest: ComparaisonTemporelle;
 }
 
+export interface DashboardData {
+  globaux?: KPIGlobaux;
+  produits_top?: ProduitTop[];
+  produits_marge?: MargeProduits;
+  categories?: CategoriePerf[];
+  temporel?: EvolutionTemporelle[];
+  temporel_comparaison?: ComparaisonData;
+  geographique?: PerformanceGeo[];
+  clients?: AnalyseClients;
+  clients_fidelite?: FideliteClients;
+}
+
+export type PanneauDashboard = keyof DashboardData;
+
 export interface Filtres {
   date_debut?: string;
   date_fin?: string;
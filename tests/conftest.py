@@ -0,0 +1,30 @@
+"""
+Configuration commune des tests
+🧪 Rend importables les modules du backend et fournit un petit dataset
+   synthétique au schéma Superstore (benchmarks/generateur.py)
+"""
+
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+DOSSIER_BACKEND = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend')
+sys.path.insert(0, DOSSIER_BACKEND)
+sys.path.insert(0, os.path.join(DOSSIER_BACKEND, 'benchmarks'))
+
+from generateur import generer_dataset  # noqa: E402
+from schema import compacter_dataset  # noqa: E402
+
+# Taille du dataset des tests : quelques lignes par cellule du cube
+NB_LIGNES = 5_000
+
+
+@pytest.fixture(scope='session')
+def dataset():
+    """Dataset compact trié par date, comme après load_data"""
+    df = generer_dataset(NB_LIGNES)
+    for colonne in ('Order Date', 'Ship Date'):
+        df[colonne] = pd.to_datetime(df[colonne], format='%m/%d/%Y')
+    return compacter_dataset(df.sort_values('Order Date', kind='stable').reset_index(drop=True))
@@ -0,0 +1,48 @@
+"""
+Tests de l'API (main.py) sur un CSV synthétique
+🌐 Chaque requête KPI est relevée une fois dans le journal des filtres
+   (préchauffage), dashboard compris
+"""
+
+import os
+
+import pytest
+
+from generateur import ecrire_csv
+
+
+@pytest.fixture(scope='module')
+def api(tmp_path_factory):
+    """Application chargée sur un petit CSV, sans préchauffage ni partage"""
+    csv = ecrire_csv(str(tmp_path_factory.mktemp('donnees') / 'superstore.csv'), 2_000)
+    os.environ.update(DATASET_PATH=csv, DATASET_SNAPSHOT_DIR="", DATASET_SHM_DIR="", DATASET_SURVEILLANCE="0",
+                      KPI_PRECHAUFFAGE="0", KPI_PRECHAUFFAGE_JOURNAL="")
+    import main
+    from fastapi.testclient import TestClient
+
+    with TestClient(main.app) as client:
+        yield main, client
+
+
+@pytest.fixture
+def releves(api, monkeypatch):
+    """Filtres relevés dans le journal pendant le test"""
+    main, _ = api
+    notes = []
+    noter = main.journal_filtres.noter
+    monkeypatch.setattr(main.journal_filtres, 'noter', lambda filtres, nombre=1: (notes.append(filtres),
+                                                                                   noter(filtres, nombre)))
+    return notes
+
+
+@pytest.mark.parametrize('url', [
+    '/kpi/globaux?region=West',
+    '/kpi/dashboard?region=West',
+    '/kpi/dashboard?region=West&panneaux=globaux,geographique',
+])
+def test_requete_relevee_une_fois(api, releves, url):
+    _, client = api
+    for _ in range(2):  # calcul puis lecture du cache
+        assert client.get(url).status_code == 200
+    assert len(releves) == 2
+    assert all(filtres['region'] == ['West'] for filtres in releves)
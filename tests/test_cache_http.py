@@ -0,0 +1,30 @@
+"""
+ETag des réponses (cache_http.py)
+🏷️ Même jeu de filtres, même ETag quelle que soit son écriture ; jeux de
+   valeurs différents, ETags différents
+"""
+
+import pytest
+
+from cache_http import calculer_etag
+
+
+def etag(query_string: str) -> str:
+    return calculer_etag("source:1", "/kpi/globaux", query_string.encode("latin-1"))
+
+
+@pytest.mark.parametrize('formes', [
+    ['region=West&region=East', 'region=East&region=West', 'region=East,West', 'region=West,East',
+     'region=East%2CWest', 'region=West&region=East,West&categorie=Toutes'],
+    ['region=East&segment=Consumer&segment=Corporate', 'segment=Corporate,Consumer&region=East'],
+    ['', 'region=Toutes', 'categorie=Toutes&segment=Tous', 'profile=1'],
+    ['date_debut=2015-03-01', 'date_debut=2015-03-01T00:00:00'],
+])
+def test_formes_equivalentes(formes):
+    assert len({etag(forme) for forme in formes}) == 1
+
+
+def test_jeux_differents():
+    formes = ['', 'region=East', 'region=West', 'region=West&region=East', 'region=East&categorie=Technology',
+              'region=East&limite=5', 'etat=East']
+    assert len({etag(forme) for forme in formes}) == len(formes)
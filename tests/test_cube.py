@@ -0,0 +1,134 @@
+"""
+Cube journalier (cube.py)
+🧊 Les agrégats lus dans le cube sont ceux d'un parcours des lignes filtrées
+   (filtres.filtrer_par_masques puis groupby pandas), pour plusieurs
+   combinaisons de filtres ; une borne de date avec une heure n'est pas
+   servie par le cube
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cube import CubeJournalier
+from filtres import filtrer_par_masques
+from rechargement import EtatDataset
+from temporel import cles_periodes
+
+AGREGATIONS = {
+    'Sales': 'sum',
+    'Profit': 'sum',
+    'Quantity': 'sum',
+    'Order ID': 'nunique',
+    'Customer ID': 'nunique',
+}
+
+# Regroupements : None (total), dimension du cube ou granularité de période
+REGROUPEMENTS = [None, 'Category', 'Region', 'Segment', 'jour', 'mois', 'annee']
+
+FILTRES_JOURNALIERS = [
+    {},
+    {'categorie': 'Technology'},
+    {'region': 'West,East', 'segment': 'Consumer'},
+    {'categorie': 'Toutes', 'region': 'Toutes', 'segment': 'Tous'},
+    {'date_debut': '2015-03-01', 'date_fin': '2016-06-30'},
+    {'date_debut': '2016-01-01', 'categorie': 'Furniture', 'region': 'Central'},
+    {'date_fin': '2014-01-15'},
+    {'categorie': 'Inconnue'},
+]
+
+# Bornes en milieu de journée : le jour de la borne n'est que partiellement retenu
+FILTRES_HORAIRES = [
+    {'date_debut': '2015-03-01T12:00'},
+    {'date_fin': '2016-06-30T08:30', 'region': 'South'},
+    {'date_debut': '2015-03-01 00:00:01', 'date_fin': '2015-03-31 23:59', 'segment': 'Corporate'},
+]
+
+
+def reference(df: pd.DataFrame, filtres, regroupement):
+    """Agrégation des lignes filtrées par masques (comportement historique)"""
+    lignes = filtrer_par_masques(df, **filtres)
+    if regroupement is None:
+        return {colonne: getattr(lignes[colonne], fonction)() for colonne, fonction in AGREGATIONS.items()}
+    if regroupement in ('jour', 'mois', 'annee'):
+        cle = pd.Series(cles_periodes(lignes['Order Date'].to_numpy(), regroupement), index=lignes.index)
+    else:
+        cle = lignes[regroupement]
+    return lignes.groupby(cle, observed=True).agg(AGREGATIONS)
+
+
+def depuis_cube(cube: CubeJournalier, cellules: np.ndarray, regroupement):
+    """Même agrégation lue dans les cellules retenues du cube"""
+    if regroupement is None:
+        return cube.agreger(cellules, AGREGATIONS)
+    if regroupement in cube.valeurs:
+        libelles = cube.libelles(cellules, regroupement)
+    else:
+        libelles = cles_periodes(cube.jours[cellules], regroupement)
+    return cube.agreger(cellules, AGREGATIONS, libelles)
+
+
+def comparer(attendu, obtenu):
+    """Comptages et clés exacts, sommes à l'ordre de sommation près"""
+    if isinstance(attendu, dict):
+        assert obtenu.keys() == attendu.keys()
+        for colonne, valeur in attendu.items():
+            assert obtenu[colonne] == pytest.approx(valeur, rel=1e-9)
+        return
+    assert obtenu.index.astype(object).tolist() == attendu.index.astype(object).tolist()
+    for colonne, fonction in AGREGATIONS.items():
+        if fonction == 'nunique' or colonne == 'Quantity':
+            assert obtenu[colonne].tolist() == attendu[colonne].tolist(), colonne
+        else:
+            np.testing.assert_allclose(obtenu[colonne].to_numpy(), attendu[colonne].to_numpy(),
+                                       rtol=1e-9, atol=1e-9, err_msg=colonne)
+
+
+@pytest.fixture(scope='module')
+def etat(dataset):
+    return EtatDataset(dataset)
+
+
+@pytest.fixture(scope='module')
+def etat_horodate(dataset):
+    """Même dataset, commandes passées à des heures différentes de la journée"""
+    rng = np.random.default_rng(7)
+    commandes = dataset['Order ID'].astype(object)
+    heures = pd.Series(rng.integers(0, 24 * 60, commandes.nunique()), index=commandes.unique())
+    df = dataset.copy()
+    df['Order Date'] = df['Order Date'] + pd.to_timedelta(commandes.map(heures).to_numpy(), unit='min')
+    return EtatDataset(df.sort_values('Order Date', kind='stable').reset_index(drop=True))
+
+
+@pytest.mark.parametrize('filtres', FILTRES_JOURNALIERS)
+@pytest.mark.parametrize('regroupement', REGROUPEMENTS)
+def test_cube_egal_au_parcours(etat, filtres, regroupement):
+    cellules = etat.cube.selection(**filtres)
+    assert cellules is not None
+    comparer(reference(etat.df, filtres, regroupement), depuis_cube(etat.cube, cellules, regroupement))
+
+
+@pytest.mark.parametrize('filtres', FILTRES_HORAIRES)
+def test_borne_horaire_hors_cube(etat, filtres):
+    assert etat.cube.selection(**filtres) is None
+
+
+@pytest.mark.parametrize('filtres', FILTRES_JOURNALIERS + FILTRES_HORAIRES)
+@pytest.mark.parametrize('regroupement', REGROUPEMENTS)
+def test_requete_egale_au_parcours(etat, filtres, regroupement):
+    """Cube ou repli sur les lignes : la requête donne toujours le résultat du parcours"""
+    granularite = regroupement if regroupement in ('jour', 'mois', 'annee') else None
+    par = 'periode' if granularite else regroupement
+    obtenu = etat.requete(filtres).agreger(AGREGATIONS, par=par, granularite=granularite)
+    comparer(reference(etat.df, filtres, regroupement), obtenu)
+
+
+@pytest.mark.parametrize('filtres', FILTRES_JOURNALIERS[4:7] + FILTRES_HORAIRES)
+@pytest.mark.parametrize('regroupement', [None, 'Category', 'jour'])
+def test_dates_horodatees(etat_horodate, filtres, regroupement):
+    """Commandes avec une heure : filtres de dates hors cube, résultats du parcours"""
+    assert etat_horodate.cube.selection(**filtres) is None
+    granularite = 'jour' if regroupement == 'jour' else None
+    par = 'periode' if granularite else regroupement
+    obtenu = etat_horodate.requete(filtres).agreger(AGREGATIONS, par=par, granularite=granularite)
+    comparer(reference(etat_horodate.df, filtres, regroupement), obtenu)
@@ -0,0 +1,101 @@
+"""
+Équivalence des moteurs de requêtes (requetes.MOTEURS_REQUETES)
+🔌 Sur les mêmes données et les mêmes filtres, chaque moteur renvoie les
+   agrégats du moteur pandas : mêmes clés, mêmes comptages, et des sommes
+   égales à la précision des float64 près (l'ordre de sommation diffère)
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from rechargement import EtatDataset
+from requetes import MOTEURS_REQUETES, RequeteKPI
+
+# Écart relatif toléré sur les sommes (ordre de sommation propre à chaque moteur)
+TOLERANCE = 1e-9
+
+FILTRES = [
+    {},
+    {'categorie': 'Technology'},
+    {'region': 'West,East', 'segment': 'Consumer'},
+    {'date_debut': '2015-03-01', 'date_fin': '2016-06-30'},
+    {'date_debut': '2015-03-01T12:00', 'date_fin': '2016-06-30T08:30', 'categorie': 'Furniture'},
+    {'etat': 'California', 'mode_livraison': 'Standard Class'},
+    {'sous_categorie': 'Chairs,Phones', 'ventes_min': '100', 'remise_max': '0.2'},
+    {'categorie': 'Inconnue'},
+]
+
+# Agrégats demandés par les endpoints : (méthode, arguments)
+AGREGATS = [
+    ('agreger', ({'Sales': 'sum', 'Profit': 'sum', 'Quantity': 'sum', 'Order ID': 'nunique'},)),
+    ('agreger', ({'Sales': 'sum', 'Customer ID': 'nunique'}, 'Category')),
+    ('agreger', ({'Sales': 'sum', 'Profit': 'sum'}, ('Region', 'Segment'))),
+    ('agreger', ({'Sales': 'sum', 'Order ID': 'nunique'}, 'periode', 'jour')),
+    ('agreger', ({'Sales': 'sum', 'Profit': 'sum'}, 'periode', 'mois')),
+    ('agreger_geo', ('etat',)),
+    ('agreger_produits', ()),
+    ('agreger_clients', ()),
+    ('commandes_clients', ()),
+]
+
+
+@pytest.fixture(scope='module')
+def reference(dataset):
+    return EtatDataset(dataset)
+
+
+@pytest.fixture(scope='module', params=MOTEURS_REQUETES)
+def etat(request, dataset, reference):
+    """État du dataset interrogé par chaque moteur"""
+    if request.param == 'pandas':
+        return reference
+    if request.param == 'duckdb':
+        pytest.importorskip('duckdb')
+    from sql import EtatSQL
+    return EtatSQL(dataset, moteur=request.param)
+
+
+def par_client(commandes: pd.DataFrame) -> pd.DataFrame:
+    """
+    Commandes rangées dans un ordre indépendant des codes de clients,
+    propres à chaque moteur, et de l'ordre des commandes d'un même jour
+    (seul le regroupement par client compte)
+    """
+    commandes = commandes.sort_values(['client', 'jour', 'ventes'], kind='stable')
+    groupes = [groupe for _, groupe in commandes.groupby('client', sort=False)]
+    groupes.sort(key=lambda groupe: (tuple(groupe['jour']), tuple(groupe['ventes'].round(6))))
+    return pd.concat(groupes, ignore_index=True).drop(columns='client') if groupes else commandes
+
+
+def comparer(attendu, obtenu):
+    """Mêmes clés et comptages ; sommes égales à TOLERANCE près"""
+    if isinstance(attendu, dict):
+        assert obtenu.keys() == attendu.keys()
+        for colonne, valeur in attendu.items():
+            assert obtenu[colonne] == pytest.approx(valeur, rel=TOLERANCE)
+        return
+    attendu, obtenu = attendu.reset_index(), obtenu.reset_index()
+    assert list(obtenu.columns) == list(attendu.columns)
+    for colonne in attendu.columns:
+        a, b = attendu[colonne], obtenu[colonne]
+        if pd.api.types.is_float_dtype(a) or pd.api.types.is_float_dtype(b):
+            np.testing.assert_allclose(b.to_numpy(dtype=np.float64), a.to_numpy(dtype=np.float64),
+                                       rtol=TOLERANCE, atol=1e-9, err_msg=colonne)
+        else:
+            assert b.astype(object).tolist() == a.astype(object).tolist(), colonne
+
+
+def test_interface_abstraite():
+    with pytest.raises(TypeError):
+        RequeteKPI({})
+
+
+@pytest.mark.parametrize('filtres', FILTRES, ids=lambda filtres: '&'.join(f"{k}={v}" for k, v in filtres.items()))
+@pytest.mark.parametrize('methode, arguments', AGREGATS, ids=lambda valeur: str(valeur)[:40])
+def test_equivalence(reference, etat, filtres, methode, arguments):
+    attendu = getattr(reference.requete(filtres), methode)(*arguments)
+    obtenu = getattr(etat.requete(filtres), methode)(*arguments)
+    if methode == 'commandes_clients':
+        attendu, obtenu = par_client(attendu), par_client(obtenu)
+    comparer(attendu, obtenu)
@@ -0,0 +1,53 @@
+"""
+Journal des filtres demandés (prechauffage.JournalFiltres)
+🔥 Plusieurs workers partagent le fichier du journal : les requêtes de
+   chacun s'additionnent, sans double comptage d'une sauvegarde à l'autre
+"""
+
+from prechauffage import JournalFiltres
+
+
+def requetes(journal: JournalFiltres):
+    """Nombre de requêtes par combinaison (région seule)"""
+    return {tuple(journal._parametres[cle].get('region') or ()): nombre
+            for cle, nombre in journal._compteurs.items()}
+
+
+def test_workers_additionnes(tmp_path):
+    chemin = str(tmp_path / "journal.json")
+    premier, second = JournalFiltres(chemin), JournalFiltres(chemin)
+    for _ in range(3):
+        premier.noter({'region': 'East'})
+    second.noter({'region': 'West'})
+    second.noter({'region': 'East'})
+
+    premier.sauvegarder()
+    second.sauvegarder()
+    # Deuxième sauvegarde sans nouvelle requête : rien n'est recompté
+    premier.sauvegarder()
+
+    attendu = {('East',): 4, ('West',): 1}
+    assert requetes(JournalFiltres(chemin)) == attendu
+    # Chaque worker reprend les compteurs de tous les workers
+    assert requetes(premier) == attendu
+    assert requetes(second) == attendu
+
+
+def test_requetes_depuis_sauvegarde(tmp_path):
+    chemin = str(tmp_path / "journal.json")
+    journal = JournalFiltres(chemin)
+    journal.noter({'region': 'East'})
+    journal.sauvegarder()
+    JournalFiltres(chemin).sauvegarder()  # worker sans requête
+    journal.noter({'region': 'East,West', 'categorie': 'Toutes'})
+    journal.noter({'region': ['West', 'East']})
+    journal.sauvegarder()
+
+    assert requetes(JournalFiltres(chemin)) == {('East', 'West'): 2, ('East',): 1}
+
+
+def test_sans_chemin():
+    journal = JournalFiltres()
+    journal.noter({'region': 'East'})
+    journal.sauvegarder()
+    assert len(journal) == 1